@@ -46,7 +46,7 @@ extensions = ['sphinx.ext.autodoc' ,
 
 # Options for autodoc.
 autodoc_member_order = 'bysource'
-autodoc_mock_imports = ['numpy',
+autodoc_mock_imports = ['numpy', 'scipy',
                         'abaqus', 'abaqusConstants', 'abaqusExceptions',
                         'part', 'mesh', 'odbAccess', 'regionToolset']
 autodoc_default_options = {
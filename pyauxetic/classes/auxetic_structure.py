@@ -10,8 +10,15 @@ from odbAccess import openOdb
 from regionToolset import Region
 
 from .  import auxetic_structure_params  # noqa: E272
+from .. import export
+from .. import finalizer
+from .. import geometry
 from .. import helper
+from .. import mesh_quality
+from .. import monitor
 from .. import postprocessing
+from .. import restart
+from .. import stop_criteria
 
 logger = logging.getLogger(__name__)
 
@@ -31,6 +38,9 @@ class AuxeticStructure:
         7. :meth:`.create_job`
         8. :meth:`.submit_job`
         9. :meth:`.output_results`
+    
+    Afterwards, :meth:`.regenerate` can be used for changing the unit cell
+    parameters in the same model, followed by steps 6 to 9.
     """
     __metaclass__ = ABCMeta
     
@@ -63,6 +73,8 @@ class AuxeticStructure:
         self.model = model
         self.name  = name
         self.unit_cells            = []           # Assigned in add_unit_cells.
+        self.unit_cell_aliases     = dict()       # Assigned in add_unit_cells.
+        self.geometry_tolerance    = 1E-6         # Assigned in add_unit_cells.
         self.pattern_mode          = None         # Assigned in add_pattern_params.
         self.structure_map         = None         # Assigned in add_pattern_params.
         self.num_cell_repeat       = None         # Assigned in add_pattern_params.
@@ -70,10 +82,24 @@ class AuxeticStructure:
         self.part_3dprint          = None         # Assigned in assemble_structure.
         self.part_main_instance    = None         # Assigned in assemble_structure.
         self.part_3dprint_instance = None         # Assigned in assemble_structure.
+        self.part_unpartitioned    = None         # Assigned in _perpare_for_loading.
+        self.ribbon_width          = None         # Assigned in assemble_structure.
         self.sets                  = dict()       # Assigned in perpare_for_loading.
+        self.loading_params        = None         # Assigned in define_bcs.
         self.loading_rps           = [None, None] # Assigned in perpare_for_loading.
+        self.step_params           = None         # Assigned in define_step.
+        self.restart_params        = None         # Assigned in define_step.
+        self.field_output_params   = None         # Assigned in define_field_output.
+        self.mesh_quality          = None         # Assigned in check_mesh_quality.
         self.job                   = None         # Assigned in create_job.
+        self.job_dir               = None         # Assigned in create_job.
+        self.job_monitor           = None         # Assigned in submit_job.
+        self.stop_reason           = None         # Assigned in submit_job.
+        self.analysis_status       = None         # Assigned in submit_job and output_results.
         self.odb_path              = None         # Assigned in submit_job.
+        self.restart_jobs          = []           # Assigned in submit_job.
+        self.restart_odb_paths     = []           # Assigned in submit_job.
+        self.periodic_constraints  = []           # Assigned in _tie_periodic_boundaries.
         if   loading_params.direction.lower() == 'x':
             self.loading_direction    = 0
             self.transverse_direction = 1
@@ -110,9 +136,122 @@ class AuxeticStructure:
         """
         pass
     
+    def create_export_part(self, output_params, folder_path=None):
+        """Create a 3D part suitable for export without modifying the analysis model.
+        
+        The merged planar geometry of *self.part_main* is written to an ACIS file,
+        imported as a sketch into a separate model named *'<name>-Export'* and extruded.
+        If the BCs have been defined, *self.part_unpartitioned* is used instead, since
+        the analysis part has been partitioned by :meth:`._perpare_for_loading`.
+        If *output_params.export_ribbon_width* is larger than *self.ribbon_width*, the
+        ribbons are widened by merging a box with each loaded edge. Unlike
+        :meth:`assemble_structure` with *for_3dprint*, the unit cells are not patterned
+        and merged again, and the analysis model is left intact.
+        
+        Args:
+            output_params(OutputParams): Special namedtuple describing the parameters
+                                         for outputting the results of modeling and analysis.
+                                         See class for full description of options.
+                                         Here, *output_params.export_ribbon_width*
+                                         is used for deteriming width of the ribbons.
+            folder_path(str):            Folder in which the temporary ACIS file is written.
+                                         Defaults to :obj:`None` which uses *self.job_dir*,
+                                         or the current working directory if the job
+                                         has not been created.
+        
+        Returns:
+            The created part, which is also assigned to *self.part_3dprint*.
+        
+        Raises:
+            RuntimeError:    If the structure is not planar or has not been assembled.
+            AbaqusException: Various exceptions raised by the Abaqus API.
+        """
+        # The abaqus module cannot be imported in the GUI code,
+        # so only import it when running.
+        from abaqus import mdb
+        
+        if not self.is_planar:
+            raise RuntimeError('Export parts can only be created for planar structures.')
+        if self.part_main is None:
+            raise RuntimeError('assemble_structure must be called before create_export_part.')
+        
+        logger.debug('Creating the export part.')
+        model_name = self.name + '-Export'
+        if model_name in mdb.models.keys():
+            del mdb.models[model_name]
+        export_model    = mdb.Model(name=model_name, modelType=STANDARD_EXPLICIT)
+        assembly        = export_model.rootAssembly
+        extrusion_depth = self.unit_cells[0].params.extrusion_depth
+        assembly.DatumCsysByDefault(CARTESIAN)
+        
+        # Extrude the outline of the planar structure.
+        if self.part_unpartitioned is not None:
+            source_part = self.part_unpartitioned
+        else:
+            source_part = self.part_main
+        if folder_path is None:
+            folder_path = self.job_dir if self.job_dir is not None else os.getcwd()
+        acis_path = os.path.join(folder_path, model_name + '.sat')
+        source_part.writeAcisFile(fileName=acis_path)
+        try:
+            acis   = mdb.openAcis(acis_path, scaleFromFile=OFF)
+            sketch = export_model.ConstrainedSketchFromGeometryFile(name='planar structure',
+                                                                    geometryFile=acis)
+            core_part = export_model.Part(name='planar structure', dimensionality=THREE_D,
+                                          type=DEFORMABLE_BODY)
+            core_part.BaseSolidExtrude(sketch=sketch, depth=extrusion_depth)
+        finally:
+            os.remove(acis_path)
+        core_instance = assembly.Instance(name='planar structure-1', part=core_part,
+                                          autoOffset=OFF, dependent=ON)
+        logger.debug('Extruded the planar structure.')
+        
+        extra_width = output_params.export_ribbon_width - (self.ribbon_width or 0.0)
+        if extra_width <= 1E-9:
+            if extra_width < 0:
+                logger.warning('The ribbons of the analysis model are wider than' +
+                               ' output_params.export_ribbon_width and are exported as they are.')
+            self.part_3dprint          = core_part
+            self.part_3dprint_instance = core_instance
+            logger.debug('Created the export part.')
+            return core_part
+        
+        # Widen the ribbons at both loaded edges of the structure.
+        (min_coords, max_coords) = helper.get_box_coords(object_list=core_part)
+        ribbon_size = [0.0, 0.0]
+        ribbon_size[self.loading_direction]    = extra_width
+        ribbon_size[self.transverse_direction] = ( max_coords[self.transverse_direction]
+                                                 - min_coords[self.transverse_direction] )
+        ribbon_part = helper.create_ribbon_part(model=export_model,
+                                length_x=ribbon_size[0], length_y=ribbon_size[1],
+                                is3d=True, extrusion_depth=extrusion_depth)
+        instances = [core_instance]
+        for position in (min_coords[self.loading_direction] - extra_width,
+                         max_coords[self.loading_direction]):
+            vector = list(min_coords)
+            vector[self.loading_direction] = position
+            instances.append(assembly.Instance(name='ribbon_instance-%i'%len(instances),
+                                               part=ribbon_part, autoOffset=OFF, dependent=ON))
+            assembly.translate(instanceList=(instances[-1].name, ), vector=vector)
+        merge_instance = assembly.InstanceFromBooleanMerge(name='print structure',
+                                    instances=instances, originalInstances=DELETE, domain=GEOMETRY)
+        export_model.parts.__delitem__(core_part.name)
+        export_model.parts.__delitem__(ribbon_part.name)
+        
+        self.part_3dprint          = merge_instance.part
+        self.part_3dprint_instance = merge_instance
+        logger.debug('Created the export part with ribbons of width %g.',
+                     output_params.export_ribbon_width)
+        return merge_instance.part
+    #
+    
     def add_pattern_params(self, pattern_params):
         """Add the parameters used by :meth:`.assemble_structure` for assembling the structure.
         
+        For all pattern modes, *self.structure_map* is assigned a
+        :class:`.geometry.SparseStructureMap`, so uniform and sparse maps
+        are never expanded to a dense array.
+        
         Args:
             pattern_params(PatternParams): Special namedtuple describing the parameters
                                            for patterning the unit cell(s).
@@ -138,32 +277,50 @@ class AuxeticStructure:
             else:
                 self.pattern_mode    = pattern_mode
                 self.num_cell_repeat = num_cell_repeat
-                self.structure_map   = np.ones([num_cell_repeat[0], num_cell_repeat[1]]) * \
-                                       self.unit_cells[0].params.id
+                self.structure_map   = geometry.SparseStructureMap.uniform(
+                                           num_cell_repeat[:2], self.unit_cells[0].params.id)
+        elif pattern_mode == 'periodic':
+            if len(self.unit_cells) != 1:
+                raise ValueError('periodic patterning requires exactly one unit cell.')
+            if (num_cell_repeat is not None) or (structure_map is not None):
+                raise ValueError('periodic patterning requires both num_cell_repeat' +
+                                 ' and structure_map to be None.')
+            self.pattern_mode    = pattern_mode
+            self.num_cell_repeat = (1, 1)
+            self.structure_map   = geometry.SparseStructureMap.uniform((1, 1), self.unit_cells[0].params.id)
         elif pattern_mode == 'nonuniform':
             if (structure_map is None) or (num_cell_repeat is not None):
                 raise ValueError('nonuniform patterning requires structure_map' +
                                  'to be defined and num_cell_repeat to be None.')
-            elif type(structure_map) is not np.ndarray:
-                raise ValueError('structure_map must be a numpy ndarray.')
             else:
+                # Raises ValueError for invalid types.
+                structure_map        = geometry.as_sparse_structure_map(structure_map)
                 self.pattern_mode    = pattern_mode
                 self.structure_map   = structure_map
-                self.num_cell_repeat = (structure_map.shape[0], structure_map.shape[1])
+                self.num_cell_repeat = structure_map.shape
             # All elements in structure_map must correspond to a unit cell.
-            uc_id_list = [uc.id for uc in self.unit_cells]
-            for elem in np.unique(structure_map):
+            uc_id_list = [uc.id for uc in self.unit_cells] + list(self.unit_cell_aliases.keys())
+            for elem in structure_map.ids():
                 if elem not in uc_id_list:
                     raise ValueError('structure_map contains ids' +
                                      'that are not defined as unit cells.')
+            if self.unit_cell_aliases:
+                # Use the ids of the shared unit cells, so identical geometries form common blocks.
+                self.structure_map = structure_map.replace_ids(self.unit_cell_aliases)
         else:
             raise ValueError('Invalid value for pattern_mode.')
         logger.info('Pattern data added to the structure.')
     #
     
-    def add_unit_cells(self, unit_cell_params):
+    def add_unit_cells(self, unit_cell_params, tolerance=1E-6):
         """Add one or more unit cells to the auxetic structure.
         
+        Unit cells describing the same geometry, according to
+        :meth:`.auxetic_unit_cell.AuxeticUnitCell.geometry_key`, share one
+        unit cell object and thus one sketch and part. The ids of the other
+        unit cells are kept in *self.unit_cell_aliases* and are resolved by
+        :meth:`.get_unit_cell_by_id` and :meth:`.add_pattern_params`.
+        
         Args:
             unit_cell_params: Special namedtuple describing the unit cell geometry.
                               The namedtuple must be selected from 
@@ -172,6 +329,7 @@ class AuxeticStructure:
                               For nonuniform structures, must be a tuple
                               where all unit cell ids used in
                               *self.structure_map* are defined.
+            tolerance(float): Tolerance for comparing the geometries. Defaults to 1E-6.
         Raises:
             RuntimeError: If :meth:`.add_pattern_params` has already been called.
             ValueError:   If *unit_cell_params* is invalid.
@@ -224,8 +382,22 @@ class AuxeticStructure:
             logger.debug('All unit cells have an extrusion_depth of %f.'%ucp_extrusion_depths[0])
         
         # Initialize the unit cells and add them to structure.
+        # Parameters describing an existing geometry are mapped to its unit cell.
+        self.geometry_tolerance = tolerance
+        unit_cells_by_key = dict( (self.unit_cell_class.geometry_key(uc.params, tolerance), uc)
+                                  for uc in self.unit_cells )
         for ucp in unit_cell_params: #TODO: make sure it's the same for all unit cells.
-            self.unit_cells.append( self.unit_cell_class(self.model, ucp) )
+            key = self.unit_cell_class.geometry_key(ucp, tolerance)
+            if key in unit_cells_by_key:
+                self.unit_cell_aliases[ucp.id] = unit_cells_by_key[key].id
+                logger.debug('Unit cell %i has the same geometry as unit cell %i and shares its part.',
+                             ucp.id, unit_cells_by_key[key].id)
+            else:
+                self.unit_cells.append( self.unit_cell_class(self.model, ucp) )
+                unit_cells_by_key[key] = self.unit_cells[-1]
+        if self.unit_cell_aliases:
+            logger.info('%i unit cells share the geometry of others. %i unique unit cells were created.',
+                        len(self.unit_cell_aliases), len(self.unit_cells))
     
     logger.info('Unit cell added added to the structure.')
     #
@@ -242,11 +414,113 @@ class AuxeticStructure:
         Raises:
             ValueError: If the unit cell does not exist.
         """
+        id = self.unit_cell_aliases.get(id, id)
         for uc in self.unit_cells:
             if uc.id == id:
                 return uc
         raise ValueError('No unit cell with id=%i'%id)
     
+    def regenerate(self, unit_cell_params, loading_params=None):
+        """Change the unit cell parameters and regenerate the structure in the same model.
+        
+        The unit cells are updated using
+        :meth:`.auxetic_unit_cell.AuxeticUnitCell.update_params`, which recreates
+        their sketches and parts, and the structure is assembled again.
+        The model, material, section, and step are reused, so batches which only
+        vary the geometry do not need a new model for each structure.
+        All parts, sets, BCs, loads and constraints are deleted and, if *loading_params* is given, the BCs are defined again.
+        Afterwards, :meth:`.mesh_part` and the following methods must be called.
+        
+        Args:
+            unit_cell_params: New parameters of one or more unit cells of the structure,
+                              which are matched to the existing unit cells by their id.
+                              If the structure has a single unit cell,
+                              the id of the new parameters is ignored.
+                              Unit cells sharing a part must keep the same geometry.
+            loading_params(LoadingParams):
+                              Special namedtuple describing the loading
+                              and boundary conditions applied to the model.
+                              Its direction must not change. Defaults to :obj:`None`,
+                              which means :meth:`.define_bcs` is not called.
+        
+        Raises:
+            RuntimeError: If :meth:`.assemble_structure` has not been called before.
+            ValueError:   If *unit_cell_params* is invalid.
+            AbaqusException: Various exceptions raised by the Abaqus API.
+        """
+        if self.part_main is None:
+            raise RuntimeError('The structure must be assembled before it is regenerated.')
+        
+        if isinstance(unit_cell_params, self.unit_cell_class.params_class_list):
+            unit_cell_params = (unit_cell_params,)
+        if len(self.unit_cells) == 1 and len(unit_cell_params) == 1:
+            # Keep the id so the structure map remains valid.
+            unit_cell_params = (unit_cell_params[0]._replace(id=self.unit_cells[0].id), )
+        if self.is_planar:
+            ucp_extrusion_depths = [ucp.extrusion_depth for ucp in unit_cell_params] + \
+                                   [uc.params.extrusion_depth for uc in self.unit_cells]
+            if len( np.unique(ucp_extrusion_depths) ) != 1:
+                raise ValueError('unit_cell_params contains more than one value for extrusion_depth.')
+        # Unit cells sharing a part are updated once, using the id of the shared unit cell.
+        shared_params = dict()
+        for ucp in unit_cell_params:
+            uc_id = self.get_unit_cell_by_id(ucp.id).id
+            if uc_id in shared_params and \
+               self.unit_cell_class.geometry_key(shared_params[uc_id], self.geometry_tolerance) != \
+               self.unit_cell_class.geometry_key(ucp, self.geometry_tolerance):
+                raise ValueError('Unit cells sharing the part of unit cell %i' %uc_id +
+                                 ' must keep the same geometry.')
+            shared_params[uc_id] = ucp._replace(id=uc_id)
+        
+        logger.info('Regenerating structure %s with new unit cell parameters.', self.name)
+        
+        # Delete everything which depends on the old geometry.
+        # Parts of the unit cells are also deleted, since they may have been
+        # partitioned or used directly, e.g. in periodic structures.
+        model = self.model
+        for repository in (model.boundaryConditions, model.loads, model.constraints):
+            for key in repository.keys():
+                del repository[key]
+        model.rootAssembly.deleteAllFeatures()
+        for uc in self.unit_cells:
+            if uc._part_main is not None:
+                del uc.part_main
+            if uc._part_3dprint is not None:
+                del uc.part_3dprint
+        for key in model.parts.keys():
+            del model.parts[key]
+        logger.debug('Deleted the parts, BCs, loads, and constraints of the old structure.')
+        
+        for (uc_id, ucp) in shared_params.items():
+            self.get_unit_cell_by_id(uc_id).update_params(ucp)
+        
+        self.part_main             = None
+        self.part_3dprint          = None
+        self.part_main_instance    = None
+        self.part_3dprint_instance = None
+        self.part_unpartitioned    = None
+        self.sets                  = dict()
+        self.loading_rps           = [None, None]
+        self.periodic_constraints  = []
+        self.job                   = None
+        self.job_monitor           = None
+        self.stop_reason           = None
+        self.analysis_status       = None
+        self.odb_path              = None
+        self.restart_jobs          = []
+        self.restart_odb_paths     = []
+        self.mesh_quality          = None
+        
+        self.assemble_structure(for_3dprint=False, delete_all=True)
+        if 'section' in model.sections.keys():
+            self._assign_section()
+        if loading_params is not None:
+            self.define_bcs(loading_params)
+            if self.field_output_params is not None:
+                # The requested regions belonged to the old geometry.
+                self.define_field_output(self.field_output_params)
+        logger.info('Regenerated structure %s.', self.name)
+    
     def _perpare_for_loading(self):
         """Prepare the structure for loading. This function is called by :meth:`.define_bcs`.
         
@@ -270,6 +544,10 @@ class AuxeticStructure:
               The first RP is fixed and the second undergoes force/displacement.
               These RPs are coupled using an equation to *self.sets['LD-Edge-1']*
               and *self.sets['LD-Edge-2']*, respectively.
+            
+            - **self.part_unpartitioned**: Copy of the planar part before it is partitioned,
+              in a separate model named *'<name>-Unpartitioned'*.
+              Used by :meth:`.create_export_part`.
         
         Raises:
             RuntimeError: If the part has been previously partitioned.
@@ -291,6 +569,19 @@ class AuxeticStructure:
         point_y1_coords = (coords[1][0]/2.0, coords[0][1]  , coords[0][2])
         point_y2_coords = (coords[1][0]/2.0, coords[1][1]  , coords[0][2])
         
+        # The partitions are only needed for the analysis, so an unpartitioned copy
+        # of the part is kept in a separate model for create_export_part.
+        if self.is_planar:
+            # The abaqus module cannot be imported in the GUI code,
+            # so only import it when running.
+            from abaqus import mdb
+            model_name = self.name + '-Unpartitioned'
+            if model_name in mdb.models.keys():
+                del mdb.models[model_name]
+            copy_model = mdb.Model(name=model_name, modelType=STANDARD_EXPLICIT)
+            self.part_unpartitioned = copy_model.Part(name=part.name, objectToCopy=part)
+            logger.debug('Copied the unpartitioned part to model %s.', model_name)
+        
         # Partition the part like a cross to have proper stress paths.
         logger.debug('Partitioning the structure.')
         part.PartitionFaceByShortestPath(point1=point_x1_coords,
@@ -373,6 +664,190 @@ class AuxeticStructure:
         logger.info('Prepared the structure for loading.')
     #
     
+    def _define_periodic_bcs(self, loading_params):
+        """Apply loads and boundary conditions to a periodic unit cell.
+        This function is called by :meth:`.define_bcs` when *self.pattern_mode*
+        is *'periodic'*.
+        
+        Two reference points are created, whose displacements are the
+        relative displacements of the opposite boundaries of the unit cell:
+        
+            - **self.loading_rps[0]** (*'RP-LD-set'*): Relative displacement of
+              the boundaries normal to the loading direction. It undergoes the
+              force/displacement in the loading direction and is fixed in the
+              transverse direction, so no macroscopic shear is applied.
+            - **self.loading_rps[1]** (*'RP-TD-set'*): Relative displacement of
+              the boundaries normal to the transverse direction. It is fixed in the
+              loading direction and free in the transverse direction, which gives
+              a macroscopic uniaxial stress state.
+        
+        The boundary nodes are tied to these reference points by
+        :meth:`._tie_periodic_boundaries` after the part is meshed.
+        
+        Args:
+            loading_params(LoadingParams): Special namedtuple describing the loading and
+                                           and boundary conditions applied to the model.
+                                           See class for full description of options.
+        
+        Raises:
+            RuntimeError:    If the number of steps in the model is not exactly 2.
+            ValueError:      If *loading_params.type* is invalid.
+            AbaqusException: Various exceptions raised by the Abaqus API.
+        """
+        
+        loading_type = loading_params.type
+        loading_data = loading_params.data
+        assembly     = self.model.rootAssembly
+        
+        if len(self.model.steps) != 2:
+            raise RuntimeError(
+                ('The number of steps in the model is not exactly 2.' +
+                 ' This means that either self.define_step() has not been called,' +
+                 ' or steps have been manually added to the model.'))
+        loading_step = self.model.steps.values()[1]
+        
+        # Create reference points for the relative displacement of the boundaries.
+        logger.debug('Creating reference points for the periodic boundaries.')
+        coords = helper.get_box_coords(object_list=self.part_main_instance)
+        rp_ld = assembly.ReferencePoint(point=(coords[1][0], coords[1][1], coords[0][2]))
+        rp_td = assembly.ReferencePoint(point=(coords[0][0], coords[1][1], coords[0][2]))
+        self.loading_rps[0] = assembly.Set(referencePoints=(
+                        assembly.referencePoints[rp_ld.id], ), name='RP-LD-set')
+        self.loading_rps[1] = assembly.Set(referencePoints=(
+                        assembly.referencePoints[rp_td.id], ), name='RP-TD-set')
+        
+        # Note: Directions are 0,1,2 in the program, but 1,2,3 for the API.
+        ld_dof = [UNSET, UNSET]
+        td_dof = [UNSET, UNSET]
+        ld_dof[self.transverse_direction] = 0.0
+        td_dof[self.loading_direction]    = 0.0
+        
+        if   loading_type.lower() in ['disp', 'displacement']:
+            ld_dof[self.loading_direction] = loading_data
+        elif loading_type.lower() == 'force':
+            cf = [UNSET, UNSET]
+            cf[self.loading_direction] = loading_data
+            self.model.ConcentratedForce(name='UM-Force-BC', createStepName=loading_step.name,
+                                         region=self.loading_rps[0], follower=OFF,
+                                         distributionType=UNIFORM, field='', localCsys=None,
+                                         amplitude=UNSET, cf1=cf[0], cf2=cf[1])
+        else:
+            raise ValueError('Invalid value for loading_type: %s'%loading_type)
+        
+        self.model.DisplacementBC(name='Periodic-LD-BC', createStepName=loading_step.name,
+                                  region=self.loading_rps[0],
+                                  distributionType=UNIFORM, fieldName='', localCsys=None,
+                                  u1=ld_dof[0], u2=ld_dof[1], ur3=UNSET,
+                                  amplitude=UNSET, fixed=OFF)
+        self.model.DisplacementBC(name='Periodic-TD-BC', createStepName=loading_step.name,
+                                  region=self.loading_rps[1],
+                                  distributionType=UNIFORM, fieldName='', localCsys=None,
+                                  u1=td_dof[0], u2=td_dof[1], ur3=UNSET,
+                                  amplitude=UNSET, fixed=OFF)
+        logger.info('Defined periodic BCs with a uniaxial %s loading of %f.',
+                    loading_type, loading_data)
+    #
+    
+    def _tie_periodic_boundaries(self):
+        """Tie the nodes on opposite boundaries of a periodic unit cell.
+        This function is called by :meth:`.mesh_part` when *self.pattern_mode*
+        is *'periodic'*. Constraints from a previous mesh are deleted first.
+        
+        Nodes are paired using a sorted-coordinate lookup
+        (see :func:`.helper.pair_periodic_nodes`) and for every pair
+        an equation :math:`u^+ - u^- - u^{RP} = 0` is defined in both directions.
+        Nodes on the corners, if any, are tied to the corner with minimum coordinates
+        so the equations are not redundant.
+        A node which is not tied is pinned to remove the rigid body motion.
+        
+        Raises:
+            RuntimeError:    If the mesh is not periodic.
+            AbaqusException: Various exceptions raised by the Abaqus API.
+        """
+        
+        logger.debug('Tying the periodic boundaries.')
+        part     = self.part_main
+        instance = self.part_main_instance
+        
+        # Delete the constraints and sets of the previous mesh.
+        for name in self.periodic_constraints:
+            if name in self.model.constraints.keys():
+                del self.model.constraints[name]
+            if name in part.sets.keys():
+                del part.sets[name]
+        if 'Periodic-Pin-BC' in self.model.boundaryConditions.keys():
+            del self.model.boundaryConditions['Periodic-Pin-BC']
+        self.periodic_constraints = []
+        
+        labels = np.array([n.label       for n in part.nodes])
+        coords = np.array([n.coordinates for n in part.nodes])
+        box_min = coords.min(axis=0)
+        box_max = coords.max(axis=0)
+        tol = 1E-6 * max(box_max - box_min)
+        
+        # The loading RP ties the boundaries normal to the loading direction.
+        rp_sets = {self.loading_direction   : 'RP-LD-set',
+                   self.transverse_direction: 'RP-TD-set'}
+        
+        on_min = [abs(coords[:, i] - box_min[i]) < tol for i in (0, 1)]
+        on_max = [abs(coords[:, i] - box_max[i]) < tol for i in (0, 1)]
+        is_corner = (on_min[0] | on_max[0]) & (on_min[1] | on_max[1])
+        
+        def tie(dependent, independent, rp_normals):
+            # Define u_dependent - u_independent - sum(u_rp) = 0 in both directions.
+            for label in (dependent, independent):
+                name = 'PBC-N%i'%label
+                if name not in part.sets.keys():
+                    part.SetFromNodeLabels(name=name, nodeLabels=(int(label),))
+                    self.periodic_constraints.append(name)
+            for dof in (1, 2):
+                eq_name = 'PBC-%i-%i-%i'%(dependent, independent, dof)
+                terms = [( 1.0, instance.name+'.PBC-N%i'%dependent  , dof),
+                         (-1.0, instance.name+'.PBC-N%i'%independent, dof)]
+                terms += [(-1.0, rp_sets[normal], dof) for normal in rp_normals]
+                self.model.Equation(name=eq_name, terms=tuple(terms))
+                self.periodic_constraints.append(eq_name)
+        
+        tied = set()
+        for normal in (0, 1):
+            tangent  = 1 - normal
+            on_minus = np.where( on_min[normal] & ~is_corner )[0]
+            on_plus  = np.where( on_max[normal] & ~is_corner )[0]
+            (minus_idx, plus_idx) = helper.pair_periodic_nodes(
+                                        coords[on_minus, tangent], coords[on_plus, tangent], tol)
+            for (i, j) in zip(on_minus[minus_idx], on_plus[plus_idx]):
+                tie(labels[j], labels[i], (normal,))
+                tied.add(labels[j])
+        
+        # Corners are tied to the corner with minimum coordinates, if there is one.
+        corners = np.where(is_corner)[0]
+        if len(corners) > 0:
+            origin = [i for i in corners if on_min[0][i] and on_min[1][i]]
+            if len(origin) != 1 or len(corners) != 4:
+                raise RuntimeError('The corners of the unit cell are not meshed periodically.')
+            for i in corners:
+                if i == origin[0]:
+                    continue
+                rp_normals = tuple(normal for normal in (0, 1) if on_max[normal][i])
+                tie(labels[i], labels[origin[0]], rp_normals)
+                tied.add(labels[i])
+        num_pairs = len(tied)
+        
+        # Pin the untied node nearest to the center to remove the rigid body motion.
+        free = np.array([label not in tied for label in labels])
+        distance = np.linalg.norm(coords - (box_min+box_max)/2.0, axis=1)
+        distance[~free] = np.inf
+        pin_label = int(labels[np.argmin(distance)])
+        part.SetFromNodeLabels(name='PBC-Pin', nodeLabels=(pin_label,))
+        self.periodic_constraints.append('PBC-Pin')
+        self.model.DisplacementBC(name='Periodic-Pin-BC', createStepName='Initial',
+                                  region=instance.sets['PBC-Pin'],
+                                  u1=SET, u2=SET, ur3=UNSET)
+        
+        self.model.rootAssembly.regenerate()
+        logger.info('Tied %i pairs of nodes on the periodic boundaries.', num_pairs)
+    #
+    
     def assign_material(self, material_params):
         """Assign material properties to the auxetic structure.
         
@@ -395,7 +870,6 @@ class AuxeticStructure:
         
         logger.debug('Defining material properties for the structure.')
         model = self.model
-        part = self.part_main
         
         logger.debug('Defining material properties.')
         material = model.Material(name='material')
@@ -434,31 +908,41 @@ class AuxeticStructure:
             logger.debug('Defined hyperelastic property based on the %s material model.', type)
         
         
+        model.HomogeneousSolidSection(name='section', material=material.name, thickness=1.0)
+        self._assign_section()
+        logger.info('Defined material properties for the structure.')
+    #
+    
+    def _assign_section(self):
+        """Assign the section defined by :meth:`.assign_material` to *self.part_main*.
+        This function is also called by :meth:`.regenerate` for the new part.
+        """
         logger.debug('Assigning section to the structure.')
-        section = model.HomogeneousSolidSection(name='section',
-                                                material=material.name, thickness=1.0)
-        
+        part   = self.part_main
         region = Region(faces=part.faces, cells=part.cells)
-        part.SectionAssignment(region=region, sectionName=section.name,
+        part.SectionAssignment(region=region, sectionName='section',
                                offset=0.0, offsetType=MIDDLE_SURFACE, offsetField='', 
                                thicknessAssignment=FROM_SECTION)
         logger.debug('Assigned section to the structure.')
-        logger.info('Defined material properties for the structure.')
     #
     
-    def define_step(self, step_params=None):
+    def define_step(self, step_params=None, restart_params=None):
         """Define a single step for the analysis.
         Currently, only static general steps are supported.
         The step is named *'Step-1'*, but this name is not hard-coded elsewhere.
         Also, the nonlinear geometry (NLGEOM) parameter is always turned on.
         
         Args:
-            step_params(StepParams): Special namedtuple describing
-                                     the step defined for analysis.
-                                     If not specified, the default values of
-                                     the namedtuple are used.
-                                     Also, validation of values is done by Abaqus API.
-                                     See class for full description of options.
+            step_params(StepParams):       Special namedtuple describing
+                                           the step defined for analysis.
+                                           If not specified, the default values of
+                                           the namedtuple are used.
+                                           Also, validation of values is done by Abaqus API.
+                                           See class for full description of options.
+            restart_params(RestartParams): Special namedtuple describing the restart of
+                                           the job if it stops because of increment limits
+                                           or cutbacks. If specified, restart data is written.
+                                           Defaults to :obj:`None`.
         
         Raises:
             AbaqusException: Various exceptions raised by the Abaqus API.
@@ -473,11 +957,119 @@ class AuxeticStructure:
         max_inc_size  = step_params.max_inc_size
         max_num_inc   = step_params.max_num_inc
         
+        self.step_params = step_params
         logger.debug('Defining step for the analysis.')
         self.model.StaticStep(name='Step-1', previous='Initial',
                               timePeriod=time_period, nlgeom=ON, maxNumInc=max_num_inc,
                               initialInc=init_inc_size, minInc=min_inc_size, maxInc=max_inc_size)
         logger.info('Defined a static general step for the analysis.')
+        
+        self.restart_params = restart_params
+        if restart_params is not None:
+            self.model.steps['Step-1'].Restart(frequency=restart_params.frequency,
+                                               numberIntervals=0, overlay=ON, timeMarks=OFF)
+            logger.debug('Requested restart data every %i increments.', restart_params.frequency)
+    #
+    
+    def update_step(self, step_params):
+        """Change the step defined by :meth:`.define_step`, e.g. the increment sizes
+        of a structure regenerated by :meth:`.regenerate`.
+        
+        Args:
+            step_params(StepParams): Special namedtuple describing the step.
+        
+        Raises:
+            AbaqusException: Various exceptions raised by the Abaqus API.
+        """
+        self.model.steps['Step-1'].setValues(timePeriod=step_params.time_period,
+                                             maxNumInc=step_params.max_num_inc,
+                                             initialInc=step_params.init_inc_size,
+                                             minInc=step_params.min_inc_size,
+                                             maxInc=step_params.max_inc_size)
+        self.step_params = step_params
+        logger.debug('Updated the step of the analysis: %s.', step_params)
+    #
+    
+    def define_field_output(self, field_output_params=None):
+        """Replace the field output requests of the model.
+        
+        By default, Abaqus writes its preselected variables of the whole model in every
+        increment, although :mod:`.postprocessing` only needs the displacements of a few
+        node sets. Each region is requested separately and named *'F-Output-<set name>'*.
+        :meth:`.define_bcs` must be called before this, since the sets are defined there.
+        The requests are defined again by :meth:`.regenerate`.
+        
+        Args:
+            field_output_params(FieldOutputParams): Special namedtuple describing the field
+                                                    output. See class for full description
+                                                    of options. Defaults to :obj:`None`
+                                                    which uses the *'metrics_only'* preset.
+        
+        Raises:
+            RuntimeError:    If :meth:`.define_bcs` has not been called.
+            ValueError:      If *field_output_params* is invalid.
+            AbaqusException: Various exceptions raised by the Abaqus API.
+        """
+        if field_output_params is None:
+            field_output_params = auxetic_structure_params.FieldOutputParams()
+        if self.loading_rps[0] is None:
+            raise RuntimeError('define_bcs must be called before define_field_output.')
+        
+        model    = self.model
+        assembly = model.rootAssembly
+        preset   = field_output_params.preset
+        logger.debug('Defining the field output requests.')
+        
+        # Each request is a tuple (name, region, variables).
+        if preset == 'default':
+            requests = [ ('F-Output-1', MODEL, PRESELECT) ]
+        elif preset == 'metrics_only':
+            requests = [ ('F-Output-%s'%rp_set.name, rp_set, ('U', 'RF'))
+                         for rp_set in self.loading_rps ]
+            if self.pattern_mode != 'periodic':
+                requests.extend( ('F-Output-%s'%name, self.part_main_instance.sets[name], ('U', ))
+                                 for name in ('LD-Edge-1', 'LD-Edge-2', 'TD-Edge-1',
+                                              'TD-Edge-2', 'Mid-Vertice-1', 'Mid-Vertice-2') )
+        elif preset == 'custom':
+            variables = tuple(field_output_params.variables or ('U', 'RF', 'S', 'LE'))
+            if field_output_params.regions is None:
+                requests = [ ('F-Output-1', MODEL, variables) ]
+            else:
+                requests = []
+                for name in field_output_params.regions:
+                    if name in self.sets:
+                        region = self.part_main_instance.sets[name]
+                    elif name in assembly.sets.keys():
+                        region = assembly.sets[name]
+                    else:
+                        raise ValueError("Set '%s' in field_output_params.regions does not exist."%name)
+                    requests.append( ('F-Output-%s'%name, region, variables) )
+        else:
+            raise ValueError("Invalid value '%s' for field_output_params.preset."%preset)
+        
+        if field_output_params.time_points is not None:
+            if 'Output-Times' in model.timePoints.keys():
+                del model.timePoints['Output-Times']
+            model.TimePoint(name='Output-Times',
+                            points=tuple( (time, ) for time in field_output_params.time_points ))
+            timing = dict(timePoint='Output-Times')
+        elif field_output_params.num_intervals is not None:
+            timing = dict(numIntervals=field_output_params.num_intervals, timeMarks=OFF)
+        else:
+            timing = dict(frequency=field_output_params.frequency)
+        
+        for name in model.fieldOutputRequests.keys():
+            del model.fieldOutputRequests[name]
+        for (name, region, variables) in requests:
+            if region is MODEL:
+                model.FieldOutputRequest(name=name, createStepName='Step-1',
+                                         variables=variables, **timing)
+            else:
+                model.FieldOutputRequest(name=name, createStepName='Step-1', region=region,
+                                         sectionPoints=DEFAULT, rebar=EXCLUDE,
+                                         variables=variables, **timing)
+        self.field_output_params = field_output_params
+        logger.info('Defined %i field output requests using the %s preset.', len(requests), preset)
     #
     
     def define_bcs(self, loading_params):
@@ -511,6 +1103,11 @@ class AuxeticStructure:
         loading_data      = loading_params.data
         
         logger.debug('Defining the BCs.')
+        self.loading_params = loading_params
+        
+        if self.pattern_mode == 'periodic':
+            self._define_periodic_bcs(loading_params)
+            return
         
         # Prepare the structure for loading.
         self._perpare_for_loading()
@@ -653,6 +1250,14 @@ class AuxeticStructure:
         part = self.part_main
         if mesh_params.seed_size is None:
             raise ValueError('mesh_params.seed_size has not been specified.')
+        if len(part.elements) > 0:
+            # The part is being remeshed, e.g. by a mesh convergence study.
+            # The geometry, sets, and BCs are kept.
+            if self.is_shell:
+                part.deleteMesh(regions=part.faces)
+            else:
+                part.deleteMesh(regions=part.cells)
+            logger.debug('Deleted the existing mesh.')
         part.seedPart(size=mesh_params.seed_size, deviationFactor=0.1, minSizeFactor=0.1)
         logger.debug('Seed generated.')
         
@@ -670,6 +1275,9 @@ class AuxeticStructure:
         part.generateMesh()
         logger.debug('Mesh generated.')
         
+        if self.pattern_mode == 'periodic':
+            self._tie_periodic_boundaries()
+        
         # Get text stats of element codes and types for logging.
         # This is a possible bottleneck. #TODO: test for 500K+ elements.
         elem_stats=dict()
@@ -686,7 +1294,75 @@ class AuxeticStructure:
          %(elem_library.name.capitalize(), elem_stats_str) )
     #
     
-    def create_job(self, job_params):
+    def check_mesh_quality(self, mesh_params, quality_params):
+        """Check the quality of the mesh before the job is submitted.
+        
+        It must be called after :meth:`.mesh_part`. The metrics of all elements
+        are computed by :func:`.mesh_quality.evaluate_mesh_quality`, whose summary
+        is assigned to *self.mesh_quality*. If the mesh is not accepted, the action
+        depends on *quality_params.action*, see :class:`MeshQualityParams`.
+        
+        Args:
+            mesh_params(MeshParams):           Special namedtuple describing the mesh
+                                               applied to the model.
+            quality_params(MeshQualityParams): Special namedtuple describing the quality check.
+        
+        Returns:
+            The :class:`MeshParams` of the accepted mesh, whose seed size
+            is smaller than *mesh_params.seed_size* if the part was remeshed.
+        
+        Raises:
+            ValueError:   If *quality_params.action* is invalid.
+            ValueError:   If the structure is a solid, since only planar and shell
+                          elements are supported by :mod:`.mesh_quality`.
+            RuntimeError: If the part has not been meshed.
+            RuntimeError: If the mesh is not accepted and *quality_params.action*
+                          is not *'warn'*.
+        """
+        if quality_params.action not in auxetic_structure_params.all_mesh_quality_action_list:
+            raise ValueError("Invalid value '%s' for quality_params.action."%quality_params.action)
+        if self.is_solid:
+            raise ValueError('The mesh quality of solid structures cannot be checked.')
+        
+        num_remesh = 0
+        while True:
+            part = self.part_main
+            if len(part.elements) == 0:
+                raise RuntimeError('The part must be meshed before its quality is checked.')
+            # Only the nodes and connectivities are read from the part,
+            # and the metrics are computed for all elements at once.
+            coords = np.array([node.coordinates for node in part.nodes])
+            if self.is_planar:
+                # Abaqus returns three coordinates even for planar parts, but inverted
+                # elements can only be detected using the normal of the plane.
+                coords = coords[:, :2]
+            element_groups = dict()
+            for element in part.elements:
+                connectivity = element.connectivity
+                element_groups.setdefault(len(connectivity), []).append(connectivity)
+            self.mesh_quality = mesh_quality.evaluate_mesh_quality(
+                                    coords, list(element_groups.values()), quality_params)
+            summary_str = ('%(num_failed)i of %(num_elements)i elements failed.' +
+                           ' Worst values: aspect ratio %(max_aspect_ratio).3g, skew %(max_skew).3g,' +
+                           ' Jacobian %(min_jacobian).3g, angle %(min_angle).3g.')%self.mesh_quality
+            if self.mesh_quality['passed']:
+                logger.info('The mesh passed the quality check. %s', summary_str)
+                return mesh_params
+            if quality_params.action != 'remesh' or num_remesh >= quality_params.max_remesh:
+                break
+            num_remesh += 1
+            mesh_params = mesh_params._replace(seed_size=mesh_params.seed_size * quality_params.seed_factor)
+            logger.warning('The mesh failed the quality check. %s Remeshing with seed size %g.',
+                           summary_str, mesh_params.seed_size)
+            self.mesh_part(mesh_params)
+        
+        if quality_params.action == 'warn':
+            logger.warning('The mesh failed the quality check. %s', summary_str)
+            return mesh_params
+        raise RuntimeError('The mesh of structure %s failed the quality check. %s'%(self.name, summary_str))
+    #
+    
+    def create_job(self, job_params, job_name=None):
         """Define a single step for the analysis. Assigns *self.job*.
         Current limitations are:
         
@@ -697,6 +1373,11 @@ class AuxeticStructure:
         Args:
             job_params(JobParams): Special namedtuple describing the job created for analysis.
                                    See class for full description of options.
+            job_name(str):         Name of the job. Defaults to :obj:`None`
+                                   which uses the name of the structure.
+        
+        The job runs in *job_params.scratch_dir*, if specified, which is assigned to
+        *self.job_dir*. Otherwise it runs in the current working directory.
         
         Raises:
             AbaqusException: Various exceptions raised by the Abaqus API.
@@ -721,21 +1402,61 @@ class AuxeticStructure:
         elif job_params.nodalOutputPrecision.upper() == 'DOUBLE': nodalOutputPrecision = DOUBLE
         else: raise ValueError('invalid value for job_params.nodalOutputPrecision')
         
-        self.job = mdb.Job(name=self.name, description=description,
+        if job_name is None:
+            job_name = self.name
+        
+        # Jobs run in the scratch directory, if any, and the solver writes its
+        # temporary files there, so the shared filesystem is not used until
+        # the results are staged by output_results.
+        if job_params.scratch_dir is None:
+            self.job_dir = os.getcwd()
+            scratch      = ''
+        else:
+            self.job_dir = os.path.abspath(job_params.scratch_dir)
+            scratch      = self.job_dir
+            if not os.path.isdir(self.job_dir):
+                os.makedirs(self.job_dir)
+        
+        self.job = mdb.Job(name=job_name, description=description,
                    model=self.model, type=ANALYSIS,
                    atTime=None, waitMinutes=0, waitHours=0, queue=None, memory=memoryPercent,
                    memoryUnits=PERCENTAGE, getMemoryFromAnalysis=True,
                    explicitPrecision=explicitPrecision, nodalOutputPrecision=nodalOutputPrecision, echoPrint=OFF,
                    modelPrint=OFF, contactPrint=OFF, historyPrint=OFF, userSubroutine='',
-                   scratch='', resultsFormat=ODB, multiprocessingMode=DEFAULT, numCpus=numCpus,
+                   scratch=scratch, resultsFormat=ODB, multiprocessingMode=DEFAULT, numCpus=numCpus,
                    numDomains=numCpus, numGPUs=0)
-        logger.info('Created the job named %s.', self.job.name)
+        logger.info('Created the job named %s in %s.', self.job.name, self.job_dir)
     #
     
-    def submit_job(self):
+    def submit_job(self, monitor_params=None, callbacks=(), stop_params=None):
         """Submit the job and wait for it to finish.
         Does not clean old files, but they should not be a problem.
         
+        If *monitor_params* is specified, the status and message files are monitored
+        while the job is running using :func:`.monitor.monitor_abaqus_job` and
+        the job is killed if it diverges. The monitor is assigned to *self.job_monitor*.
+        
+        If *stop_params* is specified, the job is also monitored and ended as soon as
+        one of its criteria is met. The job is then considered successful and the
+        criterion is assigned to *self.stop_reason*.
+        
+        *self.analysis_status* is set to *'completed'*, *'stopped'*, or *'failed'*.
+        
+        If restart data has been requested in :meth:`.define_step` and the job stops
+        because of increment limits or cutbacks, the analysis is continued from the
+        last good increment by restart jobs using :meth:`._restart_job`.
+        
+        Args:
+            monitor_params(MonitorParams): Special namedtuple describing how the job
+                                           is monitored. Defaults to :obj:`None`
+                                           which means the job is not monitored.
+            callbacks(tuple):              Functions called by the monitor as
+                                           *callback(event, data)*. See :mod:`.monitor`
+                                           for the events. Defaults to an empty tuple.
+            stop_params(StopParams):       Special namedtuple describing criteria for
+                                           ending the job early. See :mod:`.stop_criteria`.
+                                           Defaults to :obj:`None`.
+        
         Raises:
             RuntimeError:    If the job has not been defined by :meth:`.create_job`.
             RuntimeError:    If the job does not complete successfuly.
@@ -746,38 +1467,178 @@ class AuxeticStructure:
             raise RuntimeError('The job has not been defined.' +
                                ' self.create_job() must be called first.')
         
+        stop_checks = ()
+        if stop_params is not None:
+            stop_checks = (stop_criteria.StopCriteria(self, stop_params), )
+            if monitor_params is None:
+                # Only monitor the job for the stop criteria.
+                monitor_params = auxetic_structure_params.MonitorParams(
+                                     max_cutback_increments=None, max_min_size_increments=None)
+        
         logger.info('Submitting the job...')
-        self.job.submit()
-        logger.info("Job '%s' submitted. Waiting for completion..."%self.job.name)
-        self.job.waitForCompletion()
-        if self.job.status == COMPLETED:
-            logger.info('The job completed successfuly.')
-            self.odb_path = os.path.join(os.getcwd(), self.job.name + '.odb')
-        else:
-            raise RuntimeError('The job was aborted or terminated.' +
-                               ' Check message file for more information.')
+        self.job_monitor       = None
+        self.stop_reason       = None
+        self.analysis_status   = None
+        self.restart_jobs      = []
+        self.restart_odb_paths = []
+        # Abaqus writes the job files to the current working directory.
+        with helper.working_directory(self.job_dir):
+            self.job.submit()
+            logger.info("Job '%s' submitted. Waiting for completion..."%self.job.name)
+            if monitor_params is not None:
+                self.job_monitor = monitor.monitor_abaqus_job(self.job, self.step_params,
+                                                              monitor_params, callbacks, stop_checks)
+            self.job.waitForCompletion()
+            # The Odb may also contain the completed frames of a failed job.
+            self.odb_path = os.path.join(self.job_dir, self.job.name + '.odb')
+            self.analysis_status = 'failed'
+            if self.job.status == COMPLETED:
+                logger.info('The job completed successfuly.')
+                self.analysis_status = 'completed'
+            elif self.job_monitor is not None and self.job_monitor.stop_reason is not None:
+                self.stop_reason = self.job_monitor.stop_reason
+                logger.info('The job was ended early because %s.', self.stop_reason)
+                self.analysis_status = 'stopped'
+            elif self.restart_params is not None and self.restart_params.max_restarts > 0 and \
+                 restart.restart_reason(self.job.name, self.job_dir, self.job_monitor) is not None:
+                self._restart_job(monitor_params, callbacks)
+                self.analysis_status = 'completed'
+            elif self.job_monitor is not None and self.job_monitor.divergence_reason is not None:
+                raise RuntimeError('The job was killed because it was diverging: %s.'
+                                   %self.job_monitor.divergence_reason)
+            else:
+                raise RuntimeError('The job was aborted or terminated.' +
+                                   ' Check message file for more information.')
     #
     
-    def output_results(self, output_params):
+    def _restart_job(self, monitor_params=None, callbacks=()):
+        """Continue a stopped job using restart analyses.
+        
+        Each restart analysis copies the model of the previous job, ends the stopped step
+        at its last increment with restart data, and continues the loading in a new step
+        whose parameters are returned by :func:`.restart.restart_step_params`.
+        The jobs and models are named *'<job name>-Restart-<number>'*.
+        The jobs are assigned to *self.restart_jobs* and their Odbs to *self.restart_odb_paths*.
+        
+        Args:
+            monitor_params(MonitorParams): See :meth:`.submit_job`. Defaults to :obj:`None`.
+            callbacks(tuple):              See :meth:`.submit_job`. Defaults to an empty tuple.
+        
+        Raises:
+            RuntimeError:    If the job does not complete after *restart_params.max_restarts*
+                             restarts, or a restart job stops for other reasons.
+            AbaqusException: Various exceptions raised by the Abaqus API.
+        """
+        # The abaqus module cannot be imported in the GUI code,
+        # so only import it when running.
+        from abaqus import mdb
+        
+        job         = self.job
+        job_monitor = self.job_monitor
+        model       = self.model
+        step_name   = 'Step-1'
+        step_params = self.step_params
+        for i in range(1, self.restart_params.max_restarts+1):
+            reason = restart.restart_reason(job.name, self.job_dir, job_monitor)
+            if reason is None:
+                raise RuntimeError("The restart job '%s' was aborted or terminated."%job.name +
+                                   ' Check message file for more information.')
+            restart_increment = restart.read_restart_increment(job.name,
+                                                               self.restart_params.frequency,
+                                                               self.job_dir)
+            if restart_increment is None:
+                raise RuntimeError("Job '%s' has no increment to restart from."%job.name)
+            step_params = restart.restart_step_params(step_params, self.restart_params,
+                                                      restart_increment, reason)
+            logger.warning("Job '%s' stopped because of %s. Restarting from increment %i" +
+                           ' (t=%f) with %s.', job.name, reason.replace('_', ' '),
+                           restart_increment.increment, restart_increment.total_time,
+                           step_params)
+            
+            name = '%s-Restart-%i'%(self.job.name, i)
+            restart_model = mdb.Model(name=name, objectToCopy=model)
+            restart_model.setValues(restartJob=job.name, restartStep=step_name,
+                                    restartIncrement=restart_increment.increment,
+                                    endRestartStep=True)
+            restart_step_name = 'Step-%i'%(i+1)
+            restart_model.StaticStep(name=restart_step_name, previous=step_name,
+                                     timePeriod=step_params.time_period, nlgeom=ON,
+                                     maxNumInc=step_params.max_num_inc,
+                                     initialInc=step_params.init_inc_size,
+                                     minInc=step_params.min_inc_size,
+                                     maxInc=step_params.max_inc_size)
+            restart_model.steps[restart_step_name].Restart(frequency=self.restart_params.frequency,
+                                                           numberIntervals=0, overlay=ON,
+                                                           timeMarks=OFF)
+            restart_job = mdb.Job(name=name, model=restart_model, type=RESTART,
+                                  description=self.job.description,
+                                  memory=self.job.memory, memoryUnits=PERCENTAGE,
+                                  getMemoryFromAnalysis=True,
+                                  explicitPrecision=self.job.explicitPrecision,
+                                  nodalOutputPrecision=self.job.nodalOutputPrecision,
+                                  resultsFormat=ODB, multiprocessingMode=DEFAULT,
+                                  numCpus=self.job.numCpus, numDomains=self.job.numDomains,
+                                  numGPUs=0)
+            self.restart_jobs.append(restart_job)
+            
+            restart_job.submit()
+            logger.info("Restart job '%s' submitted. Waiting for completion...", name)
+            job_monitor = None
+            if monitor_params is not None:
+                job_monitor = monitor.monitor_abaqus_job(restart_job, step_params,
+                                                         monitor_params, callbacks)
+            restart_job.waitForCompletion()
+            self.restart_odb_paths.append(os.path.join(self.job_dir, name + '.odb'))
+            if restart_job.status == COMPLETED:
+                logger.info('The restart job completed successfuly.')
+                return
+            job, model, step_name = restart_job, restart_model, restart_step_name
+        
+        raise RuntimeError("The job did not complete after %i restarts."
+                           %self.restart_params.max_restarts)
+    #
+    
+    def output_results(self, output_params, artifact_finalizer=None):
         """Output the results of the analysis.
             
         Args:
             output_params(OutputParams): Special namedtuple describing the parameters
                                          for outputting the results of modeling and analysis.
                                          See class for full description of options.
+            artifact_finalizer(ArtifactFinalizer):
+                                         If specified, the Odb and job files are moved and
+                                         the native STL and 3MF files are written by its
+                                         threads, and this method returns without waiting
+                                         for them. Use *artifact_finalizer.wait(self.name)*
+                                         to wait for the results. Defaults to :obj:`None`,
+                                         which finalizes the results before returning.
+        
+        If the job has not been completed and *output_params.keep_partial_results* is
+        :obj:`True`, the completed frames are post-processed, the results are flagged as
+        partial, and *self.analysis_status* is set to *'partial'*. If the job did not
+        write any frames, only the job files are saved.
+        
+        If the job ran in *job_params.scratch_dir*, the requested Odb and job files are
+        moved from there to the results folder and the other files of the job are deleted.
         
         Raises:
-            RuntimeError:    If the job has not been completed.
+            RuntimeError:    If the job has not been completed and
+                             *output_params.keep_partial_results* is :obj:`False`.
             ValueError:      If output_params.export_ribbon_width has not been
-                             specified but STL or STP export is requested.
+                             specified but STL, STP, or 3MF export is requested.
             AbaqusException: Various exceptions raised by the Abaqus API.
         """
         
         logger.debug('Exporting results.')
         
-        if self.job.status != COMPLETED:
-            raise RuntimeError('The job has not been completed.' +
-                               ' Output is only possible after completion of analysis.')
+        final_job = (self.restart_jobs or [self.job])[-1]
+        if final_job.status != COMPLETED and self.stop_reason is None:
+            if not output_params.keep_partial_results:
+                raise RuntimeError('The job has not been completed.' +
+                                   ' Output is only possible after completion of analysis.')
+            logger.warning('The job has not been completed.' +
+                           ' Its completed frames are post-processed as partial results.')
+            self.analysis_status = 'partial'
         
         # Make a directory for storing results.
         # This is also done in main.main().
@@ -789,50 +1650,108 @@ class AuxeticStructure:
             os.makedirs(folder_path)
             logger.debug('Created the folder for analysis results: %s', folder_path)
         
-        logger.debug('Opening the Odb.')
-        odb = openOdb(path=self.odb_path)
-        output_table = postprocessing.get_numerical_output(obj=self, odb=odb)
-        postprocessing.write_single_numerical_output(output_table, self.name, folder_path)
-        odb.close()
+        # Restart jobs which failed to start do not write an Odb.
+        self.restart_odb_paths = [path for path in self.restart_odb_paths if os.path.isfile(path)]
+        if os.path.isfile(self.odb_path):
+            logger.debug('Opening the Odb.')
+            odb = openOdb(path=self.odb_path)
+            restart_odbs = [openOdb(path=path) for path in self.restart_odb_paths]
+            output_table = postprocessing.get_numerical_output(obj=self, odb=odb,
+                                                               restart_odbs=restart_odbs)
+            postprocessing.write_single_numerical_output(output_table, self.name, folder_path,
+                                                         partial=(self.analysis_status == 'partial'))
+            if self.pattern_mode == 'periodic' and len(output_table) > 0:
+                self.effective_properties = postprocessing.get_effective_properties(
+                                                obj=self, odb=odb, restart_odbs=restart_odbs)
+                postprocessing.write_effective_properties(self.effective_properties,
+                                                          self.name, folder_path)
+            odb.close()
+            for restart_odb in restart_odbs:
+                restart_odb.close()
+        else:
+            logger.error('The job did not write an Odb. No numerical output is available.')
+            self.analysis_status = 'failed'
+        
+        if artifact_finalizer is None:
+            artifact_finalizer = finalizer.ArtifactFinalizer(num_threads=0)
+        staged_paths = set()
+        def store(source, destination, compress):
+            staged_paths.add(source)
+            if compress:
+                artifact_finalizer.submit(self.name, finalizer.compress_file, source, destination)
+                return destination + '.gz'
+            artifact_finalizer.submit(self.name, finalizer.move_file, source, destination)
+            return destination
         
         if output_params.save_job_files: 
-            #TODO: add function that uses shutil.move and shutil.copy2 in case of exception.
-            os.rename( os.path.join(os.getcwd(), self.job.name + '.inp'),
-                       os.path.join(folder_path, self.job.name + '.inp'))
-            os.rename( os.path.join(os.getcwd(), self.job.name + '.msg'),
-                       os.path.join(folder_path, self.job.name + '.msg'))
-            #os.rename( os.path.join(os.getcwd(), self.job.name + '.log'), #investigate access error.
-            #           os.path.join(folder_path, self.job.name + '.log'))
-            sta_string = ''
-            if os.path.isfile(os.path.join(os.getcwd(), self.job.name + '.sta')):
-                sta_string = ', and sta.'
-                os.rename( os.path.join(os.getcwd(), self.job.name + '.sta'),
-                           os.path.join(folder_path, self.job.name + '.sta'))
-        logger.debug('Saved job files to the folder: inp, msg, log%s.', sta_string)
-        
-        if output_params.save_odb:
-            new_odb_path = os.path.join(folder_path, self.job.name + '.odb')
-            os.rename(self.odb_path, new_odb_path)
-            self.odb_path = new_odb_path
-            logger.debug('Saved the Odb to the folder.')
-        
-        if output_params.export_stl or output_params.export_stp:
-            # Create the exportable part. This operation is destructive
-            # and the mdb should not be saved afterwards.
-            #TODO FIXME: but it is. fix this. see if you can restore the originals.
+            extensions = ['.inp', '.msg', '.sta']
+            if self.analysis_status in ('partial', 'failed'):
+                # The errors of failed jobs may only be written to the data file.
+                extensions.append('.dat')
+            #TODO: investigate access error for the log file.
+            for job in [self.job] + self.restart_jobs:
+                for extension in extensions:
+                    file_path = os.path.join(self.job_dir, job.name + extension)
+                    if os.path.isfile(file_path):
+                        store(file_path, os.path.join(folder_path, job.name + extension),
+                              output_params.compress_job_files)
+            logger.debug('Saving job files to the folder: %s.',
+                         ', '.join(extension[1:] for extension in extensions))
+        
+        if output_params.save_odb and os.path.isfile(self.odb_path):
+            self.odb_path = store(self.odb_path, os.path.join(folder_path, self.job.name + '.odb'),
+                                  output_params.compress_odb)
+            for (i, odb_path) in enumerate(self.restart_odb_paths):
+                self.restart_odb_paths[i] = store(odb_path,
+                                                  os.path.join(folder_path, os.path.basename(odb_path)),
+                                                  output_params.compress_odb)
+            logger.debug('Saving the Odb to the folder.')
+        
+        if output_params.export_stl or output_params.export_stp or output_params.export_3mf:
             if output_params.export_ribbon_width is None:
-                raise ValueError('output_params.export_ribbon_width must be specified for STL or STP export.')
-            self.assemble_structure(for_3dprint=True, output_params=output_params, delete_all=True)
+                raise ValueError('output_params.export_ribbon_width must be specified for STL, STP, or 3MF export.')
             
-            if output_params.export_stl:
-                postprocessing.export_part_stl(self, folder_path)
+            # STL and 3MF files are written from the analytic geometry if possible,
+            # which does not need the 3D part or the Abaqus API.
+            native_stl = output_params.export_stl and export.is_supported(self)
+            if native_stl or (output_params.export_3mf and export.is_supported(self)):
+                geometry = export.structure_geometry(self, output_params.export_ribbon_width)
+            if native_stl:
+                artifact_finalizer.submit(self.name, export.export_stl, geometry,
+                                          os.path.join(folder_path, self.name + '.stl'))
+                logger.debug('Exporting the structure in the binary STL format.')
             
-            if output_params.export_stp:
-                self.part_3dprint.writeStepFile(
-                    fileName=os.path.join(folder_path, self.name + '.stp'))
-                logger.debug('Exported the part in the STP format.')
-        
-        if output_params.save_cae: # This is done last so the 3D model is also saved.
+            if output_params.export_3mf:
+                if export.is_supported(self):
+                    artifact_finalizer.submit(self.name, export.export_3mf, geometry,
+                                              os.path.join(folder_path, self.name + '.3mf'))
+                    logger.debug('Exporting the structure in the 3MF format.')
+                else:
+                    logger.warning('3MF export is only supported for reentrant2d structures.')
+            
+            if output_params.export_stp or (output_params.export_stl and not native_stl):
+                # The export part is created in a separate model,
+                # so the analysis model is saved intact.
+                self.create_export_part(output_params, folder_path)
+                
+                if output_params.export_stl and not native_stl:
+                    postprocessing.export_part_stl(self, folder_path)
+                
+                if output_params.export_stp:
+                    self.part_3dprint.writeStepFile(
+                        fileName=os.path.join(folder_path, self.name + '.stp'))
+                    logger.debug('Exported the part in the STP format.')
+        
+        if self.job_dir != os.getcwd():
+            # Only the requested results are staged from the scratch directory.
+            job_names = [job.name for job in [self.job] + self.restart_jobs]
+            for file_name in os.listdir(self.job_dir):
+                file_path = os.path.join(self.job_dir, file_name)
+                if os.path.splitext(file_name)[0] in job_names and file_path not in staged_paths:
+                    os.remove(file_path)
+            logger.debug('Deleted the other files of the job from the scratch directory.')
+        
+        if output_params.save_cae: # This is done last so the export model is also saved.
             # The abaqus module cannot be imported in the GUI code,
             # so only import it when running.
             from abaqus import mdb
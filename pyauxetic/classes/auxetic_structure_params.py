@@ -25,6 +25,12 @@ try:
                            * **'nonuniform'**: A number of unit cells are patterned
                              based on *PatternParams.structure_map*.
                            
+                           * **'periodic'**: A single unit cell is modeled
+                             with periodic boundary conditions for calculating
+                             the effective in-plane properties of the lattice.
+                             Both *PatternParams.num_cell_repeat* and
+                             *PatternParams.structure_map* must be :obj:`None`.
+                           
                            Raises :obj:`ValueError` for other values.
                            Defaults to :obj:`None`, which also raises the error.
                            """
@@ -42,6 +48,11 @@ try:
                            unit cells and how they are distributed in the structure.
                            The unit cells must be compatible for patterning.
                            
+                           For huge or porous lattices, a
+                           :class:`.geometry.SparseStructureMap` or a sparse matrix,
+                           e.g. of :mod:`scipy.sparse`, can be used instead,
+                           which is never expanded to a dense array.
+                           
                            Used only when *PatternParams.pattern_mode == 'nonuniform'*.
                            
                            Defaults to :obj:`None`.
@@ -115,6 +126,51 @@ except (AttributeError, TypeError) as e:
     pass
 #### End   StepParams ####
 
+#### Begin FieldOutputParams ####
+FieldOutputParams = \
+    namedtuple('FieldOutputParams',
+               ['preset', 'variables', 'regions',
+                'frequency', 'num_intervals', 'time_points'] )
+FieldOutputParams.__new__.__defaults__ = ('metrics_only', None, None, 1, None, None)
+try:
+    FieldOutputParams.__doc__ = """namedtuple instance describing the field output written to the Odb.
+                                See :meth:`.AuxeticStructure.define_field_output`.
+                                """
+    FieldOutputParams.preset.__doc__        = """(:class:`str`) One of the following:
+    
+                                                + *'metrics_only'*: Only the displacements of the node sets
+                                                  and the displacements and reaction forces of the
+                                                  reference points used by :mod:`.postprocessing`.
+                                                + *'custom'*: *variables* in *regions*.
+                                                + *'default'*: The preselected variables of Abaqus
+                                                  in the whole model.
+                                            
+                                            Defaults to *'metrics_only'*.
+                                            """
+    FieldOutputParams.variables.__doc__     = """(:class:`tuple`) Names of the output variables,
+                                            e.g. *('U', 'RF', 'S')*, used by the *'custom'* preset.
+                                            Defaults to :obj:`None` which uses *('U', 'RF', 'S', 'LE')*.
+                                            """
+    FieldOutputParams.regions.__doc__       = """(:class:`tuple`) Names of the sets whose output is written
+                                            by the *'custom'* preset. Names in *AuxeticStructure.sets*
+                                            refer to sets of the structure and other names to sets of
+                                            the assembly, e.g. *'RP-1-set'*. Defaults to :obj:`None`
+                                            which writes the output of the whole model.
+                                            """
+    FieldOutputParams.frequency.__doc__     = """(:class:`int`) The output is written every this number of
+                                            increments. Defaults to 1.
+                                            """
+    FieldOutputParams.num_intervals.__doc__ = """(:class:`int`) If specified, the output is written at this
+                                            number of evenly spaced times instead. Defaults to :obj:`None`.
+                                            """
+    FieldOutputParams.time_points.__doc__   = """(:class:`tuple`) If specified, the output is written at these
+                                            step times instead. Since the times are relative to the step,
+                                            they do not suit restarted analyses. Defaults to :obj:`None`.
+                                            """
+except (AttributeError, TypeError) as e:
+    pass
+#### End   FieldOutputParams ####
+
 #### Begin LoadingParams ####
 LoadingParams = \
     namedtuple('LoadingParams',
@@ -214,12 +270,105 @@ all_elem_library_list = ['STANDARD', 'EXPLICIT']
 all_elem_code_list    = ['CPE4H', 'C3D8R']
 #### End   MeshParams ####
 
+#### Begin MeshQualityParams ####
+MeshQualityParams = \
+    namedtuple('MeshQualityParams',
+               ['max_aspect_ratio', 'max_skew', 'min_jacobian', 'min_angle',
+                'max_failed_fraction', 'action', 'seed_factor', 'max_remesh'] )
+MeshQualityParams.__new__.__defaults__ = (10.0, 0.85, 0.1, 10.0, 0.0, 'fail', 0.7, 2)
+try:
+    MeshQualityParams.__doc__ = """namedtuple instance describing the quality check of the mesh,
+                                which is run after meshing and before the job is submitted.
+                                See :mod:`.mesh_quality` for the definitions of the metrics.
+                                A threshold of :obj:`None` disables its check.
+                                """
+    MeshQualityParams.max_aspect_ratio.__doc__    = """(:class:`float`) Largest allowed ratio of the longest
+                                                  to the shortest edge of an element. Defaults to 10.0.
+                                                  """
+    MeshQualityParams.max_skew.__doc__            = """(:class:`float`) Largest allowed equiangle skew,
+                                                  between 0 and 1. Defaults to 0.85.
+                                                  """
+    MeshQualityParams.min_jacobian.__doc__        = """(:class:`float`) Smallest allowed scaled Jacobian,
+                                                  between -1 and 1. Defaults to 0.1.
+                                                  """
+    MeshQualityParams.min_angle.__doc__           = """(:class:`float`) Smallest allowed corner angle in degrees.
+                                                  Defaults to 10.0.
+                                                  """
+    MeshQualityParams.max_failed_fraction.__doc__ = """(:class:`float`) Largest fraction of elements which may fail
+                                                  a check while the mesh is accepted. Defaults to 0.0.
+                                                  """
+    MeshQualityParams.action.__doc__              = """(:class:`str`) What happens if the mesh is not accepted:
+    
+                                                  * **'fail'**: :obj:`RuntimeError` is raised before the job is submitted.
+                                                  * **'remesh'**: The part is meshed again with the seed size multiplied
+                                                    by *MeshQualityParams.seed_factor*, up to
+                                                    *MeshQualityParams.max_remesh* times, and then the error is raised.
+                                                  * **'warn'**: A warning is logged and the analysis continues.
+                                                  
+                                                  Defaults to *'fail'*.
+                                                  """
+    MeshQualityParams.seed_factor.__doc__         = """(:class:`float`) Factor applied to the seed size when remeshing.
+                                                  Defaults to 0.7.
+                                                  """
+    MeshQualityParams.max_remesh.__doc__          = """(:class:`int`) Maximum number of times the part is remeshed.
+                                                  Defaults to 2.
+                                                  """
+except (AttributeError, TypeError) as e:
+    pass
+
+all_mesh_quality_action_list = ['fail', 'remesh', 'warn']
+#### End   MeshQualityParams ####
+
+#### Begin ConvergenceParams ####
+ConvergenceParams = \
+    namedtuple('ConvergenceParams',
+               ['initial_seed_size', 'refinement_ratio', 'min_seed_size',
+                'metric', 'tolerance', 'cache_file'] )
+ConvergenceParams.__new__.__defaults__ = (None, 0.7, None, 'poisson_mean', 0.01, None)
+try:
+    ConvergenceParams.__doc__ = """namedtuple instance describing a mesh convergence study.
+                                The part is meshed with a decreasing sequence of seed sizes
+                                until the metric converges. See :mod:`pyauxetic.convergence`.
+                                """
+    ConvergenceParams.initial_seed_size.__doc__ = \
+                               """(:class:`float`) Seed size of the first (coarsest) mesh.
+                               Defaults to :obj:`None` which raises an error.
+                               """
+    ConvergenceParams.refinement_ratio.__doc__  = \
+                               """(:class:`float`) Ratio between the seed sizes of
+                               consecutive meshes. Must be between 0 and 1. Defaults to 0.7.
+                               """
+    ConvergenceParams.min_seed_size.__doc__     = \
+                               """(:class:`float`) Smallest seed size which is analyzed.
+                               Defaults to :obj:`None` which raises an error.
+                               """
+    ConvergenceParams.metric.__doc__            = \
+                               """(:class:`str`) Column of the numerical output whose value
+                               at the last frame is checked for convergence,
+                               e.g. *'poisson_mean'* or *'strain_td_mean'*.
+                               Defaults to *'poisson_mean'*.
+                               """
+    ConvergenceParams.tolerance.__doc__         = \
+                               """(:class:`float`) The study stops when the relative change of
+                               the metric between consecutive meshes is less than this value.
+                               Defaults to 0.01.
+                               """
+    ConvergenceParams.cache_file.__doc__        = \
+                               """(:class:`str`) Path of a json file used for caching the results
+                               of the studies. A study is not repeated if a structure with
+                               the same geometry and analysis settings is in the cache.
+                               Defaults to :obj:`None` which disables caching.
+                               """
+except (AttributeError, TypeError) as e:
+    pass
+#### End   ConvergenceParams ####
+
 #### Begin JobParams ####
 JobParams = \
     namedtuple('JobParams',
                ['description', 'numCpus', 'memoryPercent',
-                'explicitPrecision', 'nodalOutputPrecision'] )
-JobParams.__new__.__defaults__ = ('', 1, 90, 'single', 'single')
+                'explicitPrecision', 'nodalOutputPrecision', 'scratch_dir'] )
+JobParams.__new__.__defaults__ = ('', 1, 90, 'single', 'single', None)
 try:
     JobParams.__doc__ = """namedtuple instance describing the job created for analysis."""
     JobParams.description.__doc__          = """(:class:`str`) Description of the job. Defaults to an empty string."""
@@ -233,19 +382,176 @@ try:
                                """(:class:`str`) Nodal output precision.
                                Valid values are *'SINGLE'* and *'DOUBLE'*. Defaults to *'single'*.
                                """
+    JobParams.scratch_dir.__doc__          = \
+                               """(:class:`str`) Folder on a fast local disk, e.g. tmpfs or NVMe, where
+                               the job runs and the solver writes its scratch files. Only the requested
+                               results are moved to the results folder and the other files of the job
+                               are deleted. Defaults to :obj:`None` which runs the job in the current
+                               working directory.
+                               """
 except (AttributeError, TypeError) as e:
     pass
 #### End   JobParams ####
 
+#### Begin SchedulerParams ####
+SchedulerParams = \
+    namedtuple('SchedulerParams',
+               ['num_cpus', 'memory', 'license_tokens', 'backfill', 'poll_interval'] )
+SchedulerParams.__new__.__defaults__ = (None, None, None, True, 1.0)
+try:
+    SchedulerParams.__doc__ = """namedtuple instance describing the resources
+                              available to :class:`.scheduler.Scheduler`.
+                              """
+    SchedulerParams.num_cpus.__doc__       = """(:class:`int`) Number of CPU cores available for all jobs.
+                                             Defaults to :obj:`None` which uses the number
+                                             of cores of the machine.
+                                             """
+    SchedulerParams.memory.__doc__         = """(:class:`float`) Memory in megabytes available for all jobs.
+                                             Defaults to :obj:`None` which means memory is not limited.
+                                             """
+    SchedulerParams.license_tokens.__doc__ = """(:class:`int`) Number of Abaqus license tokens available for all jobs.
+                                             Defaults to :obj:`None` which means tokens are not limited.
+                                             """
+    SchedulerParams.backfill.__doc__       = """(:class:`bool`) Whether or not smaller jobs may start before
+                                             a waiting job with a higher priority, as long as they
+                                             do not delay it. Defaults to :obj:`True`.
+                                             """
+    SchedulerParams.poll_interval.__doc__  = """(:class:`float`) Time in seconds between checks of the
+                                             running jobs. Defaults to 1.0.
+                                             """
+except (AttributeError, TypeError) as e:
+    pass
+#### End   SchedulerParams ####
+
+#### Begin MonitorParams ####
+MonitorParams = \
+    namedtuple('MonitorParams',
+               ['poll_interval', 'max_cutback_increments', 'max_min_size_increments',
+                'kill_on_divergence'] )
+MonitorParams.__new__.__defaults__ = (5.0, 4, 5, True)
+try:
+    MonitorParams.__doc__ = """namedtuple instance describing how a running job is monitored
+                            by :class:`.monitor.JobMonitor`.
+                            """
+    MonitorParams.poll_interval.__doc__           = """(:class:`float`) Time in seconds between reads of the
+                                                    status and message files. Defaults to 5.0.
+                                                    """
+    MonitorParams.max_cutback_increments.__doc__  = """(:class:`int`) The job is considered diverging if this number
+                                                    of consecutive increments each needed at least one cutback.
+                                                    :obj:`None` disables the check. Defaults to 4.
+                                                    """
+    MonitorParams.max_min_size_increments.__doc__ = """(:class:`int`) The job is considered diverging if this number
+                                                    of consecutive increments used the minimum increment size.
+                                                    :obj:`None` disables the check. Defaults to 5.
+                                                    """
+    MonitorParams.kill_on_divergence.__doc__      = """(:class:`bool`) Whether or not to kill a diverging job.
+                                                    Otherwise, divergence is only reported. Defaults to :obj:`True`.
+                                                    """
+except (AttributeError, TypeError) as e:
+    pass
+#### End   MonitorParams ####
+
+#### Begin StopParams ####
+StopParams = \
+    namedtuple('StopParams',
+               ['target_strain_ld', 'target_reaction_force',
+                'poisson_tolerance', 'poisson_num_frames', 'poisson_metric'] )
+StopParams.__new__.__defaults__ = (None, None, None, 3, 'poisson_mean')
+try:
+    StopParams.__doc__ = """namedtuple instance describing criteria for ending an analysis
+                         before the end of the step, which are checked while the job runs
+                         by :class:`.stop_criteria.StopCriteria`. The job is ended as soon as
+                         any of the criteria is met. Criteria set to :obj:`None` are not used.
+                         """
+    StopParams.target_strain_ld.__doc__      = """(:class:`float`) Total strain in the loading direction, i.e. the sum
+                                             of *strain_ld* in the output table, at which the analysis ends.
+                                             Defaults to :obj:`None`.
+                                             """
+    StopParams.target_reaction_force.__doc__ = """(:class:`float`) Magnitude of the reaction force
+                                             in the loading direction at which the analysis ends.
+                                             Defaults to :obj:`None`.
+                                             """
+    StopParams.poisson_tolerance.__doc__     = """(:class:`float`) The analysis ends when the Poisson's ratio of the
+                                             last *poisson_num_frames* frames changes less than this value.
+                                             Note that this criterion may be met in the initial, linear part
+                                             of the response. Defaults to :obj:`None`.
+                                             """
+    StopParams.poisson_num_frames.__doc__    = """(:class:`int`) Number of frames used for *poisson_tolerance*.
+                                             Defaults to 3.
+                                             """
+    StopParams.poisson_metric.__doc__        = """(:class:`str`) Column of the output table used for
+                                             *poisson_tolerance*. Defaults to *'poisson_mean'*.
+                                             """
+except (AttributeError, TypeError) as e:
+    pass
+#### End   StopParams ####
+
+#### Begin RestartParams ####
+RestartParams = \
+    namedtuple('RestartParams',
+               ['max_restarts', 'frequency', 'num_inc_factor', 'min_inc_factor'] )
+RestartParams.__new__.__defaults__ = (2, 1, 2.0, 0.1)
+try:
+    RestartParams.__doc__ = """namedtuple instance describing the restart of jobs which stop
+                            because of increment limits or cutbacks. See :mod:`.restart`.
+                            """
+    RestartParams.max_restarts.__doc__   = """(:class:`int`) Maximum number of restart analyses of a job.
+                                         Defaults to 2.
+                                         """
+    RestartParams.frequency.__doc__      = """(:class:`int`) Restart data is written every this number of
+                                         increments. Only the data of the last written increment is kept.
+                                         Defaults to 1.
+                                         """
+    RestartParams.num_inc_factor.__doc__ = """(:class:`float`) Factor applied to the maximum number of increments
+                                         of a restart analysis if the job needed too many increments.
+                                         Defaults to 2.0.
+                                         """
+    RestartParams.min_inc_factor.__doc__ = """(:class:`float`) Factor applied to the minimum increment size
+                                         of a restart analysis if the job ran out of cutbacks.
+                                         Defaults to 0.1.
+                                         """
+except (AttributeError, TypeError) as e:
+    pass
+#### End   RestartParams ####
+
+#### Begin IncrementLearningParams ####
+IncrementLearningParams = \
+    namedtuple('IncrementLearningParams',
+               ['history_file', 'num_neighbors', 'min_inc_factor', 'record'] )
+IncrementLearningParams.__new__.__defaults__ = (None, 3, 0.5, True)
+try:
+    IncrementLearningParams.__doc__ = """namedtuple instance describing how the increment sizes of a run
+                                      are derived from the increment histories of previous runs.
+                                      See :mod:`.increment_learning`.
+                                      """
+    IncrementLearningParams.history_file.__doc__   = """(:class:`str`) Path to the history file, which contains one json
+                                                   record per line. Defaults to :obj:`None` which raises an error.
+                                                   """
+    IncrementLearningParams.num_neighbors.__doc__  = """(:class:`int`) Number of nearest previous runs used. Defaults to 3."""
+    IncrementLearningParams.min_inc_factor.__doc__ = """(:class:`float`) Factor applied to the smallest converged increment
+                                                   of the previous runs to obtain the minimum increment size,
+                                                   leaving room for cutbacks. Defaults to 0.5.
+                                                   """
+    IncrementLearningParams.record.__doc__         = """(:class:`bool`) Whether or not to add the increment history of
+                                                   the run to the history file. Defaults to :obj:`True`.
+                                                   """
+except (AttributeError, TypeError) as e:
+    pass
+#### End   IncrementLearningParams ####
+
 #### Begin OutputParams ####
 OutputParams = \
     namedtuple('OutputParams',
                ['result_folder_name',
                 'save_cae', 'save_odb', 'save_job_files',
-                'export_ribbon_width', 'export_stl', 'export_stp'])
+                'export_ribbon_width', 'export_stl', 'export_stp',
+                'keep_partial_results', 'export_3mf',
+                'finalizer_threads', 'compress_odb', 'compress_job_files'])
 OutputParams.__new__.__defaults__ = (None,
                                      True, True, True,
-                                     None, False, False)
+                                     None, False, False,
+                                     False, False,
+                                     0, False, False)
 # This entire block only runs under Python 3.5+,
 # because docstrings are immutable. However,
 # it is written for documentation using sphinx.
@@ -271,7 +577,7 @@ try:
     OutputParams.export_ribbon_width.__doc__ = \
                            """:class:`Float` defining the ribbon width used for exporting the part.
                            Must be positive, but can be :obj:`None` if the part
-                           will not be exported (both export_stl are export_stp are :obj:`False`).
+                           will not be exported (export_stl, export_stp, and export_3mf are :obj:`False`).
                            
                            Defaults to :obj:`None`.
                            """
@@ -279,6 +585,27 @@ try:
                            """Whether or not to export the structure in the STL format. Defaults to :obj:`False`."""
     OutputParams.export_stp.__doc__ = \
                            """Whether or not to export the structure in the STP format. Defaults to :obj:`False`."""
+    OutputParams.keep_partial_results.__doc__ = \
+                           """Whether or not to post-process the completed frames of a job which
+                           did not complete. The results are flagged as partial and a failed
+                           analysis does not abort :func:`.main.main_batch`, but is recorded
+                           in the status column of the batch results. Defaults to :obj:`False`.
+                           """
+    OutputParams.export_3mf.__doc__ = \
+                           """Whether or not to export the structure in the 3MF format, where each
+                           unique unit cell is stored once and placed in each of its cells.
+                           Only supported for reentrant2d structures. Defaults to :obj:`False`.
+                           """
+    OutputParams.finalizer_threads.__doc__ = \
+                           """Number of threads moving, compressing, and exporting the results
+                           in the background, see :mod:`.finalizer`. Batches then move on to the
+                           next structure without waiting for disk I/O. Defaults to 0, which
+                           finalizes the results before :meth:`.output_results` returns.
+                           """
+    OutputParams.compress_odb.__doc__ = \
+                           """Whether or not to compress the saved Odb using gzip. Defaults to :obj:`False`."""
+    OutputParams.compress_job_files.__doc__ = \
+                           """Whether or not to compress the saved job files using gzip. Defaults to :obj:`False`."""
 except (AttributeError, TypeError) as e:
     pass
 #### End   OutputParams ####
\ No newline at end of file
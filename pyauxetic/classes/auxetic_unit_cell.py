@@ -19,6 +19,9 @@ class AuxeticUnitCell:
         Child classes must first define self.name and afterwards call this
         function using :code:`super(ChildClass, self).__init__(params)`.
         This function then creates the self.sketch and self.part_main.
+        The dictionaries of sketch geometries and dimensions created with the sketch
+        are kept in self.sketch_geometry and self.sketch_dimensions so they can
+        be inspected after creation.
         
         Logging is done in the child classes.
         
@@ -38,6 +41,8 @@ class AuxeticUnitCell:
         self.params            = params
         self._part_main        = None
         self._part_3dprint     = None
+        self.sketch_geometry   = dict()  # Assigned in create_sketch.
+        self.sketch_dimensions = dict()  # Assigned in create_sketch.
         self.create_sketch()
         # It it not necessary to make the part here,
         # but this ensures that the sketch is valid.
@@ -82,9 +87,65 @@ class AuxeticUnitCell:
         logger.debug('Deleted part_main of unit cell %s.', self.name)
         self._part_main = None
     
+    def update_params(self, params):
+        """Change the parameters of the unit cell in the same model.
+        
+        The parts of the unit cell are deleted, since they may have been
+        partitioned or used by a structure, and the sketch is recreated
+        under the same name from the new parameters, which also updates
+        self.sketch_geometry and self.sketch_dimensions. Then self.part_main
+        is created from the new sketch, as in the constructor.
+        
+        The sketch is not edited through self.sketch_dimensions, since some
+        parameters, e.g. *diag_strut_length*, are not sketch dimensions.
+        
+        Args:
+            params: New parameters describing the unit cell geometry.
+                    They must be from the same classes accepted by the constructor
+                    and have the same id as the unit cell.
+        
+        Raises:
+            ValueError:   If *params* is invalid or its id is different.
+        """
+        if not isinstance(params, self.params_class_list):
+            raise ValueError('params must one of the unit cell parameter' +
+                             ' classes defind for this unit cell.')
+        if params.id != self.id:
+            raise ValueError('The id of a unit cell cannot be changed.')
+        
+        if self._part_main is not None:
+            del self.part_main
+        if self._part_3dprint is not None:
+            del self.part_3dprint
+        self.params = params
+        del self.model.sketches[self.sketch_name]
+        self.create_sketch()
+        self.create_part_main()
+        self.bound_size = helper.get_part_box_size(part=self.part_main)
+        logger.info('Recreated unit cell %s with new parameters.', self.name)
+    
+    @classmethod
+    def geometry_key(cls, params, tolerance=1E-6):
+        """Return a hashable key which is equal for parameters describing the same geometry.
+        
+        The id is ignored and numerical values are rounded to multiples of *tolerance*.
+        Child classes may override this, e.g. to compare parameters of different classes.
+        
+        Args:
+            params:           Parameters describing the unit cell geometry.
+            tolerance(float): Tolerance of the numerical values. Defaults to 1E-6.
+        """
+        key = [type(params).__name__]
+        for value in params[1:]:
+            if isinstance(value, (int, float)):
+                value = int(round(value / tolerance))
+            key.append(value)
+        return tuple(key)
+    
     @abstractmethod
     def create_sketch(self):
         """Create the 2D sketch for the unit cell.
+        Assigns self.sketch, self.sketch_geometry, and self.sketch_dimensions.
         See child classes for implementation.
         """
         pass
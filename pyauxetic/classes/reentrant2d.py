@@ -5,6 +5,7 @@ import numpy as np
 from abaqusConstants import *  # noqa: F403
 
 from .. import helper
+from .. import geometry
 
 from .auxetic_structure import AuxeticStructure
 from .auxetic_unit_cell import AuxeticUnitCell
@@ -45,6 +46,25 @@ class Reentrant2DUnitCell(AuxeticUnitCell):
         super(Reentrant2DUnitCell, self).__init__(model, params)
         logger.info('Created Reentrant2DUnitCell object named %s.', self.name)
     
+    @classmethod
+    def geometry_key(cls, params, tolerance=1E-6):
+        """Return a hashable key which is equal for parameters describing the same geometry.
+        
+        The key is made of the outline of the unit cell, computed by
+        :func:`.geometry.reentrant2d_outline`, and its extrusion depth,
+        so parameters of different classes can describe the same geometry.
+        Invalid parameters fall back to
+        :meth:`.auxetic_unit_cell.AuxeticUnitCell.geometry_key`,
+        so their errors are raised when the sketch is created.
+        """
+        try:
+            (outer, inner, bound_size) = geometry.reentrant2d_outline(
+                                             geometry.reentrant2d_full_params(params))
+        except (ValueError, RuntimeError):
+            return super(Reentrant2DUnitCell, cls).geometry_key(params, tolerance)
+        values = np.concatenate([outer.ravel(), inner.ravel(), [params.extrusion_depth]])
+        return tuple(int(value) for value in np.round(values / tolerance))
+    
     def create_part_main(self):
         """Create the main part of the unit cell based on the sketch."""
         self._create_part_main_planar()
@@ -57,6 +77,10 @@ class Reentrant2DUnitCell(AuxeticUnitCell):
         """Create the 2D sketch for the unit cell.
         A suitable creation method is called based on the
         unit cell parameters class passed to the unit cell object.
+        
+        The dictionaries of geometries and dimensions returned by the creation
+        method are kept in self.sketch_geometry and self.sketch_dimensions,
+        e.g. *self.sketch_dimensions['tail_vline_length']*.
         """
         #TODO: doc. reference reentrant page.
         #TODO: The sketch is created based on the 2D reentrant unit cell proposed by 
@@ -74,7 +98,9 @@ class Reentrant2DUnitCell(AuxeticUnitCell):
         else:
             raise TypeError('self.params is of incorrect type.' +
                             ' This is not supposed to happen.')
-        self.sketch = sk
+        self.sketch            = sk
+        self.sketch_geometry   = dg
+        self.sketch_dimensions = dd
 #
 
 class Reentrant2DPlanarShellStructure(AuxeticStructure):
@@ -95,11 +121,11 @@ class Reentrant2DPlanarShellStructure(AuxeticStructure):
         validating all input.
         
         Args:
-            structure_map(:class:`np.array`):
-                                A numpy array containing integer ids of unit cells
-                                and how they are distributed in the structure.
-                                It is defined by :meth:`assemble_structure`
-                                regardless of its *pattern_params* argument.
+            structure_map(SparseStructureMap):
+                                The rectangles of unit cell ids describing
+                                how they are distributed in the structure.
+                                It is defined by :meth:`add_pattern_params`
+                                regardless of the pattern mode.
             for_3dprint(bool):  If :obj:`True`, the structure will be a 3D part
                                 suitable for export, Otherwise dimensionality will
                                 be governed by the structure. Defaults to :obj:`False`.
@@ -116,56 +142,40 @@ class Reentrant2DPlanarShellStructure(AuxeticStructure):
         
         logger.debug('Assembling the core structure.')
         assembly = self.model.rootAssembly
-        unit_cell_bound_size = np.array(self.unit_cells[0].bound_size)
-        
-        used_ucs   = []
-        instances  = []
         
-        # Pattern the unit cells based on structure_map.
-        logger.debug('Patterning the unit cells based on structure_map.')
-        it = np.nditer(structure_map, order='C', flags=['multi_index', 'c_index'])
-        for elem in it:
-            if elem == 0:
-                continue
-            uc = self.get_unit_cell_by_id(id=elem)
-            if for_3dprint:
-                part = uc.part_3dprint
-            else:
-                part = uc.part_main
-            instances.append(assembly.Instance(
-                                    name=helper.return_instance_name(base_name=uc.name, suffix='-%03i'%it.index),
-                                    part=part, autoOffset=OFF, dependent=ON) )
-            helper.transfer_instance_to_zero(model=self.model, instance=instances[-1])
-            try:
-                vector = (it.multi_index[0], it.multi_index[1], it.multi_index[2]) * unit_cell_bound_size
-            except IndexError:
-                vector = (it.multi_index[0], it.multi_index[1], 0)*unit_cell_bound_size
-            assembly.translate(instanceList=(instances[-1].name, ), vector = vector)
-            # Will throw a warning for the very first instance because vector=(0,0,0).
-            if uc not in used_ucs:
-                used_ucs.append(uc)
-        logger.debug('Patterned the unit cells based on structure_map.')
+        # Uniform maps form a single block, and empty cells are never visited.
+        (instances, used_ucs, built_parts) = self._pattern_blocks(structure_map, for_3dprint)
         
         # Merge the instances.
-        logger.debug('Merging the patterned unit cells.')
         if delete_all:
             delete_flag       = DELETE
             delete_all_string = ' and deleted all unrelated parts'
         else:
             delete_flag       = SUPPRESS
             delete_all_string = ''
-        core_instance = assembly.InstanceFromBooleanMerge(
-                                    name='reentrant2d structure core',
-                                    instances=instances,
-                                    originalInstances=delete_flag, domain=GEOMETRY )
-        logger.debug('Merged the patterned unit cells.')
+        if len(instances) == 1:
+            # A structure made of a single block needs no merge.
+            core_instance = instances[0]
+        else:
+            logger.debug('Merging the patterned unit cells.')
+            core_instance = assembly.InstanceFromBooleanMerge(
+                                        name='reentrant2d structure core',
+                                        instances=instances,
+                                        originalInstances=delete_flag, domain=GEOMETRY )
+            logger.debug('Merged the patterned unit cells.')
         
         if delete_all:
+            core_part_name = core_instance.part.name
+            for part in built_parts:
+                if part.name != core_part_name:
+                    del self.model.parts[part.name]
             for uc in used_ucs:
                 if for_3dprint:
-                    del uc.part_3dprint
+                    if uc.part_3dprint.name != core_part_name:
+                        del uc.part_3dprint
                 else:
-                    del uc.part_main
+                    if uc.part_main.name != core_part_name:
+                        del uc.part_main
         
         if for_3dprint:
             self.part_3dprint          = core_instance.part
@@ -181,6 +191,100 @@ class Reentrant2DPlanarShellStructure(AuxeticStructure):
         return (core_instance.part, core_instance)
     #
     
+    def _pattern_blocks(self, structure_map, for_3dprint=False):
+        """Pattern the unit cells using the repeated blocks of *structure_map*.
+        
+        Each distinct rectangle of identical unit cells found by
+        :class:`.geometry.StructureMapBlocks` is built once by merging a strip of
+        unit cells along axis 1 and then a strip of these strips along axis 0.
+        The repeated tile of the map is built from its rectangles and patterned
+        the same way. This is called by :meth:`assemble_core_structure` for
+        all pattern modes.
+        
+        Returns:
+            A tuple *(instances, used_ucs, built_parts)* containing the instances
+            forming the core structure, the used unit cells, and the parts
+            built for the blocks.
+        """
+        assembly   = self.model.rootAssembly
+        bound_size = np.array(self.unit_cells[0].bound_size)
+        prefix     = 'print ' if for_3dprint else ''
+        blocks     = geometry.StructureMapBlocks(structure_map)
+        logger.debug('Found %i distinct blocks and a %ix%i tile repeated %ix%i times in structure_map.' +
+                     ' %i instances are merged instead of %i.', len(blocks.blocks()),
+                     blocks.tile_shape[0], blocks.tile_shape[1], blocks.num_tiles[0], blocks.num_tiles[1],
+                     blocks.num_merged_instances(), structure_map.count_nonzero())
+        used_ucs    = []
+        built_parts = []
+        
+        # Blocks are described by (part, shift) where shift
+        # translates the first cell of the part to the origin.
+        def place(part, shift, index, name):
+            instance = assembly.Instance(name=name, part=part, autoOffset=OFF, dependent=ON)
+            vector = np.array((index[0], index[1], 0)) * bound_size + shift
+            assembly.translate(instanceList=(instance.name, ), vector=tuple(vector))
+            return instance
+        
+        def merge(instances, name):
+            merge_instance = assembly.InstanceFromBooleanMerge(name=prefix + name, instances=instances,
+                                                               originalInstances=DELETE, domain=GEOMETRY)
+            # Only the part is kept.
+            assembly.deleteFeatures((merge_instance.name, ))
+            built_parts.append(merge_instance.part)
+            return (merge_instance.part, np.zeros(3))
+        
+        def grid(part, shift, counts, step, name):
+            for axis in (1, 0):
+                if counts[axis] > 1:
+                    indices = np.zeros((counts[axis], 2), dtype=int)
+                    indices[:, axis] = np.arange(counts[axis]) * step[axis]
+                    instances = [ place(part, shift, index, '%s-%s-%i'%(name, 'xy'[axis], k+1))
+                                  for (k, index) in enumerate(indices) ]
+                    (part, shift) = merge(instances, '%s-%s'%(name, 'xy'[axis]))
+            return (part, shift)
+        
+        # Build each distinct rectangle of unit cells.
+        rectangle_blocks = dict()
+        for (uc_id, counts) in blocks.blocks():
+            uc = self.get_unit_cell_by_id(id=uc_id)
+            if for_3dprint:
+                part = uc.part_3dprint
+            else:
+                part = uc.part_main
+            shift = -np.array(helper.get_box_coords(object_list=part)[0])
+            rectangle_blocks[(uc_id, counts)] = grid(part, shift, counts, (1, 1),
+                                                     'block %i %ix%i'%(uc_id, counts[0], counts[1]))
+            if uc not in used_ucs:
+                used_ucs.append(uc)
+        
+        # Pieces of the core structure are described by (part, shift, index).
+        pieces = []
+        if blocks.is_tiled():
+            if len(blocks.tile_rectangles) == 1:
+                (uc_id, tile_index, counts) = blocks.tile_rectangles[0]
+                (part, shift) = rectangle_blocks[(uc_id, counts)]
+            else:
+                tile_index = (0, 0)
+                instances  = []
+                for (uc_id, start, counts) in blocks.tile_rectangles:
+                    (part, shift) = rectangle_blocks[(uc_id, counts)]
+                    instances.append(place(part, shift, start, 'tile-%i'%(len(instances)+1)))
+                (part, shift) = merge(instances, 'tile')
+            (part, shift) = grid(part, shift, blocks.num_tiles, blocks.tile_shape, 'tiles')
+            pieces.append( (part, shift, tile_index) )
+        else:
+            pieces.extend( rectangle_blocks[(uc_id, counts)] + (start, )
+                           for (uc_id, start, counts) in blocks.tile_rectangles )
+        pieces.extend( rectangle_blocks[(uc_id, counts)] + (start, )
+                       for (uc_id, start, counts) in blocks.remainder_rectangles )
+        
+        instances = [ place(part, shift, index,
+                            helper.return_instance_name(base_name=prefix + 'core block', suffix='-%03i'%(k+1)))
+                      for (k, (part, shift, index)) in enumerate(pieces) ]
+        logger.debug('Patterned the unit cells using %i blocks.', len(instances))
+        return (instances, used_ucs, built_parts)
+    #
+    
     def assemble_structure(self, for_3dprint=False, output_params=None, delete_all=True):
         """Assemble one or more unit cells according to pattern parameters
         to create the auxetic structure.
@@ -227,6 +331,19 @@ class Reentrant2DPlanarShellStructure(AuxeticStructure):
         unit_cell_bound_size = np.array(self.unit_cells[0].bound_size)
         logger.debug('All unit cells were of the same bound_size.')
         
+        if self.pattern_mode == 'periodic' and not for_3dprint:
+            # A periodic unit cell is analyzed on its own, without ribbons.
+            uc = self.unit_cells[0]
+            self.part_main          = uc.part_main
+            self.part_main_instance = assembly.Instance(
+                                          name=helper.return_instance_name(base_name=uc.name),
+                                          part=uc.part_main, autoOffset=OFF, dependent=ON)
+            helper.transfer_instance_to_zero(model=self.model, instance=self.part_main_instance)
+            self.ribbon_width       = None
+            assembly.regenerate()
+            logger.info('Assembled the periodic unit cell.')
+            return
+        
         # Assemble the core auxetic structure.
         (core_part, core_instance) = \
             self.assemble_core_structure(self.structure_map, for_3dprint, delete_all)
@@ -242,6 +359,7 @@ class Reentrant2DPlanarShellStructure(AuxeticStructure):
             # vert_strut_thickness in all unit cells.
             ribbon_width = max(
                 [uc.params.vert_strut_thickness for uc in self.unit_cells] )
+            self.ribbon_width = ribbon_width
         if self.loading_direction == 0:
             ribbon_size = (ribbon_width, self.num_cell_repeat[1] * unit_cell_bound_size[1] )
         else:
@@ -475,36 +593,9 @@ def create_sketch_reentrant2d_box(model, params, sketch_name):
     if not isinstance(params, Reentrant2DUcpBox):
         raise ValueError('params must be a Reentrant2DUcpBox.')
     
-    horz_bounding_box    = params.horz_bounding_box / 2.0
-    vert_bounding_box    = params.vert_bounding_box / 2.0
-    vert_strut_thickness = params.vert_strut_thickness
-    diag_strut_angle     = params.diag_strut_angle
-    diag_strut_thickness = params.diag_strut_thickness
-    tail_strut_thickness = params.vert_strut_thickness
-    
-    diag_strut_angle_rad      = np.deg2rad(diag_strut_angle)
-    tail_strut_thickness_half = tail_strut_thickness / 2.0
-    diag_strut_length = (horz_bounding_box - tail_strut_thickness_half) / sin(diag_strut_angle_rad)
-    vert_strut_length_half = ( vert_bounding_box
-                          + (diag_strut_length         * cos(diag_strut_angle_rad) )
-                          + (diag_strut_thickness      / sin(diag_strut_angle_rad) )
-                          + (tail_strut_thickness_half / tan(diag_strut_angle_rad) ) ) / 2.0
-    vert_strut_length = vert_strut_length_half * 2.0
-    tail_strut_length = ( vert_strut_length_half
-                          - (diag_strut_thickness      / sin(diag_strut_angle_rad) )
-                          - (tail_strut_thickness_half / tan(diag_strut_angle_rad) ) )
-    
-    ## These dimensions only work if diag_line1 ends higher than tail_hline.
-    if tail_strut_length < ( diag_strut_length * cos(diag_strut_angle_rad) ):
-        raise RuntimeError('The formulated dimensions are incorrect for these inputs.')
-    
-    
     # Create the Reentrant2DUcpFull object.
-    new_params = Reentrant2DUcpFull(params.id, params.extrusion_depth,
-                                    tail_strut_length, tail_strut_thickness,
-                                    diag_strut_length, diag_strut_thickness,
-                                    diag_strut_angle,
-                                    vert_strut_length, vert_strut_thickness )
+    new_params = geometry.reentrant2d_full_params(params)
+    tail_strut_length = new_params.tail_strut_length
     
     # Create the sketch.
     (sk, dg, dd) = create_sketch_reentrant2d_full(model, new_params, sketch_name)
@@ -539,23 +630,6 @@ def create_sketch_reentrant2d_simple(model, params, sketch_name):
         raise ValueError('params must be a Reentrant2DUcpSimple.')
     
     # Manipulate parameters so create_sketch_reentrant2d_full() can be called.
-    # Note that mirroring will be considered in create_sketch_reentrant2d_full(),
-    # but sin() and tan() functions require a deg2rad conversion.
-    vert_strut_length    = params.vert_strut_length
-    vert_strut_thickness = params.vert_strut_thickness
-    diag_strut_length    = vert_strut_length/1.5  # Dummy dimension. Determined by constraints.
-    diag_strut_thickness = params.diag_strut_thickness
-    diag_strut_angle     = params.diag_strut_angle
-    tail_strut_thickness = params.vert_strut_thickness
-    tail_strut_length    = ( ( vert_strut_length / 2.0 )
-                             -  diag_strut_thickness      / sin(np.deg2rad(diag_strut_angle))
-                             - (tail_strut_thickness/2.0) / tan(np.deg2rad(diag_strut_angle)) )
-    
-    # Create the Reentrant2DUcpFull object.
-    new_params = Reentrant2DUcpFull(params.id, params.extrusion_depth,
-                                    tail_strut_length, tail_strut_thickness,
-                                    diag_strut_length, diag_strut_thickness,
-                                    diag_strut_angle,
-                                    vert_strut_length, vert_strut_thickness )
+    new_params = geometry.reentrant2d_full_params(params)
     return create_sketch_reentrant2d_full(model, new_params, sketch_name)
 #
\ No newline at end of file
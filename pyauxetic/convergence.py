@@ -0,0 +1,193 @@
+"""Mesh convergence studies.
+
+A mesh convergence study remeshes a structure whose geometry, sets, and BCs
+have already been defined using a decreasing sequence of seed sizes.
+Each mesh is analyzed and the study stops when the chosen metric changes
+by less than a tolerance. The coarser mesh of the converged pair is recommended.
+
+The results can be cached in a json file, keyed by a hash of the geometry and
+analysis settings, so the study is not repeated for identical structures
+in later batches.
+"""
+
+import os
+import json
+import hashlib
+import logging
+import numpy as np
+
+from . import __version__
+from . import postprocessing
+
+logger = logging.getLogger(__name__)
+
+_convergence_table_labels = ('Mesh', 'seed_size', 'num_elements', 'metric_value', 'relative_change')
+_convergence_table_fmt    = ('%d', '%.6f', '%d', '%.8f', '%.8f')
+
+def geometry_hash(obj, *extra_params):
+    """Return a hash of the geometry of a structure and other settings.
+    
+    Args:
+        obj(AuxeticStructure): The structure. Its unit cell parameters,
+                               pattern mode, structure map and loading
+                               direction are used.
+        *extra_params:         Other parameters included in the hash, e.g. the
+                               namedtuples describing the material and mesh.
+    
+    Returns:
+        A hexadecimal string.
+    """
+    # The nonzero cells describe the structure map independently of its rectangles.
+    data = [ [uc.params for uc in obj.unit_cells], obj.pattern_mode,
+             obj.structure_map.shape, obj.structure_map.cells(), obj.loading_direction,
+             list(extra_params) ]
+    text = json.dumps(postprocessing.to_json_compatible(data), sort_keys=True)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+#
+
+def return_seed_sizes(convergence_params):
+    """Return the decreasing sequence of seed sizes of a convergence study.
+    
+    Raises:
+        ValueError: If *convergence_params* is invalid.
+    """
+    initial_seed_size = convergence_params.initial_seed_size
+    min_seed_size     = convergence_params.min_seed_size
+    refinement_ratio  = convergence_params.refinement_ratio
+    if initial_seed_size is None or min_seed_size is None:
+        raise ValueError('convergence_params.initial_seed_size and' +
+                         ' convergence_params.min_seed_size must be specified.')
+    if not 0 < refinement_ratio < 1:
+        raise ValueError('convergence_params.refinement_ratio must be between 0 and 1.')
+    if min_seed_size > initial_seed_size:
+        raise ValueError('convergence_params.min_seed_size must not be' +
+                         ' larger than convergence_params.initial_seed_size.')
+    
+    seed_sizes = [float(initial_seed_size)]
+    while seed_sizes[-1] * refinement_ratio >= min_seed_size * (1.0 - 1E-9):
+        seed_sizes.append(seed_sizes[-1] * refinement_ratio)
+    if len(seed_sizes) < 2:
+        raise ValueError('convergence_params must define at least two seed sizes.')
+    return seed_sizes
+#
+
+def read_cache(cache_file, key):
+    """Return the cached result of a convergence study or :obj:`None` if it does not exist."""
+    if cache_file is None or not os.path.isfile(cache_file):
+        return None
+    with open(cache_file, 'r') as file:
+        cache = json.load(file)
+    return cache.get(key)
+#
+
+def write_cache(cache_file, key, entry):
+    """Add the result of a convergence study to the cache file."""
+    cache = dict()
+    if os.path.isfile(cache_file):
+        with open(cache_file, 'r') as file:
+            cache = json.load(file)
+    cache[key] = entry
+    with open(cache_file, 'w') as file:
+        json.dump(cache, file, indent=1, sort_keys=True)
+    logger.debug('Cached the results of the mesh convergence study in %s.', cache_file)
+#
+
+def run_mesh_convergence(obj, mesh_params, job_params, convergence_params, hash_params=()):
+    """Run a mesh convergence study on a structure.
+    
+    The following methods of *obj* must have been called before:
+    :meth:`.assemble_structure`, :meth:`.assign_material`,
+    :meth:`.define_step`, and :meth:`.define_bcs`.
+    The geometry, sets and BCs are reused and only :meth:`.mesh_part`,
+    :meth:`.create_job`, and :meth:`.submit_job` are called for each mesh.
+    The jobs are named *'<structure name>-Mesh-<number>'*.
+    
+    Args:
+        obj(AuxeticStructure):                The structure.
+        mesh_params(MeshParams):              Special namedtuple describing the mesh.
+                                              *mesh_params.seed_size* is ignored.
+        job_params(JobParams):                Special namedtuple describing the jobs.
+        convergence_params(ConvergenceParams): Special namedtuple describing the study.
+        hash_params(tuple):                   Other parameters which affect the results and are
+                                              included in the cache key, e.g. the namedtuples
+                                              describing the material, step, and loading.
+                                              Defaults to an empty tuple.
+    
+    Returns:
+        A tuple *(seed_size, convergence_table)* containing the recommended seed size
+        and a numpy array whose columns are described by *_convergence_table_labels*.
+    
+    Raises:
+        ValueError:   If *convergence_params* is invalid.
+        RuntimeError: If a job does not complete successfuly.
+    """
+    from odbAccess import openOdb
+    
+    seed_sizes = return_seed_sizes(convergence_params)
+    metric = convergence_params.metric
+    if metric not in postprocessing.output_table_labels[2:]:
+        raise ValueError("Invalid value '%s' for convergence_params.metric."%metric)
+    column = postprocessing.output_table_labels.index(metric)
+    
+    key = geometry_hash(obj, mesh_params._replace(seed_size=None), metric,
+                        convergence_params.tolerance, seed_sizes, *hash_params)
+    entry = read_cache(convergence_params.cache_file, key)
+    if entry is not None:
+        logger.info('Found the mesh convergence study of structure %s in the cache.' +
+                    ' Recommended seed size: %f.', obj.name, entry['seed_size'])
+        return ( entry['seed_size'], np.array(entry['table']) )
+    
+    logger.info('Starting mesh convergence study of structure %s with %i seed sizes.',
+                obj.name, len(seed_sizes))
+    rows = []
+    recommended_seed_size = None
+    for (i, seed_size) in enumerate(seed_sizes):
+        obj.mesh_part(mesh_params._replace(seed_size=seed_size))
+        obj.create_job(job_params, job_name='%s-Mesh-%02i'%(obj.name, i+1))
+        obj.submit_job()
+        odb = openOdb(path=obj.odb_path)
+        restart_odbs = [openOdb(path=path) for path in obj.restart_odb_paths]
+        value = postprocessing.get_numerical_output(obj=obj, odb=odb,
+                                                    restart_odbs=restart_odbs)[-1, column]
+        odb.close()
+        for restart_odb in restart_odbs:
+            restart_odb.close()
+        
+        if rows:
+            previous_value = rows[-1][3]
+            relative_change = abs(value - previous_value) / max(abs(previous_value), 1E-12)
+        else:
+            relative_change = np.nan
+        rows.append( (i+1, seed_size, len(obj.part_main.elements), value, relative_change) )
+        logger.info('Mesh %i: seed size=%f, %s=%f, relative change=%f.',
+                    i+1, seed_size, metric, value, relative_change)
+        
+        if relative_change < convergence_params.tolerance:
+            recommended_seed_size = seed_sizes[i-1]
+            break
+    
+    if recommended_seed_size is None:
+        recommended_seed_size = seed_sizes[-1]
+        logger.warning('The mesh convergence study of structure %s did not converge.' +
+                       ' Using the smallest seed size.', obj.name)
+    logger.info('Mesh convergence study completed. Recommended seed size: %f.',
+                recommended_seed_size)
+    
+    convergence_table = np.array(rows, dtype=float)
+    if convergence_params.cache_file is not None:
+        write_cache(convergence_params.cache_file, key,
+                    dict(seed_size=recommended_seed_size, metric=metric,
+                         table=convergence_table.tolist()))
+    return (recommended_seed_size, convergence_table)
+#
+
+def write_convergence_table(convergence_table, seed_size, metric, structure_name, folder_path):
+    """Write the output of :func:`run_mesh_convergence` to a csv file."""
+    with open(os.path.join(folder_path, structure_name+' mesh convergence.csv') ,'w') as file:
+        file.write('Modeling and post-processing done by PyAuxetic %s\n'%__version__)
+        file.write('Metric = %s. Recommended seed size = %f.\n'%(metric, seed_size))
+        file.write( ', '.join(_convergence_table_labels) + '\n' )
+        np.savetxt(fname=file, X=convergence_table, fmt=_convergence_table_fmt,
+                   delimiter=', ', newline='\n')
+    logger.info('Exported the mesh convergence table for structure %s.', structure_name)
+#
@@ -0,0 +1,641 @@
+"""Native export of structures for 3D printing.
+
+:func:`.postprocessing.export_part_stl` needs Abaqus/CAE, the stlExport plugin,
+a viewport displaying the part, and the part created by the destructive
+re-assembly of the structure, and writes ASCII files. The functions in this
+module build the extruded structure directly from the analytic geometry in
+:mod:`.geometry`, so they can be used without Abaqus/CAE.
+
+The cap of each unit cell is triangulated once, by triangulating a quarter of
+the cell as in the sketch and mirroring it, and extruded. The walls shared by
+touching unit cells and ribbons are left out and their edges are split at the
+same points, so the STL file describes a single closed manifold surface. The
+extruded cells are translated to the positions of the cells in the structure
+map and written in chunks, so the memory used does not depend on the size of
+the structure.
+
+:func:`export_3mf` writes the 3MF format instead, where each unique unit cell
+and ribbon mesh is stored once and placed by a transform for each cell, so the
+file size mostly depends on the number of unique unit cells. Each mesh is a
+closed shell touching its neighbors, which 3MF consumers merge into a single solid.
+"""
+
+import os
+import logging
+import zipfile
+import numpy as np
+
+from . import __version__
+from .classes.auxetic_structure_params import PatternParams
+from .classes.auxetic_unit_cell_params import reentrant2d_ucp_list
+from .geometry import (PlanarStructureGeometry, reentrant2d_quarter_outline,
+                       reentrant2d_outline)
+
+logger = logging.getLogger(__name__)
+
+# Layout of a triangle in a binary STL file.
+_stl_dtype = np.dtype([('normal', '<f4', (3,)), ('vertices', '<f4', (3, 3)), ('attribute', '<u2')])
+
+def _signed_area(points):
+    """Return the signed area of a closed polygon, which is positive if it is counter-clockwise."""
+    x = points[:, 0]
+    y = points[:, 1]
+    return 0.5 * np.sum(x * np.roll(y, -1) - np.roll(x, -1) * y)
+#
+
+def triangulate_polygon(points):
+    """Triangulate a simple counter-clockwise polygon by ear clipping.
+    
+    Args:
+        points(np.array): (n,2) array of the polygon vertices.
+    
+    Returns:
+        An (n-2,3) integer array of the vertex indices of counter-clockwise triangles.
+    
+    Raises:
+        ValueError:   If the polygon is not counter-clockwise.
+        RuntimeError: If the polygon cannot be triangulated, e.g. if it is self-intersecting.
+    """
+    points = np.asarray(points, dtype=float)
+    if _signed_area(points) <= 0:
+        raise ValueError('The polygon must be counter-clockwise.')
+    tolerance = 1E-12 * np.ptp(points, axis=0).max() ** 2
+    
+    remaining = list(range(len(points)))
+    triangles = []
+    while len(remaining) > 3:
+        n = len(remaining)
+        for k in range(n):
+            (i, j, l) = (remaining[k-1], remaining[k], remaining[(k+1) % n])
+            (a, b, c) = (points[i], points[j], points[l])
+            if _cross(a, b, c) <= tolerance:
+                continue  # Reflex or degenerate vertex.
+            others = [m for m in remaining if m not in (i, j, l)]
+            if _points_in_triangle(points[others], a, b, c, tolerance).any():
+                continue
+            triangles.append( (i, j, l) )
+            remaining.pop(k)
+            break
+        else:
+            raise RuntimeError('The polygon could not be triangulated.')
+    triangles.append( tuple(remaining) )
+    return np.array(triangles, dtype=int)
+#
+
+def _cross(a, b, c):
+    """Return the z component of *(b-a) x (c-b)*, which is positive for a convex corner at *b*."""
+    return (b[0]-a[0]) * (c[1]-b[1]) - (b[1]-a[1]) * (c[0]-b[0])
+#
+
+def _points_in_triangle(points, a, b, c, tolerance):
+    """Check whether points are inside or on the edges of a counter-clockwise triangle."""
+    if len(points) == 0:
+        return np.zeros(0, dtype=bool)
+    def side(p, q):
+        return (q[0]-p[0]) * (points[:, 1]-p[1]) - (q[1]-p[1]) * (points[:, 0]-p[0])
+    return (side(a, b) >= -tolerance) & (side(b, c) >= -tolerance) & (side(c, a) >= -tolerance)
+#
+
+def extrude_polygon(cap_triangles, boundaries, depth):
+    """Extrude a triangulated planar region to a closed shell.
+    
+    Args:
+        cap_triangles(np.array): (n,3,2) array of counter-clockwise triangles covering the region.
+        boundaries(list):        Closed polygons, as (m,2) arrays, bounding the region.
+                                 Outer boundaries must be counter-clockwise and
+                                 the boundaries of holes clockwise.
+        depth(float):            Extrusion depth in the z direction.
+    
+    Returns:
+        A (k,3,3) array of triangles whose normals point outwards.
+    """
+    cap_triangles = np.asarray(cap_triangles, dtype=float)
+    num_caps = len(cap_triangles)
+    bottom = np.zeros((num_caps, 3, 3))
+    bottom[:, :, :2] = cap_triangles[:, ::-1]
+    top = np.zeros((num_caps, 3, 3))
+    top[:, :, :2] = cap_triangles
+    top[:, :, 2]  = depth
+    
+    walls = []
+    for boundary in boundaries:
+        boundary = np.asarray(boundary, dtype=float)
+        walls.append( wall_triangles(boundary, np.roll(boundary, -1, axis=0), depth) )
+    return np.concatenate([bottom, top] + walls)
+#
+
+def wall_triangles(starts, ends, depth):
+    """Extrude edges in the z direction, each to two triangles.
+    
+    Args:
+        starts(np.array): (n,2) array of the start points of the edges.
+        ends(np.array):   (n,2) array of the end points of the edges.
+        depth(float):     Extrusion depth in the z direction.
+    
+    Returns:
+        A (2n,3,3) array of triangles whose normals point to the right of the edges.
+    """
+    a0 = np.zeros((len(starts), 3))
+    a0[:, :2] = starts
+    b0 = np.zeros((len(ends), 3))
+    b0[:, :2] = ends
+    a1 = a0 + np.array([0.0, 0.0, depth])
+    b1 = b0 + np.array([0.0, 0.0, depth])
+    return np.concatenate(( np.stack((a0, b0, b1), axis=1), np.stack((a0, b1, a1), axis=1) ))
+#
+
+def reentrant2d_cap_triangles(params):
+    """Return the triangulated face of a reentrant2d unit cell.
+    
+    The quarter of the cell is triangulated and mirrored, so the vertices on
+    the edges of the bounding box are identical on opposite edges, and the
+    triangles of neighboring cells share their vertices.
+    The cell is positioned like :func:`.geometry.reentrant2d_outline`,
+    so its bounding box starts at the origin.
+    
+    Args:
+        params: Parameters describing the unit cell geometry. Must be one of the
+                classes in *auxetic_unit_cell_params.reentrant2d_ucp_list*.
+    
+    Returns:
+        A (k,3,2) array of counterclockwise triangles.
+    """
+    (quarter, h) = reentrant2d_quarter_outline(params)
+    quarter_caps = quarter[triangulate_polygon(quarter)]
+    
+    # Mirroring reverses the orientation of the triangles.
+    mirrored_v = quarter_caps[:, ::-1] * np.array([-1.0, 1.0])
+    caps = np.concatenate((quarter_caps, mirrored_v))
+    mirrored_h = caps[:, ::-1] * np.array([1.0, -1.0]) + np.array([0.0, 2*h])
+    caps = np.concatenate((caps, mirrored_h))
+    return caps - caps.reshape(-1, 2).min(axis=0)
+#
+
+def reentrant2d_triangles(params, depth=None):
+    """Return the closed shell of an extruded reentrant2d unit cell.
+    
+    The cell is positioned like :func:`.geometry.reentrant2d_outline`,
+    so its bounding box starts at the origin.
+    
+    Args:
+        params: Parameters describing the unit cell geometry. Must be one of the
+                classes in *auxetic_unit_cell_params.reentrant2d_ucp_list*.
+        depth(float): Extrusion depth. Defaults to :obj:`None`
+                      which uses *params.extrusion_depth*.
+    
+    Returns:
+        A (k,3,3) array of triangles whose normals point outwards.
+    """
+    if depth is None:
+        depth = params.extrusion_depth
+    caps = reentrant2d_cap_triangles(params)
+    
+    (outer, inner, _) = reentrant2d_outline(params)
+    if _signed_area(outer) < 0:
+        outer = outer[::-1]
+    if _signed_area(inner) > 0:
+        inner = inner[::-1]
+    return extrude_polygon(caps, [outer, inner], depth)
+#
+
+def box_triangles(min_corner, max_corner, depth):
+    """Return the closed shell of an extruded rectangle, e.g. a ribbon."""
+    (x0, y0) = min_corner
+    (x1, y1) = max_corner
+    outline = np.array([(x0, y0), (x1, y0), (x1, y1), (x0, y1)], dtype=float)
+    caps = outline[np.array([(0, 1, 2), (0, 2, 3)])]
+    return extrude_polygon(caps, [outline], depth)
+#
+
+# Sides of the bounding box of a unit cell in cell units as (axis, coordinate):
+# left, right, bottom, and top. The opposite side of side *i* is *i ^ 1*.
+_sides = ( (0, 0.0), (0, 1.0), (1, 0.0), (1, 1.0) )
+
+def _snap_to_sides(points, tolerance=1E-9):
+    """Set coordinates in cell units that are close to the sides of the bounding box to exactly 0 or 1."""
+    points = np.array(points, dtype=float)
+    points[abs(points) < tolerance]       = 0.0
+    points[abs(points - 1.0) < tolerance] = 1.0
+    return points
+#
+
+def _in_intervals(values, intervals):
+    """Check whether values are strictly inside any of the intervals in an (n,2) array
+    of disjoint intervals sorted by their start."""
+    index = np.searchsorted(intervals[:, 0], values) - 1
+    inside = index >= 0
+    inside[inside] = values[inside] < intervals[index[inside], 1]
+    return inside
+#
+
+def reentrant2d_cell_faces(params):
+    """Return the faces of a reentrant2d unit cell in cell units.
+    
+    The coordinates are divided by the bound_size of the cell, so its bounding box
+    is the unit square, and coordinates on its sides are exactly 0 or 1.
+    
+    Args:
+        params: Parameters describing the unit cell geometry. Must be one of the
+                classes in *auxetic_unit_cell_params.reentrant2d_ucp_list*.
+    
+    Returns:
+        A tuple *(caps, edges, contacts)* where *caps* is a (k,3,2) array of
+        counterclockwise triangles, *edges* is an (m,2,2) array of the boundary
+        edges which have the material on their left, and *contacts* contains an
+        (n,2) array for each side of the bounding box of the sorted intervals
+        along the side in which the cell touches it.
+    """
+    (outer, inner, bound_size) = reentrant2d_outline(params)
+    bound_size = np.array(bound_size)
+    if _signed_area(outer) < 0:
+        outer = outer[::-1]
+    if _signed_area(inner) > 0:
+        inner = inner[::-1]
+    caps = _snap_to_sides(reentrant2d_cap_triangles(params) / bound_size)
+    
+    edges = []
+    for boundary in (outer, inner):
+        boundary = _snap_to_sides(boundary / bound_size)
+        edges.append( np.stack((boundary, np.roll(boundary, -1, axis=0)), axis=1) )
+    edges = np.concatenate(edges)
+    
+    contacts = []
+    for (axis, value) in _sides:
+        on_side = (edges[:, :, axis] == value).all(axis=1)
+        intervals = np.sort(edges[on_side, :, 1-axis], axis=1)
+        contacts.append( intervals[np.argsort(intervals[:, 0])] )
+    return (caps, edges, contacts)
+#
+
+def _points_on_edge(p, q, splits):
+    """Return the split points strictly inside an edge on a side of the bounding box.
+    
+    Args:
+        p, q(np.array): End points of the edge.
+        splits(list):   Sorted coordinates along each side at which edges are split.
+    
+    Returns:
+        An (n,2) array of the points ordered from *p* to *q*.
+    """
+    for (side, (axis, value)) in enumerate(_sides):
+        if p[axis] == value and q[axis] == value:
+            (lower, upper) = sorted((p[1-axis], q[1-axis]))
+            along = splits[side]
+            along = along[(along > lower) & (along < upper)]
+            if q[1-axis] < p[1-axis]:
+                along = along[::-1]
+            points = np.zeros((len(along), 2))
+            points[:, axis]   = value
+            points[:, 1-axis] = along
+            return points
+    return np.zeros((0, 2))
+#
+
+def reentrant2d_cell_triangles(faces, neighbor_contacts, depth):
+    """Return an extruded unit cell without the walls shared with its neighbors.
+    
+    The edges on the sides of the bounding box are split at the ends of the contacts
+    of the neighbors, so the vertices of touching cells are identical.
+    
+    Args:
+        faces(tuple):            Output of :func:`reentrant2d_cell_faces`.
+        neighbor_contacts(list): For each side of the bounding box, an (n,2) array of the sorted
+                                 intervals along the side in which the neighbor touches it.
+        depth(float):            Extrusion depth.
+    
+    Returns:
+        A (k,3,3) array of triangles whose normals point outwards and
+        whose x and y coordinates are in cell units.
+    """
+    (caps, edges, contacts) = faces
+    splits = [np.unique(intervals) for intervals in neighbor_contacts]
+    
+    split_caps = []
+    remaining  = list(caps)
+    while remaining:
+        triangle = remaining.pop()
+        for k in range(3):
+            (p, q, r) = (triangle[k], triangle[(k+1) % 3], triangle[(k+2) % 3])
+            points = _points_on_edge(p, q, splits)
+            if len(points):
+                chain = np.vstack((p, points, q))
+                remaining.extend( np.array([a, b, r]) for (a, b) in zip(chain[:-1], chain[1:]) )
+                break
+        else:
+            split_caps.append(triangle)
+    
+    (starts, ends) = ([], [])
+    for (p, q) in edges:
+        chain = np.vstack((p, _points_on_edge(p, q, splits), q))
+        starts.append(chain[:-1])
+        ends.append(chain[1:])
+    (starts, ends) = (np.concatenate(starts), np.concatenate(ends))
+    
+    # Walls touching the neighbors are inside the structure.
+    midpoints = (starts + ends) / 2.0
+    shared = np.zeros(len(starts), dtype=bool)
+    for (side, (axis, value)) in enumerate(_sides):
+        on_side = (starts[:, axis] == value) & (ends[:, axis] == value)
+        shared |= on_side & _in_intervals(midpoints[:, 1-axis], neighbor_contacts[side])
+    return np.concatenate(( extrude_polygon(split_caps, [], depth),
+                            wall_triangles(starts[~shared], ends[~shared], depth) ))
+#
+
+def _ribbon_triangles(geometry, ribbon_index, contacts):
+    """Return an extruded ribbon without the walls shared with the unit cells.
+    
+    Args:
+        geometry(PlanarStructureGeometry): Geometry of the structure.
+        ribbon_index(int):                 0 for the first ribbon and 1 for the second one.
+        contacts(np.array):                (n,2) array of the sorted intervals along
+                                           the ribbon in which the unit cells touch it.
+    
+    Returns:
+        A (k,3,3) array of triangles whose normals point outwards.
+    """
+    ld    = geometry.loading_direction
+    td    = geometry.transverse_direction
+    shape = geometry.structure_map.shape
+    
+    # The coordinates are computed like those of the unit cells, so they are identical.
+    inner = ( geometry.core_origin[ld]
+              + ( ribbon_index * (shape[ld] - 1) + float(ribbon_index) ) * geometry.bound_size[ld] )
+    outer = geometry.ribbons[ribbon_index][ribbon_index][ld]
+    along = geometry.core_origin[td] + np.array([0.0, shape[td]]) * geometry.bound_size[td]
+    along = np.unique(np.concatenate(( along, contacts.ravel() )))
+    
+    def points(along, across):
+        result = np.zeros((len(along), 2))
+        result[:, td] = along
+        result[:, ld] = across
+        return result
+    
+    inner_points = points(along, inner)
+    outer_points = points(along[[0, -1]], outer)
+    
+    # The outline runs along inner_points and back along outer_points.
+    uncovered = ~_in_intervals((along[:-1] + along[1:]) / 2.0, contacts)
+    starts = np.vstack(( inner_points[:-1][uncovered], inner_points[-1:], outer_points[::-1] ))
+    ends   = np.vstack(( inner_points[1:][uncovered], outer_points[::-1], inner_points[:1] ))
+    
+    # The cap is a fan from a corner on the outer side.
+    caps = np.stack(( np.repeat(outer_points[:1], len(along) - 1, axis=0),
+                      inner_points[:-1], inner_points[1:] ), axis=1)
+    caps = np.concatenate(( caps, [[outer_points[0], inner_points[-1], outer_points[1]]] ))
+    if _signed_area(np.vstack(( inner_points, outer_points[::-1] ))) < 0:
+        (starts, ends) = (ends, starts)
+        caps = caps[:, ::-1]
+    return np.concatenate(( extrude_polygon(caps, [], geometry.extrusion_depth),
+                            wall_triangles(starts, ends, geometry.extrusion_depth) ))
+#
+
+def structure_triangle_chunks(geometry, chunk_size=100000):
+    """Generate the triangles of an extruded structure in chunks.
+    
+    The triangles form a single closed manifold surface. The walls shared
+    by touching unit cells and ribbons are left out, and the edges of
+    touching unit cells are split at the same points.
+    
+    Args:
+        geometry(PlanarStructureGeometry): Geometry of the structure.
+        chunk_size(int):                   Approximate number of triangles per chunk.
+                                           Defaults to 100000.
+    
+    Yields:
+        (k,3,3) arrays of triangles.
+    """
+    depth = geometry.extrusion_depth
+    shape = geometry.structure_map.shape
+    td    = geometry.transverse_direction
+    (indices, ids) = geometry.cells()
+    faces = dict( (uc_id, reentrant2d_cell_faces(params)) for (uc_id, params) in geometry.params.items() )
+    
+    # The neighbor of each cell on each side is its unit cell id,
+    # 0 if the neighboring cell is empty, or -1 if it is a ribbon.
+    neighbors = np.zeros((len(ids), len(_sides)), dtype=int)
+    for (side, (axis, value)) in enumerate(_sides):
+        step = np.zeros(2, dtype=int)
+        step[axis] = 1 if value else -1
+        neighbors[:, side] = geometry.structure_map.lookup(indices + step)
+        if geometry.ribbons and axis == geometry.loading_direction:
+            neighbors[indices[:, axis] == (shape[axis] - 1 if value else 0), side] = -1
+    
+    def neighbor_contacts(neighbor, side):
+        if neighbor == -1:
+            return np.array([[0.0, 1.0]])
+        elif neighbor == 0:
+            return np.zeros((0, 2))
+        return faces[neighbor][2][side ^ 1]
+    
+    for ribbon_index in range(len(geometry.ribbons)):
+        # The side of the cells touching the ribbon.
+        side = 2 * geometry.loading_direction + ribbon_index
+        contacts = [np.zeros((0, 2))]
+        for uc_id in np.unique(ids[neighbors[:, side] == -1]):
+            adjacent = (ids == uc_id) & (neighbors[:, side] == -1)
+            along = indices[adjacent, td][:, None, None] + faces[uc_id][2][side][None, :, :]
+            contacts.append( (geometry.core_origin[td] + along * geometry.bound_size[td]).reshape(-1, 2) )
+        contacts = np.concatenate(contacts)
+        yield _ribbon_triangles(geometry, ribbon_index, contacts[np.argsort(contacts[:, 0])])
+    
+    # The cells are grouped by their unit cell and neighbors, which are encoded as a single integer.
+    (values, value_index) = np.unique(np.column_stack((ids, neighbors)), return_inverse=True)
+    dims = (len(values),) * (1 + len(_sides))
+    (codes, inverse) = np.unique(np.ravel_multi_index(value_index.reshape(len(ids), -1).T, dims),
+                                 return_inverse=True)
+    keys = values[np.column_stack(np.unravel_index(codes, dims))]
+    inverse = inverse.ravel()
+    for (k, key) in enumerate(keys):
+        template = reentrant2d_cell_triangles(faces[key[0]],
+                                              [neighbor_contacts(neighbor, side)
+                                               for (side, neighbor) in enumerate(key[1:])], depth)
+        # The top and bottom vertices have the same x and y coordinates,
+        # so the unique ones are translated and the triangles are gathered from them.
+        (vertices, vertex_index) = np.unique(template[:, :, :2].reshape(-1, 2), axis=0, return_inverse=True)
+        vertex_index = vertex_index.reshape(template.shape[:2])
+        cell_indices = indices[inverse == k]
+        cells_per_chunk = max(1, chunk_size // len(template))
+        for start in range(0, len(cell_indices), cells_per_chunk):
+            chunk_indices = cell_indices[start:start+cells_per_chunk]
+            # The same operations as for the ribbons, so touching vertices are identical.
+            positions = geometry.core_origin + (chunk_indices[:, None, :] + vertices) * geometry.bound_size
+            chunk = np.empty((len(chunk_indices), len(template), 3, 3))
+            chunk[..., :2] = positions[:, vertex_index]
+            chunk[..., 2]  = template[:, :, 2]
+            yield chunk.reshape(-1, 3, 3)
+#
+
+def write_binary_stl(file_path, triangle_chunks, header=None):
+    """Write triangles to a binary STL file in chunks.
+    
+    The number of triangles is written after all chunks,
+    so it need not be known in advance.
+    
+    Args:
+        file_path(str):       Path to the file.
+        triangle_chunks:      Iterable of (k,3,3) arrays of triangles.
+        header(str):          Header of the file, which is truncated to 80 characters.
+                              Defaults to :obj:`None` which names PyAuxetic.
+    
+    Returns:
+        The number of triangles written.
+    """
+    if header is None:
+        header = 'Exported by PyAuxetic %s'%__version__
+    num_triangles = 0
+    with open(file_path, 'wb') as file:
+        file.write(header.encode('ascii')[:80].ljust(80, b' '))
+        np.array([0], dtype='<u4').tofile(file)
+        for triangles in triangle_chunks:
+            records = np.zeros(len(triangles), dtype=_stl_dtype)
+            normals = np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0])
+            lengths = np.sqrt((normals**2).sum(axis=1))
+            lengths[lengths == 0] = 1.0
+            records['normal']   = normals / lengths[:, None]
+            records['vertices'] = triangles
+            records.tofile(file)
+            num_triangles += len(triangles)
+        file.seek(80)
+        np.array([num_triangles], dtype='<u4').tofile(file)
+    return num_triangles
+#
+
+def is_supported(obj):
+    """Return :obj:`True` if the unit cells of a structure are supported by this module."""
+    return all(isinstance(uc.params, reentrant2d_ucp_list) for uc in obj.unit_cells)
+#
+
+def structure_geometry(obj, ribbon_width):
+    """Return the :class:`.geometry.PlanarStructureGeometry` of a structure for export.
+    
+    Like :meth:`.AuxeticStructure.assemble_structure` with *for_3dprint=True*,
+    the ribbons are included for all pattern modes.
+    
+    Args:
+        obj(AuxeticStructure): The structure. :meth:`.add_pattern_params` must have been called.
+        ribbon_width(float):   Width of the ribbons.
+    """
+    pattern_params = PatternParams(pattern_mode='nonuniform', structure_map=obj.structure_map)
+    return PlanarStructureGeometry([uc.params for uc in obj.unit_cells], pattern_params,
+                                   'xy'[obj.loading_direction], ribbon_width)
+#
+
+def export_stl(geometry, file_path, chunk_size=100000):
+    """Export an extruded structure in the binary STL format.
+    
+    The file describes a single closed manifold surface, so it can be sliced
+    without merging the unit cells first. See :func:`structure_triangle_chunks`.
+    
+    Args:
+        geometry(PlanarStructureGeometry): Geometry of the structure, e.g. the output
+                                           of :func:`structure_geometry`.
+        file_path(str):                    Path to the file.
+        chunk_size(int):                   Approximate number of triangles written at once.
+                                           Defaults to 100000.
+    
+    Returns:
+        The number of triangles written.
+    """
+    num_triangles = write_binary_stl(file_path, structure_triangle_chunks(geometry, chunk_size))
+    logger.debug('Exported %i triangles to %s.', num_triangles, os.path.basename(file_path))
+    return num_triangles
+#
+
+_3mf_content_types = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">\n'
+    ' <Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>\n'
+    ' <Default Extension="model" ContentType="application/vnd.ms-package.3dmanufacturing-3dmodel+xml"/>\n'
+    '</Types>\n')
+_3mf_relationships = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">\n'
+    ' <Relationship Target="/3D/3dmodel.model" Id="rel0"'
+    ' Type="http://schemas.microsoft.com/3dmanufacturing/2013/01/3dmodel"/>\n'
+    '</Relationships>\n')
+
+def indexed_mesh(triangles, decimals=9):
+    """Convert triangles to a mesh of unique vertices.
+    
+    Args:
+        triangles(np.array): (n,3,3) array of triangles.
+        decimals(int):       Vertices are merged if they are equal after rounding
+                             to this number of decimals. Defaults to 9.
+    
+    Returns:
+        A tuple *(vertices, faces)* containing an (m,3) array of vertices and
+        an (n,3) integer array of the vertex indices of the triangles.
+    """
+    points = np.round(np.asarray(triangles, dtype=float).reshape(-1, 3), decimals)
+    (vertices, inverse) = np.unique(points.view([('', points.dtype)] * 3), return_inverse=True)
+    vertices = vertices.view(points.dtype).reshape(-1, 3)
+    return (vertices, inverse.reshape(-1, 3))
+#
+
+def _3mf_mesh_object(object_id, triangles):
+    """Return the xml of a 3MF object containing a mesh."""
+    (vertices, faces) = indexed_mesh(triangles)
+    lines = [' <object id="%i" type="model">'%object_id, '  <mesh>', '   <vertices>']
+    lines.extend('    <vertex x="%.9g" y="%.9g" z="%.9g"/>'%tuple(vertex) for vertex in vertices)
+    lines.extend(['   </vertices>', '   <triangles>'])
+    lines.extend('    <triangle v1="%i" v2="%i" v3="%i"/>'%tuple(face) for face in faces)
+    lines.extend(['   </triangles>', '  </mesh>', ' </object>'])
+    return lines
+#
+
+def export_3mf(geometry, file_path):
+    """Export an extruded structure in the 3MF format using instanced meshes.
+    
+    The mesh of each unique unit cell and ribbon is stored once. The structure is
+    a single object whose components place the meshes using translations.
+    
+    Args:
+        geometry(PlanarStructureGeometry): Geometry of the structure, e.g. the output
+                                           of :func:`structure_geometry`.
+        file_path(str):                    Path to the file.
+    
+    Returns:
+        A tuple *(num_meshes, num_components)*.
+    """
+    depth = geometry.extrusion_depth
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>',
+             '<model unit="millimeter" xml:lang="en-US"' +
+             ' xmlns="http://schemas.microsoft.com/3dmanufacturing/core/2015/02">',
+             ' <metadata name="Application">PyAuxetic %s</metadata>'%__version__,
+             '<resources>']
+    # Each component is a tuple (object_id, translation).
+    components = []
+    object_id = 0
+    
+    ribbon_ids = dict()
+    for (ribbon_min, ribbon_max) in geometry.ribbons:
+        size = tuple(np.round(np.asarray(ribbon_max) - ribbon_min, 9))
+        if size not in ribbon_ids:
+            object_id += 1
+            ribbon_ids[size] = object_id
+            lines.extend(_3mf_mesh_object(object_id, box_triangles((0.0, 0.0), size, depth)))
+        components.append( (ribbon_ids[size], (ribbon_min[0], ribbon_min[1])) )
+    
+    (indices, ids) = geometry.cells()
+    offsets = geometry.core_origin + indices * geometry.bound_size
+    for uc_id in np.unique(ids):
+        object_id += 1
+        lines.extend(_3mf_mesh_object(object_id, reentrant2d_triangles(geometry.params[uc_id], depth)))
+        components.extend( (object_id, tuple(offset)) for offset in offsets[ids == uc_id] )
+    
+    structure_id = object_id + 1
+    lines.append(' <object id="%i" type="model">'%structure_id)
+    lines.append('  <components>')
+    lines.extend('   <component objectid="%i" transform="1 0 0 0 1 0 0 0 1 %.9g %.9g 0"/>'
+                 %(component_id, x, y) for (component_id, (x, y)) in components)
+    lines.extend(['  </components>', ' </object>', '</resources>',
+                  '<build>', ' <item objectid="%i"/>'%structure_id, '</build>', '</model>', ''])
+    
+    with zipfile.ZipFile(file_path, 'w', zipfile.ZIP_DEFLATED) as file:
+        file.writestr('[Content_Types].xml', _3mf_content_types)
+        file.writestr('_rels/.rels', _3mf_relationships)
+        file.writestr('3D/3dmodel.model', '\n'.join(lines))
+    logger.debug('Exported %i meshes placed by %i components to %s.',
+                 object_id, len(components), os.path.basename(file_path))
+    return (object_id, len(components))
+#
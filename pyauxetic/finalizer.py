@@ -0,0 +1,220 @@
+"""Background finalization of the artifacts of analyses.
+
+After an analysis, its Odb and job files are moved to the results folder and
+the structure may be exported. These operations are dominated by disk I/O, so
+:class:`ArtifactFinalizer` runs them in a pool of threads, while the batch moves
+on to the next structure. Tasks are grouped by the name of their structure and
+:meth:`ArtifactFinalizer.wait` reports when all tasks of a structure are done.
+
+Only functions which do not use the Abaqus API may be submitted, since the API
+is not thread-safe. :func:`move_file` falls back to copying if the destination
+is on another filesystem and :func:`compress_file` compresses a file using gzip.
+"""
+
+import os
+import gzip
+import errno
+import shutil
+import logging
+import threading
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+logger = logging.getLogger(__name__)
+
+def _copy_and_sync(source, destination, compress=False):
+    """Copy a file, optionally compressing it, and flush it to the disk before returning."""
+    with open(source, 'rb') as source_file:
+        with open(destination, 'wb') as destination_file:
+            if compress:
+                with gzip.GzipFile(fileobj=destination_file, mode='wb') as gzip_file:
+                    shutil.copyfileobj(source_file, gzip_file, 1024*1024)
+            else:
+                shutil.copyfileobj(source_file, destination_file, 1024*1024)
+            destination_file.flush()
+            os.fsync(destination_file.fileno())
+#
+
+def move_file(source, destination):
+    """Move a file, copying it if *destination* is on another filesystem.
+    
+    The copy is flushed to the disk before *source* is removed.
+    
+    Returns:
+        The path of the moved file.
+    """
+    try:
+        os.rename(source, destination)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        _copy_and_sync(source, destination)
+        shutil.copystat(source, destination)
+        os.remove(source)
+        logger.debug('Copied %s across filesystems.', os.path.basename(source))
+    return destination
+#
+
+def compress_file(source, destination):
+    """Compress a file using gzip and remove the original.
+    
+    Args:
+        source(str):      Path to the file.
+        destination(str): Path to the compressed file, without the *.gz* extension.
+    
+    Returns:
+        The path of the compressed file.
+    """
+    destination = destination + '.gz'
+    _copy_and_sync(source, destination, compress=True)
+    os.remove(source)
+    logger.debug('Compressed %s.', os.path.basename(source))
+    return destination
+#
+
+class FinalizerTask(object):
+    """A task submitted to :class:`ArtifactFinalizer`.
+    
+    After the task is done, *self.result* contains the return value of
+    its function, or *self.error* contains the exception it raised.
+    """
+    
+    def __init__(self, name, function, args):
+        self.name     = name
+        self.function = function
+        self.args     = args
+        self.result   = None
+        self.error    = None
+        self._done    = threading.Event()
+    
+    def run(self):
+        try:
+            self.result = self.function(*self.args)
+        except Exception as e:
+            self.error = e
+            logger.exception('Finalizing the artifacts of %s failed.', self.name)
+        finally:
+            self._done.set()
+    
+    def done(self):
+        """Return :obj:`True` if the task is done."""
+        return self._done.is_set()
+    
+    def wait(self, timeout=None):
+        """Wait until the task is done. Returns :obj:`True` if it is done."""
+        self._done.wait(timeout)
+        return self._done.is_set()
+#
+
+class ArtifactFinalizer(object):
+    """Pool of threads running the finalization tasks of structures.
+    
+    If *num_threads* is 0, tasks run immediately when they are submitted and
+    their exceptions are raised, so the same code can be used for serial finalization.
+    """
+    
+    def __init__(self, num_threads=2):
+        """Start the threads.
+        
+        Args:
+            num_threads(int): Number of threads. Defaults to 2.
+        
+        Raises:
+            ValueError: If *num_threads* is negative.
+        """
+        if num_threads < 0:
+            raise ValueError('num_threads must not be negative.')
+        self.tasks         = []
+        self._queue        = queue.Queue()
+        self._lock         = threading.Lock()
+        self._threads      = []
+        self._is_shut_down = False
+        for i in range(num_threads):
+            thread = threading.Thread(target=self._work, name='finalizer-%i'%(i+1))
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+        logger.debug('Started the artifact finalizer with %i threads.', num_threads)
+    
+    def _work(self):
+        while True:
+            task = self._queue.get()
+            if task is None:
+                break
+            task.run()
+    
+    def submit(self, name, function, *args):
+        """Submit a task.
+        
+        Args:
+            name(str):         Name of the structure the task belongs to.
+            function:          Function run with *args*. It must not use the Abaqus API.
+        
+        Returns:
+            A :class:`FinalizerTask`.
+        
+        Raises:
+            RuntimeError: If the finalizer has been shut down.
+        """
+        task = FinalizerTask(name, function, args)
+        with self._lock:
+            if self._is_shut_down:
+                raise RuntimeError('The artifact finalizer has been shut down.')
+            self.tasks.append(task)
+        if self._threads:
+            self._queue.put(task)
+        else:
+            task.run()
+            if task.error is not None:
+                raise task.error
+        return task
+    
+    def pending(self, name=None):
+        """Return the tasks which are not done, optionally only those of a structure."""
+        with self._lock:
+            return [task for task in self.tasks
+                    if not task.done() and (name is None or task.name == name)]
+    
+    def wait(self, name=None, timeout=None):
+        """Wait until the tasks of a structure, or all tasks, are done.
+        
+        Args:
+            name(str):       Name of the structure. Defaults to :obj:`None`,
+                             which waits for all tasks.
+            timeout(float):  Maximum waiting time for each task in seconds.
+                             Defaults to :obj:`None`, which waits indefinitely.
+        
+        Returns:
+            A list of the exceptions raised by the tasks.
+        
+        Raises:
+            RuntimeError: If a task is not done before *timeout*.
+        """
+        with self._lock:
+            tasks = [task for task in self.tasks if name is None or task.name == name]
+        for task in tasks:
+            if not task.wait(timeout):
+                raise RuntimeError('Finalizing the artifacts of %s timed out.'%task.name)
+        return [task.error for task in tasks if task.error is not None]
+    
+    def shutdown(self, wait=True):
+        """Stop the threads after the submitted tasks are done.
+        
+        Returns:
+            A list of the exceptions raised by the tasks, if *wait* is :obj:`True`.
+        """
+        with self._lock:
+            self._is_shut_down = True
+        for thread in self._threads:
+            self._queue.put(None)
+        if not wait:
+            return []
+        for thread in self._threads:
+            thread.join()
+        errors = self.wait()
+        logger.debug('Shut down the artifact finalizer after %i tasks with %i errors.',
+                     len(self.tasks), len(errors))
+        return errors
+#
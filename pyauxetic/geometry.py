@@ -0,0 +1,726 @@
+"""Analytic geometry of the unit cells and structures.
+
+This module describes the geometry of the structures using plain numpy arrays,
+so it can be used without Abaqus/CAE, e.g. by the native solvers in
+:mod:`pyauxetic.solvers` and the exporters. The geometry is identical to the
+sketches created in :mod:`.classes.reentrant2d`.
+"""
+
+import logging
+from math import sin, cos, tan
+import numpy as np
+try:
+    from collections.abc import Iterable
+except ImportError:
+    from collections import Iterable
+
+from .classes.auxetic_unit_cell_params import (
+    Reentrant2DUcpFull, Reentrant2DUcpBox, Reentrant2DUcpSimple, reentrant2d_ucp_list)
+
+logger = logging.getLogger(__name__)
+
+def reentrant2d_full_params(params):
+    """Convert the parameters of a reentrant2d unit cell to an equivalent
+    :class:`Reentrant2DUcpFull` object.
+    
+    Args:
+        params: Parameters describing the unit cell geometry. Must be one of the
+                classes in *auxetic_unit_cell_params.reentrant2d_ucp_list*.
+    
+    Returns:
+        A :class:`Reentrant2DUcpFull` object describing the same geometry.
+    
+    Raises:
+        ValueError:   If *params* is of an invalid type.
+        RuntimeError: If the dimensions of a :class:`Reentrant2DUcpBox` are incorrect.
+    """
+    if   isinstance(params, Reentrant2DUcpFull):
+        return params
+    
+    elif isinstance(params, Reentrant2DUcpBox):
+        horz_bounding_box    = params.horz_bounding_box / 2.0
+        vert_bounding_box    = params.vert_bounding_box / 2.0
+        vert_strut_thickness = params.vert_strut_thickness
+        diag_strut_angle     = params.diag_strut_angle
+        diag_strut_thickness = params.diag_strut_thickness
+        tail_strut_thickness = params.vert_strut_thickness
+        
+        diag_strut_angle_rad      = np.deg2rad(diag_strut_angle)
+        tail_strut_thickness_half = tail_strut_thickness / 2.0
+        diag_strut_length = (horz_bounding_box - tail_strut_thickness_half) / sin(diag_strut_angle_rad)
+        vert_strut_length_half = ( vert_bounding_box
+                              + (diag_strut_length         * cos(diag_strut_angle_rad) )
+                              + (diag_strut_thickness      / sin(diag_strut_angle_rad) )
+                              + (tail_strut_thickness_half / tan(diag_strut_angle_rad) ) ) / 2.0
+        vert_strut_length = vert_strut_length_half * 2.0
+        tail_strut_length = ( vert_strut_length_half
+                              - (diag_strut_thickness      / sin(diag_strut_angle_rad) )
+                              - (tail_strut_thickness_half / tan(diag_strut_angle_rad) ) )
+        
+        ## These dimensions only work if diag_line1 ends higher than tail_hline.
+        if tail_strut_length < ( diag_strut_length * cos(diag_strut_angle_rad) ):
+            raise RuntimeError('The formulated dimensions are incorrect for these inputs.')
+        
+        return Reentrant2DUcpFull(params.id, params.extrusion_depth,
+                                  tail_strut_length, tail_strut_thickness,
+                                  diag_strut_length, diag_strut_thickness,
+                                  diag_strut_angle,
+                                  vert_strut_length, vert_strut_thickness )
+    
+    elif isinstance(params, Reentrant2DUcpSimple):
+        vert_strut_length    = params.vert_strut_length
+        vert_strut_thickness = params.vert_strut_thickness
+        diag_strut_length    = vert_strut_length/1.5  # Dummy dimension. Determined by constraints.
+        diag_strut_thickness = params.diag_strut_thickness
+        diag_strut_angle     = params.diag_strut_angle
+        tail_strut_thickness = params.vert_strut_thickness
+        tail_strut_length    = ( ( vert_strut_length / 2.0 )
+                                 -  diag_strut_thickness      / sin(np.deg2rad(diag_strut_angle))
+                                 - (tail_strut_thickness/2.0) / tan(np.deg2rad(diag_strut_angle)) )
+        
+        return Reentrant2DUcpFull(params.id, params.extrusion_depth,
+                                  tail_strut_length, tail_strut_thickness,
+                                  diag_strut_length, diag_strut_thickness,
+                                  diag_strut_angle,
+                                  vert_strut_length, vert_strut_thickness )
+    
+    else:
+        raise ValueError('params must one of the unit cell parameter' +
+                         ' classes defind for the Re-Entrant 2D unit cell.')
+#
+
+def reentrant2d_quarter_outline(params):
+    """Return the outline of a quarter of a reentrant2d unit cell.
+    
+    The points are the same as the vertices of the sketch created by
+    :func:`.reentrant2d.create_sketch_reentrant2d_full` before mirroring.
+    The quarter is mirrored about *x=0* and the horizontal line *y=h*.
+    
+    Args:
+        params: Parameters describing the unit cell geometry. Must be one of the
+                classes in *auxetic_unit_cell_params.reentrant2d_ucp_list*.
+    
+    Returns:
+        A tuple *(points, h)* where *points* is a (8,2) numpy array containing
+        the vertices of the closed quarter outline in counter-clockwise order
+        starting from the origin, and *h* is the y coordinate of the horizontal mirror line.
+    
+    Raises:
+        ValueError:   If *params.diag_strut_angle* is not less than 90 degrees.
+        RuntimeError: If the geometry is self-intersecting.
+    """
+    params = reentrant2d_full_params(params)
+    if params.diag_strut_angle >= 90:
+        raise ValueError('params.diag_strut_angle must be less than 90 degrees.')
+    
+    # The sketch is mirrored twice. Therefore some parametes need to be halved.
+    tail_strut_length    = params.tail_strut_length
+    tail_strut_thickness = params.tail_strut_thickness / 2.0
+    diag_strut_length    = params.diag_strut_length
+    diag_strut_thickness = params.diag_strut_thickness
+    vert_strut_length    = params.vert_strut_length / 2.0
+    vert_strut_thickness = params.vert_strut_thickness
+    angle                = np.deg2rad( params.diag_strut_angle )
+    
+    p0 = (0.0, 0.0)
+    p1 = (-tail_strut_thickness, 0.0)
+    p2 = (-tail_strut_thickness, tail_strut_length)
+    p3 = (p2[0] - diag_strut_length * sin(angle), p2[1] - diag_strut_length * cos(angle))
+    p4 = (p3[0], p3[1] + vert_strut_length)
+    p5 = (p4[0] + vert_strut_thickness, p4[1])
+    p6 = (p5[0], p5[1] - vert_strut_length
+                 + diag_strut_thickness / sin(angle)
+                 + vert_strut_thickness / tan(angle) )
+    # diag_line2 ends on the vertical mirror line.
+    p7 = (0.0, p6[1] - p6[0] / tan(angle))
+    
+    if p7[1] > p4[1]:
+        # Vertices at the center of the unit cell pass each other,
+        # meaning that the geometry self-intersects and is invalid.
+        raise RuntimeError('The geometry is invalid because' +
+                           ' vertices at the center of the unit cell'    +
+                           ' pass each other, meaning that the geometry' +
+                           ' is self-intersecting.' )
+    
+    # The outline runs clockwise in the sketch, so it is reversed.
+    points = np.array([p0, p1, p2, p3, p4, p5, p6, p7])
+    points = np.vstack((points[:1], points[:0:-1]))
+    return (points, p4[1])
+#
+
+def reentrant2d_outline(params):
+    """Return the outer and inner outlines of a full reentrant2d unit cell.
+    
+    The material of the unit cell is the region inside the outer outline
+    and outside the inner outline. The unit cell is positioned so its
+    bounding box starts at the origin.
+    
+    Args:
+        params: Parameters describing the unit cell geometry. Must be one of the
+                classes in *auxetic_unit_cell_params.reentrant2d_ucp_list*.
+    
+    Returns:
+        A tuple *(outer, inner, bound_size)* where *outer* and *inner* are
+        (n,2) numpy arrays containing the vertices of closed polygons and
+        *bound_size* is a tuple *(x, y)* containing size of the bounding box.
+    """
+    (quarter, h) = reentrant2d_quarter_outline(params)
+    # Counter-clockwise: p0, p7, p6, p5, p4, p3, p2, p1.
+    (p0, p7, p6, p5, p4, p3, p2, p1) = quarter
+    
+    def mirror_h(p):
+        return np.array([p[0], 2*h - p[1]])
+    
+    def mirror_v(p):
+        return np.array([-p[0], p[1]])
+    
+    # The left half of the outer outline, from the bottom to the top.
+    left_outer = [p0, p1, p2, p3, p4, mirror_h(p3), mirror_h(p2), mirror_h(p1), mirror_h(p0)]
+    right_outer = [mirror_v(p) for p in left_outer[-2:0:-1]]
+    outer = np.array(left_outer + right_outer)[::-1]  # Counter-clockwise.
+    
+    left_inner = [p5, p6, p7]
+    inner = np.array(left_inner + [mirror_v(p6), mirror_v(p5), mirror_h(mirror_v(p6)),
+                                   mirror_h(p7), mirror_h(p6)])
+    
+    bound_min  = outer.min(axis=0)
+    bound_size = tuple(outer.max(axis=0) - bound_min)
+    return (outer - bound_min, inner - bound_min, bound_size)
+#
+
+def points_in_polygon(points, polygon):
+    """Check whether points are inside a closed polygon using the even-odd rule.
+    
+    The operation is vectorized over the points.
+    
+    Args:
+        points(np.array):  (n,2) array of points.
+        polygon(np.array): (m,2) array of the polygon vertices.
+    
+    Returns:
+        A boolean numpy array of length n.
+    """
+    points  = np.asarray(points, dtype=float)
+    x = points[:, 0][:, None]
+    y = points[:, 1][:, None]
+    x1 = polygon[:, 0][None, :]
+    y1 = polygon[:, 1][None, :]
+    x2 = np.roll(polygon[:, 0], -1)[None, :]
+    y2 = np.roll(polygon[:, 1], -1)[None, :]
+    
+    crosses = (y1 > y) != (y2 > y)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x_cross = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+    return (crosses & (x < x_cross)).sum(axis=1) % 2 == 1
+#
+
+def structure_map_from_pattern_params(unit_cell_params, pattern_params):
+    """Return the structure map described by the pattern parameters.
+    
+    This is the same structure map used by
+    :meth:`.auxetic_structure.AuxeticStructure.add_pattern_params`.
+    
+    Args:
+        unit_cell_params: A unit cell parameters object or a tuple of them.
+        pattern_params(PatternParams): Special namedtuple describing the parameters
+                                       for patterning the unit cell(s).
+    
+    Returns:
+        A :class:`SparseStructureMap`, so huge maps are never made dense.
+    
+    Raises:
+        ValueError: If *pattern_params.pattern_mode* is invalid.
+    """
+    unit_cell_params = as_params_tuple(unit_cell_params)
+    if   pattern_params.pattern_mode == 'uniform':
+        return SparseStructureMap.uniform(pattern_params.num_cell_repeat, unit_cell_params[0].id)
+    elif pattern_params.pattern_mode == 'periodic':
+        return SparseStructureMap.uniform((1, 1), unit_cell_params[0].id)
+    elif pattern_params.pattern_mode == 'nonuniform':
+        return as_sparse_structure_map(pattern_params.structure_map)
+    else:
+        raise ValueError('Invalid value for pattern_mode.')
+#
+
+def structure_map_period(structure_map):
+    """Return the shape of the smallest tile which repeats to form a structure map.
+    
+    Returns:
+        A tuple *(p, q)* such that *structure_map[i, j] == structure_map[i % p, j % q]*
+        for all cells. The last tiles may be cut off at the far edges of the map.
+    """
+    structure_map = np.asarray(structure_map)
+    period = []
+    for axis in (0, 1):
+        n = structure_map.shape[axis]
+        first_line = np.take(structure_map, 0, axis=1-axis)
+        for p in range(1, n + 1):
+            # The first line is checked first, since it rules out most candidates.
+            if not (first_line[p:] == first_line[:n-p]).all():
+                continue
+            if (np.take(structure_map, range(p, n), axis=axis) ==
+                np.take(structure_map, range(n - p), axis=axis)).all():
+                break
+        period.append(p)
+    return tuple(period)
+#
+
+def uniform_rectangles(structure_map):
+    """Decompose a structure map into rectangles of cells with the same unit cell id.
+    
+    Each line of the map along axis 0 is split into runs of equal ids, and runs
+    spanning the same cells in consecutive lines are joined. Cells with the id 0
+    are skipped.
+    
+    Returns:
+        A list of tuples *(id, start, counts)*, where *start* is the index of the first
+        cell of the rectangle in the map and *counts* is its number of cells along each axis.
+    """
+    structure_map = np.asarray(structure_map, dtype=int)
+    rectangles = []
+    if structure_map.size == 0:
+        return rectangles
+    open_rectangles = dict()
+    for (i, line) in enumerate(structure_map):
+        breaks = np.flatnonzero(np.diff(line)) + 1
+        starts = np.concatenate(([0], breaks))
+        ends   = np.concatenate((breaks, [len(line)]))
+        continued = dict()
+        for (start, end) in zip(starts, ends):
+            uc_id = int(line[start])
+            if uc_id == 0:
+                continue
+            key = (start, end, uc_id)
+            rectangle = open_rectangles.pop(key, None)
+            if rectangle is None:
+                rectangle = [uc_id, (i, int(start)), [0, int(end - start)]]
+                rectangles.append(rectangle)
+            rectangle[2][0] += 1
+            continued[key] = rectangle
+        open_rectangles = continued
+    return [ (uc_id, start, tuple(counts)) for (uc_id, start, counts) in rectangles ]
+#
+
+# Maps with at most this many cells are analyzed densely for repeated tiles.
+max_dense_cells = 10**6
+
+class SparseStructureMap(object):
+    """A structure map described by rectangles of cells with the same unit cell id.
+    
+    Unlike a dense array, its memory and the cost of patterning, validating and
+    sizing the structure scale with the number of rectangles, so huge or porous
+    lattices can be described without materializing every cell. Cells which are
+    not covered by a rectangle are empty, like the id 0 in a dense map.
+    
+    The rectangles are tuples *(id, start, counts)* like those of
+    :func:`uniform_rectangles` and must not overlap.
+    Use :meth:`from_coordinates`, :meth:`from_sparse_matrix`, :meth:`from_dense`
+    or :meth:`uniform` for other descriptions of the map.
+    """
+    
+    def __init__(self, shape, rectangles):
+        """Initialize the map.
+        
+        Args:
+            shape(tuple):  Number of cells along axes 0 and 1. If :obj:`None`,
+                           the smallest shape containing all rectangles is used.
+            rectangles:    An iterable, e.g. a generator, of tuples *(id, start, counts)*.
+        
+        Raises:
+            ValueError: If a rectangle is empty, has a non-positive id,
+                        or lies outside *shape*, or if rectangles overlap.
+        """
+        self.rectangles = []
+        for (uc_id, start, counts) in rectangles:
+            (uc_id, start, counts) = ( int(uc_id), (int(start[0]), int(start[1])),
+                                       (int(counts[0]), int(counts[1])) )
+            if uc_id < 1 or min(counts) < 1 or min(start) < 0:
+                raise ValueError('Invalid rectangle in structure map: %s.'%((uc_id, start, counts), ))
+            self.rectangles.append( (uc_id, start, counts) )
+        extents = ( max([0] + [start[0] + counts[0] for (uc_id, start, counts) in self.rectangles]),
+                    max([0] + [start[1] + counts[1] for (uc_id, start, counts) in self.rectangles]) )
+        if shape is None:
+            shape = extents
+        self.shape = (int(shape[0]), int(shape[1]))
+        if extents[0] > self.shape[0] or extents[1] > self.shape[1]:
+            raise ValueError('The rectangles of the structure map exceed its shape %s.'%(self.shape, ))
+        self._check_overlap()
+        self._cell_keys = None  # Assigned in lookup.
+    
+    def _check_overlap(self):
+        """Raise :obj:`ValueError` if any rectangles overlap.
+        
+        The rectangles are split into lines along the axis giving fewer lines,
+        and the intervals of each line are checked after sorting them,
+        so no cells are materialized.
+        """
+        if len(self.rectangles) < 2:
+            return
+        starts = np.array([start  for (uc_id, start, counts) in self.rectangles], dtype=np.int64)
+        counts = np.array([counts for (uc_id, start, counts) in self.rectangles], dtype=np.int64)
+        axis  = 0 if counts[:, 0].sum() <= counts[:, 1].sum() else 1
+        other = 1 - axis
+        num_lines = counts[:, axis]
+        rect_index = np.repeat(np.arange(len(self.rectangles)), num_lines)
+        offsets = np.arange(num_lines.sum()) - np.repeat(np.cumsum(num_lines) - num_lines, num_lines)
+        line = starts[rect_index, axis] + offsets
+        low  = starts[rect_index, other]
+        high = low + counts[rect_index, other]
+        order = np.lexsort((low, line))
+        (line, low, high) = (line[order], low[order], high[order])
+        if ( (line[1:] == line[:-1]) & (low[1:] < high[:-1]) ).any():
+            raise ValueError('The rectangles of the structure map overlap.')
+    
+    @classmethod
+    def uniform(cls, shape, uc_id):
+        """Return a map of *shape* filled with one unit cell."""
+        return cls(shape, [ (uc_id, (0, 0), shape[:2]) ])
+    
+    @classmethod
+    def from_dense(cls, structure_map):
+        """Return the sparse form of a dense structure map."""
+        structure_map = np.asarray(structure_map, dtype=int)
+        return cls(structure_map.shape[:2], uniform_rectangles(structure_map))
+    
+    @classmethod
+    def from_coordinates(cls, indices, ids, shape=None):
+        """Return a map from a list of nonzero cells.
+        
+        Consecutive cells with the same id are merged into runs along axis 1,
+        and runs spanning the same cells in consecutive lines into rectangles.
+        
+        Args:
+            indices:      (n,2) integer array of the positions of the cells.
+            ids:          Unit cell ids of the cells. Zeros are skipped.
+            shape(tuple): Shape of the map. Defaults to :obj:`None`, see :meth:`__init__`.
+        
+        Raises:
+            ValueError: If a cell is given more than once.
+        """
+        indices = np.asarray(indices, dtype=int).reshape(-1, 2)
+        ids     = np.asarray(ids, dtype=int).ravel()
+        nonzero = ids != 0
+        (i, j, ids) = (indices[nonzero, 0], indices[nonzero, 1], ids[nonzero])
+        if len(ids) == 0:
+            return cls(shape, [])
+        order = np.lexsort((j, i))
+        (i, j, ids) = (i[order], j[order], ids[order])
+        same_cell = (i[1:] == i[:-1]) & (j[1:] == j[:-1])
+        if same_cell.any():
+            raise ValueError('The structure map contains repeated cells.')
+        
+        # Runs of consecutive cells along axis 1.
+        run_starts = np.flatnonzero(np.concatenate(( [True],
+                         (i[1:] != i[:-1]) | (j[1:] != j[:-1] + 1) | (ids[1:] != ids[:-1]) )))
+        run_lengths = np.diff(np.concatenate((run_starts, [len(ids)])))
+        (run_i, run_j, run_ids) = (i[run_starts], j[run_starts], ids[run_starts])
+        
+        # Runs of the same cells in consecutive lines form rectangles.
+        order = np.lexsort((run_i, run_ids, run_lengths, run_j))
+        (run_i, run_j, run_ids, run_lengths) = (run_i[order], run_j[order],
+                                                run_ids[order], run_lengths[order])
+        rect_starts = np.flatnonzero(np.concatenate(( [True],
+                          (run_j[1:] != run_j[:-1]) | (run_lengths[1:] != run_lengths[:-1]) |
+                          (run_ids[1:] != run_ids[:-1]) | (run_i[1:] != run_i[:-1] + 1) )))
+        rect_counts = np.diff(np.concatenate((rect_starts, [len(run_ids)])))
+        return cls(shape, [ (run_ids[k], (run_i[k], run_j[k]), (count, run_lengths[k]))
+                            for (k, count) in zip(rect_starts, rect_counts) ])
+    
+    @classmethod
+    def from_sparse_matrix(cls, matrix):
+        """Return a map from a sparse matrix, e.g. of :mod:`scipy.sparse`,
+        which must provide a *tocoo()* method.
+        """
+        coo = matrix.tocoo()
+        return cls.from_coordinates(np.column_stack((coo.row, coo.col)), coo.data, coo.shape)
+    
+    def ids(self):
+        """Return the sorted unit cell ids used in the map."""
+        return sorted(set(uc_id for (uc_id, start, counts) in self.rectangles))
+    
+    def count_nonzero(self):
+        """Return the number of nonzero cells."""
+        return sum(counts[0] * counts[1] for (uc_id, start, counts) in self.rectangles)
+    
+    def replace_ids(self, mapping):
+        """Return a map in which the ids in the keys of *mapping* are replaced by its values."""
+        return SparseStructureMap(self.shape, [ (mapping.get(uc_id, uc_id), start, counts)
+                                                for (uc_id, start, counts) in self.rectangles ])
+    
+    def cells(self):
+        """Return the nonzero cells as a tuple *(indices, ids)* sorted by their position."""
+        indices = [np.zeros((0, 2), dtype=int)]
+        ids     = [np.zeros(0, dtype=int)]
+        for (uc_id, start, counts) in self.rectangles:
+            (i, j) = np.indices(counts)
+            indices.append( np.column_stack((i.ravel() + start[0], j.ravel() + start[1])) )
+            ids.append( np.ones(counts[0] * counts[1], dtype=int) * uc_id )
+        (indices, ids) = (np.concatenate(indices), np.concatenate(ids))
+        order = np.lexsort((indices[:, 1], indices[:, 0]))
+        return (indices[order], ids[order])
+    
+    def lookup(self, indices):
+        """Return the unit cell ids of cells, which are 0 for empty cells and cells outside the map.
+        
+        Only the nonzero cells are used, so the cost does not depend on the size of the map.
+        
+        Args:
+            indices: (n,2) integer array of the positions of the cells.
+        """
+        if self._cell_keys is None:
+            (cell_indices, cell_ids) = self.cells()
+            # cells() is sorted by position, so the keys are sorted.
+            self._cell_keys = (cell_indices[:, 0].astype(np.int64) * self.shape[1] + cell_indices[:, 1],
+                               cell_ids)
+        (cell_keys, cell_ids) = self._cell_keys
+        indices = np.asarray(indices, dtype=np.int64).reshape(-1, 2)
+        ids = np.zeros(len(indices), dtype=int)
+        valid = ( (indices >= 0) & (indices < self.shape) ).all(axis=1)
+        if len(cell_keys) == 0:
+            return ids
+        keys = indices[valid, 0] * self.shape[1] + indices[valid, 1]
+        position = np.minimum(np.searchsorted(cell_keys, keys), len(cell_keys) - 1)
+        found = cell_keys[position] == keys
+        ids[np.flatnonzero(valid)[found]] = cell_ids[position[found]]
+        return ids
+    
+    def to_dense(self):
+        """Return the map as a dense 2D array."""
+        structure_map = np.zeros(self.shape, dtype=int)
+        for (uc_id, start, counts) in self.rectangles:
+            structure_map[start[0] : start[0] + counts[0],
+                          start[1] : start[1] + counts[1]] = uc_id
+        return structure_map
+#
+
+def as_sparse_structure_map(structure_map):
+    """Return a structure map, which may be a dense numpy array, a
+    :class:`SparseStructureMap` or a sparse matrix, as a :class:`SparseStructureMap`.
+    
+    Raises:
+        ValueError: If *structure_map* is of an invalid type.
+    """
+    if isinstance(structure_map, SparseStructureMap):
+        return structure_map
+    elif isinstance(structure_map, np.ndarray):
+        return SparseStructureMap.from_dense(structure_map)
+    elif hasattr(structure_map, 'tocoo'):
+        return SparseStructureMap.from_sparse_matrix(structure_map)
+    else:
+        raise ValueError('structure_map must be a numpy ndarray, a SparseStructureMap' +
+                         ' or a sparse matrix.')
+#
+
+class StructureMapBlocks(object):
+    """Decomposition of a structure map into repeated rectangular blocks.
+    
+    The map is described by the smallest tile which repeats to form it
+    (see :func:`structure_map_period`), *self.num_tiles* complete copies of the tile,
+    and the cells beyond the complete tiles. The tile and the remaining cells are
+    decomposed into rectangles of identical unit cells using :func:`uniform_rectangles`.
+    Each distinct rectangle and the tile can then be built once and patterned, so the
+    assembly cost depends on the variety of the map rather than its number of cells.
+    """
+    
+    def __init__(self, structure_map):
+        """Analyze the structure map.
+        
+        Args:
+            structure_map: 2D array of unit cell ids or a :class:`SparseStructureMap`.
+                           Sparse maps with more than *max_dense_cells* cells are
+                           not searched for a repeated tile, and their rectangles
+                           are used directly.
+        """
+        if isinstance(structure_map, SparseStructureMap):
+            if structure_map.shape[0] * structure_map.shape[1] > max_dense_cells:
+                self.shape                = structure_map.shape
+                self.tile_shape           = structure_map.shape
+                self.num_tiles            = (1, 1)
+                self.tile_rectangles      = list(structure_map.rectangles)
+                self.remainder_rectangles = []
+                return
+            structure_map = structure_map.to_dense()
+        structure_map = np.asarray(structure_map, dtype=int)
+        self.shape = shape = structure_map.shape[:2]
+        self.tile_shape = structure_map_period(structure_map)
+        self.num_tiles  = (shape[0] // self.tile_shape[0], shape[1] // self.tile_shape[1])
+        self.tile_rectangles = uniform_rectangles(
+                                   structure_map[:self.tile_shape[0], :self.tile_shape[1]])
+        
+        # Rectangles of the cells beyond the complete tiles, in map coordinates.
+        tiled_shape = (self.num_tiles[0] * self.tile_shape[0],
+                       self.num_tiles[1] * self.tile_shape[1])
+        self.remainder_rectangles = []
+        for (sub_map, offset) in ((structure_map[tiled_shape[0]:, :], (tiled_shape[0], 0)),
+                                  (structure_map[:tiled_shape[0], tiled_shape[1]:], (0, tiled_shape[1]))):
+            for (uc_id, start, counts) in uniform_rectangles(sub_map):
+                self.remainder_rectangles.append(
+                    (uc_id, (start[0] + offset[0], start[1] + offset[1]), counts) )
+    
+    def is_tiled(self):
+        """Return :obj:`True` if the tile is repeated."""
+        return self.num_tiles[0] * self.num_tiles[1] > 1
+    
+    def blocks(self):
+        """Return the distinct rectangles as a list of tuples *(id, counts)*."""
+        blocks = []
+        for (uc_id, start, counts) in self.tile_rectangles + self.remainder_rectangles:
+            if (uc_id, counts) not in blocks:
+                blocks.append( (uc_id, counts) )
+        return blocks
+    
+    def num_merged_instances(self):
+        """Return the total number of instances merged when each distinct rectangle and
+        the tile are built once and patterned in strips along axis 1 and then axis 0.
+        """
+        def grid_instances(counts):
+            return sum(count for count in counts if count > 1)
+        total = sum(grid_instances(counts) for (uc_id, counts) in self.blocks())
+        if self.is_tiled():
+            if len(self.tile_rectangles) > 1:
+                total += len(self.tile_rectangles)
+            total += grid_instances(self.num_tiles)
+            num_pieces = 1 + len(self.remainder_rectangles)
+        else:
+            num_pieces = len(self.tile_rectangles) + len(self.remainder_rectangles)
+        if num_pieces > 1:
+            total += num_pieces
+        return total
+    
+    def to_structure_map(self):
+        """Return the structure map described by the blocks."""
+        structure_map = np.zeros(self.shape, dtype=int)
+        (p, q) = self.tile_shape
+        for i in range(self.num_tiles[0]):
+            for j in range(self.num_tiles[1]):
+                for (uc_id, start, counts) in self.tile_rectangles:
+                    structure_map[i*p + start[0] : i*p + start[0] + counts[0],
+                                  j*q + start[1] : j*q + start[1] + counts[1]] = uc_id
+        for (uc_id, start, counts) in self.remainder_rectangles:
+            structure_map[start[0] : start[0] + counts[0],
+                          start[1] : start[1] + counts[1]] = uc_id
+        return structure_map
+#
+
+def as_params_tuple(unit_cell_params):
+    """Return *unit_cell_params* as a tuple of unit cell parameter objects."""
+    if isinstance(unit_cell_params, reentrant2d_ucp_list):
+        return (unit_cell_params,)
+    elif isinstance(unit_cell_params, Iterable):
+        return tuple(unit_cell_params)
+    else:
+        raise ValueError('unit_cell_params must be a unit cell parameters object or a tuple of them.')
+#
+
+class PlanarStructureGeometry(object):
+    """Analytic geometry of a planar reentrant2d structure including its ribbons.
+    
+    The layout is identical to the one created by
+    :meth:`.reentrant2d.Reentrant2DPlanarShellStructure.assemble_structure`:
+    The first ribbon starts at the origin and the core structure and
+    the second ribbon follow it in the loading direction.
+    """
+    
+    def __init__(self, unit_cell_params, pattern_params, loading_direction, ribbon_width=None):
+        """Initialize the geometry.
+        
+        Args:
+            unit_cell_params: A unit cell parameters object or a tuple of them.
+            pattern_params(PatternParams): Special namedtuple describing the parameters
+                                           for patterning the unit cell(s).
+            loading_direction(str):        Direction of loading, *'x'* or *'y'*.
+            ribbon_width(float):           Width of the ribbons. If :obj:`None`,
+                                           the maximum vert_strut_thickness of
+                                           the unit cells is used, which is the
+                                           value used for analysis.
+                                           Ribbons are not created for periodic
+                                           structures. Defaults to :obj:`None`.
+        
+        Raises:
+            ValueError: If the unit cells don't have the same bound_size,
+                        or ids in the structure map are not defined.
+        """
+        unit_cell_params   = as_params_tuple(unit_cell_params)
+        self.params        = dict( (ucp.id, reentrant2d_full_params(ucp)) for ucp in unit_cell_params )
+        self.outlines      = dict( (i, reentrant2d_outline(p)) for (i, p) in self.params.items() )
+        self.structure_map = structure_map_from_pattern_params(unit_cell_params, pattern_params)
+        self.is_periodic   = pattern_params.pattern_mode == 'periodic'
+        
+        if   loading_direction.lower() == 'x':
+            self.loading_direction = 0
+        elif loading_direction.lower() == 'y':
+            self.loading_direction = 1
+        else:
+            raise ValueError("loading_direction must be 'x' or 'y'.")
+        self.transverse_direction = 1 - self.loading_direction
+        
+        bound_sizes = np.array([outline[2] for outline in self.outlines.values()])
+        if (abs(bound_sizes - bound_sizes[0]) > 1E-6).any():
+            raise ValueError('All unit cells must have the same bound_size.')
+        self.bound_size = bound_sizes[0]
+        for elem in self.structure_map.ids():
+            if elem not in self.params:
+                raise ValueError('structure_map contains ids that are not defined as unit cells.')
+        
+        self.extrusion_depth = unit_cell_params[0].extrusion_depth
+        core_size = self.bound_size * np.array(self.structure_map.shape)
+        if self.is_periodic:
+            self.ribbon_width = 0.0
+            self.ribbons      = []
+        else:
+            if ribbon_width is None:
+                ribbon_width = max( [p.vert_strut_thickness for p in self.params.values()] )
+            self.ribbon_width = ribbon_width
+            ribbon_size = np.array(core_size)
+            ribbon_size[self.loading_direction] = ribbon_width
+            offset = np.zeros(2)
+            offset[self.loading_direction] = ribbon_width + core_size[self.loading_direction]
+            # Ribbons are defined as (min_coords, max_coords).
+            self.ribbons = [ (np.zeros(2), ribbon_size), (offset, offset + ribbon_size) ]
+        
+        self.core_origin = np.zeros(2)
+        self.core_origin[self.loading_direction] = self.ribbon_width
+        self.size = np.array(core_size)
+        self.size[self.loading_direction] += 2*self.ribbon_width
+    
+    def cells(self):
+        """Return the nonzero cells of the structure map.
+        
+        Returns:
+            A tuple *(indices, ids)* where *indices* is an (n,2) integer array
+            of the cell positions in the structure map and *ids* contains their unit cell ids.
+        """
+        return self.structure_map.cells()
+    
+    def contains(self, points):
+        """Check whether points are inside the material of the structure.
+        
+        Args:
+            points(np.array): (n,2) array of points.
+        
+        Returns:
+            A boolean numpy array of length n.
+        """
+        points = np.asarray(points, dtype=float)
+        inside = np.zeros(len(points), dtype=bool)
+        
+        for (ribbon_min, ribbon_max) in self.ribbons:
+            inside |= ( (points >= ribbon_min) & (points <= ribbon_max) ).all(axis=1)
+        
+        # Find the unit cell containing each point and test it in local coordinates.
+        local = points - self.core_origin
+        index = np.floor(local / self.bound_size).astype(int)
+        shape = np.array(self.structure_map.shape)
+        # Points on the far boundaries belong to the last cell.
+        on_far_edge = (index == shape) & (abs(local - shape*self.bound_size) < 1E-9)
+        index[on_far_edge] -= 1
+        ids = self.structure_map.lookup(index)
+        local = local - index * self.bound_size
+        
+        for (uc_id, (outer, inner, bound_size)) in self.outlines.items():
+            mask = ids == uc_id
+            if mask.any():
+                inside[mask] |= ( points_in_polygon(local[mask], outer) &
+                                  ~points_in_polygon(local[mask], inner) )
+        return inside
+#
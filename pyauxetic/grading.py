@@ -0,0 +1,170 @@
+"""Graded structures generated from fields of unit cell parameters.
+
+Instead of defining a unit cell for each id and writing the structure map by
+hand, :func:`graded_structure` evaluates functions of the position, e.g. the
+angle of the diagonal struts as *angle(x, y)*, at the centers of all cells at
+once. The values are quantized by :func:`quantize_fields` so that similar cells
+share a unit cell, which bounds the number of parts that are created.
+
+All unit cells of a structure must have the same bounding box, so the parameters
+should be described by a class with a fixed bounding box, e.g.
+:class:`Reentrant2DUcpBox`.
+"""
+
+import logging
+import numpy as np
+
+from .geometry import reentrant2d_full_params, reentrant2d_outline
+from .classes.auxetic_unit_cell_params import reentrant2d_ucp_list
+
+logger = logging.getLogger(__name__)
+
+def _unique_rows(codes):
+    """Return the unique rows of a 2D array and the index of the unique row of each row."""
+    codes = np.ascontiguousarray(codes)
+    rows = codes.view([('', codes.dtype)] * codes.shape[1]).ravel()
+    (unique_rows, labels) = np.unique(rows, return_inverse=True)
+    return (unique_rows.view(codes.dtype).reshape(-1, codes.shape[1]), labels)
+#
+
+def _quantize(values, steps):
+    """Quantize the columns of *values* on grids with the given steps.
+    Columns with a step of 0 are not quantized.
+    
+    Returns:
+        A tuple *(levels, labels)* where *levels* contains the unique quantized rows.
+    """
+    min_values = values.min(axis=0)
+    max_values = values.max(axis=0)
+    safe_steps = np.where(steps > 0, steps, 1.0)
+    quantized  = np.where(steps > 0,
+                          min_values + np.round((values - min_values) / safe_steps) * safe_steps,
+                          values)
+    # Rounding up may leave the range of the field, which does not increase the error.
+    quantized = np.clip(quantized, min_values, max_values)
+    return _unique_rows(quantized)
+#
+
+def quantize_fields(values, tolerances, max_levels=None, max_iterations=60):
+    """Quantize parameter values so that similar values share a level.
+    
+    Each column is rounded to a grid whose step is twice its tolerance, so no value
+    changes by more than its tolerance. If this gives more than *max_levels* levels,
+    the steps are scaled up by bisection until at most *max_levels* levels remain.
+    
+    Args:
+        values(np.array):     (n,m) array of the values of m parameters at n cells.
+        tolerances(np.array): Tolerance of each parameter. A tolerance of 0 means
+                              the parameter is not quantized, unless *max_levels*
+                              must be enforced, in which case the initial tolerance
+                              is proportional to the range of the parameter.
+        max_levels(int):      Maximum number of levels. Defaults to :obj:`None`.
+        max_iterations(int):  Maximum number of bisections. Defaults to 60.
+    
+    Returns:
+        A tuple *(levels, labels, max_errors)*, where *levels* is a (k,m) array of the
+        values of the levels, *labels* contains the level of each cell, and *max_errors*
+        is the largest change of each parameter.
+    
+    Raises:
+        ValueError: If *max_levels* is less than 1.
+    """
+    values = np.asarray(values, dtype=float)
+    steps  = 2.0 * np.asarray(tolerances, dtype=float) * np.ones(values.shape[1])
+    (levels, labels) = _quantize(values, steps)
+    
+    if max_levels is not None and len(levels) > max_levels:
+        if max_levels < 1:
+            raise ValueError('max_levels must be at least 1.')
+        ranges = values.max(axis=0) - values.min(axis=0)
+        # Parameters without a tolerance start with the smallest relative tolerance of the others.
+        relative_steps = (steps / np.where(ranges > 0, ranges, np.inf))[steps > 0]
+        relative_step  = relative_steps.min() if (relative_steps > 0).any() else 2E-6
+        steps  = np.where(steps > 0, steps, relative_step * ranges)
+        # At the upper scale, every parameter has a single level.
+        lower_scale = 1.0
+        upper_scale = 2.0 * max(ranges.max() / max(steps[steps > 0].min(), 1E-300), 1.0)
+        for i in range(max_iterations):
+            scale = np.sqrt(lower_scale * upper_scale)
+            if len(_quantize(values, steps * scale)[0]) > max_levels:
+                lower_scale = scale
+            else:
+                upper_scale = scale
+            if upper_scale / lower_scale < 1.001:
+                break
+        (levels, labels) = _quantize(values, steps * upper_scale)
+    
+    max_errors = abs(levels[labels] - values).max(axis=0)
+    return (levels, labels, max_errors)
+#
+
+def graded_structure(base_params, fields, num_cell_repeat, tolerance=None, max_unique_cells=None):
+    """Generate the unit cells and structure map of a graded structure.
+    
+    Each function in *fields* is called once with two arrays containing the x and y
+    coordinates of the centers of all cells, measured from the corner of the core
+    structure, and must return an array of the same shape or a scalar. For example::
+    
+        fields = {'diag_strut_angle': lambda x, y: 60 + 10 * x / x.max()}
+    
+    Args:
+        base_params(namedtuple): Parameters of the unit cell from which all unit cells
+                                 are derived. Must be one of the classes in
+                                 *auxetic_unit_cell_params.reentrant2d_ucp_list*.
+        fields(dict):            Functions of the position, or constants, keyed by
+                                 the names of the parameters they define.
+        num_cell_repeat(tuple):  Number of cells in the x and y directions.
+        tolerance:               Largest allowed change of the parameters, either a float
+                                 or a dict keyed by parameter names. Defaults to :obj:`None`
+                                 which only merges cells with identical parameters.
+        max_unique_cells(int):   Maximum number of unit cells. The tolerance is increased
+                                 if necessary. Defaults to :obj:`None`.
+    
+    Returns:
+        A tuple *(unit_cell_params, structure_map)* containing a tuple of unit cell
+        parameters with the ids 1 to k and the structure map, which can be used
+        with *PatternParams(pattern_mode='nonuniform', structure_map=structure_map)*.
+    
+    Raises:
+        ValueError: If *base_params* is of an invalid type, a field is not a parameter
+                    of *base_params*, or the unit cells don't have the same bounding box.
+    """
+    if not isinstance(base_params, reentrant2d_ucp_list):
+        raise ValueError('base_params must be one of the classes in reentrant2d_ucp_list.')
+    names = sorted(fields.keys())
+    for name in names:
+        if name not in base_params._fields or name in ('id', 'extrusion_depth'):
+            raise ValueError("'%s' is not a parameter of %s which can be graded."
+                             %(name, type(base_params).__name__))
+    if tolerance is None:
+        tolerance = 0.0
+    if isinstance(tolerance, dict):
+        tolerances = [tolerance.get(name, 0.0) for name in names]
+    else:
+        tolerances = [tolerance] * len(names)
+    
+    # Evaluate all fields at the centers of the cells at once.
+    bound_size = np.array(reentrant2d_outline(reentrant2d_full_params(base_params))[2])
+    shape = (int(num_cell_repeat[0]), int(num_cell_repeat[1]))
+    (i, j) = np.indices(shape)
+    (x, y) = ( (i + 0.5) * bound_size[0], (j + 0.5) * bound_size[1] )
+    def evaluate(field):
+        value = field(x, y) if callable(field) else field
+        return (np.asarray(value, dtype=float) * np.ones(shape)).ravel()
+    values = np.column_stack([evaluate(fields[name]) for name in names])
+    
+    (levels, labels, max_errors) = quantize_fields(values, tolerances, max_unique_cells)
+    unit_cell_params = tuple( base_params._replace(id=k+1, **dict(zip(names, [float(value) for value in level])))
+                              for (k, level) in enumerate(levels) )
+    structure_map = labels.reshape(shape) + 1
+    
+    bound_sizes = np.array([reentrant2d_outline(reentrant2d_full_params(params))[2]
+                            for params in unit_cell_params])
+    if (abs(bound_sizes - bound_sizes[0]) > 1E-6).any():
+        raise ValueError('The graded unit cells do not have the same bound_size.' +
+                         ' Use a parameter class with a fixed bounding box, e.g. Reentrant2DUcpBox.')
+    logger.info('Generated a graded structure with %i unique unit cells for %i cells.' +
+                ' Largest changes of the parameters: %s.', len(unit_cell_params), structure_map.size,
+                ', '.join('%s=%g'%(name, error) for (name, error) in zip(names, max_errors)))
+    return (unit_cell_params, structure_map)
+#
@@ -1,8 +1,10 @@
 """ Helper functions used in the PyAuxetic library for various operations."""
 
 from collections import Iterable
+from contextlib import contextmanager
 import os
 import logging
+import numpy as np
 
 from abaqusConstants import *  # noqa: F403
 from part import EdgeArray, VertexArray
@@ -256,6 +258,21 @@ def return_results_folder_path(structure_name, root_folder_name=None):
         return os.path.join(os.getcwd(), root_folder_name, structure_name)
 #
 
+@contextmanager
+def working_directory(path):
+    """Change the current working directory inside a with statement and restore it afterwards.
+    
+    Abaqus writes the files of a job to the current working directory,
+    so this is used for running jobs in a scratch directory.
+    """
+    previous_path = os.getcwd()
+    os.chdir(path)
+    try:
+        yield path
+    finally:
+        os.chdir(previous_path)
+#
+
 def return_sketch_name(base_name):
     """Return a unified name for a sketch based on a base name.
     
@@ -323,4 +340,57 @@ def transfer_instance_to_zero(model, instance):
     if instance_coords[0] != [0,0,0]:
         model.rootAssembly.translate(instanceList=(instance.name, ),
                            vector= [-i for i in instance_coords[0]] )
-#
\ No newline at end of file
+#
+def pair_periodic_nodes(minus_coords, plus_coords, tol=1E-6):
+    """Pair the nodes on two opposite boundaries of a periodic unit cell.
+    
+    Both coordinate arrays are sorted and each node on the plus boundary is
+    looked up on the minus boundary, so the operation is :math:`O(n \\log n)`
+    instead of comparing every pair of nodes.
+    
+    Args:
+        minus_coords(np.array): 1D array containing the coordinates of the nodes
+                                on the first boundary along the direction
+                                parallel to the boundary.
+        plus_coords(np.array):  1D array similar to *minus_coords* for the nodes
+                                on the opposite boundary.
+        tol(float):             Maximum allowed distance between paired nodes.
+                                Defaults to 1E-6.
+    
+    Returns:
+        A tuple of two integer arrays *(minus_indices, plus_indices)*
+        where *minus_coords[minus_indices[i]]* is paired with
+        *plus_coords[plus_indices[i]]*.
+    
+    Raises:
+        RuntimeError: If the number of nodes on the two boundaries is different
+                      or a node does not have a counterpart, which means
+                      that the mesh is not periodic.
+    """
+    minus_coords = np.asarray(minus_coords, dtype=float)
+    plus_coords  = np.asarray(plus_coords , dtype=float)
+    if len(minus_coords) != len(plus_coords):
+        raise RuntimeError('The boundaries have %i and %i nodes.'
+                           %(len(minus_coords), len(plus_coords)) +
+                           ' The mesh is not periodic.')
+    
+    minus_order  = np.argsort(minus_coords, kind='mergesort')
+    minus_sorted = minus_coords[minus_order]
+    # Find the nearest node on the minus boundary for each plus node.
+    right = np.clip(np.searchsorted(minus_sorted, plus_coords), 1, max(len(minus_sorted)-1, 1))
+    left  = right - 1
+    if len(minus_sorted) == 1:
+        right = left = np.zeros(len(plus_coords), dtype=int)
+    use_left = ( np.abs(plus_coords - minus_sorted[left]) <=
+                 np.abs(plus_coords - minus_sorted[right]) )
+    nearest  = np.where(use_left, left, right)
+    
+    if (np.abs(plus_coords - minus_sorted[nearest]) > tol).any():
+        raise RuntimeError('Some nodes on opposite boundaries have no counterpart.' +
+                           ' The mesh is not periodic.')
+    if len(np.unique(nearest)) != len(nearest):
+        raise RuntimeError('Some nodes on opposite boundaries are paired more than once.' +
+                           ' The mesh is not periodic.')
+    
+    return (minus_order[nearest], np.arange(len(plus_coords)))
+#
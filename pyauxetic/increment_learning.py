@@ -0,0 +1,176 @@
+"""Increment sizes learned from the increment histories of previous runs.
+
+The default increment sizes of :class:`StepParams` rarely suit a structure,
+which leads to cutbacks and additional iterations. After each completed run,
+its .sta file is parsed by :func:`summarize_sta` and the summary is added to a
+history file by :func:`record_run`, together with the unit cell parameters and
+the material. Before a new run, :func:`suggest_step_params` finds the nearest
+previous runs with the same unit cell class and material, and derives the
+initial, minimum, and maximum increment sizes from their converged increments.
+
+The history file contains one json record per line, so records of runs
+in different campaigns can simply be appended.
+"""
+
+import os
+import json
+import math
+import logging
+import numpy as np
+
+from .postprocessing import to_json_compatible
+from .monitor import parse_sta_line
+
+logger = logging.getLogger(__name__)
+
+def summarize_sta(sta_path):
+    """Summarize the increments of the first step in a .sta file.
+    
+    Returns:
+        A dictionary containing *'num_increments'*, *'num_cutbacks'*, *'total_iters'*,
+        *'step_time'*, *'first_inc_size'*, *'min_inc_size'*, and *'max_inc_size'*,
+        where the sizes are those of the converged increments. :obj:`None` is returned
+        if the file does not exist or contains no converged increment.
+    """
+    if not os.path.isfile(sta_path):
+        return None
+    attempts = []
+    with open(sta_path, 'r') as file:
+        for line in file:
+            status = parse_sta_line(line)
+            if status is not None and status.step == 1:
+                attempts.append(status)
+    increments = [status for status in attempts if status.converged]
+    if not increments:
+        return None
+    inc_sizes = [status.inc_size for status in increments]
+    summary = dict(num_increments = len(increments),
+                   num_cutbacks   = len(attempts) - len(increments),
+                   total_iters    = sum(status.total_iters for status in attempts),
+                   step_time      = increments[-1].step_time,
+                   first_inc_size = inc_sizes[0],
+                   min_inc_size   = min(inc_sizes),
+                   max_inc_size   = max(inc_sizes))
+    logger.info('Increment history of %s: %i increments, %i cutbacks, %i iterations,' +
+                ' increment sizes between %g and %g.', os.path.basename(sta_path),
+                summary['num_increments'], summary['num_cutbacks'], summary['total_iters'],
+                summary['min_inc_size'], summary['max_inc_size'])
+    return summary
+#
+
+def _run_key(unit_cell_params, material_params):
+    """Return the unit cell class, the parameters without the id, and the material of a run,
+    in the form they are stored in the history file.
+    """
+    params = json.loads(json.dumps(to_json_compatible(list(unit_cell_params[1:]))))
+    material = json.loads(json.dumps(to_json_compatible(material_params), sort_keys=True))
+    return (type(unit_cell_params).__name__, params, material)
+#
+
+def record_run(history_file, unit_cell_params, material_params, step_params, summary):
+    """Add the increment history of a completed run to the history file.
+    
+    Args:
+        history_file(str):                  Path to the history file.
+        unit_cell_params(namedtuple):       Parameters of the unit cell of the structure.
+        material_params(MaterialParams):    Special namedtuple describing the material.
+        step_params(StepParams):            Special namedtuple describing the step.
+        summary(dict):                      Output of :func:`summarize_sta`.
+    """
+    (unit_cell, params, material) = _run_key(unit_cell_params, material_params)
+    record = dict(unit_cell=unit_cell, params=params, material=material,
+                  time_period=step_params.time_period, summary=summary)
+    with open(history_file, 'a') as file:
+        file.write(json.dumps(record, sort_keys=True) + '\n')
+    logger.debug('Added the increment history of the run to %s.', history_file)
+#
+
+def read_history(history_file):
+    """Return the records of the history file, which need not exist."""
+    records = []
+    if history_file is None or not os.path.isfile(history_file):
+        return records
+    with open(history_file, 'r') as file:
+        for line in file:
+            if line.strip():
+                records.append(json.loads(line))
+    return records
+#
+
+def _distance(params_1, params_2):
+    """Return the distance between two lists of unit cell parameters
+    using the relative differences of numerical values.
+    Other values must be identical, otherwise :obj:`None` is returned.
+    """
+    if len(params_1) != len(params_2):
+        return None
+    squares = 0.0
+    for (value_1, value_2) in zip(params_1, params_2):
+        if isinstance(value_1, (int, float)) and isinstance(value_2, (int, float)):
+            scale = max(abs(value_1), abs(value_2), 1E-12)
+            squares += ((value_1 - value_2) / scale) ** 2
+        elif value_1 != value_2:
+            return None
+    return math.sqrt(squares)
+#
+
+def suggest_step_params(learning_params, unit_cell_params, material_params, step_params):
+    """Derive the increment sizes of a run from the nearest previous runs.
+    
+    The previous runs must have the same unit cell class and material and are
+    sorted by :func:`_distance`. The sizes are scaled by the time period and are:
+    
+        + *init_inc_size*: The median of the first converged increments.
+        + *max_inc_size*:  The median of the largest converged increments.
+        + *min_inc_size*:  The smallest converged increment multiplied by
+          *learning_params.min_inc_factor*.
+    
+    *max_num_inc* is increased, if needed, to twice the largest number of increments.
+    
+    Args:
+        learning_params(IncrementLearningParams): Special namedtuple describing the learning.
+        unit_cell_params(namedtuple):             Parameters of the unit cell of the structure.
+        material_params(MaterialParams):          Special namedtuple describing the material.
+        step_params(StepParams):                  Special namedtuple describing the step.
+    
+    Returns:
+        A :class:`StepParams`, which is *step_params* if there are no matching runs.
+    
+    Raises:
+        ValueError: If *learning_params.history_file* is not specified.
+    """
+    if learning_params.history_file is None:
+        raise ValueError('learning_params.history_file must be specified.')
+    (unit_cell, params, material) = _run_key(unit_cell_params, material_params)
+    neighbors = []
+    for record in read_history(learning_params.history_file):
+        if record['unit_cell'] != unit_cell or record['material'] != material:
+            continue
+        distance = _distance(params, record['params'])
+        if distance is not None:
+            neighbors.append( (distance, record) )
+    if not neighbors:
+        logger.info('No previous runs match the structure. Using the given increment sizes.')
+        return step_params
+    neighbors.sort(key=lambda neighbor: neighbor[0])
+    records = [record for (distance, record) in neighbors[:learning_params.num_neighbors]]
+    
+    time_period = step_params.time_period
+    def fractions(key):
+        return np.array([record['summary'][key] / record['time_period'] for record in records])
+    max_inc_size  = min(np.median(fractions('max_inc_size')) * time_period, time_period)
+    min_inc_size  = min(fractions('min_inc_size').min() * time_period * learning_params.min_inc_factor,
+                        max_inc_size)
+    init_inc_size = min(max(np.median(fractions('first_inc_size')) * time_period, min_inc_size),
+                        max_inc_size)
+    max_num_inc   = max(step_params.max_num_inc,
+                        2 * max(record['summary']['num_increments'] for record in records))
+    
+    learned_step_params = step_params._replace(init_inc_size=float(init_inc_size),
+                                               min_inc_size=float(min_inc_size),
+                                               max_inc_size=float(max_inc_size),
+                                               max_num_inc=int(max_num_inc))
+    logger.info('Learned the increment sizes from %i previous runs (nearest distance %g): %s.',
+                len(records), neighbors[0][0], learned_step_params)
+    return learned_step_params
+#
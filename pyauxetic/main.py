@@ -9,7 +9,10 @@ import logging
 import numpy as np
 
 from . import classes
+from . import convergence
+from . import finalizer
 from . import helper
+from . import increment_learning
 from . import postprocessing
 
 from . import __version__
@@ -27,7 +30,11 @@ def main_single(unit_cell_name  , structure_name   ,
                 loading_params  , mesh_params      ,
                 job_params      , output_params    ,
                 step_params=None, run_analysis=True,
-                is_part_of_batch=False):
+                is_part_of_batch=False, convergence_params=None,
+                reuse_structure=None, monitor_params=None, stop_params=None,
+                restart_params=None, increment_learning_params=None,
+                artifact_finalizer=None, field_output_params=None,
+                mesh_quality_params=None):
     """Model and analyze a single auxetic structure.
     
     Args:
@@ -80,6 +87,67 @@ def main_single(unit_cell_name  , structure_name   ,
         is_part_of_batch(bool):          If calling from :func:`.main_batch`, 
                                          must be set to :obj:`True`. Defaults to :obj:`False`.
         
+        convergence_params(ConvergenceParams): Special namedtuple describing a mesh
+                                         convergence study. If specified, the study is run
+                                         using :func:`.convergence.run_mesh_convergence`
+                                         before the main analysis, which then uses the
+                                         recommended seed size instead of
+                                         *mesh_params.seed_size*. The convergence table
+                                         is written to the results folder.
+                                         Defaults to :obj:`None`.
+        
+        reuse_structure(AuxeticStructure): A structure returned by a previous call
+                                         with the same *unit_cell_name*, *pattern_params*,
+                                         *material_params*, *step_params*, and loading
+                                         direction. If specified, its model is reused and
+                                         only the geometry is regenerated using
+                                         :meth:`.AuxeticStructure.regenerate`, instead of
+                                         creating a new Mdb. Defaults to :obj:`None`.
+        
+        monitor_params(MonitorParams):   Special namedtuple describing how the job is
+                                         monitored while running. If specified, progress
+                                         is logged and diverging jobs are killed.
+                                         See :meth:`.AuxeticStructure.submit_job`.
+                                         Defaults to :obj:`None`.
+        
+        stop_params(StopParams):         Special namedtuple describing criteria for ending
+                                         the analysis early, e.g. at a target strain.
+                                         The results are post-processed up to the last
+                                         completed frame. Defaults to :obj:`None`.
+        
+        restart_params(RestartParams):   Special namedtuple describing the restart of the
+                                         job if it stops because of increment limits or
+                                         cutbacks. See :mod:`.restart`. Ignored if
+                                         *reuse_structure* is specified, since the step
+                                         is reused. Defaults to :obj:`None`.
+        
+        increment_learning_params(IncrementLearningParams): Special namedtuple describing
+                                         how the increment sizes are derived from the
+                                         previous runs in a history file, to which the
+                                         completed run is then added.
+                                         See :mod:`.increment_learning`.
+                                         Only used for uniform structures.
+                                         Defaults to :obj:`None`.
+        
+        artifact_finalizer(ArtifactFinalizer): Finalizer which moves and exports the results
+                                         in the background, see :mod:`.finalizer`. The
+                                         function then returns without waiting for it.
+                                         Defaults to :obj:`None`, which uses a finalizer with
+                                         *output_params.finalizer_threads* threads if positive
+                                         and waits for it before returning.
+        
+        field_output_params(FieldOutputParams): Special namedtuple describing the field
+                                         output written to the Odb, e.g. only what
+                                         :mod:`.postprocessing` needs. Ignored if
+                                         *reuse_structure* is specified, since its requests
+                                         are reused. See :meth:`.AuxeticStructure.define_field_output`.
+                                         Defaults to :obj:`None` which keeps the default
+                                         field output of Abaqus.
+        mesh_quality_params(MeshQualityParams): Special namedtuple describing the quality
+                                         check of the mesh before the job is created.
+                                         See :meth:`.AuxeticStructure.check_mesh_quality`.
+                                         Defaults to :obj:`None` which skips the check.
+    
     Returns:
         An object of a subclass of :class:`AuxeticStructure` class.
     
@@ -105,34 +173,94 @@ def main_single(unit_cell_name  , structure_name   ,
     if os.path.isdir(folder_path):
         raise RuntimeError("'%s' already exists. Delete it before proceeding."%folder_path)
     
-    # The abaqus module cannot be imported in the GUI code,
-    # so only import it when running. #TODO: test. there is a abaqus.session somewhere else.
-    logger.info('Creating the model.')
-    logger.debug('Opening a new Mdb.')
-    from abaqus import Mdb
-    
-    logger.info('Modeling structure geometry.')
-    auxeticObj = unit_cell_class(model=Mdb().models.values()[0],
-                                 name=structure_name, loading_params=loading_params)
+    if reuse_structure is not None:
+        if not isinstance(reuse_structure, unit_cell_class):
+            raise ValueError('reuse_structure must be a %s structure.'%unit_cell_class.pretty_name)
+        logger.info('Regenerating the geometry of structure %s in its model.',
+                    reuse_structure.name)
+        auxeticObj = reuse_structure
+        auxeticObj.name = structure_name
+        if run_analysis:
+            auxeticObj.regenerate(unit_cell_params, loading_params)
+        else:
+            auxeticObj.regenerate(unit_cell_params)
+        logger.info('Modeling of structure geometry completed.')
     
-    auxeticObj.add_unit_cells(unit_cell_params)
-    auxeticObj.add_pattern_params(pattern_params)
-    auxeticObj.assemble_structure(for_3dprint=False, delete_all=True)
-    logger.info('Modeling of structure geometry completed.')
-    #TODO: save mdb here.
+    else:
+        # The abaqus module cannot be imported in the GUI code,
+        # so only import it when running. #TODO: test. there is a abaqus.session somewhere else.
+        logger.info('Creating the model.')
+        logger.debug('Opening a new Mdb.')
+        from abaqus import Mdb
+        
+        logger.info('Modeling structure geometry.')
+        auxeticObj = unit_cell_class(model=Mdb().models.values()[0],
+                                     name=structure_name, loading_params=loading_params)
+        
+        auxeticObj.add_unit_cells(unit_cell_params)
+        auxeticObj.add_pattern_params(pattern_params)
+        auxeticObj.assemble_structure(for_3dprint=False, delete_all=True)
+        logger.info('Modeling of structure geometry completed.')
+        #TODO: save mdb here.
     
     if run_analysis:
         logger.info('Preparing the analysis.')
-        auxeticObj.assign_material(material_params)
-        if step_params is not None:
-            auxeticObj.define_step(step_params)
-        else:
-            auxeticObj.define_step()
-        auxeticObj.define_bcs(loading_params)
+        learn_increments = False
+        if increment_learning_params is not None:
+            if hasattr(unit_cell_params, '_fields'):
+                learn_increments = True
+                if step_params is None:
+                    step_params = StepParams()
+                step_params = increment_learning.suggest_step_params(
+                                  increment_learning_params, unit_cell_params,
+                                  material_params, step_params)
+            else:
+                logger.warning('Increment sizes are only learned for uniform structures.')
+        if reuse_structure is None:
+            auxeticObj.assign_material(material_params)
+            if step_params is not None:
+                auxeticObj.define_step(step_params, restart_params)
+            else:
+                auxeticObj.define_step(restart_params=restart_params)
+            auxeticObj.define_bcs(loading_params)
+            if field_output_params is not None:
+                auxeticObj.define_field_output(field_output_params)
+        elif learn_increments:
+            auxeticObj.update_step(step_params)
+        if convergence_params is not None:
+            (seed_size, convergence_table) = convergence.run_mesh_convergence(
+                    auxeticObj, mesh_params, job_params, convergence_params,
+                    hash_params=(material_params, step_params, loading_params) )
+            mesh_params = mesh_params._replace(seed_size=seed_size)
         auxeticObj.mesh_part(mesh_params)
+        if mesh_quality_params is not None:
+            # The part is remeshed in place if the mesh is rejected.
+            auxeticObj.check_mesh_quality(mesh_params, mesh_quality_params)
         auxeticObj.create_job(job_params)
-        auxeticObj.submit_job()
-        auxeticObj.output_results(output_params)
+        try:
+            auxeticObj.submit_job(monitor_params, stop_params=stop_params)
+        except RuntimeError as e:
+            if not output_params.keep_partial_results:
+                raise
+            logger.error('The analysis of structure %s failed: %s', structure_name, e)
+        if learn_increments and increment_learning_params.record and \
+           auxeticObj.analysis_status == 'completed' and not auxeticObj.restart_jobs:
+            summary = increment_learning.summarize_sta(
+                          os.path.join(auxeticObj.job_dir, auxeticObj.job.name + '.sta'))
+            if summary is not None:
+                increment_learning.record_run(increment_learning_params.history_file,
+                                              unit_cell_params, material_params,
+                                              auxeticObj.step_params, summary)
+        own_finalizer = artifact_finalizer is None and output_params.finalizer_threads > 0
+        if own_finalizer:
+            artifact_finalizer = finalizer.ArtifactFinalizer(output_params.finalizer_threads)
+        auxeticObj.output_results(output_params, artifact_finalizer)
+        if convergence_params is not None:
+            convergence.write_convergence_table(convergence_table, seed_size,
+                                                convergence_params.metric, structure_name,
+                                                auxeticObj.results_folder_path)
+        if own_finalizer and artifact_finalizer.shutdown():
+            raise RuntimeError('Finalizing the results of structure %s failed.'%structure_name)
         logger.info('Analysis of structure %s completed.', structure_name)
     
     logger.info('Modeling and analysis of structure %s completed.', structure_name)
@@ -143,7 +271,11 @@ def main_batch(unit_cell_name       , structure_prefix,
                material_params      ,                  
                loading_params       , mesh_params     ,
                job_params           , output_params   ,
-               step_params=None     , run_analysis=True):
+               step_params=None     , run_analysis=True,
+               convergence_params=None, reuse_model=False,
+               monitor_params=None, stop_params=None, restart_params=None,
+               increment_learning_params=None, field_output_params=None,
+               mesh_quality_params=None):
     """Run a number of analysis in succession and merge the results to a single csv file.
     
     All paramters of this function are the same as :func:`.main_single`.
@@ -158,6 +290,17 @@ def main_batch(unit_cell_name       , structure_prefix,
         unit_cell_params_list:  A list of unit_cell_params for the structures.
                                 The id in each parameter must be unique and is
                                 used for defining *structure_name*.
+        
+        reuse_model (bool):     If :obj:`True`, the model of the first structure
+                                is reused for the others and only the geometry is
+                                regenerated. See *reuse_structure* in :func:`.main_single`.
+                                Defaults to :obj:`False`.
+    
+    If *output_params.keep_partial_results* is :obj:`True`, a failed analysis does not
+    abort the batch. Its status is recorded in the batch results instead.
+    
+    If *output_params.finalizer_threads* is positive, the results of each structure are
+    moved and exported in the background while the next structure is analyzed.
     
     All other parameters are passed without change or validation.
     """
@@ -181,24 +324,64 @@ def main_batch(unit_cell_name       , structure_prefix,
     analysis_ids         = []
     structure_names      = []
     results_folder_paths = []
-    for unit_cell_params in unit_cell_params_list:
-        structure_name = structure_prefix + '-%03i'%analysis_id
-    
-        auxeticObj = main_single(unit_cell_name  , structure_name,
-                                 unit_cell_params, pattern_params,
-                                 material_params ,                
-                                 loading_params  , mesh_params   ,
-                                 job_params      , output_params ,
-                                 step_params     , run_analysis  ,
-                                 is_part_of_batch=True)
-        analysis_ids.append(analysis_id)
-        structure_names.append(structure_name)
-        results_folder_paths.append( auxeticObj.results_folder_path )#TODO: does not work if run_analysis==False.
-        analysis_id += 1
-    
+    statuses             = []
+    auxeticObj           = None
+    artifact_finalizer   = None
+    if output_params.finalizer_threads > 0:
+        artifact_finalizer = finalizer.ArtifactFinalizer(output_params.finalizer_threads)
+    try:
+        for unit_cell_params in unit_cell_params_list:
+            structure_name = structure_prefix + '-%03i'%analysis_id
+            if reuse_model:
+                reuse_structure = auxeticObj
+            else:
+                reuse_structure = None
+            
+            try:
+                auxeticObj = main_single(unit_cell_name  , structure_name,
+                                         unit_cell_params, pattern_params,
+                                         material_params ,                
+                                         loading_params  , mesh_params   ,
+                                         job_params      , output_params ,
+                                         step_params     , run_analysis  ,
+                                         is_part_of_batch=True,
+                                         convergence_params=convergence_params,
+                                         reuse_structure=reuse_structure,
+                                         monitor_params=monitor_params,
+                                         stop_params=stop_params,
+                                         restart_params=restart_params,
+                                         increment_learning_params=increment_learning_params,
+                                         artifact_finalizer=artifact_finalizer,
+                                         field_output_params=field_output_params,
+                                         mesh_quality_params=mesh_quality_params)
+            except Exception:
+                if not output_params.keep_partial_results:
+                    raise
+                logger.exception('Modeling and analysis of structure %s failed.', structure_name)
+                # The model may be left in an inconsistent state, so it is not reused.
+                auxeticObj = None
+                results_folder_paths.append(None)
+                statuses.append('failed')
+            else:
+                results_folder_paths.append( auxeticObj.results_folder_path )#TODO: does not work if run_analysis==False.
+                statuses.append(auxeticObj.analysis_status)
+            analysis_ids.append(analysis_id)
+            structure_names.append(structure_name)
+            analysis_id += 1
+    finally:
+        if artifact_finalizer is not None:
+            # Wait until the results of all structures are in place.
+            artifact_finalizer.shutdown()
+    
+    if artifact_finalizer is not None and artifact_finalizer.wait():
+        raise RuntimeError('Finalizing the results of some structures failed. See the log for details.')
+    if all(path is None for path in results_folder_paths):
+        raise RuntimeError('Modeling and analysis of all structures failed.')
     postprocessing.write_batch_numerical_output(1.0, unit_cell_params_list,
                                  structure_names, analysis_ids, results_folder_paths,
-                                 folder_path=os.path.split(results_folder_paths[0])[0])
+                                 folder_path=os.path.split(
+                                     [path for path in results_folder_paths if path is not None][0])[0],
+                                 statuses=statuses)
     logger.info('Batch modeling and analysis completed.')
 #
 
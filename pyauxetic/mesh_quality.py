@@ -0,0 +1,127 @@
+"""Quality of the mesh, checked before the job is submitted.
+
+Distorted elements, e.g. at the thin hinges of reentrant unit cells, may abort
+a job after minutes of solving. :func:`element_quality` computes the following
+metrics of triangular and quadrilateral elements using their corner nodes, for
+all elements of a shape at once:
+
+    + *aspect_ratio*: Ratio of the longest to the shortest edge.
+    + *skew*:         Equiangle skew, which is the largest deviation of the corner
+      angles from those of the ideal element, scaled to be between 0 and 1.
+    + *jacobian*:     Scaled Jacobian, which is the smallest corner value of
+      *sin(angle)*, relative to the ideal element. It is negative at concave
+      corners and for inverted elements.
+    + *min_angle*:    Smallest corner angle in degrees.
+
+:func:`evaluate_mesh_quality` compares them to the thresholds of
+:class:`MeshQualityParams` and is used by :meth:`.AuxeticStructure.check_mesh_quality`.
+"""
+
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Number of corner nodes of the supported elements by their number of nodes.
+# The corner nodes come first in the connectivity of second order elements.
+corner_node_counts = {3: 3, 6: 3, 4: 4, 8: 4}
+
+def element_quality(coords, elements):
+    """Compute the quality metrics of elements with the same number of corners.
+    
+    Args:
+        coords(np.array):   (n,2) or (n,3) array of nodal coordinates. The coordinates
+                            of planar elements must be passed as a (n,2) array,
+                            since the normal of (n,3) elements is their average
+                            normal, so inverted elements can't be detected.
+        elements(np.array): (m,3) or (m,4) array of the corner nodes of the elements,
+                            ordered counterclockwise for planar elements.
+    
+    Returns:
+        A dictionary of arrays of length m keyed by *'aspect_ratio'*, *'skew'*,
+        *'jacobian'*, and *'min_angle'*.
+    """
+    coords   = np.asarray(coords, dtype=float)
+    elements = np.asarray(elements, dtype=int)
+    points   = np.zeros(elements.shape + (3,))
+    points[:, :, :coords.shape[1]] = coords[elements]
+    num_corners = elements.shape[1]
+    
+    edges   = np.roll(points, -1, axis=1) - points  # From each corner to the next.
+    lengths = np.sqrt((edges ** 2).sum(axis=2))
+    lengths = np.maximum(lengths, 1E-300)
+    
+    # Corner vectors point to the next and the previous corners.
+    to_next = edges / lengths[:, :, None]
+    to_prev = -np.roll(to_next, 1, axis=1)
+    cosines = np.clip((to_next * to_prev).sum(axis=2), -1.0, 1.0)
+    angles  = np.degrees(np.arccos(cosines))
+    crosses = np.cross(to_next, to_prev)
+    if coords.shape[1] == 2:
+        normals = np.zeros((len(elements), 3))
+        normals[:, 2] = 1.0
+    else:
+        # Shell elements may lie in any plane, so the average normal is used.
+        normals = crosses.sum(axis=1)
+        normals = normals / np.maximum(np.sqrt((normals ** 2).sum(axis=1)), 1E-300)[:, None]
+    sines = (crosses * normals[:, None, :]).sum(axis=2)
+    
+    ideal_angle = 180.0 * (num_corners - 2) / num_corners
+    max_angles  = angles.max(axis=1)
+    min_angles  = angles.min(axis=1)
+    skew = np.maximum( (max_angles - ideal_angle) / (180.0 - ideal_angle),
+                       (ideal_angle - min_angles) / ideal_angle )
+    return dict(aspect_ratio = lengths.max(axis=1) / lengths.min(axis=1),
+                skew         = skew,
+                jacobian     = sines.min(axis=1) / np.sin(np.radians(ideal_angle)),
+                min_angle    = min_angles)
+#
+
+def evaluate_mesh_quality(coords, element_groups, quality_params):
+    """Check the quality of a mesh against the thresholds of *quality_params*.
+    
+    Args:
+        coords(np.array):                  (n,2) or (n,3) array of nodal coordinates.
+        element_groups(list):              Arrays of the nodes of the elements, one for
+                                           each number of nodes in *corner_node_counts*.
+        quality_params(MeshQualityParams): Special namedtuple describing the thresholds.
+    
+    Returns:
+        A dictionary containing *'num_elements'*, *'num_failed'*, *'passed'*, and the
+        worst value of each metric, i.e. *'max_aspect_ratio'*, *'max_skew'*,
+        *'min_jacobian'*, and *'min_angle'*.
+    
+    Raises:
+        ValueError: If the elements of a group have an unsupported number of nodes.
+    """
+    metrics = []
+    for elements in element_groups:
+        elements = np.asarray(elements, dtype=int)
+        if len(elements) == 0:
+            continue
+        if elements.shape[1] not in corner_node_counts:
+            raise ValueError('Elements with %i nodes are not supported.'%elements.shape[1])
+        metrics.append( element_quality(coords, elements[:, :corner_node_counts[elements.shape[1]]]) )
+    if not metrics:
+        raise ValueError('The mesh contains no elements.')
+    metrics = dict( (key, np.concatenate([group[key] for group in metrics])) for key in metrics[0] )
+    
+    failed = np.zeros(len(metrics['skew']), dtype=bool)
+    if quality_params.max_aspect_ratio is not None:
+        failed |= metrics['aspect_ratio'] > quality_params.max_aspect_ratio
+    if quality_params.max_skew is not None:
+        failed |= metrics['skew'] > quality_params.max_skew
+    if quality_params.min_jacobian is not None:
+        failed |= metrics['jacobian'] < quality_params.min_jacobian
+    if quality_params.min_angle is not None:
+        failed |= metrics['min_angle'] < quality_params.min_angle
+    
+    num_failed = int(failed.sum())
+    return dict(num_elements     = len(failed),
+                num_failed       = num_failed,
+                passed           = num_failed <= quality_params.max_failed_fraction * len(failed),
+                max_aspect_ratio = float(metrics['aspect_ratio'].max()),
+                max_skew         = float(metrics['skew'].max()),
+                min_jacobian     = float(metrics['jacobian'].min()),
+                min_angle        = float(metrics['min_angle'].min()))
+#
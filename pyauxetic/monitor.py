@@ -0,0 +1,387 @@
+"""Live monitoring of running Abaqus/Standard jobs.
+
+:meth:`.AuxeticStructure.submit_job` normally waits for the job without any
+feedback. If a :class:`MonitorParams` is passed to it, a :class:`JobMonitor`
+reads the new lines of the status (.sta) and message (.msg) files of the
+job while it runs. Files left by a previous run of the job are ignored
+until the new run overwrites them. Each converged increment is reported to
+a number of callbacks and logged, together with the number of cutbacks and
+an estimate of the remaining time (ETA).
+
+The monitor also detects jobs which are diverging, i.e. jobs where several
+consecutive increments need cutbacks or where the increment size is stuck at
+*step_params.min_inc_size*. Such jobs are killed, so they do not run until
+*step_params.max_num_inc* is reached.
+
+Stop checks can be used for ending jobs early, e.g. when the results needed
+have been obtained (see :mod:`.stop_criteria`). They are functions called as
+*check(progress)* after new increments converge, which return a string
+describing why the job should stop, or :obj:`None`.
+
+The callbacks are called as *callback(event, data)*, where *event* is one of:
+
+    + *'increment'*: An increment converged. *data* is a :class:`JobProgress`.
+    + *'cutback'*: An attempt did not converge. *data* is an :class:`IncrementStatus`.
+    + *'message'*: A warning or error was written to the message file. *data* is the line.
+    + *'divergence'*: The job is diverging. *data* is a string describing the reason.
+    + *'killed'*: The job was killed because it was diverging. *data* is the reason.
+    + *'stop'*: A stop check was met, see below. *data* is a string describing it.
+    + *'stopped'*: The job was ended because of a stop check. *data* is the reason.
+    + *'finished'*: The job finished. *data* is the last :class:`JobProgress`.
+"""
+
+import os
+import re
+import time
+import logging
+from collections import namedtuple
+
+from .classes.auxetic_structure_params import MonitorParams, StepParams
+
+logger = logging.getLogger(__name__)
+
+IncrementStatus = \
+    namedtuple('IncrementStatus',
+               ['step', 'increment', 'attempt', 'converged', 'severe_iters',
+                'equil_iters', 'total_iters', 'total_time', 'step_time', 'inc_size'] )
+try:
+    IncrementStatus.__doc__ = """namedtuple instance describing one attempt of an increment in the .sta file."""
+    IncrementStatus.step.__doc__         = """(:class:`int`) Number of the step."""
+    IncrementStatus.increment.__doc__    = """(:class:`int`) Number of the increment."""
+    IncrementStatus.attempt.__doc__      = """(:class:`int`) Number of the attempt."""
+    IncrementStatus.converged.__doc__    = """(:class:`bool`) Whether or not the attempt converged."""
+    IncrementStatus.severe_iters.__doc__ = """(:class:`int`) Number of severe discontinuity iterations."""
+    IncrementStatus.equil_iters.__doc__  = """(:class:`int`) Number of equilibrium iterations."""
+    IncrementStatus.total_iters.__doc__  = """(:class:`int`) Total number of iterations."""
+    IncrementStatus.total_time.__doc__   = """(:class:`float`) Total time at the end of the attempt."""
+    IncrementStatus.step_time.__doc__    = """(:class:`float`) Step time at the end of the attempt."""
+    IncrementStatus.inc_size.__doc__     = """(:class:`float`) Size of the increment."""
+except (AttributeError, TypeError) as e:
+    pass
+
+JobProgress = \
+    namedtuple('JobProgress',
+               ['increment', 'step_time', 'inc_size', 'num_cutbacks', 'elapsed_time', 'eta'] )
+try:
+    JobProgress.__doc__ = """namedtuple instance describing the progress of a running job."""
+    JobProgress.increment.__doc__    = """(:class:`int`) Number of the last converged increment."""
+    JobProgress.step_time.__doc__    = """(:class:`float`) Step time of the last converged increment."""
+    JobProgress.inc_size.__doc__     = """(:class:`float`) Size of the last converged increment."""
+    JobProgress.num_cutbacks.__doc__ = """(:class:`int`) Total number of cutbacks."""
+    JobProgress.elapsed_time.__doc__ = """(:class:`float`) Wall clock time in seconds since monitoring started."""
+    JobProgress.eta.__doc__          = """(:class:`float`) Estimated remaining wall clock time in seconds,
+                                       assuming the step time advances at the average rate so far.
+                                       :obj:`None` before the first increment.
+                                       """
+except (AttributeError, TypeError) as e:
+    pass
+
+# A row of the .sta file of Abaqus/Standard, e.g.
+#    1     2   1U    0     6     6  0.100      0.100      0.1000
+_sta_row_pattern = re.compile(r'^\s*(\d+)\s+(\d+)\s+(\d+)(U?)\s+(\d+)\s+(\d+)\s+(\d+)' +
+                              r'\s+(\S+)\s+(\S+)\s+(\S+)')
+
+def parse_sta_line(line):
+    """Parse a line of a .sta file.
+    
+    Returns:
+        An :class:`IncrementStatus` or :obj:`None` if the line does not describe an attempt.
+    """
+    match = _sta_row_pattern.match(line)
+    if match is None:
+        return None
+    groups = match.groups()
+    try:
+        return IncrementStatus(step=int(groups[0]), increment=int(groups[1]),
+                               attempt=int(groups[2]), converged=(groups[3] != 'U'),
+                               severe_iters=int(groups[4]), equil_iters=int(groups[5]),
+                               total_iters=int(groups[6]), total_time=float(groups[7]),
+                               step_time=float(groups[8]), inc_size=float(groups[9]))
+    except ValueError:
+        return None
+#
+
+def _file_signature(path):
+    """Return the modification time and size of a file, or :obj:`None` if it does not exist."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime, stat.st_size)
+#
+
+class FileTail(object):
+    """Read the lines appended to a file since the last read.
+    
+    A file which already exists when the :class:`FileTail` is created, e.g. the file
+    of a previous run of the same job, is stale and ignored until it is modified.
+    The file is then read from its beginning, since Abaqus overwrites the files
+    of a job when it is submitted again.
+    """
+    
+    def __init__(self, path):
+        self.path    = path
+        self.offset  = 0
+        self._buffer = ''
+        self._stale  = _file_signature(path)
+    
+    def read_lines(self):
+        """Return the new complete lines of the file. The file need not exist."""
+        signature = _file_signature(self.path)
+        if signature is None or signature == self._stale:
+            return []
+        if self._stale is not None:
+            logger.debug('The stale file %s was overwritten.', self.path)
+            self._stale = None
+        if signature[1] < self.offset:
+            # The file was truncated.
+            (self.offset, self._buffer) = (0, '')
+        with open(self.path, 'rb') as file:
+            file.seek(self.offset)
+            data = file.read()
+            self.offset = file.tell()
+        lines = (self._buffer + data.decode('latin-1')).split('\n')
+        # The last line may still be written.
+        self._buffer = lines.pop()
+        return [line.rstrip('\r') for line in lines]
+#
+
+class JobMonitor(object):
+    """Monitor the status and message files of a running job.
+    See the module documentation for a description of the events.
+    """
+    
+    def __init__(self, job_name, working_dir=None, step_params=None,
+                 monitor_params=None, callbacks=(), stop_checks=()):
+        """Initialize the monitor.
+        
+        Args:
+            job_name(str):                Name of the job.
+            working_dir(str):             Folder containing the job files. Defaults to
+                                          :obj:`None` which uses the current working directory.
+            step_params(StepParams):      Special namedtuple describing the step of the job,
+                                          used for the ETA and for detecting increments at the
+                                          minimum size. Defaults to :obj:`None` which uses
+                                          the default values of the namedtuple.
+            monitor_params(MonitorParams): Special namedtuple describing the monitoring.
+                                          Defaults to :obj:`None` which uses the default
+                                          values of the namedtuple.
+            callbacks(tuple):             Functions called as *callback(event, data)*.
+                                          Defaults to an empty tuple.
+            stop_checks(tuple):           Functions called as *check(progress)* after new
+                                          increments converge. Defaults to an empty tuple.
+        """
+        if working_dir is None:
+            working_dir = os.getcwd()
+        if step_params is None:
+            step_params = StepParams()
+        if monitor_params is None:
+            monitor_params = MonitorParams()
+        self.job_name       = job_name
+        self.step_params    = step_params
+        self.monitor_params = monitor_params
+        self.callbacks      = list(callbacks)
+        self.stop_checks    = list(stop_checks)
+        self.sta_file       = FileTail(os.path.join(working_dir, job_name + '.sta'))
+        self.msg_file       = FileTail(os.path.join(working_dir, job_name + '.msg'))
+        self.start_time     = time.time()
+        
+        self.increments             = []    # Converged attempts.
+        self.num_cutbacks           = 0
+        self.num_diverging_messages = 0
+        self.finished               = False
+        self.completed              = None  # Assigned when the .sta file reports the end of the job.
+        self.divergence_reason      = None
+        self.stop_reason            = None
+        self._cutback_increments    = 0     # Consecutive increments which needed cutbacks.
+        self._min_size_increments   = 0     # Consecutive increments at the minimum size.
+        self._cutback_in_increment  = False
+    
+    def _emit(self, event, data):
+        for callback in self.callbacks:
+            callback(event, data)
+    
+    def progress(self):
+        """Return a :class:`JobProgress` describing the current progress."""
+        elapsed_time = time.time() - self.start_time
+        if not self.increments:
+            return JobProgress(0, 0.0, 0.0, self.num_cutbacks, elapsed_time, None)
+        last = self.increments[-1]
+        fraction = last.step_time / float(self.step_params.time_period)
+        if fraction > 0:
+            eta = max(elapsed_time * (1.0 - fraction) / fraction, 0.0)
+        else:
+            eta = None
+        return JobProgress(last.increment, last.step_time, last.inc_size,
+                           self.num_cutbacks, elapsed_time, eta)
+    
+    def _process_sta_line(self, line):
+        if 'HAS COMPLETED SUCCESSFULLY' in line:
+            self.finished  = True
+            self.completed = True
+            return
+        if 'HAS NOT BEEN COMPLETED' in line:
+            self.finished  = True
+            self.completed = False
+            return
+        status = parse_sta_line(line)
+        if status is None:
+            return
+        
+        if not status.converged:
+            self.num_cutbacks += 1
+            self._cutback_in_increment = True
+            logger.info('Job %s: increment %i, attempt %i did not converge (cutback).',
+                        self.job_name, status.increment, status.attempt)
+            self._emit('cutback', status)
+            return
+        
+        self.increments.append(status)
+        if self._cutback_in_increment:
+            self._cutback_increments += 1
+        else:
+            self._cutback_increments = 0
+        self._cutback_in_increment = False
+        if status.inc_size <= self.step_params.min_inc_size * (1.0 + 1E-6):
+            self._min_size_increments += 1
+        else:
+            self._min_size_increments = 0
+        
+        progress = self.progress()
+        if progress.eta is None:
+            eta_string = 'unknown'
+        else:
+            eta_string = '%.0f s'%progress.eta
+        logger.info('Job %s: increment %i converged, step time=%g, increment size=%g,' +
+                    ' cutbacks=%i, ETA=%s.', self.job_name, status.increment,
+                    status.step_time, status.inc_size, self.num_cutbacks, eta_string)
+        self._emit('increment', progress)
+    
+    def _process_msg_line(self, line):
+        if 'DIVERG' in line.upper():
+            self.num_diverging_messages += 1
+        if '***WARNING' in line or '***ERROR' in line:
+            logger.debug('Job %s: %s', self.job_name, line.strip())
+            self._emit('message', line.strip())
+    
+    def check_divergence(self):
+        """Return a string describing why the job is diverging, or :obj:`None`."""
+        max_cutback_increments  = self.monitor_params.max_cutback_increments
+        max_min_size_increments = self.monitor_params.max_min_size_increments
+        if max_cutback_increments is not None and \
+           self._cutback_increments >= max_cutback_increments:
+            return ('%i consecutive increments needed cutbacks'%self._cutback_increments)
+        if max_min_size_increments is not None and \
+           self._min_size_increments >= max_min_size_increments:
+            return ('%i consecutive increments used the minimum increment size'
+                    %self._min_size_increments)
+        return None
+    
+    def poll(self):
+        """Read the new lines of the status and message files and report them.
+        
+        Returns:
+            A string describing why the job is diverging, or :obj:`None`.
+        """
+        num_increments = len(self.increments)
+        for line in self.sta_file.read_lines():
+            self._process_sta_line(line)
+        for line in self.msg_file.read_lines():
+            self._process_msg_line(line)
+        
+        if len(self.increments) > num_increments and self.stop_reason is None:
+            progress = self.progress()
+            for check in self.stop_checks:
+                reason = check(progress)
+                if reason is not None:
+                    self.stop_reason = reason
+                    logger.info('Job %s met a stop criterion: %s.', self.job_name, reason)
+                    self._emit('stop', reason)
+                    break
+        
+        if self.divergence_reason is None and not self.finished:
+            reason = self.check_divergence()
+            if reason is not None:
+                self.divergence_reason = reason
+                logger.warning('Job %s is diverging: %s.', self.job_name, reason)
+                self._emit('divergence', reason)
+        return self.divergence_reason
+    
+    def run(self, is_running, kill=None):
+        """Monitor the job until it finishes or is killed.
+        
+        Args:
+            is_running(function): Function without arguments which returns
+                                  :obj:`False` after the job has finished.
+            kill(function):       Function without arguments which kills the job.
+                                  Defaults to :obj:`None` which means the job is not killed.
+        
+        Returns:
+            The last :class:`JobProgress`.
+        """
+        while True:
+            reason = self.poll()
+            if reason is not None and kill is not None and self.monitor_params.kill_on_divergence:
+                logger.warning('Killing job %s.', self.job_name)
+                kill()
+                self._emit('killed', reason)
+                break
+            if self.stop_reason is not None and kill is not None and not self.finished:
+                logger.info('Ending job %s.', self.job_name)
+                kill()
+                self._emit('stopped', self.stop_reason)
+                break
+            if self.finished or not is_running():
+                self.poll()
+                break
+            time.sleep(self.monitor_params.poll_interval)
+        
+        progress = self.progress()
+        logger.info('Stopped monitoring job %s after %i increments and %i cutbacks.',
+                    self.job_name, progress.increment, progress.num_cutbacks)
+        self._emit('finished', progress)
+        return progress
+#
+
+def monitor_abaqus_job(job, step_params=None, monitor_params=None, callbacks=(),
+                       stop_checks=(), startup_timeout=600.0):
+    """Monitor a submitted Abaqus job until it finishes or is killed.
+    
+    The job is considered running while its lock (.lck) file exists and its log (.log)
+    file does not report the end of the analysis. If the lock file does not appear
+    within *startup_timeout* seconds, e.g. because the input file has errors,
+    monitoring stops.
+    
+    Args:
+        job(Job):                     The submitted Abaqus Job object.
+        step_params(StepParams):      See :class:`JobMonitor`.
+        monitor_params(MonitorParams): See :class:`JobMonitor`.
+        callbacks(tuple):             See :class:`JobMonitor`.
+        stop_checks(tuple):           See :class:`JobMonitor`.
+        startup_timeout(float):       Defaults to 600.0.
+    
+    Returns:
+        The :class:`JobMonitor`.
+    """
+    monitor    = JobMonitor(job.name, os.getcwd(), step_params, monitor_params,
+                            callbacks, stop_checks)
+    lck_path   = os.path.join(os.getcwd(), job.name + '.lck')
+    log_file   = FileTail(os.path.join(os.getcwd(), job.name + '.log'))
+    state      = dict(started=False, ended=False)
+    
+    def is_running():
+        for line in log_file.read_lines():
+            if ('COMPLETED' in line and 'Abaqus JOB' in line) or 'exited with error' in line:
+                state['ended'] = True
+        if state['ended']:
+            return False
+        if os.path.exists(lck_path):
+            state['started'] = True
+            return True
+        if state['started']:
+            return False
+        return time.time() - monitor.start_time < startup_timeout
+    
+    monitor.run(is_running, kill=job.kill)
+    return monitor
+#
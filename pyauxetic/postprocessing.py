@@ -5,47 +5,122 @@ import os
 import logging
 import numpy as np
 
-from abaqusConstants import *  # noqa: F403 # Consider removing
-
 from . import __version__
 
 logger = logging.getLogger(__name__)
 
-_output_table_labels = ('Inc', 'Time',
-                        'U_ld', 'U_td_mean', 'U_td_midpoint',
-                        'strain_ld', 'strain_td_mean', 'strain_td_midpoint',
-                        'poisson_midpoint', 'poisson_mean')
+# Labels of the columns of the numerical output tables.
+output_table_labels = ('Inc', 'Time',
+                       'U_ld', 'U_td_mean', 'U_td_midpoint',
+                       'strain_ld', 'strain_td_mean', 'strain_td_midpoint',
+                       'poisson_midpoint', 'poisson_mean')
+_output_table_labels = output_table_labels  # Kept for backwards compatibility.
 _single_output_fmt   = ('%d','%.2f',
                         '%.8f','%.8f','%.8f','%.8f','%.8f','%.8f','%.8f','%.8f')
 
-def get_numerical_output(obj, odb):
+def to_json_compatible(value):
+    """Convert parameters to objects which can be serialized to json.
     
-    logger.info('Calculating the numerical output.')
-    load_dir  = obj.loading_direction
-    trans_dir = obj.transverse_direction
-    # TODO: Make sure there is only one step and instance.
-    instance = odb.rootAssembly.instances[ obj.part_main_instance.name ]
-    step = odb.steps.values()[0]
+    Namedtuples are converted to their class name and a list of their fields,
+    so parameters of different classes with the same values are distinct.
+    Numpy arrays and scalars are converted to lists and numbers.
+    """
+    if hasattr(value, '_asdict'):
+        return [type(value).__name__,
+                [[k, to_json_compatible(v)] for (k, v) in value._asdict().items()]]
+    elif isinstance(value, np.ndarray):
+        return value.tolist()
+    elif isinstance(value, (list, tuple)):
+        return [to_json_compatible(v) for v in value]
+    elif isinstance(value, (np.integer, np.floating)):
+        return value.item()
+    else:
+        return value
+#
+
+def _completed_frames(step):
+    """Return the frames of a step up to the last completed frame.
     
-    # Retrieve the sets.
-    logger.debug('Retrieving the sets.')
+    The last frame of a job which was ended while running,
+    e.g. by :mod:`.stop_criteria`, may not contain the displacements.
+    """
+    frames = []
+    for frame in step.frames:
+        if 'U' not in frame.fieldOutputs.keys():
+            logger.warning('Frame %i is incomplete and is not post-processed.', frame.frameId)
+            break
+        frames.append(frame)
+    return frames
+#
+
+def _history_frames(odbs):
+    """Return the completed frames of a sequence of Odbs as one continuous history.
+    
+    The Odbs of restart analyses (see :mod:`.restart`) follow the Odb of the
+    original analysis. Frames which do not advance the total time, e.g. the
+    first frame of a restarted step, are skipped.
+    
+    Returns:
+        A list of tuples *(odb_index, frame, total_time)*, where *odb_index*
+        is the index of the Odb containing the frame in *odbs*.
+    """
+    history = []
+    for (odb_index, odb) in enumerate(odbs):
+        for step in odb.steps.values():
+            for frame in _completed_frames(step):
+                total_time = step.totalTime + frame.frameValue
+                if history and total_time <= history[-1][2]:
+                    continue
+                history.append( (odb_index, frame, total_time) )
+    return history
+#
+
+def _get_node_sets(obj, odb):
+    """Return the node sets used by :func:`get_numerical_output` in an Odb."""
+    # TODO: Make sure there is only one instance.
+    instance = odb.rootAssembly.instances[ obj.part_main_instance.name ]
     ld_edge_sets  = (instance.nodeSets['LD-EDGE-1'],
                      instance.nodeSets['LD-EDGE-2'])
     td_edge_sets  = (instance.nodeSets['TD-EDGE-1'],
                      instance.nodeSets['TD-EDGE-2'])
     midpoint_sets = (instance.nodeSets['MID-VERTICE-1'],
                      instance.nodeSets['MID-VERTICE-2'])
+    return (ld_edge_sets, td_edge_sets, midpoint_sets)
+#
+
+def get_numerical_output(obj, odb, restart_odbs=()):
+    """Calculate the numerical output of an analyzed structure.
+    
+    Args:
+        obj(AuxeticStructure): The analyzed structure.
+        odb(Odb):              The opened output database.
+        restart_odbs(tuple):   The opened output databases of the restart analyses
+                               of the job, see :mod:`.restart`. Their frames are
+                               stitched to the frames of *odb*. Defaults to an empty tuple.
+    
+    Returns:
+        A numpy array whose columns are described by *output_table_labels*.
+    """
+    
+    logger.info('Calculating the numerical output.')
+    if obj.pattern_mode == 'periodic':
+        return _get_periodic_numerical_output(obj, odb, restart_odbs)
+    
+    load_dir  = obj.loading_direction
+    trans_dir = obj.transverse_direction
+    
+    # Retrieve the sets.
+    logger.debug('Retrieving the sets.')
+    odbs = [odb] + list(restart_odbs)
+    odb_sets = [None] * len(odbs)
+    odb_sets[0] = _get_node_sets(obj, odb)
+    (ld_edge_sets, td_edge_sets, midpoint_sets) = odb_sets[0]
     
     frameId            = []
     frameValue         = []
     ld_disp            = []
     td_disp_mean       = []
     td_disp_midpoint   = []
-    ld_strain          = []
-    td_strain_mean     = []
-    td_strain_midpoint = []
-    poisson_mean       = []
-    poisson_midpoint   = []
     
     # Get the undeformed lengths for calculating strains.
     ld_dist_0 = ( ld_edge_sets[1].nodes[0].coordinates[load_dir] -
@@ -56,9 +131,13 @@ def get_numerical_output(obj, odb):
                     td_edge_sets[0].nodes[0].coordinates[trans_dir] )
     logger.debug('Calculated the undeformed lengths for calculating strains.')
     
-    for frame in step.frames:
-        frameId.append(frame.frameId)
-        frameValue.append(frame.frameValue)
+    for (frame_index, (odb_index, frame, total_time)) in enumerate(_history_frames(odbs)):
+        frameId.append(frame_index)
+        frameValue.append(total_time)
+        # Regions must be retrieved from the Odb containing the frame.
+        if odb_sets[odb_index] is None:
+            odb_sets[odb_index] = _get_node_sets(obj, odbs[odb_index])
+        (ld_edge_sets, td_edge_sets, midpoint_sets) = odb_sets[odb_index]
         u_output = frame.fieldOutputs['U']
         # Get displacement of the reference points (loading direction).
         ld_disp.append(
@@ -76,41 +155,209 @@ def get_numerical_output(obj, odb):
         edge2_disp = [i.data[trans_dir] for i in u_output.getSubset(region=td_edge_sets[1]).values]
         edge2_disp_mean = np.mean(edge2_disp)
         td_disp_mean.append( edge2_disp_mean - edge1_disp_mean )
-        
-        # Calculate strains.
-        if frame.incrementNumber == 0:
-            ld_strain.append(0)
-            td_strain_mean.append(0)
-            td_strain_midpoint.append(0)
-            poisson_mean.append(0)
-            poisson_midpoint.append(0)
-        else:
-            ld_strain.append( (ld_disp[-1] - ld_disp[-2]) / ld_dist_0 )
-            td_strain_midpoint.append(
-                (td_disp_midpoint[-1] - td_disp_midpoint[-2]) / midpoint_dist_0 )
-            td_strain_mean.append( (td_disp_mean[-1] - td_disp_mean[-2]) / mean_dist_0 )
-            poisson_midpoint.append( -1.0 * td_strain_midpoint[-1] / ld_strain[-1] )
-            poisson_mean.append(     -1.0 * td_strain_mean[-1]     / ld_strain[-1] )
         logger.debug('Calculated the output data for frame %i (t=%.2f).',
                      frameId[-1], frameValue[-1])
     
+    output_table = compute_output_table(frameId, frameValue,
+                                        ld_disp, td_disp_mean, td_disp_midpoint,
+                                        ld_dist_0, mean_dist_0, midpoint_dist_0)
+    logger.info('Calculated the numerical output.')
+    return output_table
+#
+
+def _get_periodic_numerical_output(obj, odb, restart_odbs=()):
+    """Calculate the numerical output of a periodic unit cell.
+    
+    The relative displacements of the opposite boundaries are the displacements
+    of the reference points *'RP-LD-SET'* and *'RP-TD-SET'*,
+    so the mean and midpoint values are identical.
+    """
+    load_dir  = obj.loading_direction
+    trans_dir = obj.transverse_direction
+    bound_size = obj.unit_cells[0].bound_size
+    
+    frameId    = []
+    frameValue = []
+    ld_disp    = []
+    td_disp    = []
+    odbs = [odb] + list(restart_odbs)
+    for (frame_index, (odb_index, frame, total_time)) in enumerate(_history_frames(odbs)):
+        frameId.append(frame_index)
+        frameValue.append(total_time)
+        rp_ld_set = odbs[odb_index].rootAssembly.nodeSets['RP-LD-SET']
+        rp_td_set = odbs[odb_index].rootAssembly.nodeSets['RP-TD-SET']
+        u_output = frame.fieldOutputs['U']
+        ld_disp.append( u_output.getSubset(region=rp_ld_set).values[0].data[load_dir ] )
+        td_disp.append( u_output.getSubset(region=rp_td_set).values[0].data[trans_dir] )
+        logger.debug('Calculated the output data for frame %i (t=%.2f).',
+                     frameId[-1], frameValue[-1])
+    
+    output_table = compute_output_table(frameId, frameValue,
+                                        ld_disp, td_disp, td_disp,
+                                        bound_size[load_dir], bound_size[trans_dir],
+                                        bound_size[trans_dir])
+    logger.info('Calculated the numerical output of the periodic unit cell.')
+    return output_table
+#
+
+def compute_output_table(frame_ids, frame_values,
+                         ld_disp, td_disp_mean, td_disp_midpoint,
+                         ld_dist_0, mean_dist_0, midpoint_dist_0):
+    """Calculate strains and Poisson's ratios and assemble the output table.
+    
+    Strains are calculated between successive frames and the first frame
+    is taken as the undeformed state.
+    
+    Args:
+        frame_ids(list):         Ids of the frames.
+        frame_values(list):      Time values of the frames.
+        ld_disp(list):           Relative displacement of the loading edges.
+        td_disp_mean(list):      Relative mean displacement of the transverse edges.
+        td_disp_midpoint(list):  Relative displacement of the transverse midpoints.
+        ld_dist_0(float):        Undeformed distance between the loading edges.
+        mean_dist_0(float):      Undeformed distance between the transverse edges.
+        midpoint_dist_0(float):  Undeformed distance between the transverse midpoints.
+    
+    Returns:
+        A numpy array whose columns are described by *output_table_labels*.
+    """
+    ld_disp          = np.asarray(ld_disp         , dtype=float)
+    td_disp_mean     = np.asarray(td_disp_mean    , dtype=float)
+    td_disp_midpoint = np.asarray(td_disp_midpoint, dtype=float)
+    
+    ld_strain          = np.zeros(len(ld_disp))
+    td_strain_mean     = np.zeros(len(ld_disp))
+    td_strain_midpoint = np.zeros(len(ld_disp))
+    poisson_mean       = np.zeros(len(ld_disp))
+    poisson_midpoint   = np.zeros(len(ld_disp))
+    
+    ld_strain[1:]          = np.diff(ld_disp)          / ld_dist_0
+    td_strain_mean[1:]     = np.diff(td_disp_mean)     / mean_dist_0
+    td_strain_midpoint[1:] = np.diff(td_disp_midpoint) / midpoint_dist_0
+    poisson_midpoint[1:]   = -1.0 * td_strain_midpoint[1:] / ld_strain[1:]
+    poisson_mean[1:]       = -1.0 * td_strain_mean[1:]     / ld_strain[1:]
+    
     # Assemble the lists to an array.
     logger.debug('Assembling frame output data into a table.')
-    output_table = np.column_stack(
-                        (frameId, frameValue,
-                         ld_disp, td_disp_mean, td_disp_midpoint,
-                         ld_strain, td_strain_mean, td_strain_midpoint,
-                         poisson_mean, poisson_midpoint) )
+    return np.column_stack(
+                (frame_ids, frame_values,
+                 ld_disp, td_disp_mean, td_disp_midpoint,
+                 ld_strain, td_strain_mean, td_strain_midpoint,
+                 poisson_mean, poisson_midpoint) )
+#
+
+def applied_load(loading_params, step_time, time_period):
+    """Return the force applied by a force loading at a time of the loading step.
     
-    logger.info('Calculated the numerical output.')
-    return output_table
+    The force is ramped from zero to *loading_params.data* over the step,
+    which is the default amplitude of the static step (see :meth:`.define_bcs`).
+    
+    Args:
+        loading_params(LoadingParams): Special namedtuple describing the loading.
+        step_time(float):              Time of the frame in the loading step.
+        time_period(float):            Time period of the loading step.
+    
+    Returns:
+        The applied force, or :obj:`None` if the loading is not a force.
+    """
+    if loading_params is None or loading_params.type.lower() != 'force':
+        return None
+    return loading_params.data * step_time / float(time_period)
 #
 
-def write_single_numerical_output(output_table, structure_name, folder_path):
-    with open(os.path.join(folder_path, structure_name+' results.csv') ,'w') as file:
+def compute_effective_properties(ld_disp, td_disp, ld_force, bound_size, loading_direction):
+    """Calculate the effective in-plane properties of a periodic unit cell.
+    
+    Args:
+        ld_disp(float):          Displacement of *'RP-LD-SET'* in the loading direction.
+        td_disp(float):          Displacement of *'RP-TD-SET'* in the transverse direction.
+        ld_force(float):         Force on *'RP-LD-SET'* in the loading direction.
+        bound_size(tuple):       Size of the unit cell.
+        loading_direction(int):  Loading direction, 0 for *'x'* and 1 for *'y'*.
+    
+    Returns:
+        A dictionary containing *'strain_ld'*, *'strain_td'*, *'stress_ld'*,
+        *'modulus_ld'*, and *'poisson'* which are secant values.
+    """
+    load_dir  = loading_direction
+    trans_dir = 1 - loading_direction
+    strain_ld = ld_disp  / bound_size[load_dir ]
+    strain_td = td_disp  / bound_size[trans_dir]
+    stress_ld = ld_force / bound_size[trans_dir]
+    return {'strain_ld' : strain_ld,
+            'strain_td' : strain_td,
+            'stress_ld' : stress_ld,
+            'modulus_ld': stress_ld / strain_ld,
+            'poisson'   : -1.0 * strain_td / strain_ld}
+#
+
+def get_effective_properties(obj, odb, restart_odbs=()):
+    """Calculate the effective in-plane properties of a periodic unit cell
+    at the last frame of the analysis.
+    
+    The effective stress is the force on *'RP-LD-SET'* divided by the unit
+    cell's width in the transverse direction (for a unit thickness).
+    Under displacement loading, the force is the reaction force of *'RP-LD-SET'*.
+    Under force loading, the loading direction of *'RP-LD-SET'* is not constrained,
+    so its reaction force is zero, and the applied force is used instead
+    (see :func:`applied_load`).
+    
+    Args:
+        obj(AuxeticStructure): The analyzed structure with
+                               *obj.pattern_mode == 'periodic'*.
+        odb(Odb):              The opened output database.
+        restart_odbs(tuple):   The opened output databases of the restart analyses.
+                               If specified, the last frame of the last one is used.
+                               Defaults to an empty tuple.
+    
+    Returns:
+        A dictionary containing *'strain_ld'*, *'strain_td'*, *'stress_ld'*,
+        *'modulus_ld'*, and *'poisson'* which are secant values.
+    """
+    load_dir   = obj.loading_direction
+    trans_dir  = obj.transverse_direction
+    odbs = [odb] + list(restart_odbs)
+    (odb_index, frame, _) = _history_frames(odbs)[-1]
+    odb = odbs[odb_index]
+    
+    rp_ld_set = odb.rootAssembly.nodeSets['RP-LD-SET']
+    rp_td_set = odb.rootAssembly.nodeSets['RP-TD-SET']
+    u_output  = frame.fieldOutputs['U']
+    
+    ld_disp  = u_output.getSubset(region=rp_ld_set).values[0].data[load_dir ]
+    td_disp  = u_output.getSubset(region=rp_td_set).values[0].data[trans_dir]
+    ld_force = applied_load(obj.loading_params, frame.frameValue, obj.step_params.time_period)
+    if ld_force is None:
+        rf_output = frame.fieldOutputs['RF']
+        ld_force  = rf_output.getSubset(region=rp_ld_set).values[0].data[load_dir]
+    
+    properties = compute_effective_properties(ld_disp, td_disp, ld_force,
+                                              obj.unit_cells[0].bound_size, load_dir)
+    logger.info("Effective properties of the unit cell: E=%f, nu=%f.",
+                properties['modulus_ld'], properties['poisson'])
+    return properties
+#
+
+def write_effective_properties(properties, structure_name, folder_path):
+    """Write the output of :func:`get_effective_properties` to a csv file."""
+    labels = ('strain_ld', 'strain_td', 'stress_ld', 'modulus_ld', 'poisson')
+    with open(os.path.join(folder_path, structure_name+' effective properties.csv') ,'w') as file:
         file.write('Modeling and post-processing done by PyAuxetic %s\n'%__version__)
+        file.write( ', '.join(labels) + '\n' )
+        file.write( ', '.join(['%.8f'%properties[label] for label in labels]) + '\n' )
+    logger.info('Exported the effective properties for structure %s.', structure_name)
+#
+
+def write_single_numerical_output(output_table, structure_name, folder_path, partial=False):
+    with open(os.path.join(folder_path, structure_name+' results.csv') ,'w') as file:
+        if partial:
+            # The first two lines are skipped when reading, so the flag is kept on the first line.
+            file.write('Modeling and post-processing done by PyAuxetic %s.'%__version__ +
+                       ' Partial results of a job which did not complete.\n')
+        else:
+            file.write('Modeling and post-processing done by PyAuxetic %s\n'%__version__)
         #TODO: add model info.
-        file.write( ', '.join(_output_table_labels) + '\n' )
+        file.write( ', '.join(output_table_labels) + '\n' )
         np.savetxt(fname=file, X=output_table, fmt=_single_output_fmt,
                    delimiter=', ', newline='\n')
     logger.info('Exported the the numerical output for structure %s.', structure_name)
@@ -118,35 +365,58 @@ def write_single_numerical_output(output_table, structure_name, folder_path):
 
 def write_batch_numerical_output(time_value, unit_cell_params_list,
                                  structure_names, analysis_ids,
-                                 results_folder_paths, folder_path):
+                                 results_folder_paths, folder_path, statuses=None):
     # TODO: doc. interpolate for time_value.
+    # statuses contains the analysis_status of the structures.
+    # Analyses which did not reach time_value use their last frame,
+    # and those without results are written as nan.
     
     logger.info('Assembling results of multiple analysis at t=%.2f.', time_value)
+    if statuses is None:
+        statuses = ['completed'] * len(structure_names)
     # Read the results of individual analyses.
     results_tables = []
     logger.debug('Reading numerical output of the structures.')
     for i in range(len(structure_names)):
-        with open(os.path.join(results_folder_paths[i], structure_names[i]+' results.csv'),
-                  'r') as file:
-            results_tables.append( 
-                np.loadtxt(fname=file, skiprows=2, delimiter=',') )
-        logger.debug('Read numerical output of structure %s.', structure_names[i])
+        results_table = None
+        if results_folder_paths[i] is not None:
+            results_path = os.path.join(results_folder_paths[i], structure_names[i]+' results.csv')
+            if os.path.isfile(results_path):
+                with open(results_path, 'r') as file:
+                    results_table = np.loadtxt(fname=file, skiprows=2, delimiter=',', ndmin=2)
+        if results_table is None or len(results_table) == 0:
+            logger.warning('No numerical output is available for structure %s.', structure_names[i])
+            results_table = None
+        else:
+            logger.debug('Read numerical output of structure %s.', structure_names[i])
+        results_tables.append(results_table)
     
     # Find the target rows based on the given model time.
     target_rows = []
-    for table in results_tables:
-        row_index = np.where( table[:,1] == time_value)
-        target_rows.append( table[row_index] )
+    status_list = []
+    for (table, status) in zip(results_tables, statuses):
+        if table is None:
+            target_rows.append( np.full(len(output_table_labels), np.nan) )
+            status_list.append(status)
+            continue
+        row_index = np.where( table[:,1] == time_value)[0]
+        if len(row_index) > 0:
+            target_rows.append( table[row_index[0]] )
+            status_list.append(status)
+        else:
+            target_rows.append( table[-1] )
+            status_list.append('%s (t=%.2f)'%(status, table[-1, 1]))
     
     # Compile the target rows.
     row_list = []
     for i in range( len(unit_cell_params_list) ):
         row_list.append(
-            np.hstack((analysis_ids[i], unit_cell_params_list[i][1:], target_rows[i][0][2:].T)) )
+            np.hstack((analysis_ids[i], unit_cell_params_list[i][1:], target_rows[i][2:].T)) )
     batch_output_table = np.vstack(row_list)
     logger.debug('Compiled numerical output of the structures into one table.')
     
     # Write batch_output_table to file.
+    # The status column is text, so np.savetxt cannot be used.
     unit_cell_params_list_fields = unit_cell_params_list[0]._fields[1:]
     fmt = ('%i',) + ('%f',)*len(unit_cell_params_list_fields) + _single_output_fmt[2:]
     with open(os.path.join(folder_path, 'batch results.csv') ,'w') as file:
@@ -154,8 +424,10 @@ def write_batch_numerical_output(time_value, unit_cell_params_list,
         file.write('Results of batch analysis.\n')
         file.write('Model Time = %.2f.\n'%time_value)
         file.write(
-            ', '.join( ('Run #',)+unit_cell_params_list_fields+_output_table_labels[2:] ) + '\n')
-        np.savetxt(fname=file, X=batch_output_table, fmt=fmt, delimiter=', ', newline='\n')
+            ', '.join( ('Run #',)+unit_cell_params_list_fields+output_table_labels[2:]+('Status',) )
+            + '\n')
+        for (row, status) in zip(batch_output_table, status_list):
+            file.write( ', '.join([f%value for (f, value) in zip(fmt, row)] + [str(status)]) + '\n' )
     logger.debug('Compiled numerical output of the structures into one table.')
     logger.info('Exported results of multiple analysis at t=%.2f.', time_value)
 #
@@ -0,0 +1,120 @@
+"""Restart of jobs which stop because of increment limits or cutbacks.
+
+If :meth:`.AuxeticStructure.define_step` is called with *restart_params*, restart
+data is written during the analysis. When the job then stops because it needed
+more than *step_params.max_num_inc* increments or ran out of cutbacks,
+:meth:`.AuxeticStructure.submit_job` ends the step at the last increment with
+restart data and continues the loading in a new step of a restart analysis,
+whose increments are adjusted using :func:`restart_step_params`.
+
+Each restart analysis writes its own Odb. :func:`.postprocessing.get_numerical_output`
+stitches the frames of the original and restart Odbs into one continuous history.
+"""
+
+import os
+import logging
+
+from .classes.auxetic_structure_params import StepParams
+from .monitor import parse_sta_line
+
+logger = logging.getLogger(__name__)
+
+# Messages of Abaqus/Standard in the .msg file for the recoverable errors.
+_increment_limit_messages = ('TOO MANY INCREMENTS NEEDED TO COMPLETE THE STEP', )
+_cutback_messages         = ('TOO MANY ATTEMPTS MADE FOR THIS INCREMENT',
+                             'TIME INCREMENT REQUIRED IS LESS THAN THE MINIMUM SPECIFIED')
+
+def restart_reason(job_name, working_dir=None, job_monitor=None):
+    """Return why a job which has not completed can be restarted.
+    
+    Args:
+        job_name(str):           Name of the job.
+        working_dir(str):        Folder containing the job files. Defaults to :obj:`None`
+                                 which uses the current working directory.
+        job_monitor(JobMonitor): The monitor of the job, if any. Jobs killed by the monitor
+                                 because of divergence are treated as running out of cutbacks.
+                                 Defaults to :obj:`None`.
+    
+    Returns:
+        *'increment_limit'*, *'cutbacks'*, or :obj:`None` if the job cannot be restarted.
+    """
+    if job_monitor is not None and job_monitor.divergence_reason is not None:
+        return 'cutbacks'
+    if working_dir is None:
+        working_dir = os.getcwd()
+    msg_path = os.path.join(working_dir, job_name + '.msg')
+    if not os.path.isfile(msg_path):
+        return None
+    with open(msg_path, 'r') as file:
+        text = file.read()
+    if any(message in text for message in _increment_limit_messages):
+        return 'increment_limit'
+    if any(message in text for message in _cutback_messages):
+        return 'cutbacks'
+    return None
+#
+
+def read_restart_increment(job_name, frequency=1, working_dir=None):
+    """Return the last converged increment of a job for which restart data was written.
+    
+    Args:
+        job_name(str):     Name of the job.
+        frequency(int):    Frequency of writing the restart data, see :class:`RestartParams`.
+                           Defaults to 1.
+        working_dir(str):  Folder containing the job files. Defaults to :obj:`None`
+                           which uses the current working directory.
+    
+    Returns:
+        The :class:`.monitor.IncrementStatus` of the increment,
+        or :obj:`None` if the job has no such increment.
+    """
+    if working_dir is None:
+        working_dir = os.getcwd()
+    sta_path = os.path.join(working_dir, job_name + '.sta')
+    if not os.path.isfile(sta_path):
+        return None
+    restart_increment = None
+    with open(sta_path, 'r') as file:
+        for line in file:
+            status = parse_sta_line(line)
+            if status is not None and status.converged and status.increment % frequency == 0:
+                restart_increment = status
+    return restart_increment
+#
+
+def restart_step_params(step_params, restart_params, restart_increment, reason):
+    """Return the step parameters of a restart analysis.
+    
+    The time period is the remainder of the stopped step. If the job needed too many
+    increments, the maximum number of increments is multiplied by
+    *restart_params.num_inc_factor*. If it ran out of cutbacks, the minimum increment
+    size is multiplied by *restart_params.min_inc_factor*.
+    
+    Args:
+        step_params(StepParams):             Step parameters of the stopped step.
+        restart_params(RestartParams):       Special namedtuple describing the restart.
+        restart_increment(IncrementStatus):  Increment from which the analysis is restarted.
+        reason(str):                         Output of :func:`restart_reason`.
+    
+    Returns:
+        A :class:`StepParams`.
+    
+    Raises:
+        ValueError: If the step has already been completed.
+    """
+    time_period = step_params.time_period - restart_increment.step_time
+    if time_period <= 1E-9 * step_params.time_period:
+        raise ValueError('The step has been completed and cannot be restarted.')
+    min_inc_size = step_params.min_inc_size
+    max_num_inc  = step_params.max_num_inc
+    if reason == 'increment_limit':
+        max_num_inc  = int(round(max_num_inc * restart_params.num_inc_factor))
+    else:
+        min_inc_size = min_inc_size * restart_params.min_inc_factor
+    min_inc_size  = min(min_inc_size, time_period)
+    max_inc_size  = min(step_params.max_inc_size, time_period)
+    init_inc_size = min(max(restart_increment.inc_size, min_inc_size), max_inc_size)
+    return StepParams(time_period=time_period, init_inc_size=init_inc_size,
+                      min_inc_size=min_inc_size, max_inc_size=max_inc_size,
+                      max_num_inc=max_num_inc)
+#
@@ -0,0 +1,343 @@
+"""Resource-aware scheduling of analysis jobs on the local machine.
+
+:meth:`.AuxeticStructure.create_job` requests *job_params.memoryPercent* of the
+memory and *job_params.numCpus* cores, which is suitable for a single job
+but oversubscribes the machine when several jobs are run at the same time.
+:class:`Scheduler` runs a number of jobs as separate processes and only
+starts a job if the cores, memory, and Abaqus license tokens it needs are
+available in the budgets defined by :class:`SchedulerParams`.
+The tokens of each job are calculated from its number of cores
+using :func:`license_tokens`.
+
+Waiting jobs are ordered by their priority and then by their predicted runtime,
+so short jobs run first. If the first waiting job does not fit, a start time is
+reserved for it based on the predicted runtimes of the running jobs, and later
+jobs which fit in the gaps are started as long as they do not delay the reservation
+(EASY backfilling). Jobs without a predicted runtime are only backfilled if
+they use resources which are not needed by the reserved job.
+
+The scheduler is not used by :func:`.main.main_single` and :func:`.main.main_batch`,
+which submit each job from Abaqus/CAE and wait for it. To schedule the analyses
+of several structures, the caller creates each structure up to
+:meth:`.AuxeticStructure.create_job`, writes its input file to the current
+working directory using :code:`obj.job.writeInput()` instead of calling
+:meth:`.AuxeticStructure.submit_job`, and submits an :func:`abaqus_job` with the
+name of the job. After :meth:`Scheduler.run` returns, the results are read from
+the odb files of the completed jobs::
+
+    scheduler = Scheduler(scheduler_params)
+    for obj in structures:
+        obj.create_job(job_params)
+        obj.job.writeInput()
+        scheduler.submit(abaqus_job(obj.job.name, num_cpus=job_params.numCpus))
+    jobs = scheduler.run()
+
+The jobs are arbitrary commands, so the scheduler can be tested offline
+using :func:`fake_solver_job` instead of :func:`abaqus_job`.
+"""
+
+import os
+import sys
+import time
+import logging
+import subprocess
+import multiprocessing
+
+from .classes.auxetic_structure_params import SchedulerParams
+
+logger = logging.getLogger(__name__)
+
+_infinity = float('inf')
+
+def license_tokens(num_cpus):
+    """Return the number of Abaqus analysis tokens needed by a job
+    using the formula *int(5 * num_cpus ^ 0.422)*.
+    """
+    return int(5 * num_cpus ** 0.422)
+#
+
+class ScheduledJob(object):
+    """A job run by :class:`Scheduler` as a separate process.
+    
+    After the job is finished, *status* is *'completed'* if the process
+    returned 0 and *'failed'* otherwise.
+    """
+    
+    def __init__(self, name, command, num_cpus=1, memory=0.0, priority=0,
+                 predicted_runtime=None, cwd=None, shell=False):
+        """Initialize the job.
+        
+        Args:
+            name(str):                Name of the job.
+            command(list):            Command and arguments passed to :class:`subprocess.Popen`.
+            num_cpus(int):            Number of CPU cores used by the job. Defaults to 1.
+            memory(float):            Memory in megabytes used by the job. Defaults to 0.0.
+            priority(int):            Jobs with a higher priority start first. Defaults to 0.
+            predicted_runtime(float): Predicted runtime in seconds. Defaults to
+                                      :obj:`None` which means it is unknown.
+            cwd(str):                 Working directory of the process. Defaults to :obj:`None`
+                                      which uses the current working directory.
+            shell(bool):              Passed to :class:`subprocess.Popen`. Defaults to :obj:`False`.
+        
+        Raises:
+            ValueError: If *num_cpus* or *memory* is invalid.
+        """
+        if num_cpus < 1:
+            raise ValueError('num_cpus must be at least 1.')
+        if memory < 0:
+            raise ValueError('memory must not be negative.')
+        self.name              = name
+        self.command           = command
+        self.num_cpus          = num_cpus
+        self.memory            = float(memory)
+        self.tokens            = license_tokens(num_cpus)
+        self.priority          = priority
+        self.predicted_runtime = predicted_runtime
+        self.cwd               = cwd
+        self.shell             = shell
+        self.status            = 'queued'
+        self.process           = None
+        self.return_code       = None
+        self.start_time        = None
+        self.end_time          = None
+    
+    @property
+    def resources(self):
+        """Tuple of the number of cores, memory, and tokens used by the job."""
+        return (self.num_cpus, self.memory, self.tokens)
+    
+    def predicted_end_time(self, now):
+        """Return the predicted end time of a running job, which is never before *now*."""
+        if self.predicted_runtime is None:
+            return _infinity
+        return max(self.start_time + self.predicted_runtime, now)
+#
+
+def abaqus_job(job_name, num_cpus=1, memory=None, priority=0, predicted_runtime=None,
+               cwd=None, abaqus_command='abaqus'):
+    """Return a :class:`ScheduledJob` which analyzes the input file *'<job_name>.inp'*.
+    
+    The input file of a structure can be written after :meth:`.AuxeticStructure.create_job`
+    using :code:`obj.job.writeInput()`. The memory is passed to Abaqus explicitly,
+    so *job_params.memoryPercent* is not used.
+    
+    Args:
+        job_name(str):            Name of the job and its input file.
+        num_cpus(int):            Number of CPU cores. Defaults to 1.
+        memory(float):            Memory in megabytes. Defaults to :obj:`None`
+                                  which uses the default memory of Abaqus and
+                                  assumes the job does not use a significant memory.
+        priority(int):            Priority of the job. Defaults to 0.
+        predicted_runtime(float): Predicted runtime in seconds. Defaults to :obj:`None`.
+        cwd(str):                 Folder containing the input file. Defaults to :obj:`None`
+                                  which uses the current working directory.
+        abaqus_command(str):      Command used for starting Abaqus. Defaults to *'abaqus'*.
+    """
+    command = [abaqus_command, 'job=%s'%job_name, 'cpus=%i'%num_cpus]
+    if memory is not None:
+        command.append('memory=%i mb'%memory)
+    command.append('interactive')
+    return ScheduledJob(job_name, command, num_cpus, memory or 0.0, priority,
+                        predicted_runtime, cwd, shell=(os.name == 'nt'))
+#
+
+def fake_solver_job(name, duration, num_cpus=1, memory=0.0, priority=0,
+                    predicted_runtime=None, return_code=0):
+    """Return a :class:`ScheduledJob` whose process sleeps for *duration* seconds
+    and returns *return_code*, for testing the scheduler without Abaqus.
+    
+    If *predicted_runtime* is not specified, *duration* is used.
+    """
+    command = [sys.executable, '-c',
+               'import sys, time; time.sleep(%f); sys.exit(%i)'%(duration, return_code)]
+    if predicted_runtime is None:
+        predicted_runtime = duration
+    return ScheduledJob(name, command, num_cpus, memory, priority, predicted_runtime)
+#
+
+class Scheduler(object):
+    """Run jobs within budgets of CPU cores, memory, and license tokens.
+    
+    Example:
+        scheduler = Scheduler(SchedulerParams(num_cpus=8, memory=16000, license_tokens=12))
+        scheduler.submit(abaqus_job('structure-001', num_cpus=4, memory=4000))
+        scheduler.submit(abaqus_job('structure-002', num_cpus=2, memory=2000))
+        jobs = scheduler.run()
+    """
+    
+    def __init__(self, scheduler_params=None):
+        """Initialize the scheduler.
+        
+        Args:
+            scheduler_params(SchedulerParams): Special namedtuple describing the resources
+                                               available to all jobs. Defaults to :obj:`None`
+                                               which uses the default values of the namedtuple.
+        """
+        if scheduler_params is None:
+            scheduler_params = SchedulerParams()
+        num_cpus = scheduler_params.num_cpus
+        if num_cpus is None:
+            num_cpus = multiprocessing.cpu_count()
+        self.capacity = (
+            num_cpus,
+            _infinity if scheduler_params.memory         is None else float(scheduler_params.memory),
+            _infinity if scheduler_params.license_tokens is None else scheduler_params.license_tokens)
+        self.backfill      = scheduler_params.backfill
+        self.poll_interval = scheduler_params.poll_interval
+        self.jobs          = []  # All submitted jobs in order of submission.
+        self.queued        = []
+        self.running       = []
+        logger.debug('Initialized the scheduler with %i cores, %s MB of memory, and %s tokens.',
+                     self.capacity[0], self.capacity[1], self.capacity[2])
+    
+    def submit(self, job):
+        """Add a job to the queue.
+        
+        Raises:
+            ValueError: If the job needs more resources than the budgets.
+        """
+        for (needed, available, label) in zip(job.resources, self.capacity,
+                                              ('cores', 'memory', 'license tokens')):
+            if needed > available:
+                raise ValueError("Job '%s' needs more %s than available."%(job.name, label))
+        self.jobs.append(job)
+        self.queued.append(job)
+        logger.debug("Submitted job '%s' using %i cores, %.0f MB, and %i tokens.",
+                     job.name, job.num_cpus, job.memory, job.tokens)
+        return job
+    
+    def _free_resources(self):
+        used = [sum(job.resources[i] for job in self.running) for i in range(3)]
+        return [capacity - u for (capacity, u) in zip(self.capacity, used)]
+    
+    def _sort_key(self, job):
+        runtime = _infinity if job.predicted_runtime is None else job.predicted_runtime
+        return (-job.priority, runtime, self.jobs.index(job))
+    
+    def _start(self, job, free, now):
+        job.process    = subprocess.Popen(job.command, cwd=job.cwd, shell=job.shell)
+        job.status     = 'running'
+        job.start_time = now
+        self.queued.remove(job)
+        self.running.append(job)
+        for i in range(3):
+            free[i] -= job.resources[i]
+        logger.info("Started job '%s'.", job.name)
+    
+    def schedule(self):
+        """Start the waiting jobs which fit in the free resources.
+        
+        Returns:
+            A list of the started jobs.
+        """
+        now     = time.time()
+        free    = self._free_resources()
+        queue   = sorted(self.queued, key=self._sort_key)
+        started = []
+        
+        # Start jobs in order until one does not fit.
+        while queue and _fits(queue[0].resources, free):
+            job = queue.pop(0)
+            self._start(job, free, now)
+            started.append(job)
+        if not queue or not self.backfill:
+            return started
+        
+        # Reserve the time when the first job will fit,
+        # assuming the running jobs end as predicted.
+        head = queue.pop(0)
+        available   = list(free)
+        shadow_time = _infinity
+        for job in sorted(self.running, key=lambda job: job.predicted_end_time(now)):
+            for i in range(3):
+                available[i] += job.resources[i]
+            if _fits(head.resources, available):
+                shadow_time = job.predicted_end_time(now)
+                break
+        if shadow_time == _infinity:
+            # The reservation is unknown, so only use resources it does not need.
+            shadow_time = now
+        extra = [available[i] - head.resources[i] for i in range(3)]
+        
+        # Backfill the jobs which do not delay the reservation.
+        for job in queue:
+            if not _fits(job.resources, free):
+                continue
+            if job.predicted_runtime is not None and now + job.predicted_runtime <= shadow_time:
+                self._start(job, free, now)
+                started.append(job)
+            elif _fits(job.resources, extra):
+                self._start(job, free, now)
+                started.append(job)
+                for i in range(3):
+                    extra[i] -= job.resources[i]
+            else:
+                continue
+            logger.debug("Job '%s' was backfilled before job '%s'.", job.name, head.name)
+        return started
+    
+    def poll(self):
+        """Check the running jobs.
+        
+        Returns:
+            A list of the jobs which have finished since the last call.
+        """
+        finished = []
+        for job in list(self.running):
+            return_code = job.process.poll()
+            if return_code is None:
+                continue
+            job.return_code = return_code
+            job.end_time    = time.time()
+            job.status      = 'completed' if return_code == 0 else 'failed'
+            self.running.remove(job)
+            finished.append(job)
+            if return_code == 0:
+                logger.info("Job '%s' completed in %.1f s.", job.name, job.end_time - job.start_time)
+            else:
+                logger.error("Job '%s' failed with return code %i.", job.name, return_code)
+        return finished
+    
+    def run(self, timeout=None):
+        """Run all submitted jobs and wait for them to finish.
+        
+        Args:
+            timeout(float): Maximum time in seconds. If it is reached, the running jobs
+                            are killed and a :class:`RuntimeError` is raised.
+                            Defaults to :obj:`None`.
+        
+        Returns:
+            A list of all jobs in order of submission.
+        
+        Raises:
+            RuntimeError: If *timeout* is reached.
+        """
+        start_time = time.time()
+        logger.info('Running %i jobs.', len(self.queued))
+        while self.queued or self.running:
+            self.poll()
+            self.schedule()
+            if timeout is not None and time.time() - start_time > timeout:
+                self.kill()
+                raise RuntimeError('Timeout while running the jobs.')
+            if self.queued or self.running:
+                time.sleep(self.poll_interval)
+        logger.info('All jobs finished.')
+        return self.jobs
+    
+    def kill(self):
+        """Kill all running jobs."""
+        for job in list(self.running):
+            job.process.kill()
+            job.process.wait()
+            job.return_code = job.process.returncode
+            job.end_time    = time.time()
+            job.status      = 'failed'
+            self.running.remove(job)
+            logger.warning("Killed job '%s'.", job.name)
+#
+
+def _fits(needed, available):
+    """Return :obj:`True` if the resources *needed* are not more than *available*."""
+    return all(n <= a for (n, a) in zip(needed, available))
+#
@@ -0,0 +1,8 @@
+"""Native solvers for screening auxetic structures without Abaqus.
+
+The solvers in this package only depend on numpy and scipy and use
+the same parameter namedtuples as the Abaqus workflow. Their output tables
+have the same columns as :func:`.postprocessing.get_numerical_output`,
+so they can be compared with, or used instead of, the Abaqus results
+for small-strain screening runs.
+"""
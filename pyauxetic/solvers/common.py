@@ -0,0 +1,403 @@
+"""Functions and classes shared by the native solvers."""
+
+import logging
+import numpy as np
+from scipy import sparse
+from scipy.sparse import linalg as sparse_linalg
+
+from .. import postprocessing
+from ..classes.auxetic_structure_params import StepParams
+from . import multigrid
+
+logger = logging.getLogger(__name__)
+
+def get_elastic_constants(material_params):
+    """Return the elastic constants used by the native solvers.
+    
+    Args:
+        material_params(MaterialParams): Special namedtuple describing the material.
+                                         Only *material_params.elastic* is used.
+    
+    Returns:
+        A tuple *(E, nu)* of floats.
+    
+    Raises:
+        ValueError: If *material_params.elastic* is not defined.
+    """
+    if material_params.elastic is None:
+        raise ValueError('The native solvers require material_params.elastic to be defined.' +
+                         ' Hyperelastic materials must be analyzed using Abaqus.')
+    if len(material_params.elastic) != 2:
+        raise ValueError('material_params.elastic must be a Tuple containing two floats.')
+    return ( float(material_params.elastic[0]), float(material_params.elastic[1]) )
+#
+
+def get_loading(loading_params):
+    """Validate *loading_params* and return its values.
+    
+    Args:
+        loading_params(LoadingParams): Special namedtuple describing the loading.
+    
+    Returns:
+        A tuple *(loading_direction, loading_type, loading_data)* where
+        *loading_direction* is 0 or 1 and *loading_type* is *'disp'* or *'force'*.
+    
+    Raises:
+        ValueError: If *loading_params.type* or *loading_params.direction* is invalid.
+    """
+    if   loading_params.direction.lower() == 'x':
+        loading_direction = 0
+    elif loading_params.direction.lower() == 'y':
+        loading_direction = 1
+    else:
+        raise ValueError("loading_params.direction must be 'x' or 'y'.")
+    
+    if   loading_params.type.lower() in ['disp', 'displacement']:
+        loading_type = 'disp'
+    elif loading_params.type.lower() == 'force':
+        loading_type = 'force'
+    else:
+        raise ValueError('Invalid value for loading_type: %s'%loading_params.type)
+    return (loading_direction, loading_type, float(loading_params.data))
+#
+
+def return_frame_times(step_params=None):
+    """Return the times at which the output of a linear analysis is written.
+    
+    The step is divided into increments of *step_params.init_inc_size*,
+    which are the frames written by Abaqus when no cutbacks occur.
+    
+    Args:
+        step_params(StepParams): Special namedtuple describing the step.
+                                 Defaults to :obj:`None` which uses
+                                 the default step values.
+    
+    Returns:
+        A numpy array of times starting from zero.
+    """
+    if step_params is None:
+        step_params = StepParams()
+    num_inc = int(np.ceil(step_params.time_period / step_params.init_inc_size - 1E-9))
+    return np.linspace(0.0, step_params.time_period, num_inc+1)
+#
+
+class ReducedSystem(object):
+    """Degrees of freedom of a model after applying the loading constraints.
+    
+    This is the native counterpart of the reference points and equations
+    defined by :meth:`.auxetic_structure.AuxeticStructure._perpare_for_loading`:
+    The dofs of the first loading edge are fixed and the dofs of the second
+    loading edge in the loading direction are tied to a single master dof,
+    which receives the force/displacement.
+    """
+    
+    def __init__(self, num_dofs, fixed_dofs, tied_dofs, dof_points=None, dofs_per_node=None,
+                 max_direct_dofs=100000):
+        """Create the mapping between the full and reduced dofs.
+        
+        Args:
+            num_dofs(int):         Number of dofs in the model.
+            fixed_dofs(np.array):  Dofs which are fixed to zero.
+            tied_dofs(np.array):   Dofs which are tied to the master dof.
+            dof_points(np.array):  (num_dofs,2) array of the coordinates of the node
+                                   of each dof. If specified, the equations are
+                                   ordered using :func:`nested_dissection_order`
+                                   before factorization, which greatly reduces
+                                   the time and memory needed for large models.
+                                   Defaults to :obj:`None`.
+            dofs_per_node(int):    Number of dofs of each node, whose dofs must be
+                                   numbered consecutively. If specified together with
+                                   *dof_points*, systems with more than *max_direct_dofs*
+                                   equations are solved by
+                                   :class:`.multigrid.SmoothedAggregationSolver`
+                                   instead of a direct factorization, whose memory
+                                   use grows faster than the size of the model.
+                                   Defaults to :obj:`None`.
+            max_direct_dofs(int):  Size of the largest system which is factorized.
+                                   Defaults to 100000.
+        """
+        fixed_dofs = np.unique(fixed_dofs)
+        tied_dofs  = np.setdiff1d(np.unique(tied_dofs), fixed_dofs)
+        
+        # -1 denotes a fixed dof.
+        full_to_reduced = -np.ones(num_dofs, dtype=int)
+        is_free = np.ones(num_dofs, dtype=bool)
+        is_free[fixed_dofs] = False
+        is_free[tied_dofs]  = False
+        num_free = is_free.sum()
+        full_to_reduced[is_free]   = np.arange(num_free)
+        full_to_reduced[tied_dofs] = num_free
+        
+        self.num_dofs        = num_dofs
+        self.num_reduced     = num_free + 1
+        self.master          = num_free
+        self.full_to_reduced = full_to_reduced
+        self.dofs_per_node   = dofs_per_node
+        self.max_direct_dofs = max_direct_dofs
+        rows = np.where(full_to_reduced >= 0)[0]
+        self.T = sparse.csr_matrix( (np.ones(len(rows)), (rows, full_to_reduced[rows])),
+                                    shape=(num_dofs, self.num_reduced) )
+        self.free_dofs       = np.where(is_free)[0]
+        self.free_points     = None
+        self._order          = None
+        if dof_points is not None:
+            self.free_points = dof_points[self.free_dofs]
+        logger.debug('Reduced %i dofs to %i dofs.', num_dofs, self.num_reduced)
+    
+    def reduce_matrix(self, K):
+        """Return :math:`T^T K T`."""
+        return (self.T.T * K * self.T).tocsr()
+    
+    def reduce_vector(self, f):
+        """Return :math:`T^T f`."""
+        return self.T.T * f
+    
+    def expand(self, q):
+        """Return the full displacement vector :math:`T q`."""
+        return self.T * q
+    
+    def factorize(self, K_r, include_master):
+        """Factorize the reduced stiffness matrix.
+        
+        Systems without the master dof which have more than *self.max_direct_dofs*
+        equations are not factorized. They are solved by
+        :class:`.multigrid.SmoothedAggregationSolver` if *self.dofs_per_node* is defined.
+        
+        Args:
+            K_r(sparse matrix):  Reduced stiffness matrix,
+                                 with or without the master dof as its last dof.
+            include_master(bool): Whether *K_r* includes the master dof.
+        
+        Returns:
+            A function which returns the solution of :math:`K_r q = f` for a given *f*.
+        
+        Raises:
+            RuntimeError: If *K_r* is solved iteratively and the iterations
+                          do not converge, e.g. if it is singular.
+        """
+        if self.free_points is None:
+            return sparse_linalg.factorized(K_r.tocsc())
+        
+        if ( not include_master and self.dofs_per_node is not None and
+             K_r.shape[0] > self.max_direct_dofs ):
+            components = self.free_dofs % self.dofs_per_node
+            modes = multigrid.rigid_body_modes(self.free_points, components, self.dofs_per_node)
+            solver = multigrid.SmoothedAggregationSolver(K_r, modes, self.free_dofs // self.dofs_per_node)
+            return solver.solve
+        
+        if self._order is None:
+            num_free = self.num_reduced - 1
+            graph = K_r[:num_free, :num_free]
+            self._order = nested_dissection_order(graph, self.free_points)
+        order = self._order
+        if include_master:
+            order = np.append(order, self.master)
+        K_ordered = K_r.tocsr()[order, :][:, order].tocsc()
+        lu = sparse_linalg.splu(K_ordered, permc_spec='NATURAL', diag_pivot_thresh=0.0,
+                                options=dict(SymmetricMode=True))
+        logger.debug('Factorized the stiffness matrix. Non-zeros in L: %i.', lu.L.nnz)
+        
+        def solve(f):
+            q = np.empty(len(order))
+            q[order] = lu.solve(f[order])
+            return q
+        return solve
+    
+    def solve_linear(self, K, loading_type, loading_data):
+        """Solve a linear problem for the given loading of the master dof.
+        
+        The other dofs are solved for a unit displacement of the master dof,
+        which is then scaled to the prescribed displacement or force. Therefore,
+        only the matrix without the master dof is factorized or solved.
+        
+        Args:
+            K(sparse matrix):   Stiffness matrix of the full model.
+            loading_type(str):  *'disp'* or *'force'*.
+            loading_data(float): The prescribed displacement or force.
+        
+        Returns:
+            A tuple *(u, reaction)* containing the full displacement vector
+            and the force acting on the master dof.
+        
+        Raises:
+            RuntimeError: If the stiffness matrix is singular.
+        """
+        K_r = self.reduce_matrix(K)
+        others = np.arange(self.num_reduced - 1)
+        q = np.zeros(self.num_reduced)
+        q[self.master] = 1.0
+        rhs = -K_r[others, :][:, [self.master]].toarray().ravel()
+        try:
+            q[others] = self.factorize(K_r[others, :][:, others], False)(rhs)
+        except RuntimeError:
+            q[others] = np.nan
+        stiffness = K_r[[self.master], :].dot(q)[0]
+        if not np.isfinite(q).all() or not stiffness > 0:
+            raise RuntimeError('The stiffness matrix is singular.' +
+                               ' The structure is not properly connected or constrained.')
+        if loading_type == 'disp':
+            q *= loading_data
+        else:
+            q *= loading_data / stiffness
+        reaction = stiffness * q[self.master]
+        return (self.expand(q), reaction)
+#
+
+def nested_dissection_order(graph, points, leaf_size=64):
+    """Order the equations of a sparse system using geometric nested dissection.
+    
+    The equations are recursively bisected at the median of their longest
+    coordinate direction and the equations connecting the two halves
+    (the separator) are ordered after them. This ordering keeps the fill-in
+    of the factorization of lattice and mesh stiffness matrices small.
+    
+    Args:
+        graph(sparse matrix): (n,n) sparse matrix whose non-zeros define
+                              the connections between the equations.
+        points(np.array):     (n,2) array of the coordinates of each equation.
+        leaf_size(int):       Parts with this many equations or less are not bisected.
+                              Defaults to 64.
+    
+    Returns:
+        An integer array containing the new order of the equations.
+    """
+    graph   = sparse.csr_matrix(graph)
+    indptr  = graph.indptr
+    indices = graph.indices
+    side    = np.zeros(graph.shape[0], dtype=np.int8)
+    
+    def bisect(nodes):
+        if len(nodes) <= leaf_size:
+            return [nodes]
+        coords = points[nodes]
+        axis = np.argmax(coords.max(axis=0) - coords.min(axis=0))
+        half = len(nodes) // 2
+        partition = np.argpartition(coords[:, axis], half)
+        (left, right) = (nodes[partition[:half]], nodes[partition[half:]])
+        
+        # The separator is made of the nodes in the left half connected to the right half.
+        side[left]  = 1
+        side[right] = 2
+        counts = indptr[left + 1] - indptr[left]
+        owners = np.repeat(left, counts)
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        neighbours = indices[np.repeat(indptr[left], counts) + offsets]
+        separator = np.unique(owners[side[neighbours] == 2])
+        side[nodes] = 0
+        
+        left = np.setdiff1d(left, separator, assume_unique=True)
+        return bisect(left) + bisect(right) + [separator]
+    
+    return np.concatenate(bisect(np.arange(graph.shape[0])))
+#
+
+def assemble_sparse(element_matrices, element_dofs, num_dofs):
+    """Assemble element matrices into a sparse global matrix.
+    
+    Args:
+        element_matrices(np.array): (m,k,k) array of element matrices.
+        element_dofs(np.array):     (m,k) integer array of the global dofs of each element.
+        num_dofs(int):              Number of dofs in the model.
+    
+    Returns:
+        A :class:`scipy.sparse.csr_matrix` where duplicate entries are summed.
+    """
+    k = element_dofs.shape[1]
+    rows = np.repeat(element_dofs, k, axis=1).ravel()
+    cols = np.tile(element_dofs, (1, k)).ravel()
+    return sparse.coo_matrix( (element_matrices.ravel(), (rows, cols)),
+                              shape=(num_dofs, num_dofs) ).tocsr()
+#
+
+def find_edge_nodes(coords, loading_direction, tol=1E-6):
+    """Find the node sets used for post-processing a planar structure.
+    
+    The sets are the native counterpart of the sets defined by
+    :meth:`.auxetic_structure.AuxeticStructure._perpare_for_loading`.
+    
+    Args:
+        coords(np.array):       (n,2) array of nodal coordinates.
+        loading_direction(int): 0 or 1.
+        tol(float):             Tolerance relative to the size of the structure.
+                                Defaults to 1E-6.
+    
+    Returns:
+        A dictionary containing integer arrays of node indices for the keys
+        *'LD-Edge-1'*, *'LD-Edge-2'*, *'TD-Edge-1'*, *'TD-Edge-2'*,
+        *'Mid-Vertice-1'*, and *'Mid-Vertice-2'*.
+    """
+    transverse_direction = 1 - loading_direction
+    coords_min = coords.min(axis=0)
+    coords_max = coords.max(axis=0)
+    tol = tol * max(coords_max - coords_min)
+    
+    sets = dict()
+    for (name, direction) in (('LD', loading_direction), ('TD', transverse_direction)):
+        sets[name+'-Edge-1'] = np.where(abs(coords[:, direction] - coords_min[direction]) < tol)[0]
+        sets[name+'-Edge-2'] = np.where(abs(coords[:, direction] - coords_max[direction]) < tol)[0]
+    
+    # The midpoints are the nodes of the transverse edges nearest to the middle.
+    middle = (coords_min[loading_direction] + coords_max[loading_direction]) / 2.0
+    for i in (1, 2):
+        edge = sets['TD-Edge-%i'%i]
+        sets['Mid-Vertice-%i'%i] = edge[[np.argmin(abs(coords[edge, loading_direction] - middle))]]
+    return sets
+#
+
+def compute_edge_output(coords, u_history, frame_times, node_sets, loading_direction):
+    """Calculate the output table from nodal displacements.
+    
+    Args:
+        coords(np.array):       (n,2) array of nodal coordinates.
+        u_history(np.array):    (f,n,2) array of nodal displacements for each frame.
+        frame_times(np.array):  Time of each frame.
+        node_sets(dict):        Node sets returned by :func:`find_edge_nodes`.
+        loading_direction(int): 0 or 1.
+    
+    Returns:
+        A numpy array with the same columns as :func:`.postprocessing.get_numerical_output`.
+    """
+    ld = loading_direction
+    td = 1 - loading_direction
+    ld_disp = ( u_history[:, node_sets['LD-Edge-2'], ld].mean(axis=1) -
+                u_history[:, node_sets['LD-Edge-1'], ld].mean(axis=1) )
+    td_disp_mean = ( u_history[:, node_sets['TD-Edge-2'], td].mean(axis=1) -
+                     u_history[:, node_sets['TD-Edge-1'], td].mean(axis=1) )
+    td_disp_midpoint = ( u_history[:, node_sets['Mid-Vertice-2'][0], td] -
+                         u_history[:, node_sets['Mid-Vertice-1'][0], td] )
+    
+    ld_dist_0 = ( coords[node_sets['LD-Edge-2'][0], ld] -
+                  coords[node_sets['LD-Edge-1'][0], ld] )
+    mean_dist_0 = ( coords[node_sets['TD-Edge-2'][0], td] -
+                    coords[node_sets['TD-Edge-1'][0], td] )
+    midpoint_dist_0 = ( coords[node_sets['Mid-Vertice-2'][0], td] -
+                        coords[node_sets['Mid-Vertice-1'][0], td] )
+    
+    return postprocessing.compute_output_table(np.arange(len(frame_times)), frame_times,
+                                               ld_disp, td_disp_mean, td_disp_midpoint,
+                                               ld_dist_0, mean_dist_0, midpoint_dist_0)
+#
+
+def compute_linear_output(coords, u, step_params, node_sets, loading_direction):
+    """Calculate the output table of a linear analysis.
+    
+    The loading is ramped linearly over the step, so the displacements
+    of each frame are proportional to the final displacements.
+    
+    Args:
+        coords(np.array):         (n,2) array of nodal coordinates.
+        u(np.array):              (n,2) array of the final nodal displacements.
+        step_params(StepParams):  Special namedtuple describing the step.
+                                  May be :obj:`None` which uses the default step values.
+        node_sets(dict):          Node sets returned by :func:`find_edge_nodes`.
+        loading_direction(int):   0 or 1.
+    
+    Returns:
+        A numpy array with the same columns as :func:`.postprocessing.get_numerical_output`.
+    """
+    if step_params is None:
+        step_params = StepParams()
+    frame_times = return_frame_times(step_params)
+    u_history = ( frame_times / step_params.time_period )[:, None, None] * u[None]
+    return compute_edge_output(coords, u_history, frame_times, node_sets, loading_direction)
+#
@@ -0,0 +1,379 @@
+"""Native geometrically nonlinear frame solver.
+
+This module analyzes the frame models created by :func:`.frame.create_frame_model`
+using co-rotational Euler-Bernoulli beam elements, so the large rotations of the
+struts of reentrant structures and the resulting change of Poisson's ratio
+with strain are captured. The strains of the struts remain small and the
+material is linear elastic.
+
+The load is applied incrementally, similar to the static general step
+defined by :meth:`.auxetic_structure.AuxeticStructure.define_step`:
+Each increment is solved using modified Newton iterations, which reuse the
+factorized tangent stiffness matrix until their convergence slows down.
+If an increment does not converge, it is restarted with a smaller increment
+size (a cutback),
+and the increment size is increased after increments which converge quickly.
+The same :class:`StepParams` are used for the increment sizes and
+every converged increment is written as an output frame.
+"""
+
+import os
+import logging
+from collections import namedtuple
+import numpy as np
+
+from .. import geometry
+from .. import postprocessing
+from ..classes.auxetic_structure_params import StepParams
+from . import common
+from . import frame
+
+logger = logging.getLogger(__name__)
+
+IncrementStats = \
+    namedtuple('IncrementStats',
+               ['increment', 'time', 'inc_size', 'num_iterations',
+                'num_cutbacks', 'residual', 'correction'] )
+try:
+    IncrementStats.__doc__ = """namedtuple instance describing the convergence of a converged increment."""
+    IncrementStats.increment.__doc__      = """(:class:`int`) Number of the increment."""
+    IncrementStats.time.__doc__           = """(:class:`float`) Step time at the end of the increment."""
+    IncrementStats.inc_size.__doc__       = """(:class:`float`) Size of the increment."""
+    IncrementStats.num_iterations.__doc__ = """(:class:`int`) Number of Newton iterations of the converged attempt."""
+    IncrementStats.num_cutbacks.__doc__   = """(:class:`int`) Number of cutbacks before the increment converged."""
+    IncrementStats.residual.__doc__       = """(:class:`float`) Largest residual force relative to the average force."""
+    IncrementStats.correction.__doc__     = """(:class:`float`) Largest displacement correction relative to
+                                               the largest displacement increment."""
+except (AttributeError, TypeError) as e:
+    pass
+
+_stats_fmt = ('%i', '%f', '%f', '%i', '%i', '%.6e', '%.6e')
+
+class CorotationalFrame(object):
+    """Internal forces and tangent stiffness of a frame using co-rotational beam elements.
+    
+    The dofs of each node are ordered as *(u_x, u_y, rotation)*.
+    """
+    
+    def __init__(self, coords, elements, E, area, inertia):
+        """Initialize the frame.
+        
+        Args:
+            coords(np.array):   (n,2) array of nodal coordinates.
+            elements(np.array): (m,2) integer array of element nodes.
+            E(float):           Elastic modulus.
+            area(np.array):     Cross-section area of each element.
+            inertia(np.array):  Second moment of area of each element.
+        
+        Raises:
+            ValueError: If an element has a zero length.
+        """
+        self.coords   = coords
+        self.elements = elements
+        self.dofs     = frame.element_dofs(elements)
+        self.num_dofs = 3 * len(coords)
+        
+        delta = coords[elements[:, 1]] - coords[elements[:, 0]]
+        self.length_0 = np.hypot(delta[:, 0], delta[:, 1])
+        if (self.length_0 <= 0).any():
+            raise ValueError('The frame contains %i elements with a zero length.'
+                             %(self.length_0 <= 0).sum())
+        self.dir_0    = delta / self.length_0[:, None]
+        self.EA = E * area
+        self.EI = E * inertia
+    
+    def evaluate(self, u, need_stiffness=True):
+        """Calculate the internal forces and the tangent stiffness matrix.
+        
+        Args:
+            u(np.array):          Displacement vector of the model.
+            need_stiffness(bool): If :obj:`False`, the stiffness matrix is not calculated.
+                                  Defaults to :obj:`True`.
+        
+        Returns:
+            A tuple *(f_int, K)* containing the internal force vector and the
+            sparse tangent stiffness matrix, which is :obj:`None` if not requested.
+        """
+        u_e = u[self.dofs]  # (m,6)
+        (L0, EA, EI) = (self.length_0, self.EA, self.EI)
+        delta = self.length_0[:, None] * self.dir_0 + u_e[:, 3:5] - u_e[:, 0:2]
+        L = np.hypot(delta[:, 0], delta[:, 1])
+        (c, s) = (delta[:, 0] / L, delta[:, 1] / L)
+        
+        # Rigid rotation of the element and the local (deformational) quantities.
+        (c0, s0) = (self.dir_0[:, 0], self.dir_0[:, 1])
+        rigid_rotation = np.arctan2(c0*s - s0*c, c0*c + s0*s)
+        extension = L - L0
+        theta_1 = u_e[:, 2] - rigid_rotation
+        theta_2 = u_e[:, 5] - rigid_rotation
+        
+        N  = EA / L0 * extension
+        M1 = EI / L0 * (4.0*theta_1 + 2.0*theta_2)
+        M2 = EI / L0 * (2.0*theta_1 + 4.0*theta_2)
+        
+        zeros = np.zeros_like(c)
+        ones  = np.ones_like(c)
+        r = np.column_stack(( -c, -s, zeros, c, s, zeros ))
+        z = np.column_stack((  s, -c, zeros, -s, c, zeros ))
+        B = np.empty((len(L), 3, 6))
+        B[:, 0] = r
+        B[:, 1] = -z / L[:, None]
+        B[:, 2] = -z / L[:, None]
+        B[:, 1, 2] += ones
+        B[:, 2, 5] += ones
+        
+        q = np.column_stack(( N, M1, M2 ))
+        f_e = np.einsum('mki,mk->mi', B, q)
+        f_int = np.bincount(self.dofs.ravel(), weights=f_e.ravel(), minlength=self.num_dofs)
+        if not need_stiffness:
+            return (f_int, None)
+        
+        # Material part in local coordinates.
+        K_l = np.zeros((len(L), 3, 3))
+        K_l[:, 0, 0] = EA / L0
+        K_l[:, 1, 1] = 4.0 * EI / L0
+        K_l[:, 2, 2] = 4.0 * EI / L0
+        K_l[:, 1, 2] = 2.0 * EI / L0
+        K_l[:, 2, 1] = 2.0 * EI / L0
+        K_e  = np.einsum('mki,mkl,mlj->mij', B, K_l, B)
+        # Geometric part.
+        K_e += np.einsum('mi,mj,m->mij', z, z, N / L)
+        K_e += np.einsum('mi,mj,m->mij', r, z, (M1 + M2) / L**2)
+        K_e += np.einsum('mi,mj,m->mij', z, r, (M1 + M2) / L**2)
+        return (f_int, common.assemble_sparse(K_e, self.dofs, self.num_dofs))
+#
+
+def solve_corotational(coords, elements, thickness, material_params, loading_params,
+                       step_params=None, node_sets=None,
+                       residual_tol=0.005, correction_tol=0.01, max_iterations=12,
+                       cutback_factor=0.25, growth_factor=1.5, refresh_ratio=0.5):
+    """Analyze a frame model using geometrically nonlinear co-rotational beams.
+    
+    An increment converges when the largest residual force is less than
+    *residual_tol* times the largest internal force and the largest
+    displacement correction is less than *correction_tol* times the largest
+    displacement increment, similar to the default controls of Abaqus.
+    The increments are solved using modified Newton iterations,
+    see :func:`_solve_increment`.
+    
+    Args:
+        coords(np.array):                (n,2) array of nodal coordinates.
+        elements(np.array):              (m,2) integer array of strut nodes.
+        thickness(np.array):             Thickness of each strut.
+        material_params(MaterialParams): Special namedtuple describing the material.
+                                         Only *material_params.elastic* is used.
+        loading_params(LoadingParams):   Special namedtuple describing the loading.
+        step_params(StepParams):         Special namedtuple describing the step.
+                                         Defaults to :obj:`None` which uses
+                                         the default step values.
+        node_sets(dict):                 Node sets as returned by
+                                         :func:`.common.find_edge_nodes`.
+                                         Defaults to :obj:`None` which finds them
+                                         from the bounding box of the model.
+        residual_tol(float):             Tolerance of the residual forces. Defaults to 0.005.
+        correction_tol(float):           Tolerance of the displacement corrections.
+                                         Defaults to 0.01.
+        max_iterations(int):             Maximum number of iterations of each attempt.
+                                         Defaults to 12.
+        cutback_factor(float):           Factor for reducing the increment size
+                                         after an attempt fails. Defaults to 0.25.
+        growth_factor(float):            Factor for increasing the increment size after
+                                         two consecutive increments converge in less than
+                                         five iterations. Defaults to 1.5.
+        refresh_ratio(float):            The tangent stiffness matrix is updated after an
+                                         iteration reduces the norm of the residual forces
+                                         by less than this factor. Defaults to 0.5.
+    
+    Returns:
+        A tuple *(output_table, increment_stats)* where *output_table* has the same
+        columns as :func:`.postprocessing.get_numerical_output` with one row per
+        converged increment, and *increment_stats* is a list of :class:`IncrementStats`.
+    
+    Raises:
+        RuntimeError: If the increment size becomes less than *step_params.min_inc_size*
+                      or *step_params.max_num_inc* is exceeded.
+    """
+    if step_params is None:
+        step_params = StepParams()
+    (E, nu) = common.get_elastic_constants(material_params)
+    (loading_direction, loading_type, loading_data) = common.get_loading(loading_params)
+    if node_sets is None:
+        node_sets = common.find_edge_nodes(coords, loading_direction)
+    
+    (area, inertia) = frame.get_section_properties(thickness)
+    model = CorotationalFrame(coords, elements, E / (1.0 - nu**2), area, inertia)
+    (fixed_dofs, tied_dofs) = frame.get_loading_constraints(node_sets, loading_direction)
+    system = common.ReducedSystem(model.num_dofs, fixed_dofs, tied_dofs,
+                                  dof_points=np.repeat(coords, 3, axis=0), dofs_per_node=3)
+    if loading_type == 'disp':
+        unknowns = np.arange(system.num_reduced - 1)
+    else:
+        unknowns = np.arange(system.num_reduced)
+    
+    time_period = float(step_params.time_period)
+    inc_size    = step_params.init_inc_size
+    q = np.zeros(system.num_reduced)
+    (time, increment, num_fast) = (0.0, 0, 0)
+    u_history   = [np.zeros((len(coords), 2))]
+    frame_times = [0.0]
+    increment_stats = []
+    logger.info('Starting nonlinear analysis of a frame with %i dofs.', model.num_dofs)
+    
+    while time < time_period * (1.0 - 1E-9):
+        increment += 1
+        if increment > step_params.max_num_inc:
+            raise RuntimeError('The maximum number of increments (%i) has been exceeded.'
+                               %step_params.max_num_inc)
+        num_cutbacks = 0
+        while True:
+            inc_size = min(inc_size, step_params.max_inc_size, time_period - time)
+            load_factor = (time + inc_size) / time_period
+            (q_new, num_iterations, residual, correction) = _solve_increment(
+                    model, system, q, unknowns, loading_type, loading_data * load_factor,
+                    residual_tol, correction_tol, max_iterations, refresh_ratio)
+            if q_new is not None:
+                break
+            num_cutbacks += 1
+            inc_size *= cutback_factor
+            logger.debug('Increment %i did not converge. Cutting back the increment size to %f.',
+                         increment, inc_size)
+            if inc_size < step_params.min_inc_size * (1.0 - 1E-9):
+                raise RuntimeError(('Increment %i did not converge and the increment size' +
+                                    ' is less than the minimum (%f).')
+                                   %(increment, step_params.min_inc_size))
+        
+        q = q_new
+        time += inc_size
+        u_history.append(system.expand(q).reshape((-1, 3))[:, :2])
+        frame_times.append(time)
+        increment_stats.append(IncrementStats(increment, time, inc_size, num_iterations,
+                                              num_cutbacks, residual, correction))
+        logger.debug('Increment %i converged in %i iterations with %i cutbacks. Time: %f.',
+                     increment, num_iterations, num_cutbacks, time)
+        
+        # Increase the increment size after two consecutive fast increments.
+        num_fast = num_fast + 1 if (num_iterations < 5 and num_cutbacks == 0) else 0
+        if num_fast >= 2:
+            inc_size *= growth_factor
+            num_fast = 0
+    
+    logger.info('Nonlinear analysis completed in %i increments and %i iterations.',
+                increment, sum(stats.num_iterations for stats in increment_stats))
+    output_table = common.compute_edge_output(coords, np.array(u_history), np.array(frame_times),
+                                              node_sets, loading_direction)
+    return (output_table, increment_stats)
+#
+
+def _solve_increment(model, system, q_start, unknowns, loading_type, loading_value,
+                     residual_tol, correction_tol, max_iterations, refresh_ratio):
+    """Solve one increment using modified Newton iterations.
+    
+    The tangent stiffness matrix of the start of the increment is factorized once
+    and reused by the following iterations. The tangent stiffness matrix is only
+    updated and factorized again after an iteration which reduces the norm of
+    the residual forces by less than *refresh_ratio*.
+    
+    Returns:
+        A tuple *(q, num_iterations, residual, correction)*.
+        *q* is :obj:`None` if the increment did not converge.
+    """
+    master = system.master
+    q = q_start.copy()
+    f_ext = np.zeros(system.num_reduced)
+    if loading_type == 'disp':
+        q[master] = loading_value
+    else:
+        f_ext[master] = loading_value
+    
+    # The first iteration uses the tangent stiffness of the start of the increment
+    # and linearizes the effect of the prescribed displacement.
+    (residual, correction) = (np.inf, np.inf)
+    (f_int, K) = model.evaluate(system.expand(q_start))
+    f_int_r = system.reduce_vector(f_int)
+    K_r = system.reduce_matrix(K)
+    r = (f_ext - f_int_r)[unknowns]
+    if loading_type == 'disp':
+        r -= K_r[unknowns, :][:, [master]].toarray().ravel() * (q[master] - q_start[master])
+    (solve, num_factorizations) = (None, 0)
+    for iteration in range(1, max_iterations + 1):
+        if not np.isfinite(r).all():
+            return (None, iteration, residual, correction)
+        try:
+            if solve is None:
+                solve = system.factorize(K_r[unknowns, :][:, unknowns],
+                                         len(unknowns) == system.num_reduced)
+                num_factorizations += 1
+            dq = solve(r)
+        except RuntimeError:
+            # The tangent stiffness matrix is singular.
+            return (None, iteration, residual, correction)
+        q[unknowns] += dq
+        
+        r_norm = np.linalg.norm(r)
+        (f_int, _) = model.evaluate(system.expand(q), need_stiffness=False)
+        f_int_r = system.reduce_vector(f_int)
+        r = (f_ext - f_int_r)[unknowns]
+        force_scale = max( abs(f_int_r).max(), abs(f_ext).max(), 1E-30 )
+        residual   = abs(r).max() / force_scale
+        correction = abs(dq).max() / max( abs(q - q_start).max(), 1E-30 )
+        if residual <= residual_tol and correction <= correction_tol:
+            logger.debug('Converged in %i iterations with %i factorizations.',
+                         iteration, num_factorizations)
+            return (q, iteration, residual, correction)
+        if not np.linalg.norm(r) <= refresh_ratio * r_norm:
+            (_, K) = model.evaluate(system.expand(q))
+            K_r = system.reduce_matrix(K)
+            solve = None
+    return (None, max_iterations, residual, correction)
+#
+
+def write_increment_stats(increment_stats, structure_name, folder_path):
+    """Write the output of :func:`solve_corotational` to a csv file."""
+    with open(os.path.join(folder_path, structure_name+' convergence.csv') ,'w') as file:
+        file.write('Modeling and post-processing done by PyAuxetic %s\n'%postprocessing.__version__)
+        file.write( ', '.join(IncrementStats._fields) + '\n' )
+        np.savetxt(fname=file, X=np.array(increment_stats, dtype=float), fmt=_stats_fmt,
+                   delimiter=', ', newline='\n')
+    logger.info('Exported the convergence statistics for structure %s.', structure_name)
+#
+
+def run_corotational_analysis(unit_cell_params, pattern_params,
+                              material_params , loading_params,
+                              step_params=None, structure_name=None, folder_path=None):
+    """Model and analyze a planar structure using the native nonlinear frame solver.
+    
+    Args:
+        unit_cell_params:                Parameters describing the unit cell geometry.
+                                         See :func:`.main.main_single`.
+        pattern_params(PatternParams):   Special namedtuple describing the parameters
+                                         for patterning the unit cell(s).
+        material_params(MaterialParams): Special namedtuple describing the material.
+                                         Only *material_params.elastic* is used.
+        loading_params(LoadingParams):   Special namedtuple describing the loading.
+        step_params(StepParams):         Special namedtuple describing the step.
+                                         Defaults to :obj:`None`.
+        structure_name(str):             Name of the structure used for the output files.
+                                         Defaults to :obj:`None`.
+        folder_path(str):                If specified, the results and the convergence
+                                         statistics are written to this folder.
+                                         Defaults to :obj:`None`.
+    
+    Returns:
+        A tuple *(output_table, increment_stats)*. See :func:`solve_corotational`.
+    """
+    logger.info('Starting nonlinear frame analysis of structure %s.', structure_name)
+    structure_geometry = geometry.PlanarStructureGeometry(unit_cell_params, pattern_params,
+                                                          loading_params.direction)
+    (coords, elements, thickness) = frame.create_frame_model(structure_geometry)
+    (output_table, increment_stats) = solve_corotational(coords, elements, thickness,
+                                                         material_params, loading_params,
+                                                         step_params)
+    
+    if folder_path is not None:
+        if not os.path.isdir(folder_path):
+            os.makedirs(folder_path)
+        postprocessing.write_single_numerical_output(output_table, structure_name, folder_path)
+        write_increment_stats(increment_stats, structure_name, folder_path)
+    logger.info('Nonlinear frame analysis of structure %s completed.', structure_name)
+    return (output_table, increment_stats)
+#
@@ -0,0 +1,360 @@
+"""Native linear frame (beam lattice) solver.
+
+This module idealizes each reentrant2d unit cell as a set of Euler-Bernoulli
+struts placed on the centerlines of the tail, diagonal and vertical struts.
+It is intended for structures which are too large to be meshed with
+continuum elements. Element stiffness matrices are computed in closed form
+for all struts at once and assembled into a sparse matrix. Large models are
+solved iteratively by :mod:`.multigrid`, whose memory use grows linearly with
+the number of struts, so models with millions of struts can be analyzed on a
+single machine.
+
+The idealization is as follows:
+
+    - The tail struts run along the vertical centerline of the unit cell
+      and connect to the tail struts of the neighbouring unit cells.
+    - The vertical struts of neighbouring unit cells are bonded and lie on
+      their common boundary. Where two vertical struts overlap, they
+      are merged into one strut with the sum of their thicknesses.
+    - The diagonal struts connect the end of the tail struts
+      to the centerline of the vertical struts.
+    - The ribbons are modeled as struts normal to the loading edges
+      connecting the structure to the outer face of the ribbons, which
+      is loaded the same way as :meth:`.auxetic_structure.AuxeticStructure.define_bcs`.
+      The second ribbon also has a strut along its outer face.
+
+The struts have a unit depth and a plane strain modulus, consistent with the
+plane strain elements used by Abaqus and :mod:`.plane_strain`.
+"""
+
+import os
+import logging
+import numpy as np
+
+from .. import geometry
+from .. import postprocessing
+from . import common
+
+logger = logging.getLogger(__name__)
+
+def get_strut_properties(structure_geometry):
+    """Return the centerline dimensions of the unit cells in a structure.
+    
+    Args:
+        structure_geometry(PlanarStructureGeometry): Geometry of the structure.
+    
+    Returns:
+        A dictionary mapping each unit cell id to a dictionary containing
+        the keys *'tail_length'*, *'tail_thickness'*, *'diag_thickness'*,
+        *'vert_thickness'*, and *'vert_end'*, which is the distance of the
+        ends of the vertical strut centerline from the bottom of the unit cell.
+    """
+    half_width = structure_geometry.bound_size[0] / 2.0
+    properties = dict()
+    for (uc_id, params) in structure_geometry.params.items():
+        angle = np.deg2rad(params.diag_strut_angle)
+        properties[uc_id] = dict(tail_length    = params.tail_strut_length,
+                                 tail_thickness = params.tail_strut_thickness,
+                                 diag_thickness = params.diag_strut_thickness,
+                                 vert_thickness = params.vert_strut_thickness,
+                                 vert_end       = params.tail_strut_length - half_width / np.tan(angle) )
+    return properties
+#
+
+def _snap_to_grid(points, grid_size):
+    """Return the integer grid coordinates of points, which are equal for coincident points."""
+    return np.round(points / grid_size).astype(np.int64)
+#
+
+def create_frame_model(structure_geometry, tol=1E-6):
+    """Create the struts of a planar structure.
+    
+    All struts are created using array operations over the unit cells.
+    Coincident nodes are merged and coincident struts are merged
+    into one strut with the sum of their thicknesses. Struts whose nodes
+    are merged, i.e. which have a zero length, are removed.
+    
+    Args:
+        structure_geometry(PlanarStructureGeometry): Geometry of the structure.
+        tol(float):                                  Tolerance for merging the nodes,
+                                                     relative to the size of the unit cells.
+                                                     Defaults to 1E-6.
+    
+    Returns:
+        A tuple *(coords, elements, thickness)* containing a (n,2) array of nodal
+        coordinates, a (m,2) integer array of strut nodes, and the thickness of each strut.
+    
+    Raises:
+        ValueError: If the structure is periodic.
+    """
+    if structure_geometry.is_periodic:
+        raise ValueError('Periodic structures are not supported by the frame solver.')
+    
+    (width, height) = structure_geometry.bound_size
+    half_width = width / 2.0
+    properties = get_strut_properties(structure_geometry)
+    (indices, ids) = structure_geometry.cells()
+    
+    # Lookup tables of the properties of each cell. Index 0 is an empty cell.
+    id_list = np.array(sorted(properties.keys()))
+    def lookup(key):
+        return np.concatenate(( [0.0], [properties[i][key] for i in id_list] ))
+    tail_length    = lookup('tail_length')
+    tail_thickness = lookup('tail_thickness')
+    diag_thickness = lookup('diag_thickness')
+    vert_thickness = lookup('vert_thickness')
+    vert_end       = lookup('vert_end')
+    
+    def table_index(ids):
+        return np.where(ids != 0, np.searchsorted(id_list, ids) + 1, 0)
+    structure_map = structure_geometry.structure_map
+    table = table_index(ids)
+    
+    origin = structure_geometry.core_origin + indices * structure_geometry.bound_size
+    (x0, y0) = (origin[:, 0], origin[:, 1])
+    xc = x0 + half_width
+    (lt, ye) = (tail_length[table], vert_end[table])
+    
+    # Struts are defined as (start_x, start_y, end_x, end_y, thickness).
+    struts = []
+    def add_struts(x1, y1, x2, y2, thickness):
+        struts.append(np.column_stack(( x1, y1, x2, y2, thickness )))
+    
+    add_struts(xc, y0                , xc, y0 + lt         , tail_thickness[table])
+    add_struts(xc, y0 + height       , xc, y0 + height - lt, tail_thickness[table])
+    for x_end in (x0, x0 + width):
+        add_struts(xc, y0 + lt         , x_end, y0 + ye         , diag_thickness[table])
+        add_struts(xc, y0 + height - lt, x_end, y0 + height - ye, diag_thickness[table])
+    
+    # Vertical struts. Each vertical boundary between cells (including the sides)
+    # has a strut from each of its cells, which are centered at the middle of the row.
+    # Only the boundaries of nonzero cells are used, so empty parts of the map cost nothing.
+    num_cells = np.array(structure_map.shape)
+    boundaries = np.vstack(( indices, indices + [1, 0] )).astype(np.int64)
+    boundaries = np.unique(boundaries[:, 0] * num_cells[1] + boundaries[:, 1])
+    (boundary_x, boundary_y) = (boundaries // num_cells[1], boundaries % num_cells[1])
+    table_a = table_index(structure_map.lookup(np.column_stack(( boundary_x - 1, boundary_y ))))
+    table_b = table_index(structure_map.lookup(np.column_stack(( boundary_x    , boundary_y ))))
+    
+    half_length_a = np.where(table_a != 0, height / 2.0 - vert_end[table_a], 0.0)
+    half_length_b = np.where(table_b != 0, height / 2.0 - vert_end[table_b], 0.0)
+    (thick_a, thick_b) = (vert_thickness[table_a], vert_thickness[table_b])
+    short_half = np.minimum(half_length_a, half_length_b)
+    long_half  = np.maximum(half_length_a, half_length_b)
+    thick_long = np.where(half_length_a >= half_length_b, thick_a, thick_b)
+    x = structure_geometry.core_origin[0] + boundary_x * width
+    y = structure_geometry.core_origin[1] + (boundary_y + 0.5) * height
+    add_struts(x, y - short_half, x, y + short_half, thick_a + thick_b)
+    add_struts(x, y + short_half, x, y + long_half , thick_long)
+    add_struts(x, y - short_half, x, y - long_half , thick_long)
+    
+    struts = np.vstack(struts)
+    grid_size = tol * min(width, height)
+    length = np.hypot(struts[:, 2] - struts[:, 0], struts[:, 3] - struts[:, 1])
+    struts = struts[length > grid_size]
+    
+    # Connect the loading edges to the outer face of the ribbons.
+    ld = structure_geometry.loading_direction
+    ribbon_width = structure_geometry.ribbon_width
+    core_min = structure_geometry.core_origin[ld]
+    core_max = core_min + num_cells[ld] * structure_geometry.bound_size[ld]
+    ribbon_struts = []
+    for (edge_value, outer_value) in ((core_min, core_min - ribbon_width),
+                                      (core_max, core_max + ribbon_width)):
+        ends = np.vstack(( struts[:, 0:2], struts[:, 2:4] ))
+        ends = ends[abs(ends[:, ld] - edge_value) < grid_size]
+        # Points which differ only by round-off are merged here, since they would
+        # create zero-length struts on the outer face.
+        (unique_grid, first) = np.unique(_snap_to_grid(ends, grid_size), axis=0, return_index=True)
+        ends = ends[first]
+        outer = ends.copy()
+        outer[:, ld] = outer_value
+        ribbon_struts.append(np.column_stack(( ends, outer, ribbon_width * np.ones(len(ends)) )))
+    # The outer face of the second ribbon moves as a whole in the loading direction,
+    # but can bend in the transverse direction.
+    outer = ribbon_struts[1][:, 2:4]
+    outer = outer[np.argsort(outer[:, 1 - ld])]
+    ribbon_struts.append(np.column_stack(( outer[:-1], outer[1:],
+                                           ribbon_width * np.ones(len(outer) - 1) )))
+    struts = np.vstack([struts] + ribbon_struts)
+    
+    # Merge coincident nodes using an integer grid.
+    ends = np.vstack(( struts[:, 0:2], struts[:, 2:4] ))
+    grid = _snap_to_grid(ends, grid_size)
+    grid = grid - grid.min(axis=0)
+    keys = grid[:, 0] * (grid[:, 1].max() + 1) + grid[:, 1]
+    (unique_keys, first, node_ids) = np.unique(keys, return_index=True, return_inverse=True)
+    coords = ends[first]
+    elements = node_ids.reshape((2, -1)).T
+    keep = elements[:, 0] != elements[:, 1]
+    (elements, struts) = (elements[keep], struts[keep])
+    
+    # Merge coincident struts.
+    elements = np.sort(elements, axis=1)
+    keys = elements[:, 0].astype(np.int64) * len(coords) + elements[:, 1]
+    (unique_keys, first, strut_ids) = np.unique(keys, return_index=True, return_inverse=True)
+    thickness = np.bincount(strut_ids.ravel(), weights=struts[:, 4])
+    elements = elements[first]
+    
+    logger.info('Created a frame model with %i nodes and %i struts.', len(coords), len(elements))
+    return (coords, elements, thickness)
+#
+
+def frame_stiffness(coords, elements, E, area, inertia):
+    """Compute stiffness matrices of 2D Euler-Bernoulli frame elements.
+    
+    The dofs of each node are ordered as *(u_x, u_y, rotation)*.
+    
+    Args:
+        coords(np.array):   (n,2) array of nodal coordinates.
+        elements(np.array): (m,2) integer array of element nodes.
+        E(float):           Elastic modulus.
+        area(np.array):     Cross-section area of each element.
+        inertia(np.array):  Second moment of area of each element.
+    
+    Returns:
+        A (m,6,6) array of element stiffness matrices in global coordinates.
+    """
+    delta = coords[elements[:, 1]] - coords[elements[:, 0]]
+    L = np.hypot(delta[:, 0], delta[:, 1])
+    (c, s) = (delta[:, 0] / L, delta[:, 1] / L)
+    a  = E * area / L
+    b  = 12.0 * E * inertia / L**3
+    c6 = 6.0 * E * inertia / L**2
+    d4 = 4.0 * E * inertia / L
+    d2 = 2.0 * E * inertia / L
+    
+    k11 = a*c*c + b*s*s
+    k12 = (a - b)*c*s
+    k22 = a*s*s + b*c*c
+    k13 = -c6*s
+    k23 = c6*c
+    
+    K = np.empty((len(elements), 6, 6))
+    block = np.array([[ k11, k12, k13],
+                      [ k12, k22, k23],
+                      [ k13, k23, d4 ]]).transpose((2, 0, 1))
+    K[:, 0:3, 0:3] = block
+    K[:, 3:6, 3:6] = block
+    K[:, 3:6, 3:6][:, 0:2, 2] *= -1
+    K[:, 3:6, 3:6][:, 2, 0:2] *= -1
+    coupling = np.array([[-k11, -k12,  k13],
+                         [-k12, -k22,  k23],
+                         [-k13, -k23,  d2 ]]).transpose((2, 0, 1))
+    K[:, 0:3, 3:6] = coupling
+    K[:, 3:6, 0:3] = coupling.transpose((0, 2, 1))
+    return K
+#
+
+def element_dofs(elements):
+    """Return the (m,6) array of the global dofs of frame elements."""
+    dtype = np.int32 if 3 * (elements.max() + 1) < 2**31 else np.int64
+    dofs = np.empty((len(elements), 6), dtype=dtype)
+    for i in range(3):
+        dofs[:, i]     = 3*elements[:, 0] + i
+        dofs[:, 3 + i] = 3*elements[:, 1] + i
+    return dofs
+#
+
+def get_section_properties(thickness, depth=1.0):
+    """Return the cross-section area and second moment of area of rectangular struts."""
+    return (thickness * depth, depth * thickness**3 / 12.0)
+#
+
+def get_loading_constraints(node_sets, loading_direction):
+    """Return the fixed and tied dofs of a frame model.
+    
+    The nodes of *'LD-Edge-1'* are fully fixed and the nodes of *'LD-Edge-2'*
+    are tied in the loading direction.
+    
+    Returns:
+        A tuple *(fixed_dofs, tied_dofs)*.
+    """
+    edge_1 = node_sets['LD-Edge-1']
+    fixed_dofs = np.concatenate(( 3*edge_1, 3*edge_1 + 1, 3*edge_1 + 2 ))
+    tied_dofs  = 3*node_sets['LD-Edge-2'] + loading_direction
+    return (fixed_dofs, tied_dofs)
+#
+
+def solve_frame(coords, elements, thickness, material_params, loading_params,
+                step_params=None, node_sets=None):
+    """Analyze a frame model.
+    
+    Args:
+        coords(np.array):                (n,2) array of nodal coordinates.
+        elements(np.array):              (m,2) integer array of strut nodes.
+        thickness(np.array):             Thickness of each strut.
+        material_params(MaterialParams): Special namedtuple describing the material.
+                                         Only *material_params.elastic* is used.
+        loading_params(LoadingParams):   Special namedtuple describing the loading.
+        step_params(StepParams):         Special namedtuple describing the step,
+                                         used for the output frames.
+                                         Defaults to :obj:`None` which uses
+                                         the default step values.
+        node_sets(dict):                 Node sets as returned by
+                                         :func:`.common.find_edge_nodes`.
+                                         Defaults to :obj:`None` which finds them
+                                         from the bounding box of the model.
+    
+    Returns:
+        A numpy array with the same columns as :func:`.postprocessing.get_numerical_output`.
+    """
+    (E, nu) = common.get_elastic_constants(material_params)
+    (loading_direction, loading_type, loading_data) = common.get_loading(loading_params)
+    if node_sets is None:
+        node_sets = common.find_edge_nodes(coords, loading_direction)
+    
+    (area, inertia) = get_section_properties(thickness)
+    K_e = frame_stiffness(coords, elements, E / (1.0 - nu**2), area, inertia)
+    K = common.assemble_sparse(K_e, element_dofs(elements), 3 * len(coords))
+    del K_e
+    
+    (fixed_dofs, tied_dofs) = get_loading_constraints(node_sets, loading_direction)
+    system = common.ReducedSystem(K.shape[0], fixed_dofs, tied_dofs,
+                                  dof_points=np.repeat(coords, 3, axis=0), dofs_per_node=3)
+    (u, reaction) = system.solve_linear(K, loading_type, loading_data)
+    logger.debug('Solved the linear system. Reaction force: %f.', reaction)
+    
+    return common.compute_linear_output(coords, u.reshape((-1, 3))[:, :2], step_params,
+                                        node_sets, loading_direction)
+#
+
+def run_frame_analysis(unit_cell_params, pattern_params,
+                       material_params , loading_params,
+                       step_params=None, structure_name=None, folder_path=None):
+    """Model and analyze a planar structure using the native frame solver.
+    
+    Args:
+        unit_cell_params:                Parameters describing the unit cell geometry.
+                                         See :func:`.main.main_single`.
+        pattern_params(PatternParams):   Special namedtuple describing the parameters
+                                         for patterning the unit cell(s).
+        material_params(MaterialParams): Special namedtuple describing the material.
+                                         Only *material_params.elastic* is used.
+        loading_params(LoadingParams):   Special namedtuple describing the loading.
+        step_params(StepParams):         Special namedtuple describing the step,
+                                         used for the output frames.
+                                         Defaults to :obj:`None`.
+        structure_name(str):             Name of the structure used for the output file.
+                                         Defaults to :obj:`None`.
+        folder_path(str):                If specified, the results are written to this
+                                         folder similar to :meth:`.output_results`.
+                                         Defaults to :obj:`None`.
+    
+    Returns:
+        A numpy array with the same columns as :func:`.postprocessing.get_numerical_output`.
+    """
+    logger.info('Starting frame analysis of structure %s.', structure_name)
+    structure_geometry = geometry.PlanarStructureGeometry(unit_cell_params, pattern_params,
+                                                          loading_params.direction)
+    (coords, elements, thickness) = create_frame_model(structure_geometry)
+    output_table = solve_frame(coords, elements, thickness, material_params,
+                               loading_params, step_params)
+    
+    if folder_path is not None:
+        if not os.path.isdir(folder_path):
+            os.makedirs(folder_path)
+        postprocessing.write_single_numerical_output(output_table, structure_name, folder_path)
+    logger.info('Frame analysis of structure %s completed.', structure_name)
+    return output_table
+#
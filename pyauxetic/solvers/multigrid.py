@@ -0,0 +1,266 @@
+"""Smoothed aggregation algebraic multigrid for the native solvers.
+
+A direct factorization of the stiffness matrix of a large lattice needs far
+more memory than the matrix itself, because of the fill-in of the factors.
+:class:`SmoothedAggregationSolver` instead solves the system using the
+conjugate gradient method preconditioned by a smoothed aggregation multigrid
+V-cycle, which only stores the matrix and a hierarchy of smaller matrices.
+Its memory use and solution time grow linearly with the size of the model.
+
+The nodes are grouped into aggregates using a distance-2 maximal independent
+set of the node graph. The rigid body modes of the nodes of each aggregate
+span the coarse space, which is smoothed by a damped Jacobi step, and
+Chebyshev polynomials of the Jacobi-preconditioned matrix are used as
+smoothers. All steps are vectorized using numpy and scipy.
+"""
+
+import logging
+import numpy as np
+from scipy import sparse
+from scipy.sparse import linalg as sparse_linalg
+
+logger = logging.getLogger(__name__)
+
+def rigid_body_modes(points, components, dofs_per_node):
+    """Return the in-plane rigid body modes of a model.
+    
+    Args:
+        points(np.array):     (n,2) array of the coordinates of the node of each dof.
+        components(np.array): Integer array of the component of each dof, which is
+                              0 and 1 for the displacements and 2 for the rotation.
+        dofs_per_node(int):   2 for continuum models and 3 for frames.
+    
+    Returns:
+        An (n,3) array containing the translations in x and y and the rotation
+        about the center of the model. The rotation is the third column.
+    """
+    points = np.asarray(points, dtype=float)
+    center = (points.min(axis=0) + points.max(axis=0)) / 2.0
+    (x, y) = (points - center).T
+    modes = np.zeros((len(points), 3))
+    modes[components == 0, 0] = 1.0
+    modes[components == 1, 1] = 1.0
+    modes[components == 0, 2] = -y[components == 0]
+    modes[components == 1, 2] =  x[components == 1]
+    if dofs_per_node == 3:
+        modes[components == 2, 2] = 1.0
+    return modes
+#
+
+def _neighbor_max(graph, values):
+    """Return the maximum of *values* over the neighbors of each node,
+    where *graph* is a csr matrix whose rows all contain the diagonal."""
+    return np.maximum.reduceat(values[graph.indices], graph.indptr[:-1])
+#
+
+def aggregate_nodes(graph, seed=0):
+    """Group the nodes of a graph into aggregates.
+    
+    The roots of the aggregates are a distance-2 maximal independent set, which is
+    found in parallel using random priorities. The other nodes join the aggregate
+    of a root within one or two steps.
+    
+    Args:
+        graph(sparse matrix): (n,n) sparse matrix whose non-zeros define
+                              the connections between the nodes.
+        seed(int):            Seed of the random priorities. Defaults to 0.
+    
+    Returns:
+        An integer array of the aggregate of each node.
+    """
+    num_nodes = graph.shape[0]
+    graph = ( sparse.csr_matrix(graph, dtype=bool) + sparse.identity(num_nodes, dtype=bool, format='csr') ).tocsr()
+    graph.sort_indices()
+    priority = np.random.RandomState(seed).permutation(num_nodes) / float(num_nodes)
+    
+    # 0: undecided, 1: root, -1: has a root within distance 2.
+    state = np.zeros(num_nodes, dtype=int)
+    while (state == 0).any():
+        key = np.where(state == 0, 1.0 + priority, 0.0)
+        key[state == 1] = 3.0
+        new_roots = (state == 0) & ( _neighbor_max(graph, _neighbor_max(graph, key)) == key )
+        state[new_roots] = 1
+        near_root = _neighbor_max(graph, _neighbor_max(graph, (state == 1).astype(int))) > 0
+        state[(state == 0) & near_root] = -1
+    
+    aggregates = -np.ones(num_nodes, dtype=int)
+    roots = np.where(state == 1)[0]
+    aggregates[roots] = np.arange(len(roots))
+    # Roots are at least three steps apart, so each node is next to at most one root.
+    for _ in range(2):
+        aggregates = np.where(aggregates >= 0, aggregates, _neighbor_max(graph, aggregates))
+    return aggregates
+#
+
+def tentative_prolongator(aggregates, modes, tol=1E-10):
+    """Return the prolongator which interpolates the modes exactly on each aggregate.
+    
+    The modes are orthonormalized on each aggregate using the modified
+    Gram-Schmidt process. Modes which are linearly dependent on an aggregate,
+    e.g. the rotation of an aggregate of one node without a rotational dof,
+    are dropped.
+    
+    Args:
+        aggregates(np.array): Aggregate of each dof.
+        modes(np.array):      (n,k) array of the near-nullspace modes.
+        tol(float):           Relative norm below which a mode is dropped. Defaults to 1E-10.
+    
+    Returns:
+        A tuple *(T, coarse_modes, coarse_aggregates)* of the (n,m) sparse prolongator,
+        the (m,k) modes of the coarse dofs, and the aggregate of each coarse dof.
+    """
+    (num_dofs, num_modes) = modes.shape
+    num_aggregates = aggregates.max() + 1
+    Q = np.zeros((num_dofs, num_modes))
+    R = np.zeros((num_aggregates, num_modes, num_modes))
+    for j in range(num_modes):
+        v = modes[:, j].copy()
+        scale = np.sqrt(np.bincount(aggregates, v**2, num_aggregates))
+        for i in range(j):
+            R[:, i, j] = np.bincount(aggregates, Q[:, i] * v, num_aggregates)
+            v -= R[aggregates, i, j] * Q[:, i]
+        norm = np.sqrt(np.bincount(aggregates, v**2, num_aggregates))
+        valid = norm > tol * scale
+        R[valid, j, j] = norm[valid]
+        Q[:, j] = v / np.where(valid, norm, np.inf)[aggregates]
+    
+    is_coarse = np.diagonal(R, axis1=1, axis2=2) > 0
+    coarse_index = -np.ones((num_aggregates, num_modes), dtype=int)
+    coarse_index[is_coarse] = np.arange(is_coarse.sum())
+    columns = coarse_index[aggregates]
+    keep = columns >= 0
+    rows = np.repeat(np.arange(num_dofs)[:, None], num_modes, axis=1)
+    T = sparse.csr_matrix( (Q[keep], (rows[keep], columns[keep])), shape=(num_dofs, is_coarse.sum()) )
+    return (T, R[is_coarse], np.nonzero(is_coarse)[0])
+#
+
+def _spectral_radius(A, inv_diag, num_iterations=15):
+    """Estimate the largest eigenvalue of :math:`D^{-1} A` using power iterations."""
+    x = np.random.RandomState(0).rand(A.shape[0])
+    radius = 1.0
+    for _ in range(num_iterations):
+        y = inv_diag * (A * x)
+        radius = np.linalg.norm(y) / np.linalg.norm(x)
+        x = y / np.linalg.norm(y)
+    return radius
+#
+
+class SmoothedAggregationSolver(object):
+    """Solver of a symmetric positive definite system using the conjugate gradient
+    method preconditioned by a smoothed aggregation multigrid V-cycle."""
+    
+    def __init__(self, A, modes, nodes, coarse_size=1000, max_levels=20, degree=3):
+        """Build the multigrid hierarchy.
+        
+        Args:
+            A(sparse matrix):  (n,n) symmetric positive definite matrix.
+            modes(np.array):   (n,k) array of the near-nullspace modes of *A*,
+                               e.g. the output of :func:`rigid_body_modes`.
+            nodes(np.array):   Integer array of the node of each dof.
+                               The dofs of a node are placed in the same aggregate.
+            coarse_size(int):  Size of the coarsest matrix, which is factorized.
+                               Defaults to 1000.
+            max_levels(int):   Maximum number of levels. Defaults to 20.
+            degree(int):       Degree of the Chebyshev smoother. Defaults to 3.
+        """
+        self.degree = degree
+        self.levels = []
+        A = sparse.csr_matrix(A)
+        nodes = np.unique(nodes, return_inverse=True)[1].ravel()
+        while A.shape[0] > coarse_size and len(self.levels) < max_levels - 1:
+            inv_diag = 1.0 / A.diagonal()
+            radius = _spectral_radius(A, inv_diag)
+            
+            # The node graph has a connection wherever two dofs of the nodes are coupled.
+            N = sparse.csr_matrix( (np.ones(len(nodes)), (np.arange(len(nodes)), nodes)) )
+            graph = (N.T * abs(A) * N).tocsr()
+            (T, modes, coarse_nodes) = tentative_prolongator(aggregate_nodes(graph)[nodes], modes)
+            if T.shape[1] >= A.shape[0]:
+                break
+            P = (T - (4.0 / 3.0 / radius) * sparse.diags(inv_diag) * (A * T)).tocsr()
+            self.levels.append( (A, P, inv_diag, radius) )
+            
+            A = (P.T * A * P).tocsr()
+            A = (A + A.T) * 0.5
+            # The coarse dofs of an aggregate form a node of the coarse level.
+            nodes = np.unique(coarse_nodes, return_inverse=True)[1].ravel()
+        self.coarse_solve = sparse_linalg.factorized(sparse.csc_matrix(A))
+        self.coarse_A = A
+        logger.debug('Built a multigrid hierarchy with %i levels. Operator complexity: %.2f.',
+                     len(self.levels) + 1, self.operator_complexity())
+    
+    def operator_complexity(self):
+        """Return the number of non-zeros of all levels relative to the finest level."""
+        nnz = [level[0].nnz for level in self.levels] + [self.coarse_A.nnz]
+        return sum(nnz) / float(nnz[0])
+    
+    def _smooth(self, A, inv_diag, radius, f, x):
+        """Apply the Chebyshev smoother on the interval [radius/30, 1.1*radius]."""
+        (lower, upper) = (radius / 30.0, 1.1 * radius)
+        theta = (upper + lower) / 2.0
+        delta = (upper - lower) / 2.0
+        sigma = theta / delta
+        rho = 1.0 / sigma
+        r = inv_diag * (f - A * x)
+        d = r / theta
+        for k in range(self.degree):
+            x = x + d
+            if k == self.degree - 1:
+                break
+            r = r - inv_diag * (A * d)
+            rho_new = 1.0 / (2.0 * sigma - rho)
+            d = rho_new * rho * d + (2.0 * rho_new / delta) * r
+            rho = rho_new
+        return x
+    
+    def cycle(self, f, level=0):
+        """Return the approximate solution of *A x = f* of a V-cycle starting from zero."""
+        if level == len(self.levels):
+            return self.coarse_solve(f)
+        (A, P, inv_diag, radius) = self.levels[level]
+        x = self._smooth(A, inv_diag, radius, f, np.zeros(len(f)))
+        x += P * self.cycle(P.T * (f - A * x), level + 1)
+        return self._smooth(A, inv_diag, radius, f, x)
+    
+    def solve(self, f, tol=1E-10, max_iterations=500):
+        """Solve *A x = f* using the preconditioned conjugate gradient method.
+        
+        Args:
+            f(np.array):          Right hand side.
+            tol(float):           Tolerance of the residual relative to *f*. Defaults to 1E-10.
+            max_iterations(int):  Maximum number of iterations. Defaults to 500.
+        
+        Returns:
+            The solution *x*.
+        
+        Raises:
+            RuntimeError: If the iterations do not converge, e.g. if *A* is singular.
+        """
+        A = self.levels[0][0] if self.levels else self.coarse_A
+        f = np.asarray(f, dtype=float)
+        f_norm = np.linalg.norm(f)
+        x = np.zeros(len(f))
+        if f_norm == 0:
+            return x
+        r = f.copy()
+        z = self.cycle(r)
+        p = z.copy()
+        rz = r.dot(z)
+        for iteration in range(1, max_iterations + 1):
+            Ap = A * p
+            alpha = rz / p.dot(Ap)
+            x += alpha * p
+            r -= alpha * Ap
+            residual = np.linalg.norm(r) / f_norm
+            if not np.isfinite(residual):
+                break
+            if residual <= tol:
+                logger.debug('The conjugate gradient method converged in %i iterations.', iteration)
+                return x
+            z = self.cycle(r)
+            rz_new = r.dot(z)
+            p = z + (rz_new / rz) * p
+            rz = rz_new
+        raise RuntimeError('The conjugate gradient method did not converge.' +
+                           ' The matrix may be singular.')
+#
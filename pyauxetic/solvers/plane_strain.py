@@ -0,0 +1,287 @@
+"""Native linear-elastic plane strain solver.
+
+This module analyzes planar structures using 4-node quadrilateral and/or
+3-node triangular plane strain elements. Element stiffness matrices are
+computed for all elements at once and assembled into a sparse matrix.
+The loading and boundary conditions are the same as
+:meth:`.auxetic_structure.AuxeticStructure.define_bcs` and the output table
+has the same columns as :func:`.postprocessing.get_numerical_output`.
+
+Since the analysis is linear, it is only suitable for small-strain screening
+runs. Nonlinear analyses must be done using Abaqus.
+"""
+
+import os
+import logging
+import numpy as np
+from scipy import ndimage
+
+from .. import geometry
+from .. import postprocessing
+from . import common
+
+logger = logging.getLogger(__name__)
+
+def plane_strain_matrix(E, nu):
+    """Return the (3,3) plane strain elasticity matrix."""
+    factor = E / ( (1.0 + nu) * (1.0 - 2.0*nu) )
+    return factor * np.array([[1.0 - nu, nu      , 0.0              ],
+                              [nu      , 1.0 - nu, 0.0              ],
+                              [0.0     , 0.0     , (1.0 - 2.0*nu)/2.0]])
+#
+
+def quad4_stiffness(coords, elements, D, thickness=1.0):
+    """Compute stiffness matrices of 4-node quadrilateral elements
+    using 2x2 Gauss integration.
+    
+    Args:
+        coords(np.array):   (n,2) array of nodal coordinates.
+        elements(np.array): (m,4) integer array of element nodes in counter-clockwise order.
+        D(np.array):        (3,3) elasticity matrix.
+        thickness(float):   Thickness of the elements. Defaults to 1.0.
+    
+    Returns:
+        A (m,8,8) array of element stiffness matrices.
+    
+    Raises:
+        ValueError: If an element is inverted or degenerate.
+    """
+    X = coords[elements]  # (m,4,2)
+    K = np.zeros((len(elements), 8, 8))
+    g = 1.0 / np.sqrt(3.0)
+    for (xi, eta) in ((-g, -g), (g, -g), (g, g), (-g, g)):
+        # Derivatives of the shape functions with respect to (xi, eta).
+        dN = 0.25 * np.array([[-(1-eta), -(1-xi)],
+                              [ (1-eta), -(1+xi)],
+                              [ (1+eta),  (1+xi)],
+                              [-(1+eta),  (1-xi)]])
+        J = np.einsum('ai,maj->mij', dN, X)
+        detJ = J[:, 0, 0]*J[:, 1, 1] - J[:, 0, 1]*J[:, 1, 0]
+        if (detJ <= 0).any():
+            raise ValueError('%i quadrilateral elements are inverted or degenerate.'
+                             %(detJ <= 0).sum())
+        invJ = np.empty_like(J)
+        invJ[:, 0, 0] =  J[:, 1, 1] / detJ
+        invJ[:, 0, 1] = -J[:, 0, 1] / detJ
+        invJ[:, 1, 0] = -J[:, 1, 0] / detJ
+        invJ[:, 1, 1] =  J[:, 0, 0] / detJ
+        dNdx = np.einsum('ai,mji->maj', dN, invJ)  # (m,4,2)
+        B = np.zeros((len(elements), 3, 8))
+        B[:, 0, 0::2] = dNdx[:, :, 0]
+        B[:, 1, 1::2] = dNdx[:, :, 1]
+        B[:, 2, 0::2] = dNdx[:, :, 1]
+        B[:, 2, 1::2] = dNdx[:, :, 0]
+        K += np.einsum('mki,kl,mlj,m->mij', B, D, B, detJ * thickness)
+    return K
+#
+
+def tri3_stiffness(coords, elements, D, thickness=1.0):
+    """Compute stiffness matrices of 3-node constant strain triangles.
+    
+    Args:
+        coords(np.array):   (n,2) array of nodal coordinates.
+        elements(np.array): (m,3) integer array of element nodes in counter-clockwise order.
+        D(np.array):        (3,3) elasticity matrix.
+        thickness(float):   Thickness of the elements. Defaults to 1.0.
+    
+    Returns:
+        A (m,6,6) array of element stiffness matrices.
+    
+    Raises:
+        ValueError: If an element is inverted or degenerate.
+    """
+    X = coords[elements]  # (m,3,2)
+    x = X[:, :, 0]
+    y = X[:, :, 1]
+    b = np.stack((y[:, 1] - y[:, 2], y[:, 2] - y[:, 0], y[:, 0] - y[:, 1]), axis=1)
+    c = np.stack((x[:, 2] - x[:, 1], x[:, 0] - x[:, 2], x[:, 1] - x[:, 0]), axis=1)
+    area = 0.5 * (b[:, 0]*c[:, 1] - b[:, 1]*c[:, 0])
+    if (area <= 0).any():
+        raise ValueError('%i triangular elements are inverted or degenerate.'%(area <= 0).sum())
+    B = np.zeros((len(elements), 3, 6))
+    B[:, 0, 0::2] = b
+    B[:, 1, 1::2] = c
+    B[:, 2, 0::2] = c
+    B[:, 2, 1::2] = b
+    B /= (2.0 * area)[:, None, None]
+    return np.einsum('mki,kl,mlj,m->mij', B, D, B, area * thickness)
+#
+
+def assemble_stiffness(coords, elements, D, thickness=1.0):
+    """Assemble the global stiffness matrix.
+    
+    Args:
+        coords(np.array): (n,2) array of nodal coordinates.
+        elements:         (m,3) or (m,4) integer array of element nodes
+                          or a list of such arrays for mixed meshes.
+        D(np.array):      (3,3) elasticity matrix.
+        thickness(float): Thickness of the elements. Defaults to 1.0.
+    
+    Returns:
+        A sparse matrix of size (2n,2n).
+    """
+    if isinstance(elements, np.ndarray):
+        elements = [elements]
+    num_dofs = 2 * len(coords)
+    K = None
+    for group in elements:
+        group = np.asarray(group, dtype=int)
+        if len(group) == 0:
+            continue
+        if   group.shape[1] == 4:
+            Ke = quad4_stiffness(coords, group, D, thickness)
+        elif group.shape[1] == 3:
+            Ke = tri3_stiffness(coords, group, D, thickness)
+        else:
+            raise ValueError('Elements must have 3 or 4 nodes.')
+        dofs = np.empty((len(group), 2*group.shape[1]), dtype=int)
+        dofs[:, 0::2] = 2*group
+        dofs[:, 1::2] = 2*group + 1
+        K_group = common.assemble_sparse(Ke, dofs, num_dofs)
+        K = K_group if K is None else K + K_group
+    logger.debug('Assembled the stiffness matrix with %i dofs.', num_dofs)
+    return K
+#
+
+def create_raster_mesh(structure_geometry, seed_size):
+    """Mesh a planar structure using a structured grid of quadrilateral elements.
+    
+    An element is created where its center is inside the material.
+    Parts of the mesh which are not connected to the largest region through
+    element edges are removed. The seed size is adjusted so the structure
+    is divided into a whole number of elements. Struts should be at least
+    two or three elements thick for acceptable results.
+    
+    Args:
+        structure_geometry(PlanarStructureGeometry): Geometry of the structure.
+        seed_size(float):                            Approximate size of the elements.
+    
+    Returns:
+        A tuple *(coords, elements)* containing a (n,2) array of
+        nodal coordinates and a (m,4) array of element nodes.
+    """
+    size = structure_geometry.size
+    (nx, ny) = [int(np.ceil(s / seed_size - 1E-9)) for s in size]
+    (dx, dy) = (size[0] / nx, size[1] / ny)
+    
+    (ix, iy) = np.meshgrid(np.arange(nx), np.arange(ny), indexing='ij')
+    centers = np.column_stack(( (ix.ravel() + 0.5) * dx, (iy.ravel() + 0.5) * dy ))
+    mask = structure_geometry.contains(centers).reshape((nx, ny))
+    
+    # Keep the largest region connected through element edges.
+    (labels, num_labels) = ndimage.label(mask)
+    if num_labels == 0:
+        raise RuntimeError('No elements were created. Decrease the seed size.')
+    counts = np.bincount(labels.ravel())
+    counts[0] = 0
+    mask = labels == np.argmax(counts)
+    if num_labels > 1:
+        logger.debug('Removed %i regions which were not connected to the structure.',
+                     num_labels - 1)
+    
+    (ex, ey) = np.nonzero(mask)
+    node_id = lambda i, j: i * (ny + 1) + j  # noqa: E731
+    elements = np.column_stack(( node_id(ex  , ey  ), node_id(ex+1, ey  ),
+                                 node_id(ex+1, ey+1), node_id(ex  , ey+1) ))
+    
+    # Renumber the nodes so only the used nodes remain.
+    (used, elements) = np.unique(elements, return_inverse=True)
+    elements = elements.reshape((-1, 4))
+    coords = np.column_stack(( (used // (ny + 1)) * dx, (used % (ny + 1)) * dy ))
+    logger.info('Created a raster mesh with %i nodes and %i elements.',
+                len(coords), len(elements))
+    return (coords, elements)
+#
+
+def solve_plane_strain(coords, elements, material_params, loading_params,
+                       step_params=None, node_sets=None, thickness=1.0):
+    """Analyze a meshed planar structure.
+    
+    Args:
+        coords(np.array):                (n,2) array of nodal coordinates.
+        elements:                        (m,3) or (m,4) integer array of element nodes
+                                         or a list of such arrays for mixed meshes.
+        material_params(MaterialParams): Special namedtuple describing the material.
+                                         Only *material_params.elastic* is used.
+        loading_params(LoadingParams):   Special namedtuple describing the loading.
+        step_params(StepParams):         Special namedtuple describing the step,
+                                         used for the output frames.
+                                         Defaults to :obj:`None` which uses
+                                         the default step values.
+        node_sets(dict):                 Node sets as returned by
+                                         :func:`.common.find_edge_nodes`.
+                                         Defaults to :obj:`None` which finds them
+                                         from the bounding box of the mesh.
+        thickness(float):                Thickness of the elements. Defaults to 1.0.
+    
+    Returns:
+        A numpy array with the same columns as :func:`.postprocessing.get_numerical_output`.
+    """
+    (E, nu) = common.get_elastic_constants(material_params)
+    (loading_direction, loading_type, loading_data) = common.get_loading(loading_params)
+    coords = np.asarray(coords, dtype=float)[:, :2]
+    if node_sets is None:
+        node_sets = common.find_edge_nodes(coords, loading_direction)
+    
+    K = assemble_stiffness(coords, elements, plane_strain_matrix(E, nu), thickness)
+    fixed_dofs = np.concatenate(( 2*node_sets['LD-Edge-1'], 2*node_sets['LD-Edge-1'] + 1 ))
+    tied_dofs  = 2*node_sets['LD-Edge-2'] + loading_direction
+    system = common.ReducedSystem(K.shape[0], fixed_dofs, tied_dofs,
+                                  dof_points=np.repeat(coords, 2, axis=0), dofs_per_node=2)
+    (u, reaction) = system.solve_linear(K, loading_type, loading_data)
+    logger.debug('Solved the linear system. Reaction force: %f.', reaction)
+    
+    return common.compute_linear_output(coords, u.reshape((-1, 2)), step_params,
+                                        node_sets, loading_direction)
+#
+
+def run_native_analysis(unit_cell_params, pattern_params,
+                        material_params , loading_params,
+                        mesh_params     , step_params=None,
+                        structure_name=None, folder_path=None):
+    """Model and analyze a planar structure using the native plane strain solver.
+    
+    This is the native counterpart of :func:`.main.main_single` for screening runs.
+    The structure, including the ribbons, is meshed using :func:`create_raster_mesh`.
+    
+    Args:
+        unit_cell_params:                Parameters describing the unit cell geometry.
+                                         See :func:`.main.main_single`.
+        pattern_params(PatternParams):   Special namedtuple describing the parameters
+                                         for patterning the unit cell(s).
+        material_params(MaterialParams): Special namedtuple describing the material.
+                                         Only *material_params.elastic* is used.
+        loading_params(LoadingParams):   Special namedtuple describing the loading.
+        mesh_params(MeshParams):         Special namedtuple describing the mesh.
+                                         Only *mesh_params.seed_size* is used.
+        step_params(StepParams):         Special namedtuple describing the step,
+                                         used for the output frames.
+                                         Defaults to :obj:`None`.
+        structure_name(str):             Name of the structure used for the output file.
+                                         Defaults to :obj:`None`.
+        folder_path(str):                If specified, the results are written to this
+                                         folder similar to :meth:`.output_results`.
+                                         Defaults to :obj:`None`.
+    
+    Returns:
+        A numpy array with the same columns as :func:`.postprocessing.get_numerical_output`.
+    """
+    if pattern_params.pattern_mode == 'periodic':
+        raise ValueError('Periodic structures are not supported by the native solver.')
+    if mesh_params.seed_size is None:
+        raise ValueError('mesh_params.seed_size has not been specified.')
+    
+    logger.info('Starting native analysis of structure %s.', structure_name)
+    structure_geometry = geometry.PlanarStructureGeometry(unit_cell_params, pattern_params,
+                                                          loading_params.direction)
+    (coords, elements) = create_raster_mesh(structure_geometry, mesh_params.seed_size)
+    output_table = solve_plane_strain(coords, elements, material_params,
+                                      loading_params, step_params)
+    
+    if folder_path is not None:
+        if not os.path.isdir(folder_path):
+            os.makedirs(folder_path)
+        postprocessing.write_single_numerical_output(output_table, structure_name, folder_path)
+    logger.info('Native analysis of structure %s completed.', structure_name)
+    return output_table
+#
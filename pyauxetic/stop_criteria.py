@@ -0,0 +1,137 @@
+"""Metric-driven early termination of analyses.
+
+Often, the results are only needed up to a certain strain, and the increments
+up to the end of the step are wasted. :class:`StopCriteria` is used as a stop
+check of :class:`.monitor.JobMonitor`: Each time new increments converge, the Odb
+of the running job is read and the criteria described by :class:`StopParams`
+are checked. Once a criterion is met, the job is ended and the results are
+post-processed up to the last completed frame.
+"""
+
+import os
+import logging
+import numpy as np
+
+from . import postprocessing
+
+logger = logging.getLogger(__name__)
+
+def check_stop_criteria(stop_params, output_table, reaction_force=None):
+    """Check the stop criteria against the output obtained so far.
+    
+    Args:
+        stop_params(StopParams):   Special namedtuple describing the criteria.
+        output_table(np.array):    Output table of the frames written so far,
+                                   whose columns are described by
+                                   *postprocessing.output_table_labels*.
+        reaction_force(float):     Reaction force in the loading direction
+                                   in the last frame. Defaults to :obj:`None`.
+    
+    Returns:
+        A string describing the criterion which is met, or :obj:`None`.
+    
+    Raises:
+        ValueError: If *stop_params.poisson_metric* is invalid.
+    """
+    if len(output_table) == 0:
+        return None
+    labels = postprocessing.output_table_labels
+    
+    if stop_params.target_strain_ld is not None:
+        # The strain_ld column contains the strain of each increment,
+        # so the total strain is its sum.
+        strain_ld = output_table[:, labels.index('strain_ld')].sum()
+        if abs(strain_ld) >= abs(stop_params.target_strain_ld):
+            return ('strain_ld=%g reached the target of %g'
+                    %(strain_ld, stop_params.target_strain_ld))
+    
+    if stop_params.target_reaction_force is not None and reaction_force is not None:
+        if abs(reaction_force) >= abs(stop_params.target_reaction_force):
+            return ('the reaction force of %g reached the target of %g'
+                    %(reaction_force, stop_params.target_reaction_force))
+    
+    if stop_params.poisson_tolerance is not None:
+        if stop_params.poisson_metric not in labels or \
+           not stop_params.poisson_metric.startswith('poisson'):
+            raise ValueError("Invalid value '%s' for stop_params.poisson_metric."
+                             %stop_params.poisson_metric)
+        values = output_table[:, labels.index(stop_params.poisson_metric)]
+        values = values[np.isfinite(values)]
+        num_frames = stop_params.poisson_num_frames
+        if len(values) >= max(num_frames, 2):
+            change = values[-num_frames:].max() - values[-num_frames:].min()
+            if change <= stop_params.poisson_tolerance:
+                return ('%s=%g changed by %g in the last %i frames'
+                        %(stop_params.poisson_metric, values[-1], change, num_frames))
+    return None
+#
+
+def get_reaction_force(obj, odb, frame):
+    """Return the reaction force in the loading direction of a frame.
+    
+    The force is read from the reference point which undergoes the loading,
+    see :meth:`.AuxeticStructure.define_bcs`. Under a force loading, the reaction
+    force of the reference point is zero, so the applied load is returned instead,
+    see :func:`.postprocessing.applied_load`.
+    """
+    force = postprocessing.applied_load(obj.loading_params, frame.frameValue,
+                                        obj.step_params.time_period)
+    if force is not None:
+        return force
+    if obj.pattern_mode == 'periodic':
+        rp_set = obj.loading_rps[0]
+    else:
+        rp_set = obj.loading_rps[1]
+    region = odb.rootAssembly.nodeSets[rp_set.name.upper()]
+    rf_values = frame.fieldOutputs['RF'].getSubset(region=region).values
+    return rf_values[0].data[obj.loading_direction]
+#
+
+class StopCriteria(object):
+    """Stop check of :class:`.monitor.JobMonitor` for a structure whose job is running.
+    
+    After each check, the output table of the frames written so far is kept
+    in *self.output_table*.
+    """
+    
+    def __init__(self, obj, stop_params):
+        """Initialize the stop check.
+        
+        Args:
+            obj(AuxeticStructure):   The structure. :meth:`.AuxeticStructure.create_job`
+                                     must have been called.
+            stop_params(StopParams): Special namedtuple describing the criteria.
+        """
+        self.obj          = obj
+        self.stop_params  = stop_params
+        self.odb_path     = os.path.join(obj.job_dir, obj.job.name + '.odb')
+        self.output_table = None
+    
+    def __call__(self, progress):
+        """Read the Odb of the running job and check the criteria.
+        
+        Returns:
+            A string describing the criterion which is met, or :obj:`None`.
+            :obj:`None` is also returned if the Odb cannot be read yet.
+        """
+        from odbAccess import openOdb
+        
+        try:
+            odb = openOdb(path=self.odb_path, readOnly=True)
+        except Exception as e:
+            logger.debug('Could not open the Odb of the running job: %s', e)
+            return None
+        try:
+            self.output_table = postprocessing.get_numerical_output(obj=self.obj, odb=odb)
+            reaction_force = None
+            if self.stop_params.target_reaction_force is not None:
+                frames = odb.steps.values()[0].frames
+                reaction_force = get_reaction_force(self.obj, odb, frames[len(self.output_table)-1])
+        except Exception as e:
+            # The last frame may still be written.
+            logger.debug('Could not read the Odb of the running job: %s', e)
+            return None
+        finally:
+            odb.close()
+        return check_stop_criteria(self.stop_params, self.output_table, reaction_force)
+#
@@ -0,0 +1,205 @@
+"""Tubular shell structures made by wrapping planar structures onto cylinders.
+
+A tubular structure, e.g. a stent, is the planar structure rolled up so its
+transverse direction becomes the circumference and its loading direction the
+axis of the tube. Instead of wrapping the CAD geometry, :class:`TubularShellMesh`
+meshes the planar structure with a structured grid of quadrilateral elements,
+like :func:`.plane_strain.create_raster_mesh`, and maps the nodes onto the
+cylinder, all using vectorized numpy operations. Each unit cell is divided into
+a whole number of elements, so the grid is identical in all unit cells and its
+nodes on the two sides of the seam coincide. The mid-surface mesh is written as
+an orphan mesh part of an Abaqus input file by :meth:`TubularShellMesh.write_inp`,
+where the shell thickness is the extrusion depth of the unit cells.
+
+The ribbons of planar structures are not included, and the ends of the tube
+are described by the node sets *'End-1'* and *'End-2'*.
+"""
+
+import logging
+import numpy as np
+
+from .geometry import points_in_polygon
+from .export import write_binary_stl
+
+logger = logging.getLogger(__name__)
+
+def _write_ids(file, ids, per_line=16):
+    """Write integer ids in the comma separated lines of Abaqus input files."""
+    ids = np.asarray(ids, dtype=int)
+    num_full = len(ids) // per_line * per_line
+    if num_full:
+        np.savetxt(file, ids[:num_full].reshape(-1, per_line), fmt='%d', delimiter=', ')
+    if num_full < len(ids):
+        np.savetxt(file, ids[None, num_full:], fmt='%d', delimiter=', ')
+#
+
+def _connected_components(num_nodes, edges):
+    """Find the connected components of a graph.
+    
+    Edges between different components are hooked from the larger to the smaller
+    label and the labels are then shortened by pointer jumping, which only needs
+    a few vectorized passes over the edges.
+    
+    Args:
+        num_nodes(int):  Number of nodes.
+        edges(np.array): (m,2) integer array of the nodes of the edges.
+    
+    Returns:
+        An integer array of the smallest node of the component of each node.
+    """
+    labels = np.arange(num_nodes)
+    edges  = np.asarray(edges, dtype=int).reshape(-1, 2)
+    while True:
+        (label_1, label_2) = (labels[edges[:, 0]], labels[edges[:, 1]])
+        differ = label_1 != label_2
+        if not differ.any():
+            return labels
+        np.minimum.at(labels, np.maximum(label_1, label_2)[differ], np.minimum(label_1, label_2)[differ])
+        while True:
+            jumped = labels[labels]
+            if (jumped == labels).all():
+                break
+            labels = jumped
+#
+
+class TubularShellMesh(object):
+    """Quadrilateral mid-surface mesh of a tubular reentrant2d structure."""
+    
+    def __init__(self, geometry, seed_size):
+        """Mesh and wrap the structure.
+        
+        The circumference of the tube is the size of the core structure in the
+        transverse direction, so the unit cells in the first and last lines of
+        the structure map along it meet at the seam.
+        
+        An element is created where its center is inside the material. Parts of the
+        mesh which are not connected to the largest region through element edges,
+        including those across the seam, are removed. The seed size is adjusted
+        so each unit cell is divided into a whole number of elements. Struts should
+        be at least two or three elements thick for acceptable results.
+        
+        Args:
+            geometry(PlanarStructureGeometry): Geometry of the planar structure.
+            seed_size(float):                  Approximate size of the elements.
+        
+        Raises:
+            ValueError: If the structure is periodic or has no cells,
+                        or *seed_size* is not positive.
+        """
+        if geometry.is_periodic:
+            raise ValueError('Periodic structures cannot be made tubular.')
+        (indices, ids) = geometry.cells()
+        if len(ids) == 0:
+            raise ValueError('The structure map contains no cells.')
+        if not seed_size > 0:
+            raise ValueError('seed_size must be positive.')
+        axial  = geometry.loading_direction
+        circum = geometry.transverse_direction
+        num_cells = np.array(geometry.structure_map.shape[:2])
+        self.circumference   = num_cells[circum] * geometry.bound_size[circum]
+        self.length          = num_cells[axial]  * geometry.bound_size[axial]
+        self.radius          = self.circumference / (2 * np.pi)
+        self.thickness       = geometry.extrusion_depth
+        
+        # Elements of the grid of a unit cell whose centers are inside the material
+        # of each unit cell, tiled by their cell indices.
+        divisions = np.ceil(geometry.bound_size / seed_size - 1E-9).astype(int)
+        step      = geometry.bound_size / divisions
+        grid      = np.indices(divisions).reshape(2, -1).T
+        centers   = (grid + 0.5) * step
+        cells = []
+        for uc_id in np.unique(ids):
+            (outer, inner, bound_size) = geometry.outlines[uc_id]
+            inside = points_in_polygon(centers, outer) & ~points_in_polygon(centers, inner)
+            cell_indices = indices[ids == uc_id]
+            cells.append( (cell_indices[:, None, :] * divisions + grid[None, inside, :]).reshape(-1, 2) )
+        # Grid indices in (circumferential, axial) order.
+        cells = np.concatenate(cells)[:, (circum, axial)]
+        shape = num_cells[[circum, axial]] * divisions[[circum, axial]]
+        cells = self._largest_region(cells, shape)
+        
+        # Elements are counterclockwise in (circumferential, axial) coordinates, so they face
+        # outwards. Nodes on the far side of the seam are those on its near side.
+        corners = np.array([[0, 0], [1, 0], [1, 1], [0, 1]])
+        nodes = cells[:, None, :] + corners[None, :, :]
+        keys  = (nodes[:, :, 0] % shape[0]) * (shape[1] + 1) + nodes[:, :, 1]
+        (keys, elements) = np.unique(keys, return_inverse=True)
+        elements = elements.reshape(-1, 4)
+        points = np.column_stack(( keys // (shape[1] + 1), keys % (shape[1] + 1) ))
+        
+        angles = points[:, 0] * step[circum] / self.radius
+        self.coords   = np.column_stack(( self.radius * np.cos(angles),
+                                          self.radius * np.sin(angles), points[:, 1] * step[axial] ))
+        self.elements = elements
+        self.node_sets = {
+            'End-1': np.flatnonzero(points[:, 1] == 0),
+            'End-2': np.flatnonzero(points[:, 1] == shape[1]) }
+        logger.info('Created a tubular shell mesh with %i nodes and %i elements.' +
+                    ' Radius: %g, length: %g.', len(self.coords), len(self.elements),
+                    self.radius, self.length)
+    
+    @staticmethod
+    def _largest_region(cells, shape):
+        """Return the cells of the largest region connected through element edges.
+        
+        Args:
+            cells(np.array): (n,2) integer array of the grid indices of the elements
+                             in (circumferential, axial) order.
+            shape(np.array): Size of the grid, which is periodic along the circumference.
+        """
+        keys  = cells[:, 0] * shape[1] + cells[:, 1]
+        order = np.argsort(keys)
+        (cells, keys) = (cells[order], keys[order])
+        edges = []
+        for (neighbors, valid) in ( (np.column_stack(( (cells[:, 0] + 1) % shape[0], cells[:, 1] )),
+                                     np.ones(len(cells), dtype=bool)),
+                                    (cells + [0, 1], cells[:, 1] + 1 < shape[1]) ):
+            neighbor_keys = neighbors[:, 0] * shape[1] + neighbors[:, 1]
+            position = np.minimum(np.searchsorted(keys, neighbor_keys), len(keys) - 1)
+            found = valid & (keys[position] == neighbor_keys)
+            edges.append( np.column_stack(( np.flatnonzero(found), position[found] )) )
+        labels = _connected_components(len(cells), np.concatenate(edges))
+        counts = np.bincount(labels)
+        if (counts > 0).sum() > 1:
+            logger.debug('Removed %i regions which were not connected to the structure.',
+                         (counts > 0).sum() - 1)
+        return cells[labels == np.argmax(counts)]
+    
+    def triangles(self):
+        """Return the elements split into a (2m,3,3) array of triangles."""
+        return self.coords[self.elements[:, [0, 1, 2, 0, 2, 3]].reshape(-1, 3)]
+    
+    def write_inp(self, file_path, part_name='Tube'):
+        """Write the mesh as an orphan mesh part of an Abaqus input file.
+        
+        The part contains S4R elements, the element set *'Tube'*, and the node sets
+        of the ends. It can be imported using *mdb.ModelFromInputFile*.
+        Nodes and elements are numbered from 1.
+        
+        Args:
+            file_path(str): Path to the input file.
+            part_name(str): Name of the part. Defaults to *'Tube'*.
+        """
+        node_ids    = np.arange(1, len(self.coords) + 1)
+        element_ids = np.arange(1, len(self.elements) + 1)
+        with open(file_path, 'w') as file:
+            file.write('*Heading\nTubular shell structure generated by pyauxetic\n')
+            file.write('*Part, name=%s\n*Node\n'%part_name)
+            np.savetxt(file, np.column_stack((node_ids, self.coords)),
+                       fmt=('%d', '%.9g', '%.9g', '%.9g'), delimiter=', ')
+            file.write('*Element, type=S4R, elset=Tube\n')
+            np.savetxt(file, np.column_stack((element_ids, self.elements + 1)), fmt='%d', delimiter=', ')
+            for name in sorted(self.node_sets.keys()):
+                file.write('*Nset, nset=%s\n'%name)
+                _write_ids(file, self.node_sets[name] + 1)
+            file.write('*End Part\n')
+        logger.debug('Wrote the tubular shell mesh to %s.', file_path)
+    
+    def write_stl(self, file_path):
+        """Write the mid-surface in the binary STL format.
+        
+        Returns:
+            The number of triangles.
+        """
+        return write_binary_stl(file_path, [self.triangles()])
+#
@@ -0,0 +1,628 @@
+"""Persistent worker processes for batch modeling and analysis.
+
+Starting Abaqus/CAE and importing its modules takes a considerable time,
+which is paid by every structure if each one is run in its own process.
+Instead, a number of long-lived worker processes can be started using
+:class:`WorkerPool`. Each worker imports PyAuxetic once and then runs
+:func:`.main.main_single` for the run specifications it receives.
+
+The workers and their clients communicate through a spool directory
+(see :class:`SpoolDirectory`) containing the following folders:
+
+    + *queue*: Run specifications waiting for a worker, as json files.
+    + *claimed*: Run specifications being run. Workers claim a run by
+      renaming its file, which is atomic, so each run is claimed only once.
+    + *done*: Results of finished runs, as json files.
+    + *workers*: Heartbeat files written periodically by each worker,
+      which are used for checking the health of the workers.
+      Each worker also uses a subfolder as its working directory,
+      so log and job files of the workers do not collide.
+
+Workers exit after a number of runs to contain the memory growth of
+long-lived CAE processes and :meth:`WorkerPool.check_health` starts
+a new worker in their place. The same pool can start plain Python stand-in
+workers using :func:`stand_in_worker_command`, which only create
+the results folders, so the pool can be tested without Abaqus.
+
+The namedtuples describing the structures are serialized to json by
+:func:`encode_params` and restored by :func:`decode_params`.
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import logging
+import threading
+import traceback
+import subprocess
+import numpy as np
+
+from .classes import auxetic_structure_params
+from .classes import auxetic_unit_cell_params
+
+logger = logging.getLogger(__name__)
+
+_spool_folders = ('queue', 'claimed', 'done', 'workers')
+
+def _to_str(value):
+    """Convert unicode strings read from json to :class:`str` in Python 2."""
+    if not isinstance(value, str) and isinstance(value, type(u'')):
+        return value.encode('utf-8')
+    return value
+#
+
+def _params_classes():
+    """Return a dict of all namedtuple classes used for defining structures, keyed by name."""
+    classes = dict()
+    for module in (auxetic_structure_params, auxetic_unit_cell_params):
+        for (name, value) in vars(module).items():
+            if isinstance(value, type) and hasattr(value, '_fields'):
+                classes[name] = value
+    return classes
+#
+
+def encode_params(value):
+    """Convert parameters, e.g. the arguments of :func:`.main.main_single`,
+    to objects which can be serialized to json.
+    
+    Namedtuples, tuples and numpy arrays are tagged,
+    so they can be restored by :func:`decode_params`.
+    """
+    if hasattr(value, '_asdict'):
+        return {'__namedtuple__': type(value).__name__,
+                'fields': dict( (k, encode_params(v)) for (k, v) in value._asdict().items() )}
+    elif isinstance(value, np.ndarray):
+        return {'__ndarray__': value.tolist()}
+    elif isinstance(value, tuple):
+        return {'__tuple__': [encode_params(v) for v in value]}
+    elif isinstance(value, list):
+        return [encode_params(v) for v in value]
+    elif isinstance(value, dict):
+        return dict( (k, encode_params(v)) for (k, v) in value.items() )
+    elif isinstance(value, (np.integer, np.floating, np.bool_)):
+        return value.item()
+    else:
+        return value
+#
+
+def decode_params(value, classes=None):
+    """Restore parameters encoded by :func:`encode_params`.
+    
+    Args:
+        value:         Object loaded from json.
+        classes(dict): Namedtuple classes keyed by name. Defaults to :obj:`None`
+                       which uses the parameter classes of PyAuxetic.
+    
+    Raises:
+        ValueError: If a namedtuple class is unknown.
+    """
+    if classes is None:
+        classes = _params_classes()
+    if isinstance(value, dict):
+        if '__namedtuple__' in value:
+            name = value['__namedtuple__']
+            if name not in classes:
+                raise ValueError("Unknown parameter class '%s'."%name)
+            fields = dict( (_to_str(k), decode_params(v, classes))
+                           for (k, v) in value['fields'].items() )
+            return classes[name](**fields)
+        elif '__ndarray__' in value:
+            return np.array(value['__ndarray__'])
+        elif '__tuple__' in value:
+            return tuple( decode_params(v, classes) for v in value['__tuple__'] )
+        else:
+            return dict( (_to_str(k), decode_params(v, classes)) for (k, v) in value.items() )
+    elif isinstance(value, list):
+        return [decode_params(v, classes) for v in value]
+    else:
+        return _to_str(value)
+#
+
+def _write_json(path, data):
+    """Write a json file so that readers never see a partially written file."""
+    temp_path = '%s.%s.tmp'%(path, uuid.uuid4().hex)
+    with open(temp_path, 'w') as file:
+        json.dump(data, file, indent=1, sort_keys=True)
+    if os.name == 'nt' and os.path.exists(path):
+        # os.rename does not overwrite files on Windows.
+        os.remove(path)
+    os.rename(temp_path, path)
+#
+
+def _read_json(path):
+    """Read a json file or return :obj:`None` if it does not exist or is being replaced."""
+    try:
+        with open(path, 'r') as file:
+            return json.load(file)
+    except (IOError, OSError, ValueError):
+        return None
+#
+
+class SpoolDirectory(object):
+    """A spool directory shared by the workers and their clients.
+    See the module documentation for its layout.
+    """
+    
+    def __init__(self, path):
+        """Initialize the spool directory and create its folders if necessary.
+        
+        Args:
+            path(str): Path to the spool directory.
+        """
+        self.path = os.path.abspath(path)
+        for folder in _spool_folders:
+            folder_path = os.path.join(self.path, folder)
+            if not os.path.isdir(folder_path):
+                os.makedirs(folder_path)
+    
+    def _file_path(self, folder, file_name):
+        return os.path.join(self.path, folder, file_name)
+    
+    def submit(self, kwargs, run_id=None, stand_in=None):
+        """Add a run specification to the queue.
+        
+        Args:
+            kwargs(dict):   Keyword arguments of :func:`.main.main_single`.
+            run_id(str):    Unique name of the run. Defaults to :obj:`None`
+                            which uses the structure name and a random suffix.
+            stand_in(dict): Options of :func:`stand_in_runner`, which are
+                            ignored by CAE workers. Defaults to :obj:`None`.
+        
+        Returns:
+            The run id.
+        """
+        if run_id is None:
+            run_id = '%s-%s'%(kwargs.get('structure_name', 'run'), uuid.uuid4().hex[:8])
+        spec = dict(run_id=run_id, submit_time=time.time(),
+                    kwargs=encode_params(kwargs), stand_in=stand_in or dict())
+        _write_json(self._file_path('queue', run_id + '.json'), spec)
+        logger.debug('Submitted run %s to the spool directory.', run_id)
+        return run_id
+    
+    def claim(self, worker_id):
+        """Claim the oldest run in the queue.
+        
+        Returns:
+            The run specification as a dict, or :obj:`None` if the queue is empty.
+        """
+        queue_path = os.path.join(self.path, 'queue')
+        file_names = [f for f in os.listdir(queue_path) if f.endswith('.json')]
+        file_names.sort(key=lambda f: (os.path.getmtime(os.path.join(queue_path, f))
+                                       if os.path.exists(os.path.join(queue_path, f)) else 0, f))
+        for file_name in file_names:
+            run_id = file_name[:-len('.json')]
+            claimed_path = self._file_path('claimed', '%s@%s.json'%(run_id, worker_id))
+            try:
+                os.rename(os.path.join(queue_path, file_name), claimed_path)
+            except OSError:
+                continue  # Claimed by another worker.
+            spec = _read_json(claimed_path)
+            if spec is None:
+                continue
+            return spec
+        return None
+    
+    def claimed_runs(self):
+        """Return a list of *(run_id, worker_id)* tuples of the runs being run."""
+        runs = []
+        for file_name in os.listdir(os.path.join(self.path, 'claimed')):
+            if file_name.endswith('.json') and '@' in file_name:
+                runs.append( tuple(file_name[:-len('.json')].rsplit('@', 1)) )
+        return runs
+    
+    def complete(self, run_id, worker_id, result):
+        """Write the result of a run and remove it from the claimed runs."""
+        _write_json(self._file_path('done', run_id + '.json'), result)
+        claimed_path = self._file_path('claimed', '%s@%s.json'%(run_id, worker_id))
+        if os.path.exists(claimed_path):
+            os.remove(claimed_path)
+    
+    def result(self, run_id):
+        """Return the result of a run as a dict, or :obj:`None` if it has not finished."""
+        return _read_json(self._file_path('done', run_id + '.json'))
+    
+    def write_heartbeat(self, worker_id, status):
+        """Write the heartbeat file of a worker. *status* is a dict."""
+        status = dict(status, worker_id=worker_id, pid=os.getpid(), time=time.time())
+        _write_json(self._file_path('workers', worker_id + '.json'), status)
+    
+    def read_heartbeat(self, worker_id):
+        """Return the last heartbeat of a worker as a dict, or :obj:`None`."""
+        return _read_json(self._file_path('workers', worker_id + '.json'))
+    
+    def working_dir(self, name):
+        """Return the working directory of a worker slot, creating it if necessary."""
+        path = self._file_path('workers', name)
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        return path
+    
+    def request_stop(self):
+        """Ask all workers to exit after their current run."""
+        with open(self._file_path('workers', 'stop'), 'w') as file:
+            file.write('stop\n')
+    
+    def clear_stop(self):
+        if os.path.exists(self._file_path('workers', 'stop')):
+            os.remove(self._file_path('workers', 'stop'))
+    
+    def stop_requested(self):
+        return os.path.exists(self._file_path('workers', 'stop'))
+#
+
+class _Heartbeat(threading.Thread):
+    """Thread writing the heartbeat of a worker, even while it is running a structure."""
+    
+    def __init__(self, spool, worker_id, interval):
+        super(_Heartbeat, self).__init__()
+        self.daemon    = True
+        self.spool     = spool
+        self.worker_id = worker_id
+        self.interval  = interval
+        self.status    = dict(state='idle', run_id=None, num_runs=0)
+        self._lock     = threading.Lock()
+        self._stopped  = threading.Event()
+    
+    def update(self, **status):
+        with self._lock:
+            self.status.update(status)
+            self.spool.write_heartbeat(self.worker_id, self.status)
+    
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            with self._lock:
+                self.spool.write_heartbeat(self.worker_id, self.status)
+    
+    def stop(self, **status):
+        self._stopped.set()
+        self.update(**status)
+#
+
+def run_main_single(spec):
+    """Run :func:`.main.main_single` for a run specification.
+    This is the runner used by CAE workers.
+    
+    Returns:
+        A dict containing the results folder and Odb paths.
+    """
+    # The main module can only be imported in the Abaqus kernel.
+    from .main import main_single
+    kwargs = decode_params(spec['kwargs'])
+    kwargs['is_part_of_batch'] = True
+    auxeticObj = main_single(**kwargs)
+    return dict(results_folder_path=getattr(auxeticObj, 'results_folder_path', None),
+                odb_path=auxeticObj.odb_path)
+#
+
+def stand_in_runner(spec):
+    """Stand-in for :func:`run_main_single` which does not need Abaqus.
+    
+    It creates the results folder of the structure like :func:`.main.main_single`
+    and writes the decoded arguments to a text file. The following
+    options can be passed in *spec['stand_in']* for testing:
+    
+        + *'duration'*: Time in seconds the run takes. Defaults to 0.
+        + *'error'*: If specified, a :class:`RuntimeError` with this message is raised.
+    
+    Returns:
+        A dict containing the results folder path and :obj:`None` as the Odb path.
+    """
+    options = spec.get('stand_in') or dict()
+    kwargs  = decode_params(spec['kwargs'])
+    time.sleep(options.get('duration', 0))
+    if options.get('error'):
+        raise RuntimeError(options['error'])
+    
+    # Same path as helper.return_results_folder_path(), which needs Abaqus.
+    output_params = kwargs.get('output_params')
+    folder_path   = os.getcwd()
+    if output_params is not None and output_params.result_folder_name is not None:
+        folder_path = os.path.join(folder_path, output_params.result_folder_name)
+    folder_path = os.path.join(folder_path, kwargs['structure_name'])
+    if os.path.isdir(folder_path):
+        raise RuntimeError("'%s' already exists. Delete it before proceeding."%folder_path)
+    os.makedirs(folder_path)
+    with open(os.path.join(folder_path, kwargs['structure_name'] + ' stand-in.txt'), 'w') as file:
+        for key in sorted(kwargs.keys()):
+            file.write('%s = %r\n'%(key, kwargs[key]))
+    return dict(results_folder_path=folder_path, odb_path=None)
+#
+
+def run_worker(spool_dir, worker_id, max_runs=None, runner=None,
+               poll_interval=1.0, heartbeat_interval=5.0):
+    """Run runs from the spool directory until stopped or recycled.
+    
+    Args:
+        spool_dir(str):           Path to the spool directory.
+        worker_id(str):           Unique name of the worker.
+        max_runs(int):            The worker exits after this number of runs, so it
+                                  can be replaced by a fresh process. Defaults to
+                                  :obj:`None` which means the worker is not recycled.
+        runner(function):         Function which takes a run specification and
+                                  returns a dict of outputs. Defaults to
+                                  :obj:`None` which uses :func:`run_main_single`.
+        poll_interval(float):     Time in seconds between checks of an empty queue.
+                                  Defaults to 1.0.
+        heartbeat_interval(float):Time in seconds between heartbeats. Defaults to 5.0.
+    
+    Returns:
+        The number of completed runs.
+    """
+    if runner is None:
+        runner = run_main_single
+    spool = SpoolDirectory(spool_dir)
+    heartbeat = _Heartbeat(spool, worker_id, heartbeat_interval)
+    heartbeat.update(state='idle')
+    heartbeat.start()
+    logger.info('Worker %s started.', worker_id)
+    
+    num_runs = 0
+    try:
+        while max_runs is None or num_runs < max_runs:
+            if spool.stop_requested():
+                break
+            spec = spool.claim(worker_id)
+            if spec is None:
+                time.sleep(poll_interval)
+                continue
+            
+            run_id = spec['run_id']
+            heartbeat.update(state='running', run_id=run_id)
+            logger.info('Worker %s started run %s.', worker_id, run_id)
+            result = dict(run_id=run_id, worker_id=worker_id, start_time=time.time(),
+                          status='completed', error=None, traceback=None,
+                          results_folder_path=None, odb_path=None)
+            try:
+                result.update(runner(spec))
+            except Exception as e:
+                result.update(status='failed', error='%s: %s'%(type(e).__name__, e),
+                              traceback=traceback.format_exc())
+                logger.error('Run %s failed: %s', run_id, result['error'])
+            result['end_time'] = time.time()
+            spool.complete(run_id, worker_id, result)
+            num_runs += 1
+            heartbeat.update(state='idle', run_id=None, num_runs=num_runs)
+            logger.info('Worker %s finished run %s.', worker_id, run_id)
+    finally:
+        if max_runs is not None and num_runs >= max_runs:
+            heartbeat.stop(state='recycled')
+            logger.info('Worker %s exited for recycling after %i runs.', worker_id, num_runs)
+        else:
+            heartbeat.stop(state='stopped')
+            logger.info('Worker %s stopped after %i runs.', worker_id, num_runs)
+    return num_runs
+#
+
+def write_bootstrap_script(spool_dir):
+    """Write the script which starts a worker and return its path.
+    
+    The script adds the folder containing PyAuxetic to the path and calls :func:`main`,
+    so it can be run by both Abaqus/CAE and plain Python.
+    """
+    library_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    script_path  = os.path.join(os.path.abspath(spool_dir), 'start_worker.py')
+    with open(script_path, 'w') as file:
+        file.write('import sys\n')
+        file.write('sys.path.insert(0, %r)\n'%library_path)
+        file.write('from pyauxetic import workers\n')
+        file.write('workers.main(sys.argv)\n')
+    return script_path
+#
+
+def cae_worker_command(script_path, spool_dir, worker_id, max_runs, abaqus_command='abaqus'):
+    """Return the command which starts a worker in an Abaqus/CAE noGUI process."""
+    return [abaqus_command, 'cae', 'noGUI=%s'%script_path, '--',
+            spool_dir, worker_id, str(max_runs)]
+#
+
+def stand_in_worker_command(script_path, spool_dir, worker_id, max_runs):
+    """Return the command which starts a plain Python stand-in worker using :func:`stand_in_runner`."""
+    return [sys.executable, script_path, spool_dir, worker_id, str(max_runs), '--stand-in']
+#
+
+def main(argv):
+    """Entry point of worker processes.
+    
+    The arguments are *spool_dir worker_id max_runs [--stand-in]*.
+    Only the arguments after the last *'--'* are used, if it exists,
+    since Abaqus/CAE passes its own arguments before them.
+    A *max_runs* of 0 means the worker is not recycled.
+    """
+    args = list(argv[1:])
+    if '--' in args:
+        args = args[len(args) - args[::-1].index('--'):]
+    stand_in = '--stand-in' in args
+    args = [arg for arg in args if arg != '--stand-in']
+    if len(args) != 3:
+        raise ValueError('Usage: start_worker.py spool_dir worker_id max_runs [--stand-in]')
+    (spool_dir, worker_id, max_runs) = (args[0], args[1], int(args[2]))
+    
+    run_worker(spool_dir, worker_id, max_runs=max_runs or None,
+               runner=stand_in_runner if stand_in else run_main_single)
+#
+
+class WorkerPool(object):
+    """A pool of persistent worker processes sharing a spool directory.
+    
+    Each worker runs in its own working directory inside the spool directory,
+    so *output_params.result_folder_name* should be an absolute path.
+    Otherwise, the results folders are placed in the working directories
+    of the workers. The paths are also returned by :meth:`map`.
+    
+    Example:
+        pool = WorkerPool('spool', num_workers=2, max_runs=10)
+        pool.start()
+        results = pool.map(list_of_main_single_kwargs)
+        pool.stop()
+    """
+    
+    def __init__(self, spool_dir, num_workers=1, max_runs=10, stand_in=False,
+                 abaqus_command='abaqus', heartbeat_timeout=120.0, poll_interval=1.0):
+        """Initialize the pool. The workers are started by :meth:`start`.
+        
+        Args:
+            spool_dir(str):           Path to the spool directory.
+            num_workers(int):         Number of workers. Defaults to 1.
+            max_runs(int):            Number of runs after which each worker is recycled.
+                                      :obj:`None` disables recycling. Defaults to 10.
+            stand_in(bool):           If :obj:`True`, plain Python stand-in workers are
+                                      started instead of Abaqus/CAE. Defaults to :obj:`False`.
+            abaqus_command(str):      Command used for starting Abaqus. Defaults to *'abaqus'*.
+            heartbeat_timeout(float): A worker whose last heartbeat is older than this
+                                      number of seconds is considered unresponsive and
+                                      is killed. Defaults to 120.0.
+            poll_interval(float):     Time in seconds between checks of the spool directory.
+                                      Defaults to 1.0.
+        """
+        if num_workers < 1:
+            raise ValueError('num_workers must be at least 1.')
+        self.spool             = SpoolDirectory(spool_dir)
+        self.num_workers       = num_workers
+        self.max_runs          = max_runs
+        self.stand_in          = stand_in
+        self.abaqus_command    = abaqus_command
+        self.heartbeat_timeout = heartbeat_timeout
+        self.poll_interval     = poll_interval
+        self.script_path       = None
+        self.workers           = [None] * num_workers  # (worker_id, process, start_time) of each slot.
+        self.generations       = [0] * num_workers
+    
+    def _start_worker(self, slot):
+        """Start a new worker process in a slot."""
+        self.generations[slot] += 1
+        worker_id = 'worker-%02i-%03i'%(slot+1, self.generations[slot])
+        max_runs  = self.max_runs or 0
+        if self.stand_in:
+            command = stand_in_worker_command(self.script_path, self.spool.path, worker_id, max_runs)
+        else:
+            command = cae_worker_command(self.script_path, self.spool.path, worker_id,
+                                         max_runs, self.abaqus_command)
+        process = subprocess.Popen(command, cwd=self.spool.working_dir('slot-%02i'%(slot+1)),
+                                   shell=(os.name == 'nt' and not self.stand_in))
+        self.workers[slot] = (worker_id, process, time.time())
+        logger.info('Started worker %s (pid %i).', worker_id, process.pid)
+    
+    def start(self):
+        """Start the workers."""
+        self.spool.clear_stop()
+        self.script_path = write_bootstrap_script(self.spool.path)
+        for slot in range(self.num_workers):
+            self._start_worker(slot)
+    
+    def _fail_claimed_runs(self, worker_id, error):
+        """Write a failed result for the runs claimed by a worker which has died."""
+        for (run_id, claimed_worker_id) in self.spool.claimed_runs():
+            if claimed_worker_id == worker_id:
+                self.spool.complete(run_id, worker_id,
+                                    dict(run_id=run_id, worker_id=worker_id, status='failed',
+                                         error=error, traceback=None, end_time=time.time(),
+                                         results_folder_path=None, odb_path=None))
+                logger.error('Run %s failed: %s', run_id, error)
+    
+    def check_health(self):
+        """Check the workers and replace the ones which have exited or are unresponsive.
+        
+        Workers which have exited for recycling are replaced silently.
+        Workers which have crashed or whose heartbeat is older than
+        *heartbeat_timeout* are killed and their current run is marked as failed.
+        
+        Returns:
+            A list of dicts describing the status of each worker,
+            including its last heartbeat.
+        """
+        statuses = []
+        for (slot, worker) in enumerate(self.workers):
+            if worker is None:
+                continue
+            (worker_id, process, start_time) = worker
+            heartbeat = self.spool.read_heartbeat(worker_id) or dict()
+            last_time = heartbeat.get('time', start_time)
+            return_code = process.poll()
+            
+            if return_code is not None:
+                if heartbeat.get('state') == 'recycled' and return_code == 0:
+                    logger.debug('Worker %s was recycled.', worker_id)
+                else:
+                    logger.warning('Worker %s exited unexpectedly with code %i.',
+                                   worker_id, return_code)
+                    self._fail_claimed_runs(worker_id, 'Worker %s exited unexpectedly.'%worker_id)
+            elif time.time() - last_time > self.heartbeat_timeout:
+                logger.warning('Worker %s is unresponsive and is killed.', worker_id)
+                process.kill()
+                process.wait()
+                self._fail_claimed_runs(worker_id, 'Worker %s was unresponsive.'%worker_id)
+                return_code = process.returncode
+            
+            if return_code is not None:
+                if self.spool.stop_requested():
+                    self.workers[slot] = None
+                    continue
+                self._start_worker(slot)
+                (worker_id, process, start_time) = self.workers[slot]
+                heartbeat = dict()
+            statuses.append(dict(heartbeat, worker_id=worker_id, pid=process.pid,
+                                 alive=process.poll() is None))
+        return statuses
+    
+    def map(self, kwargs_list, timeout=None, stand_in_options=None):
+        """Run :func:`.main.main_single` for a list of arguments and wait for the results.
+        
+        Args:
+            kwargs_list(list):      Keyword arguments of :func:`.main.main_single` for each run.
+            timeout(float):         Maximum time in seconds to wait. Defaults to :obj:`None`.
+            stand_in_options(list): Options of :func:`stand_in_runner` for each run.
+                                    Defaults to :obj:`None`.
+        
+        Returns:
+            A list of result dicts in the same order as *kwargs_list*. Each contains
+            *'status'* (*'completed'* or *'failed'*), *'error'*, *'worker_id'*,
+            *'results_folder_path'*, and *'odb_path'*.
+        
+        Raises:
+            RuntimeError: If the pool has not been started or *timeout* is reached.
+        """
+        if self.script_path is None:
+            raise RuntimeError('The pool has not been started. Call start() first.')
+        if stand_in_options is None:
+            stand_in_options = [None] * len(kwargs_list)
+        run_ids = [self.spool.submit(kwargs, stand_in=options)
+                   for (kwargs, options) in zip(kwargs_list, stand_in_options)]
+        
+        start_time = time.time()
+        results = dict()
+        while len(results) < len(run_ids):
+            for run_id in run_ids:
+                if run_id not in results:
+                    result = self.spool.result(run_id)
+                    if result is not None:
+                        results[run_id] = result
+            if len(results) == len(run_ids):
+                break
+            if timeout is not None and time.time() - start_time > timeout:
+                raise RuntimeError('Timeout while waiting for %i runs.'%(len(run_ids) - len(results)))
+            self.check_health()
+            time.sleep(self.poll_interval)
+        return [results[run_id] for run_id in run_ids]
+    
+    def stop(self, timeout=None):
+        """Ask the workers to exit after their current run and wait for them.
+        Workers which do not exit within *timeout* seconds are killed.
+        """
+        self.spool.request_stop()
+        start_time = time.time()
+        for (slot, worker) in enumerate(self.workers):
+            if worker is None:
+                continue
+            process = worker[1]
+            while process.poll() is None:
+                if timeout is not None and time.time() - start_time > timeout:
+                    logger.warning('Worker %s did not stop and is killed.', worker[0])
+                    process.kill()
+                    process.wait()
+                    break
+                time.sleep(0.1)
+            self.workers[slot] = None
+        logger.info('Stopped all workers.')
+#
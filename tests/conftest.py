@@ -0,0 +1,5 @@
+import os
+import sys
+
+# pyauxetic is not installed as a package, so the tests import it from the repository.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('scipy')
+
+from pyauxetic import geometry
+from pyauxetic.solvers import common, corotational, frame
+from pyauxetic.classes.auxetic_unit_cell_params import Reentrant2DUcpSimple
+from pyauxetic.classes.auxetic_structure_params import PatternParams, MaterialParams, LoadingParams
+
+
+unit_cell_params = Reentrant2DUcpSimple(1, 1.0, 10.0, 1.0, 1.0, 60.0)
+material_params  = MaterialParams(elastic=(1000.0, 0.3))
+
+
+@pytest.mark.parametrize('direction', ['x', 'y'])
+def test_poisson_ratio_changes_with_strain(direction):
+    num_cells = 12
+    pattern_params = PatternParams(pattern_mode='uniform', num_cell_repeat=(num_cells, num_cells))
+    # Roughly 10% strain of the core structure.
+    cell_length = 12.547 if direction == 'x' else 10.447
+    loading_params = LoadingParams(type='disp', direction=direction, data=0.1 * num_cells * cell_length)
+    (output_table, increment_stats) = corotational.run_corotational_analysis(
+        unit_cell_params, pattern_params, material_params, loading_params)
+    
+    assert np.isfinite(output_table).all()
+    assert len(output_table) == len(increment_stats) + 1
+    assert output_table[1:, -2].max() < 0
+    # The struts rotate, so the Poisson's ratio of the first and last increments differ.
+    assert abs(output_table[-1, -2] - output_table[1, -2]) > 0.02
+
+
+def test_modified_newton_reuses_factorizations(monkeypatch):
+    factorize = common.ReducedSystem.factorize
+    num_factorizations = []
+    
+    def counting_factorize(self, K_r, include_master):
+        num_factorizations[-1] += 1
+        return factorize(self, K_r, include_master)
+    monkeypatch.setattr(common.ReducedSystem, 'factorize', counting_factorize)
+    
+    num_cells = 8
+    pattern_params = PatternParams(pattern_mode='uniform', num_cell_repeat=(num_cells, num_cells))
+    loading_params = LoadingParams(type='disp', direction='x', data=0.1 * num_cells * 12.547)
+    structure_geometry = geometry.PlanarStructureGeometry(unit_cell_params, pattern_params, 'x')
+    (coords, elements, thickness) = frame.create_frame_model(structure_geometry)
+    results = []
+    # A refresh ratio of zero updates the tangent stiffness in every iteration (full Newton).
+    for refresh_ratio in (0.0, 0.5):
+        num_factorizations.append(0)
+        (output_table, increment_stats) = corotational.solve_corotational(
+            coords, elements, thickness, material_params, loading_params,
+            refresh_ratio=refresh_ratio)
+        num_iterations = sum(stats.num_iterations for stats in increment_stats)
+        results.append( (output_table, num_iterations) )
+    
+    assert num_factorizations[0] == results[0][1]
+    assert num_factorizations[1] < results[1][1]
+    assert num_factorizations[1] < num_factorizations[0]
+    assert np.allclose(results[1][0][-1, -2:], results[0][0][-1, -2:], rtol=1E-3)
+
+
+def test_zero_length_elements_are_rejected():
+    coords   = np.array([[0.0, 0.0], [1.0, 0.0], [1.0, 0.0]])
+    elements = np.array([[0, 1], [1, 2]])
+    with pytest.raises(ValueError):
+        corotational.CorotationalFrame(coords, elements, 1.0, np.ones(2), np.ones(2))
@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from pyauxetic import export
+from pyauxetic.geometry import PlanarStructureGeometry, reentrant2d_outline
+from pyauxetic.classes.auxetic_unit_cell_params import Reentrant2DUcpFull, Reentrant2DUcpSimple
+from pyauxetic.classes.auxetic_structure_params import PatternParams
+
+
+def read_binary_stl(file_path):
+    with open(file_path, 'rb') as file:
+        file.seek(84)
+        return np.fromfile(file, dtype=export._stl_dtype)['vertices'].astype(float)
+
+
+def check_manifold(triangles):
+    """Check that each edge is used once in each direction, i.e. by exactly two triangles."""
+    (vertices, faces) = export.indexed_mesh(triangles)
+    edges = np.concatenate(( faces[:, [0, 1]], faces[:, [1, 2]], faces[:, [2, 0]] ))
+    assert (edges[:, 0] != edges[:, 1]).all()
+    (directed, counts) = np.unique(edges, axis=0, return_counts=True)
+    assert (counts == 1).all()
+    reversed_keys = set(map(tuple, directed[:, ::-1]))
+    assert all(tuple(edge) in reversed_keys for edge in directed)
+
+
+def volume(triangles):
+    return np.einsum('ij,ij->i', triangles[:, 0], np.cross(triangles[:, 1], triangles[:, 2])).sum() / 6.0
+
+
+def expected_volume(geometry):
+    (indices, ids) = geometry.cells()
+    area = sum(np.prod(ribbon_max - ribbon_min) for (ribbon_min, ribbon_max) in geometry.ribbons)
+    for uc_id in ids:
+        (outer, inner, bound_size) = reentrant2d_outline(geometry.params[uc_id])
+        area += abs(export._signed_area(outer)) - abs(export._signed_area(inner))
+    return area * geometry.extrusion_depth
+
+
+simple = Reentrant2DUcpSimple(1, 2.0, 10.0, 1.0, 1.0, 60.0)
+
+
+def mismatched_params():
+    """Return two unit cells with the same bounding box whose vertical struts touch different intervals."""
+    full  = Reentrant2DUcpFull(1, 2.0, 3.25, 1.0, 6.0, 0.8, 60.0, 9.5, 1.0)
+    other = full._replace(id=2, tail_strut_length=3.5, vert_strut_length=9.0, vert_strut_thickness=0.8)
+    assert np.allclose(reentrant2d_outline(full)[2], reentrant2d_outline(other)[2])
+    return (full, other)
+
+
+@pytest.mark.parametrize('loading_direction', ['x', 'y'])
+def test_uniform_stl_is_manifold(tmpdir, loading_direction):
+    pattern_params = PatternParams(pattern_mode='uniform', num_cell_repeat=(5, 3))
+    geometry = PlanarStructureGeometry(simple, pattern_params, loading_direction)
+    file_path = str(tmpdir.join('structure.stl'))
+    
+    num_triangles = export.export_stl(geometry, file_path, chunk_size=100)
+    triangles = read_binary_stl(file_path)
+    assert len(triangles) == num_triangles
+    check_manifold(triangles)
+    assert volume(triangles) == pytest.approx(expected_volume(geometry), rel=1E-6)
+
+
+@pytest.mark.parametrize('loading_direction', ['x', 'y'])
+def test_nonuniform_stl_is_manifold(tmpdir, loading_direction):
+    structure_map = np.random.RandomState(1).randint(0, 3, size=(6, 5))
+    pattern_params = PatternParams(pattern_mode='nonuniform', structure_map=structure_map)
+    geometry = PlanarStructureGeometry(mismatched_params(), pattern_params, loading_direction)
+    file_path = str(tmpdir.join('structure.stl'))
+    
+    export.export_stl(geometry, file_path)
+    triangles = read_binary_stl(file_path)
+    check_manifold(triangles)
+    assert volume(triangles) == pytest.approx(expected_volume(geometry), rel=1E-6)
+
+
+def test_shared_walls_are_removed():
+    faces = export.reentrant2d_cell_faces(simple)
+    contacts = faces[2]
+    # The vertical and tail struts touch each side of the bounding box.
+    assert all(len(intervals) > 0 for intervals in contacts)
+    
+    isolated = export.reentrant2d_cell_triangles(faces, [np.zeros((0, 2))] * 4, 1.0)
+    assert len(isolated) == len(export.reentrant2d_triangles(simple, 1.0))
+    surrounded = export.reentrant2d_cell_triangles(faces, [contacts[side ^ 1] for side in range(4)], 1.0)
+    assert len(surrounded) == len(isolated) - 2 * sum(len(intervals) for intervals in contacts)
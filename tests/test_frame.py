@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('scipy')
+
+from pyauxetic import geometry
+from pyauxetic.solvers import frame
+from pyauxetic.classes.auxetic_unit_cell_params import Reentrant2DUcpSimple
+from pyauxetic.classes.auxetic_structure_params import PatternParams, MaterialParams, LoadingParams
+
+
+unit_cell_params = Reentrant2DUcpSimple(1, 1.0, 10.0, 1.0, 1.0, 60.0)
+material_params  = MaterialParams(elastic=(1000.0, 0.3))
+
+
+@pytest.mark.parametrize('direction', ['x', 'y'])
+def test_frame_model_has_no_zero_length_struts(direction):
+    pattern_params = PatternParams(pattern_mode='uniform', num_cell_repeat=(10, 10))
+    structure_geometry = geometry.PlanarStructureGeometry(unit_cell_params, pattern_params, direction)
+    (coords, elements, thickness) = frame.create_frame_model(structure_geometry)
+    
+    assert (elements[:, 0] != elements[:, 1]).all()
+    lengths = np.hypot(*(coords[elements[:, 1]] - coords[elements[:, 0]]).T)
+    assert lengths.min() > 1E-3
+    assert (thickness > 0).all()
+
+
+@pytest.mark.parametrize('direction', ['x', 'y'])
+def test_uniform_lattice_is_solved(direction):
+    pattern_params = PatternParams(pattern_mode='uniform', num_cell_repeat=(10, 10))
+    loading_params = LoadingParams(type='disp', direction=direction, data=1.0)
+    output_table = frame.run_frame_analysis(unit_cell_params, pattern_params,
+                                            material_params, loading_params)
+    
+    assert np.isfinite(output_table).all()
+    # Reentrant structures expand under tension, so the Poisson's ratio is negative.
+    assert output_table[-1, -1] < 0
+    assert output_table[-1, -2] < 0
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from pyauxetic import geometry
+from pyauxetic.geometry import SparseStructureMap
+from pyauxetic.classes.auxetic_unit_cell_params import Reentrant2DUcpSimple
+from pyauxetic.classes.auxetic_structure_params import PatternParams
+
+
+unit_cell_params = Reentrant2DUcpSimple(1, 1.0, 10.0, 1.0, 1.0, 60.0)
+
+
+def random_structure_map(seed, shape=(13, 9)):
+    return np.random.RandomState(seed).randint(0, 3, size=shape)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_sparse_round_trip(seed):
+    structure_map = random_structure_map(seed)
+    sparse_map = SparseStructureMap.from_dense(structure_map)
+    assert (sparse_map.to_dense() == structure_map).all()
+    assert sparse_map.count_nonzero() == np.count_nonzero(structure_map)
+    
+    indices = np.argwhere(structure_map != 0)
+    from_coordinates = SparseStructureMap.from_coordinates(indices, structure_map[structure_map != 0],
+                                                           structure_map.shape)
+    assert (from_coordinates.to_dense() == structure_map).all()
+    (cell_indices, cell_ids) = sparse_map.cells()
+    assert (cell_indices == indices).all()
+    assert (cell_ids == structure_map[structure_map != 0]).all()
+
+
+def test_lookup():
+    structure_map = random_structure_map(0)
+    sparse_map = SparseStructureMap.from_dense(structure_map)
+    (i, j) = np.meshgrid(np.arange(-2, 16), np.arange(-2, 12), indexing='ij')
+    indices = np.column_stack(( i.ravel(), j.ravel() ))
+    padded = np.pad(structure_map, ((2, 3), (2, 3)), mode='constant')
+    assert (sparse_map.lookup(indices) == padded.ravel()).all()
+    assert (SparseStructureMap((3, 3), []).lookup(indices) == 0).all()
+
+
+def test_invalid_rectangles():
+    with pytest.raises(ValueError):
+        SparseStructureMap((4, 4), [ (1, (0, 0), (5, 1)) ])
+    with pytest.raises(ValueError):
+        SparseStructureMap((4, 4), [ (0, (0, 0), (1, 1)) ])
+    with pytest.raises(ValueError):
+        SparseStructureMap((10, 10), [ (1, (0, 0), (5, 5)), (2, (4, 4), (3, 3)) ])
+    # Crossing rectangles do not contain each other's corners.
+    with pytest.raises(ValueError):
+        SparseStructureMap((10, 10), [ (1, (0, 3), (10, 1)), (2, (3, 0), (1, 10)) ])
+    SparseStructureMap((10, 10), [ (1, (0, 0), (5, 5)), (2, (5, 0), (5, 5)), (1, (0, 5), (10, 5)) ])
+
+
+def test_huge_porous_map_is_not_materialized():
+    # A dense array of this map would need 80 GB.
+    sparse_map = SparseStructureMap((100000, 100000), [ (1, (0, 0), (3, 2)), (1, (70000, 90000), (2, 2)) ])
+    pattern_params = PatternParams(pattern_mode='nonuniform', structure_map=sparse_map)
+    structure_geometry = geometry.PlanarStructureGeometry(unit_cell_params, pattern_params, 'y')
+    
+    assert isinstance(structure_geometry.structure_map, SparseStructureMap)
+    (indices, ids) = structure_geometry.cells()
+    assert len(ids) == 10
+    local = np.random.RandomState(0).rand(500, 2) * structure_geometry.bound_size
+    filled = structure_geometry.core_origin + indices[-1] * structure_geometry.bound_size + local
+    empty  = filled + [0, 100 * structure_geometry.bound_size[1]]
+    assert structure_geometry.contains(filled).any()
+    assert not structure_geometry.contains(empty).any()
+
+
+def test_sparse_and_dense_geometries_are_equal():
+    structure_map = random_structure_map(3) % 2
+    structure_map[0, :] = 1
+    dense_geometry  = geometry.PlanarStructureGeometry(
+        unit_cell_params, PatternParams(pattern_mode='nonuniform', structure_map=structure_map),
+        'x')
+    sparse_geometry = geometry.PlanarStructureGeometry(
+        unit_cell_params, PatternParams(pattern_mode='nonuniform',
+                                                       structure_map=SparseStructureMap.from_dense(structure_map)),
+        'x')
+    points = np.random.RandomState(0).rand(2000, 2) * dense_geometry.size
+    assert (dense_geometry.contains(points) == sparse_geometry.contains(points)).all()
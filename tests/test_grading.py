@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+
+from pyauxetic import grading
+from pyauxetic.classes.auxetic_unit_cell_params import Reentrant2DUcpBox, Reentrant2DUcpSimple
+
+
+base_params = Reentrant2DUcpBox(1, 5.0, 20.0, 24.0, 2.0, 1.5, 70.0)
+
+
+def graded_values(unit_cell_params, structure_map, name):
+    """Return the value of a parameter at each cell of the structure map."""
+    values = np.array([getattr(params, name) for params in unit_cell_params])
+    return values[structure_map - 1]
+
+
+def test_variation_is_monotonic():
+    fields = {'diag_strut_angle': lambda x, y: 60.0 + 20.0 * x / x.max()}
+    (unit_cell_params, structure_map) = grading.graded_structure(base_params, fields, (8, 3),
+                                                                 tolerance=0.5)
+    angles = graded_values(unit_cell_params, structure_map, 'diag_strut_angle')
+    
+    assert structure_map.shape == (8, 3)
+    # The angle increases along x and is constant along y.
+    assert (np.diff(angles, axis=0) > 0).all()
+    assert (angles == angles[:, :1]).all()
+    assert angles.max() == pytest.approx(80.0)
+    # The other parameters are those of the base unit cell.
+    assert all(params.vert_strut_thickness == 2.0 for params in unit_cell_params)
+
+
+def test_levels_are_clamped_to_the_range_of_the_field():
+    fields = {'diag_strut_angle': lambda x, y: 60.0 + 0.1 * x + 0.05 * y,
+              'vert_strut_thickness': lambda x, y: 1.0 + 0.01 * y}
+    shape = (7, 5)
+    tolerance = {'diag_strut_angle': 3.0, 'vert_strut_thickness': 0.05}
+    (unit_cell_params, structure_map) = grading.graded_structure(base_params, fields, shape,
+                                                                 tolerance=tolerance)
+    (i, j) = np.indices(shape)
+    (x, y) = ( (i + 0.5) * 20.0, (j + 0.5) * 24.0 )
+    for (name, field) in fields.items():
+        exact  = field(x, y)
+        values = graded_values(unit_cell_params, structure_map, name)
+        # Rounding to the grid never leaves the range of the field.
+        assert values.min() >= exact.min() - 1E-12
+        assert values.max() <= exact.max() + 1E-12
+        assert abs(values - exact).max() <= tolerance[name] + 1E-12
+
+
+def test_max_unique_cells():
+    fields = {'diag_strut_angle': lambda x, y: 55.0 + 0.1 * x + 0.05 * y}
+    (unit_cell_params, structure_map) = grading.graded_structure(base_params, fields, (10, 10),
+                                                                 max_unique_cells=4)
+    assert 1 < len(unit_cell_params) <= 4
+    angles = graded_values(unit_cell_params, structure_map, 'diag_strut_angle')
+    assert angles.min() >= 55.0 + 0.1 * 10 + 0.05 * 12
+    assert angles.max() <= 55.0 + 0.1 * 190 + 0.05 * 228
+
+
+def test_structure_map_ids():
+    fields = {'diag_strut_angle': lambda x, y: np.where(x < 60.0, 65.0, 75.0),
+              'vert_strut_thickness': 2.5}
+    (unit_cell_params, structure_map) = grading.graded_structure(base_params, fields, (6, 2))
+    
+    assert [params.id for params in unit_cell_params] == [1, 2]
+    assert structure_map.dtype.kind == 'i'
+    assert (structure_map[:3] == 1).all() and (structure_map[3:] == 2).all()
+    assert [params.diag_strut_angle for params in unit_cell_params] == [65.0, 75.0]
+    assert all(params.vert_strut_thickness == 2.5 for params in unit_cell_params)
+
+
+def test_quantize_fields_keeps_identical_values():
+    values = np.array([[1.0, 2.0], [1.0, 2.0], [3.0, 2.0]])
+    (levels, labels, max_errors) = grading.quantize_fields(values, [0.0, 0.0])
+    assert len(levels) == 2
+    assert labels[0] == labels[1] != labels[2]
+    assert (max_errors == 0).all()
+
+
+def test_invalid_fields():
+    with pytest.raises(ValueError):
+        grading.graded_structure(base_params, {'id': 2}, (2, 2))
+    with pytest.raises(ValueError):
+        grading.graded_structure(base_params, {'not_a_parameter': 1.0}, (2, 2))
+    # Invalid values are rejected by the geometry.
+    with pytest.raises(ValueError):
+        grading.graded_structure(base_params, {'diag_strut_angle': lambda x, y: 80.0 + x}, (2, 2))
+    # The bounding box of Reentrant2DUcpSimple changes with the length of the vertical struts.
+    simple_params = Reentrant2DUcpSimple(1, 1.0, 10.0, 1.0, 1.0, 60.0)
+    with pytest.raises(ValueError):
+        grading.graded_structure(simple_params, {'vert_strut_length': lambda x, y: 10.0 + 0.1 * x},
+                                 (2, 2))
@@ -0,0 +1,111 @@
+import json
+
+import numpy as np
+import pytest
+
+from pyauxetic import increment_learning
+from pyauxetic.postprocessing import to_json_compatible
+from pyauxetic.classes.auxetic_unit_cell_params import Reentrant2DUcpSimple, Reentrant2DUcpFull
+from pyauxetic.classes.auxetic_structure_params import (
+    StepParams, MaterialParams, IncrementLearningParams)
+
+
+material_params = MaterialParams(elastic=(1000.0, 0.3))
+
+sta_text = """ SUMMARY OF JOB INFORMATION:
+ STEP  INC ATT SEVERE EQUIL TOTAL  TOTAL      STEP       INC OF       DOF    IF
+    1     1   1     0     3     3  0.100      0.100      0.1000
+    1     2   1U    0     6     6  0.100      0.100      0.1000
+    1     2   2     0     4     4  0.125      0.125      0.02500
+    1     3   1     0     2     2  0.200      0.200      0.07500
+    2     1   1     0     2     2  0.300      0.100      0.1000
+ THE ANALYSIS HAS COMPLETED SUCCESSFULLY
+"""
+
+
+def make_summary(first_inc_size, min_inc_size, max_inc_size, num_increments=10):
+    return dict(num_increments=num_increments, num_cutbacks=0, total_iters=3 * num_increments,
+                step_time=1.0, first_inc_size=first_inc_size,
+                min_inc_size=min_inc_size, max_inc_size=max_inc_size)
+
+
+def test_to_json_compatible():
+    value = to_json_compatible([StepParams(time_period=2), np.arange(2), np.float64(0.5)])
+    assert json.loads(json.dumps(value)) == value
+    assert value[0][0] == 'StepParams'
+    assert ['time_period', 2] in value[0][1]
+    assert value[1:] == [[0, 1], 0.5]
+
+
+def test_summarize_sta(tmp_path):
+    sta_path = str(tmp_path.joinpath('job-1.sta'))
+    assert increment_learning.summarize_sta(sta_path) is None
+    with open(sta_path, 'w') as file:
+        file.write(sta_text)
+    
+    summary = increment_learning.summarize_sta(sta_path)
+    # Only the first step is summarized.
+    assert summary['num_increments'] == 3
+    assert summary['num_cutbacks'] == 1
+    assert summary['total_iters'] == 15
+    assert summary['step_time'] == pytest.approx(0.2)
+    assert summary['first_inc_size'] == pytest.approx(0.1)
+    assert summary['min_inc_size'] == pytest.approx(0.025)
+    assert summary['max_inc_size'] == pytest.approx(0.1)
+
+
+def test_history_is_appended(tmp_path):
+    history_file = str(tmp_path.joinpath('history.jsonl'))
+    assert increment_learning.read_history(history_file) == []
+    unit_cell_params = Reentrant2DUcpSimple(1, 1.0, 10.0, 1.0, 1.0, 60.0)
+    for k in range(2):
+        increment_learning.record_run(history_file, unit_cell_params, material_params,
+                                      StepParams(time_period=2), make_summary(0.1, 0.01, 0.2 * (k+1)))
+    
+    records = increment_learning.read_history(history_file)
+    assert len(records) == 2
+    assert records[0]['unit_cell'] == 'Reentrant2DUcpSimple'
+    # The id of the unit cell is not stored.
+    assert records[0]['params'] == [1.0, 10.0, 1.0, 1.0, 60.0]
+    assert records[0]['time_period'] == 2
+    assert [record['summary']['max_inc_size'] for record in records] == [0.2, 0.4]
+
+
+def test_step_params_are_learned_from_nearest_runs(tmp_path):
+    history_file = str(tmp_path.joinpath('history.jsonl'))
+    learning_params = IncrementLearningParams(history_file=history_file, num_neighbors=2,
+                                              min_inc_factor=0.5)
+    runs = [ (Reentrant2DUcpSimple(1, 1.0, 10.0, 1.0, 1.0, 60.0), material_params, make_summary(0.2, 0.02, 0.4)),
+             (Reentrant2DUcpSimple(2, 1.0, 10.0, 1.0, 1.0, 62.0), material_params, make_summary(0.4, 0.04, 0.6, 30)),
+             # The farthest run, a different material and a different unit cell class are not used.
+             (Reentrant2DUcpSimple(3, 1.0, 20.0, 1.0, 1.0, 45.0), material_params, make_summary(1.0, 1.0, 1.0)),
+             (Reentrant2DUcpSimple(4, 1.0, 10.0, 1.0, 1.0, 60.0), MaterialParams(elastic=(5.0, 0.3)),
+              make_summary(1.0, 1.0, 1.0)),
+             (Reentrant2DUcpFull(5, 1.0, 10.0, 1.0, 1.0, 1.0, 60.0, 5.0, 1.0), material_params,
+              make_summary(1.0, 1.0, 1.0)) ]
+    for (unit_cell_params, material, summary) in runs:
+        increment_learning.record_run(history_file, unit_cell_params, material,
+                                      StepParams(time_period=2), summary)
+    
+    step_params = StepParams(time_period=1, max_num_inc=20)
+    learned = increment_learning.suggest_step_params(learning_params,
+                                                     Reentrant2DUcpSimple(9, 1.0, 10.0, 1.0, 1.0, 61.0),
+                                                     material_params, step_params)
+    # The sizes are scaled from a time period of 2 to 1.
+    assert learned.init_inc_size == pytest.approx(0.15)
+    assert learned.max_inc_size  == pytest.approx(0.25)
+    assert learned.min_inc_size  == pytest.approx(0.005)
+    assert learned.max_num_inc   == 60
+    assert learned.time_period   == 1
+
+
+def test_step_params_without_matching_runs(tmp_path):
+    history_file = str(tmp_path.joinpath('history.jsonl'))
+    step_params = StepParams()
+    unit_cell_params = Reentrant2DUcpSimple(1, 1.0, 10.0, 1.0, 1.0, 60.0)
+    learned = increment_learning.suggest_step_params(IncrementLearningParams(history_file=history_file),
+                                                     unit_cell_params, material_params, step_params)
+    assert learned is step_params
+    with pytest.raises(ValueError):
+        increment_learning.suggest_step_params(IncrementLearningParams(), unit_cell_params,
+                                               material_params, step_params)
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from pyauxetic import mesh_quality
+from pyauxetic.classes.auxetic_structure_params import MeshQualityParams
+
+
+square   = np.array([[0.0, 0.0], [1.0, 0.0], [1.0, 1.0], [0.0, 1.0]])
+triangle = np.array([[0.0, 0.0], [1.0, 0.0], [0.5, np.sqrt(3) / 2]])
+
+
+def test_ideal_elements():
+    for (coords, elements) in ((square, [[0, 1, 2, 3]]), (triangle, [[0, 1, 2]])):
+        metrics = mesh_quality.element_quality(coords, elements)
+        assert np.allclose(metrics['aspect_ratio'], 1.0)
+        assert np.allclose(metrics['skew'], 0.0, atol=1E-12)
+        assert np.allclose(metrics['jacobian'], 1.0)
+
+
+def test_min_angle():
+    assert np.allclose(mesh_quality.element_quality(square, [[0, 1, 2, 3]])['min_angle'], 90.0)
+    assert np.allclose(mesh_quality.element_quality(triangle, [[0, 1, 2]])['min_angle'], 60.0)
+
+
+def test_distorted_elements():
+    coords = np.array([[0.0, 0.0], [4.0, 0.0], [5.0, 1.0], [1.0, 1.0]])
+    metrics = mesh_quality.element_quality(coords, [[0, 1, 2, 3]])
+    assert np.allclose(metrics['aspect_ratio'], 4.0 / np.sqrt(2))
+    assert np.allclose(metrics['skew'], 0.5)
+    assert np.allclose(metrics['jacobian'], np.sin(np.pi / 4))
+    assert np.allclose(metrics['min_angle'], 45.0)
+
+
+def test_inverted_planar_element():
+    metrics = mesh_quality.element_quality(square, [[0, 3, 2, 1]])
+    assert np.allclose(metrics['jacobian'], -1.0)
+
+
+def test_shell_elements():
+    # An element in the xz plane has the same metrics as in the xy plane.
+    coords = np.column_stack(( square[:, 0], np.zeros(4), square[:, 1] ))
+    metrics = mesh_quality.element_quality(coords, [[0, 1, 2, 3]])
+    assert np.allclose(metrics['jacobian'], 1.0)
+    assert np.allclose(metrics['min_angle'], 90.0)
+
+
+def test_concave_element():
+    coords = np.array([[0.0, 0.0], [2.0, 0.0], [0.5, 0.5], [0.0, 2.0]])
+    assert mesh_quality.element_quality(coords, [[0, 1, 2, 3]])['jacobian'][0] < 0
+
+
+def test_evaluate_mesh_quality():
+    coords = np.vstack(( square, [[5.0, 0.1]] ))
+    groups = [ [[0, 1, 2, 3, 0, 0, 0, 0]], [[0, 1, 4]] ]
+    result = mesh_quality.evaluate_mesh_quality(coords, groups, MeshQualityParams())
+    assert result['num_elements'] == 2
+    assert result['num_failed'] == 1
+    assert not result['passed']
+    result = mesh_quality.evaluate_mesh_quality(coords, groups, MeshQualityParams(max_failed_fraction=0.5))
+    assert result['passed']
+    result = mesh_quality.evaluate_mesh_quality(coords, groups[:1], MeshQualityParams())
+    assert result['passed'] and result['num_failed'] == 0
+
+
+def test_disabled_thresholds():
+    coords = np.array([[0.0, 0.0], [5.0, 0.0], [5.0, 1.0], [0.0, 1.0]])
+    quality_params = MeshQualityParams(max_aspect_ratio=2.0)
+    assert not mesh_quality.evaluate_mesh_quality(coords, [[[0, 1, 2, 3]]], quality_params)['passed']
+    quality_params = MeshQualityParams(max_aspect_ratio=None)
+    assert mesh_quality.evaluate_mesh_quality(coords, [[[0, 1, 2, 3]]], quality_params)['passed']
+
+
+def test_invalid_meshes():
+    with pytest.raises(ValueError):
+        mesh_quality.evaluate_mesh_quality(square, [[[0, 1, 2, 3, 0]]], MeshQualityParams())
+    with pytest.raises(ValueError):
+        mesh_quality.evaluate_mesh_quality(square, [[]], MeshQualityParams())
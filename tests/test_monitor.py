@@ -0,0 +1,41 @@
+from pyauxetic.monitor import JobMonitor
+
+
+stale_sta = """ SUMMARY OF JOB INFORMATION:
+    1     1   1     0     3     3  0.100      0.100      0.1000
+    1     2   1     0     3     3  0.200      0.200      0.1000
+ THE ANALYSIS HAS COMPLETED SUCCESSFULLY
+"""
+
+new_sta = """ SUMMARY OF JOB INFORMATION:
+    1     1   1U    0     6     6  0.000      0.000      0.1000
+    1     1   2     0     4     4  0.025      0.025      0.0250
+"""
+
+
+def write_sta(folder, text):
+    with open(str(folder.joinpath('job-1.sta')), 'w') as file:
+        file.write(text)
+
+
+def test_stale_sta_file_is_ignored(tmp_path):
+    write_sta(tmp_path, stale_sta)
+    monitor = JobMonitor('job-1', str(tmp_path))
+    monitor.poll()
+    assert monitor.increments == []
+    assert not monitor.finished
+    
+    write_sta(tmp_path, new_sta)
+    monitor.poll()
+    assert [status.increment for status in monitor.increments] == [1]
+    assert monitor.num_cutbacks == 1
+    assert not monitor.finished
+
+
+def test_new_sta_file_is_read(tmp_path):
+    monitor = JobMonitor('job-1', str(tmp_path))
+    monitor.poll()
+    write_sta(tmp_path, stale_sta)
+    monitor.poll()
+    assert len(monitor.increments) == 2
+    assert monitor.finished and monitor.completed
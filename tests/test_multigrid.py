@@ -0,0 +1,89 @@
+import tracemalloc
+
+import numpy as np
+import pytest
+
+pytest.importorskip('scipy')
+
+from scipy import sparse
+
+from pyauxetic import geometry
+from pyauxetic.solvers import common, frame, multigrid
+from pyauxetic.classes.auxetic_unit_cell_params import Reentrant2DUcpSimple
+from pyauxetic.classes.auxetic_structure_params import PatternParams
+
+
+unit_cell_params = Reentrant2DUcpSimple(1, 1.0, 10.0, 1.0, 1.0, 60.0)
+
+
+def create_frame_system(num_cells, max_direct_dofs=100000):
+    pattern_params = PatternParams(pattern_mode='uniform', num_cell_repeat=(num_cells, num_cells))
+    structure_geometry = geometry.PlanarStructureGeometry(unit_cell_params, pattern_params, 'y')
+    (coords, elements, thickness) = frame.create_frame_model(structure_geometry)
+    (area, inertia) = frame.get_section_properties(thickness)
+    K_e = frame.frame_stiffness(coords, elements, 1000.0, area, inertia)
+    K = common.assemble_sparse(K_e, frame.element_dofs(elements), 3 * len(coords))
+    node_sets = common.find_edge_nodes(coords, 1)
+    (fixed_dofs, tied_dofs) = frame.get_loading_constraints(node_sets, 1)
+    system = common.ReducedSystem(K.shape[0], fixed_dofs, tied_dofs,
+                                  dof_points=np.repeat(coords, 3, axis=0), dofs_per_node=3,
+                                  max_direct_dofs=max_direct_dofs)
+    return (K, system)
+
+
+def test_aggregates_cover_all_nodes():
+    n = 30
+    grid = sparse.diags([1.0, 1.0, 1.0], [-1, 0, 1], shape=(n, n))
+    graph = sparse.kron(grid, grid).tocsr()
+    aggregates = multigrid.aggregate_nodes(graph)
+    
+    assert (aggregates >= 0).all()
+    # Each aggregate contains at least the root and its neighbors.
+    assert aggregates.max() + 1 < n * n / 5
+    # The nodes of an aggregate are within two steps of each other.
+    for aggregate in range(aggregates.max() + 1):
+        (x, y) = np.divmod(np.where(aggregates == aggregate)[0], n)
+        assert np.ptp(x) <= 4 and np.ptp(y) <= 4
+
+
+def test_solution_matches_direct_solver():
+    (K, system) = create_frame_system(15)
+    K_r = system.reduce_matrix(K)
+    others = np.arange(system.num_reduced - 1)
+    A = K_r[others, :][:, others]
+    f = np.random.RandomState(0).rand(A.shape[0])
+    components = system.free_dofs % 3
+    modes = multigrid.rigid_body_modes(system.free_points, components, 3)
+    solver = multigrid.SmoothedAggregationSolver(A, modes, system.free_dofs // 3, coarse_size=100)
+    
+    assert len(solver.levels) >= 2
+    x = solver.solve(f)
+    expected = sparse.linalg.spsolve(A.tocsc(), f)
+    assert np.allclose(x, expected, rtol=1E-6, atol=1E-6 * abs(expected).max())
+
+
+@pytest.mark.parametrize('loading_type', ['disp', 'force'])
+def test_iterative_system_matches_direct_system(loading_type):
+    (K, direct_system) = create_frame_system(20)
+    (_, iterative_system) = create_frame_system(20, max_direct_dofs=0)
+    (u_direct, reaction_direct) = direct_system.solve_linear(K, loading_type, 1.0)
+    (u_iterative, reaction_iterative) = iterative_system.solve_linear(K, loading_type, 1.0)
+    
+    assert np.allclose(u_iterative, u_direct, atol=1E-6 * abs(u_direct).max())
+    assert reaction_iterative == pytest.approx(reaction_direct, rel=1E-6)
+
+
+def test_memory_grows_linearly():
+    peaks = []
+    sizes = []
+    for num_cells in (30, 60):
+        (K, system) = create_frame_system(num_cells, max_direct_dofs=0)
+        tracemalloc.start()
+        system.solve_linear(K, 'disp', 1.0)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        sizes.append(K.nnz)
+    
+    # The fill-in of a direct factorization grows superlinearly with the size of the lattice.
+    assert peaks[1] / float(peaks[0]) < 1.25 * sizes[1] / float(sizes[0])
+    assert peaks[1] < 20 * K.data.nbytes
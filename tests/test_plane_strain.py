@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('scipy')
+
+from pyauxetic.solvers import plane_strain
+from pyauxetic.classes.auxetic_unit_cell_params import Reentrant2DUcpSimple
+from pyauxetic.classes.auxetic_structure_params import (PatternParams, MaterialParams,
+                                                        LoadingParams, MeshParams)
+
+# Columns of the output table, see postprocessing.compute_output_table.
+poisson_mean_column     = 8
+poisson_midpoint_column = 9
+
+material_params = MaterialParams(elastic=(1000.0, 0.3))
+
+
+def test_strip_poisson_ratio():
+    # Away from the fixed edge, a long strip contracts freely,
+    # so its plane strain Poisson's ratio is nu / (1 - nu).
+    (nx, ny) = (8, 160)
+    (x, y) = np.meshgrid(np.linspace(0, 2, nx+1), np.linspace(0, 40, ny+1), indexing='ij')
+    coords = np.column_stack(( x.ravel(), y.ravel() ))
+    (i, j) = [index.ravel() for index in np.meshgrid(np.arange(nx), np.arange(ny), indexing='ij')]
+    node_id = lambda i, j: i * (ny + 1) + j  # noqa: E731
+    elements = np.column_stack(( node_id(i, j), node_id(i+1, j), node_id(i+1, j+1), node_id(i, j+1) ))
+    
+    output_table = plane_strain.solve_plane_strain(coords, elements, material_params,
+                                                   LoadingParams(type='disp', direction='y', data=0.1))
+    assert np.allclose(output_table[-1, poisson_midpoint_column], 0.3 / 0.7, rtol=0.01)
+
+
+@pytest.mark.parametrize('direction, poisson_mean', [('x', -0.9835), ('y', -0.3123)])
+def test_reentrant_lattice_poisson_ratio(direction, poisson_mean):
+    unit_cell_params = Reentrant2DUcpSimple(1, 1.0, 10.0, 1.0, 1.0, 60.0)
+    output_table = plane_strain.run_native_analysis(
+        unit_cell_params, PatternParams(pattern_mode='uniform', num_cell_repeat=(2, 2)),
+        material_params, LoadingParams(type='disp', direction=direction, data=0.1),
+        MeshParams(seed_size=0.25))
+    
+    assert output_table.shape == (11, 10)
+    # The analysis is linear, so the Poisson's ratio is the same in all frames.
+    assert np.allclose(output_table[1:, poisson_mean_column], output_table[-1, poisson_mean_column])
+    assert np.allclose(output_table[-1, poisson_mean_column], poisson_mean, rtol=0.02)
@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+from pyauxetic import postprocessing
+from pyauxetic.classes.auxetic_structure_params import LoadingParams, StepParams
+
+
+class FakeFieldOutput(object):
+    """Field output whose values are looked up by the name of the region."""
+    
+    class Value(object):
+        def __init__(self, data):
+            self.data = data
+    
+    class Subset(object):
+        def __init__(self, data):
+            self.values = [FakeFieldOutput.Value(data)]
+    
+    def __init__(self, data):
+        self.data = data
+    
+    def getSubset(self, region):
+        return self.Subset(self.data[region])
+
+
+class FakeFrame(object):
+    def __init__(self, frame_value, u, rf):
+        self.frameValue   = frame_value
+        self.fieldOutputs = {'U': FakeFieldOutput(u), 'RF': FakeFieldOutput(rf)}
+
+
+class FakeStep(object):
+    def __init__(self, frames):
+        self.totalTime = 0.0
+        self.frames    = frames
+
+
+class FakeOdb(object):
+    def __init__(self, frames):
+        self.steps = {'Step-1': FakeStep(frames)}
+        self.rootAssembly = type('Assembly', (object,), {})()
+        self.rootAssembly.nodeSets = {'RP-LD-SET': 'RP-LD-SET', 'RP-TD-SET': 'RP-TD-SET'}
+
+
+class FakeUnitCell(object):
+    bound_size = (20.0, 10.0)
+
+
+class FakeStructure(object):
+    def __init__(self, loading_params):
+        self.loading_direction    = 1
+        self.transverse_direction = 0
+        self.unit_cells           = [FakeUnitCell()]
+        self.loading_params       = loading_params
+        self.step_params          = StepParams(time_period=2.0)
+
+
+def periodic_odb(rf_ld):
+    """Odb of a periodic unit cell strained by 1% in y with a Poisson's ratio of -0.5."""
+    frames = []
+    for time in (0.0, 1.0, 1.5):
+        u = {'RP-LD-SET': (0.0, 0.1 * time / 1.5), 'RP-TD-SET': (0.1 * time / 1.5, 0.0)}
+        rf = {'RP-LD-SET': (0.0, rf_ld * time / 1.5), 'RP-TD-SET': (0.0, 0.0)}
+        frames.append(FakeFrame(time, u, rf))
+    return FakeOdb(frames)
+
+
+def test_applied_load():
+    assert postprocessing.applied_load(LoadingParams('disp', 'y', 1.0), 1.0, 2.0) is None
+    assert postprocessing.applied_load(LoadingParams('Force', 'y', 8.0), 0.5, 2.0) == pytest.approx(2.0)
+
+
+def test_effective_properties_under_displacement_loading():
+    obj = FakeStructure(LoadingParams('disp', 'y', 0.2))
+    properties = postprocessing.get_effective_properties(obj, periodic_odb(rf_ld=3.0))
+    assert properties['strain_ld']  == pytest.approx(0.01)
+    assert properties['poisson']    == pytest.approx(-0.5)
+    assert properties['stress_ld']  == pytest.approx(3.0 / 20.0)
+    assert properties['modulus_ld'] == pytest.approx(15.0)
+
+
+def test_effective_properties_under_force_loading():
+    # The loaded DOF is not constrained, so its reaction force is zero.
+    obj = FakeStructure(LoadingParams('force', 'y', 4.0))
+    properties = postprocessing.get_effective_properties(obj, periodic_odb(rf_ld=0.0))
+    # The last frame is at 1.5 of the time period of 2.
+    assert properties['stress_ld']  == pytest.approx(3.0 / 20.0)
+    assert properties['modulus_ld'] == pytest.approx(15.0)
+    assert properties['poisson']    == pytest.approx(-0.5)
+    assert np.isfinite(list(properties.values())).all()
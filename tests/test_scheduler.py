@@ -0,0 +1,91 @@
+import sys
+
+import pytest
+
+from pyauxetic import scheduler
+from pyauxetic.scheduler import Scheduler, ScheduledJob, fake_solver_job
+from pyauxetic.classes.auxetic_structure_params import SchedulerParams
+
+
+def make_scheduler(num_cpus=4, memory=None, license_tokens=None, backfill=True):
+    return Scheduler(SchedulerParams(num_cpus=num_cpus, memory=memory, license_tokens=license_tokens,
+                                     backfill=backfill, poll_interval=0.05))
+
+
+def test_license_tokens():
+    assert [scheduler.license_tokens(n) for n in (1, 2, 4, 8, 16)] == [5, 6, 8, 12, 16]
+
+
+def test_jobs_larger_than_the_budgets_are_rejected():
+    jobs = make_scheduler(num_cpus=4, memory=1000, license_tokens=6)
+    with pytest.raises(ValueError):
+        jobs.submit(fake_solver_job('cores', 0, num_cpus=8))
+    with pytest.raises(ValueError):
+        jobs.submit(fake_solver_job('memory', 0, memory=2000))
+    with pytest.raises(ValueError):
+        jobs.submit(fake_solver_job('tokens', 0, num_cpus=4))
+    with pytest.raises(ValueError):
+        ScheduledJob('job', [sys.executable, '-c', 'pass'], num_cpus=0)
+
+
+def test_backfill_does_not_delay_the_reserved_job():
+    jobs = make_scheduler(num_cpus=4)
+    long_job = jobs.submit(fake_solver_job('long', 1.5, num_cpus=2))
+    assert jobs.schedule() == [long_job]
+    
+    # The wide job waits for the long job. The short job ends before that and is
+    # backfilled, but the slow job would delay the wide job.
+    wide_job  = jobs.submit(fake_solver_job('wide' , 0.5, num_cpus=4, priority=1))
+    short_job = jobs.submit(fake_solver_job('short', 0.3, num_cpus=2))
+    slow_job  = jobs.submit(fake_solver_job('slow' , 2.0, num_cpus=2))
+    assert jobs.schedule() == [short_job]
+    
+    jobs.run(timeout=60)
+    assert [job.status for job in jobs.jobs] == ['completed'] * 4
+    assert short_job.end_time <= wide_job.start_time
+    assert long_job.end_time  <= wide_job.start_time
+    assert wide_job.end_time  <= slow_job.start_time
+
+
+def test_without_backfill_jobs_start_in_order():
+    jobs = make_scheduler(num_cpus=4, backfill=False)
+    long_job = jobs.submit(fake_solver_job('long', 0.5, num_cpus=2))
+    jobs.schedule()
+    wide_job  = jobs.submit(fake_solver_job('wide' , 0.1, num_cpus=4, priority=1))
+    short_job = jobs.submit(fake_solver_job('short', 0.1, num_cpus=2))
+    assert jobs.schedule() == []
+    
+    jobs.run(timeout=60)
+    assert long_job.end_time <= wide_job.start_time <= wide_job.end_time <= short_job.start_time
+
+
+def test_unknown_runtime_only_uses_spare_resources():
+    jobs = make_scheduler(num_cpus=4)
+    long_job = jobs.submit(fake_solver_job('long', 0.5, num_cpus=2))
+    jobs.schedule()
+    wide_job = jobs.submit(fake_solver_job('wide', 0.1, num_cpus=3, priority=1))
+    unknown_small = jobs.submit(ScheduledJob('unknown-small', [sys.executable, '-c', 'pass'], num_cpus=1))
+    unknown_large = jobs.submit(ScheduledJob('unknown-large', [sys.executable, '-c', 'pass'], num_cpus=2))
+    # After the long job ends, the wide job leaves one core, which the small job may use.
+    assert jobs.schedule() == [unknown_small]
+    jobs.run(timeout=60)
+    assert long_job.end_time <= wide_job.start_time
+    assert unknown_large.start_time >= wide_job.start_time
+
+
+def test_failed_jobs():
+    jobs = make_scheduler(num_cpus=2)
+    jobs.submit(fake_solver_job('ok', 0.1))
+    jobs.submit(fake_solver_job('error', 0.1, return_code=3))
+    (ok_job, error_job) = jobs.run(timeout=60)
+    assert (ok_job.status, ok_job.return_code) == ('completed', 0)
+    assert (error_job.status, error_job.return_code) == ('failed', 3)
+
+
+def test_timeout_kills_the_running_jobs():
+    jobs = make_scheduler(num_cpus=1)
+    job = jobs.submit(fake_solver_job('hanging', 30))
+    with pytest.raises(RuntimeError):
+        jobs.run(timeout=0.5)
+    assert job.status == 'failed'
+    assert not jobs.running
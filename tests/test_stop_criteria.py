@@ -0,0 +1,116 @@
+import numpy as np
+import pytest
+
+from pyauxetic import postprocessing
+from pyauxetic.stop_criteria import check_stop_criteria, get_reaction_force
+from pyauxetic.classes.auxetic_structure_params import StopParams, LoadingParams, StepParams
+
+
+def make_output_table(num_frames, strain_step=0.01, poisson=None):
+    """Output table of an analysis whose strain increases by *strain_step* in each frame."""
+    ld_dist_0 = 100.0
+    ld_disp = np.arange(num_frames) * strain_step * ld_dist_0
+    if poisson is None:
+        poisson = -0.5 * np.ones(num_frames)
+    td_strain = np.concatenate(( [0.0], -poisson[1:] * strain_step ))
+    td_disp = np.cumsum(td_strain) * 50.0
+    return postprocessing.compute_output_table(np.arange(num_frames), np.linspace(0, 1, num_frames),
+                                               ld_disp, td_disp, td_disp,
+                                               ld_dist_0, 50.0, 50.0)
+
+
+def test_empty_table():
+    assert check_stop_criteria(StopParams(target_strain_ld=0.045), np.zeros((0, 10))) is None
+
+
+def test_target_strain_uses_total_strain():
+    stop_params = StopParams(target_strain_ld=0.045)
+    assert check_stop_criteria(stop_params, make_output_table(5)) is None
+    message = check_stop_criteria(stop_params, make_output_table(6))
+    assert message is not None and 'strain_ld' in message
+    assert check_stop_criteria(stop_params, make_output_table(11)) is not None
+
+
+def test_target_strain_in_compression():
+    stop_params = StopParams(target_strain_ld=0.045)
+    assert check_stop_criteria(stop_params, make_output_table(6, strain_step=-0.01)) is not None
+
+
+def test_target_reaction_force():
+    stop_params = StopParams(target_reaction_force=10.0)
+    table = make_output_table(3)
+    assert check_stop_criteria(stop_params, table) is None
+    assert check_stop_criteria(stop_params, table, reaction_force=5.0) is None
+    assert check_stop_criteria(stop_params, table, reaction_force=-12.0) is not None
+
+
+def test_poisson_tolerance():
+    stop_params = StopParams(poisson_tolerance=0.01, poisson_num_frames=3)
+    changing = make_output_table(6, poisson=np.linspace(-0.2, -0.7, 6))
+    assert check_stop_criteria(stop_params, changing) is None
+    steady = make_output_table(6, poisson=np.array([0.0, -0.2, -0.4, -0.5, -0.5, -0.5]))
+    assert check_stop_criteria(stop_params, steady) is not None
+
+
+def test_invalid_poisson_metric():
+    stop_params = StopParams(poisson_tolerance=0.01, poisson_metric='strain_ld')
+    with pytest.raises(ValueError):
+        check_stop_criteria(stop_params, make_output_table(3))
+
+
+class FakeFieldOutput(object):
+
+    class Value(object):
+        def __init__(self, data):
+            self.data = data
+    
+    class Subset(object):
+        def __init__(self, data):
+            self.values = [FakeFieldOutput.Value(data)]
+    
+    def __init__(self, data):
+        self.data = data
+    
+    def getSubset(self, region):
+        return self.Subset(self.data)
+
+
+class FakeFrame(object):
+    """Frame whose reaction force at the loading reference point is *rf*."""
+    
+    def __init__(self, frame_value, rf):
+        self.frameValue   = frame_value
+        self.fieldOutputs = {'RF': FakeFieldOutput(rf)}
+
+
+class FakeOdb(object):
+    def __init__(self):
+        self.rootAssembly = type('Assembly', (object,), {})()
+        self.rootAssembly.nodeSets = {'RP-LD-SET': 'RP-LD-SET'}
+
+
+class FakeSet(object):
+    name = 'RP-LD-Set'
+
+
+class FakeStructure(object):
+    def __init__(self, loading_params):
+        self.pattern_mode      = 'periodic'
+        self.loading_rps       = [FakeSet()]
+        self.loading_direction = 1
+        self.loading_params    = loading_params
+        self.step_params       = StepParams(time_period=2.0)
+
+
+def test_reaction_force_under_displacement_loading():
+    obj = FakeStructure(LoadingParams(type='disp', direction='y', data=1.0))
+    assert get_reaction_force(obj, FakeOdb(), FakeFrame(1.0, (0.0, 7.0))) == 7.0
+
+
+def test_reaction_force_under_force_loading():
+    # The reaction force of a force-loaded reference point is zero.
+    obj = FakeStructure(LoadingParams(type='force', direction='y', data=30.0))
+    reaction_force = get_reaction_force(obj, FakeOdb(), FakeFrame(0.5, (0.0, 0.0)))
+    assert reaction_force == pytest.approx(7.5)
+    stop_params = StopParams(target_reaction_force=7.5)
+    assert check_stop_criteria(stop_params, make_output_table(3), reaction_force) is not None
@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+
+from pyauxetic import geometry, tubular
+from pyauxetic.mesh_quality import evaluate_mesh_quality
+from pyauxetic.classes.auxetic_unit_cell_params import Reentrant2DUcpSimple, Reentrant2DUcpBox
+from pyauxetic.classes.auxetic_structure_params import PatternParams, MeshQualityParams
+
+
+unit_cell_params = Reentrant2DUcpSimple(1, 1.0, 10.0, 1.0, 1.0, 60.0)
+
+
+def create_mesh(direction='y', seed_size=0.25, num_cell_repeat=(6, 8), params=unit_cell_params):
+    pattern_params = PatternParams(pattern_mode='uniform', num_cell_repeat=num_cell_repeat)
+    structure_geometry = geometry.PlanarStructureGeometry(params, pattern_params, direction)
+    return tubular.TubularShellMesh(structure_geometry, seed_size)
+
+
+def element_edges(elements):
+    edges = np.stack((elements, np.roll(elements, -1, axis=1)), axis=2).reshape(-1, 2)
+    return np.sort(edges, axis=1)
+
+
+@pytest.mark.parametrize('direction', ['x', 'y'])
+def test_nodes_are_wrapped_onto_the_cylinder(direction):
+    mesh = create_mesh(direction)
+    (x, y, z) = mesh.coords.T
+    
+    assert np.allclose(np.hypot(x, y), mesh.radius)
+    assert z.min() == pytest.approx(0.0) and z.max() == pytest.approx(mesh.length)
+    assert np.allclose(z[mesh.node_sets['End-1']], 0.0)
+    assert np.allclose(z[mesh.node_sets['End-2']], mesh.length)
+    # The structure covers the whole circumference.
+    angles = np.degrees(np.arctan2(y, x)) % 360
+    assert np.histogram(angles, bins=36, range=(0, 360))[0].min() > 0
+
+
+@pytest.mark.parametrize('direction', ['x', 'y'])
+def test_seam_is_closed(direction):
+    mesh = create_mesh(direction)
+    
+    # No two nodes coincide, so the nodes on both sides of the seam are shared.
+    rounded = np.round(mesh.coords, 6)
+    assert len(np.unique(rounded, axis=0)) == len(mesh.coords)
+    # Elements span the seam.
+    angles = np.arctan2(mesh.coords[:, 1], mesh.coords[:, 0])
+    element_angles = angles[mesh.elements]
+    assert ((element_angles.max(axis=1) - element_angles.min(axis=1)) > np.pi).any()
+    # Each edge is shared by at most two elements and the mesh has no free edges on the seam.
+    (edges, counts) = np.unique(element_edges(mesh.elements), axis=0, return_counts=True)
+    assert counts.max() == 2
+    free_nodes = np.unique(edges[counts == 1])
+    on_seam = (abs(mesh.coords[free_nodes, 1]) < 1E-9) & (mesh.coords[free_nodes, 0] > 0)
+    seam_edges = edges[counts == 1][np.isin(edges[counts == 1], free_nodes[on_seam]).all(axis=1)]
+    assert len(seam_edges) == 0
+
+
+def test_mesh_is_connected():
+    mesh = create_mesh()
+    labels = tubular._connected_components(len(mesh.coords), element_edges(mesh.elements))
+    assert len(np.unique(labels)) == 1
+
+
+@pytest.mark.parametrize('direction', ['x', 'y'])
+def test_element_quality(direction):
+    mesh = create_mesh(direction)
+    quality = evaluate_mesh_quality(mesh.coords, [mesh.elements], MeshQualityParams())
+    assert quality['passed']
+    assert quality['num_failed'] == 0
+    assert quality['min_jacobian'] > 0.99
+
+
+def test_seed_size_is_honoured():
+    (coarse, fine) = (create_mesh(seed_size=0.5), create_mesh(seed_size=0.25))
+    for (mesh, seed_size) in ((coarse, 0.5), (fine, 0.25)):
+        lengths = np.linalg.norm(np.diff(mesh.coords[mesh.elements[:, :2]], axis=1), axis=2)
+        assert lengths.max() <= seed_size
+        assert lengths.min() > 0.8 * seed_size
+    assert len(fine.elements) > 3 * len(coarse.elements)
+    with pytest.raises(ValueError):
+        create_mesh(seed_size=0.0)
+
+
+def test_unit_cells_with_different_parameters():
+    params = ( Reentrant2DUcpBox(1, 1.0, 12.0, 10.0, 1.0, 1.0, 60.0),
+               Reentrant2DUcpBox(2, 1.0, 12.0, 10.0, 1.5, 1.0, 70.0) )
+    structure_map = np.ones((4, 6), dtype=int)
+    structure_map[:, ::2] = 2
+    pattern_params = PatternParams(pattern_mode='nonuniform', structure_map=structure_map)
+    mesh = tubular.TubularShellMesh(geometry.PlanarStructureGeometry(params, pattern_params, 'y'), 0.25)
+    labels = tubular._connected_components(len(mesh.coords), element_edges(mesh.elements))
+    assert len(np.unique(labels)) == 1
+
+
+def test_connected_components():
+    edges = np.array([[5, 4], [4, 3], [0, 1], [7, 6], [6, 5]])
+    labels = tubular._connected_components(9, edges)
+    assert list(labels) == [0, 0, 2, 3, 3, 3, 3, 3, 8]
+
+
+def test_write_inp(tmp_path):
+    mesh = create_mesh(seed_size=0.5)
+    file_path = str(tmp_path.joinpath('tube.inp'))
+    mesh.write_inp(file_path)
+    with open(file_path) as file:
+        text = file.read()
+    assert '*Element, type=S4R, elset=Tube' in text
+    assert '*Nset, nset=End-1' in text and '*Nset, nset=End-2' in text
+    assert len(mesh.triangles()) == 2 * len(mesh.elements)
@@ -0,0 +1,75 @@
+import os
+
+import numpy as np
+import pytest
+
+from pyauxetic import workers
+from pyauxetic.classes.auxetic_unit_cell_params import Reentrant2DUcpSimple
+from pyauxetic.classes.auxetic_structure_params import PatternParams, OutputParams
+
+
+def make_kwargs(structure_name, results_path):
+    return dict(structure_name=structure_name,
+                unit_cell_params=Reentrant2DUcpSimple(1, 1.0, 10.0, 1.0, 1.0, 60.0),
+                pattern_params=PatternParams(pattern_mode='uniform', num_cell_repeat=(2, 3)),
+                output_params=OutputParams(result_folder_name=results_path))
+
+
+@pytest.fixture
+def pool_factory(tmpdir):
+    pools = []
+    def factory(**kwargs):
+        pool = workers.WorkerPool(str(tmpdir.join('spool')), stand_in=True,
+                                  poll_interval=0.1, **kwargs)
+        pool.start()
+        pools.append(pool)
+        return pool
+    yield factory
+    for pool in pools:
+        pool.stop(timeout=30)
+
+
+def test_encode_decode_params():
+    params = dict(pattern_params=PatternParams(pattern_mode='nonuniform',
+                                               structure_map=np.array([[1, 2], [2, 1]])),
+                  num_cell_repeat=(2, 3), names=['a', 'b'])
+    decoded = workers.decode_params(workers.encode_params(params))
+    assert isinstance(decoded['pattern_params'], PatternParams)
+    assert (decoded['pattern_params'].structure_map == params['pattern_params'].structure_map).all()
+    assert decoded['num_cell_repeat'] == (2, 3)
+    assert decoded['names'] == ['a', 'b']
+
+
+def test_recycled_workers_complete_all_runs(tmpdir, pool_factory):
+    results_path = str(tmpdir.join('results'))
+    pool = pool_factory(num_workers=1, max_runs=2)
+    kwargs_list = [make_kwargs('structure-%i'%i, results_path) for i in range(5)]
+    results = pool.map(kwargs_list, timeout=120)
+    
+    assert [result['status'] for result in results] == ['completed'] * 5
+    for (kwargs, result) in zip(kwargs_list, results):
+        assert result['results_folder_path'] == os.path.join(results_path, kwargs['structure_name'])
+        assert os.path.isdir(result['results_folder_path'])
+    # Each worker exits after two runs and is replaced by a new one.
+    assert len(set(result['worker_id'] for result in results)) == 3
+
+
+def test_failed_runs_are_reported(tmpdir, pool_factory):
+    results_path = str(tmpdir.join('results'))
+    pool = pool_factory(num_workers=2, max_runs=None)
+    kwargs_list = [make_kwargs('structure-%i'%i, results_path) for i in range(3)]
+    options = [None, dict(error='Meshing failed.'), None]
+    results = pool.map(kwargs_list, timeout=120, stand_in_options=options)
+    
+    assert [result['status'] for result in results] == ['completed', 'failed', 'completed']
+    assert results[1]['error'] == 'RuntimeError: Meshing failed.'
+    assert 'Meshing failed.' in results[1]['traceback']
+    assert results[1]['results_folder_path'] is None
+    # The worker continues after a failed run.
+    assert all(status['alive'] for status in pool.check_health())
+
+
+def test_map_requires_start(tmpdir):
+    pool = workers.WorkerPool(str(tmpdir.join('spool')), stand_in=True)
+    with pytest.raises(RuntimeError):
+        pool.map([make_kwargs('structure', str(tmpdir))])